@@ -58,6 +58,7 @@ class ServerHealthCheckAdmin(admin.ModelAdmin):
         'status_icon',
         'url_reachable',
         'ssh_reachable',
+        'ssh_latency_ms',
         'last_check_display'
     )
     list_filter = ('status', 'url_reachable', 'ssh_reachable', 'last_check')
@@ -69,7 +70,7 @@ class ServerHealthCheckAdmin(admin.ModelAdmin):
             'fields': ('server_name', 'server_url', 'ssh_port')
         }),
         (_('Health Status'), {
-            'fields': ('status', 'url_reachable', 'ssh_reachable', 'last_check')
+            'fields': ('status', 'url_reachable', 'ssh_reachable', 'ssh_latency_ms', 'last_error', 'last_check')
         }),
         (_('Timestamps'), {
             'fields': ('created_at', 'updated_at'),
@@ -285,6 +286,7 @@ class ApprovalAdmin(admin.ModelAdmin):
         """Display execution status icon."""
         icons = {
             'pending': '<span style="color: gray;">-</span>',
+            'queued': '<span style="color: gray;">…</span>',
             'in_progress': '<span style="color: blue;">⟳</span>',
             'success': '<span style="color: green;">✓</span>',
             'failed': '<span style="color: red;">✗</span>',
@@ -7,14 +7,17 @@ import logging
 import os
 import paramiko
 from datetime import datetime, timedelta
+from django.db import transaction
 from django.utils import timezone
 from django.conf import settings
 from django.core.mail import EmailMessage
 from celery import shared_task
+from celery.exceptions import Retry
 from celery.utils.log import get_task_logger
 
 from .models import Approval, ApprovalSettings, RatingSchedule, ServerHealthCheck
 from .email_service import EmailService
+from . import executor, ssh
 
 logger = get_task_logger(__name__)
 
@@ -25,6 +28,7 @@ def _get_ssh_config():
         'password': cfg.get('PASSWORD') or os.getenv('APPROVALS_SSH_PASSWORD'),
         'key_path': cfg.get('KEY_PATH') or os.getenv('APPROVALS_SSH_KEY_PATH'),
         'hosts': cfg.get('HOSTS', {}),
+        'command': cfg.get('COMMAND') or os.getenv('APPROVALS_SSH_COMMAND'),
         'health_username': cfg.get('HEALTH_USERNAME')
         or os.getenv('APPROVALS_SSH_HEALTH_USERNAME')
         or cfg.get('USERNAME')
@@ -32,10 +36,6 @@ def _get_ssh_config():
     }
 
 
-def _resolve_host(config, server_name):
-    return config.get('hosts', {}).get(server_name, server_name)
-
-
 # ============================================================================
 # EMAIL SENDING TASKS (Priority 1)
 # ============================================================================
@@ -199,17 +199,93 @@ def send_approval_rejected_email_task(self, approval_id):
 # SSH EXECUTION TASK
 # ============================================================================
 
+def _unhealthy_server(approval):
+    """Failed health check of the approval's server, or None."""
+    if not approval.rating_schedule:
+        return None
+    health = ServerHealthCheck.objects.filter(server_name=approval.server_name).first()
+    if health and not health.is_healthy():
+        return health
+    return None
+
+
+def _ssh_timeout():
+    """SSH command timeout from the approval settings."""
+    try:
+        return ApprovalSettings.objects.get().ssh_timeout
+    except ApprovalSettings.DoesNotExist:
+        return 900  # Default 15 minutes
+
+
+def _claim_executions(approval):
+    """
+    Claim ``approval`` plus other approvals approved within
+    APPROVALS_EXECUTION_BATCH_WINDOW_SECONDS that are still waiting for
+    execution, so one executor run serves them all. Claiming flips
+    execution_status to 'queued' and stamps execution_claimed_at; the
+    executor moves each one to 'in_progress' (and audits the start) when its
+    command begins. An approval is only ever claimed by one task. Returns the
+    claimed approvals (empty if ``approval`` itself was already taken).
+    """
+    now = timezone.now()
+    if not Approval.objects.filter(
+        pk=approval.pk, status='approved', execution_status='pending'
+    ).update(execution_status='queued', execution_claimed_at=now):
+        return []
+    approval.execution_status, approval.execution_claimed_at = 'queued', now
+    window = getattr(settings, 'APPROVALS_EXECUTION_BATCH_WINDOW_SECONDS', 900)
+    limit = getattr(settings, 'APPROVALS_EXECUTION_BATCH_SIZE', 20)
+    candidates = list(
+        Approval.objects.filter(
+            status='approved',
+            execution_status='pending',
+            approved_at__gte=now - timedelta(seconds=window),
+        ).exclude(pk=approval.pk).order_by('approved_at').values_list('pk', flat=True)[:limit - 1]
+    )
+    claimed = [
+        pk for pk in candidates
+        if Approval.objects.filter(pk=pk, execution_status='pending').update(
+            execution_status='queued', execution_claimed_at=now,
+        )
+    ]
+    return [approval] + list(Approval.objects.filter(pk__in=claimed).select_related('rating_schedule'))
+
+
+def _requeue_executions(task, approval_ids, own=False, only_unfinished=False):
+    """
+    Put claimed approvals back to 'pending' while ``task`` has retries left.
+    Others are handed to their own task, counted against this run's retries;
+    ``own`` is retried by ``task`` itself.
+    """
+    if not approval_ids or task.request.retries >= task.max_retries:
+        return
+    approvals = Approval.objects.filter(pk__in=approval_ids)
+    if only_unfinished:
+        approvals = approvals.filter(execution_status__in=('queued', 'in_progress'))
+    requeued = list(approvals.values_list('pk', flat=True))
+    Approval.objects.filter(pk__in=requeued).update(execution_status='pending', execution_claimed_at=None)
+    if own:
+        return
+    for approval_id in requeued:
+        execute_ssh_approval_task.apply_async((approval_id,), countdown=300, retries=task.request.retries + 1)
+
+
 @shared_task(bind=True, max_retries=2, default_retry_delay=300)
 def execute_ssh_approval_task(self, approval_id):
     """
     Execute SSH command on remote server after approval
 
+    Other recently approved approvals still waiting for execution are run in
+    the same executor call, so commands on different hosts run concurrently
+    while one worker multiplexes their output.
+
     Args:
         approval_id: ID of the Approval object to execute
 
     Returns:
         dict with execution status and output
     """
+    batch = []
     try:
         approval = Approval.objects.get(id=approval_id)
 
@@ -222,160 +298,66 @@ def execute_ssh_approval_task(self, approval_id):
                 'approval_id': approval_id
             }
 
-        # Check server health
-        if approval.rating_schedule:
-            health = ServerHealthCheck.objects.filter(
-                server_name=approval.server_name
-            ).first()
-            if health and not health.is_healthy():
-                logger.warning(f"Server {approval.server_name} is not healthy")
-                approval.execution_status = 'failed'
-                approval.execution_error = f'Server health check failed: {health.status}'
-                approval.save()
-                return {
-                    'success': False,
-                    'message': f'Server {approval.server_name} is not healthy',
-                    'approval_id': approval_id
-                }
-
-        logger.info(f"Starting SSH execution for approval {approval_id}")
-        approval.execution_status = 'in_progress'
-        approval._audit_context = {
-            'action': 'execution_started',
-            'actor_label': 'system',
-            'method': 'ssh',
-            'details': {'server': approval.server_name},
-        }
-        approval.save()
-
-        # Get approval settings for SSH timeout
-        try:
-            settings = ApprovalSettings.objects.get()
-            ssh_timeout = settings.ssh_timeout
-        except ApprovalSettings.DoesNotExist:
-            ssh_timeout = 900  # Default 15 minutes
-
-        # Attempt SSH execution
-        try:
-            ssh_client = paramiko.SSHClient()
-            ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-            # Connect to server
-            # NOTE: Credentials should be retrieved from secure storage (environment, vault, etc.)
-            # For now, this is a template - actual SSH credentials must be configured separately
-
-            ssh_config = _get_ssh_config()
-            host = _resolve_host(ssh_config, approval.server_name)
-            username = ssh_config.get('username')
-            password = ssh_config.get('password')
-            key_path = ssh_config.get('key_path')
-
-            if not username:
-                raise ValueError('SSH username is not configured')
-
-            connect_kwargs = {
-                'hostname': host,
-                'port': approval.server_port,
-                'username': username,
-                'timeout': ssh_timeout,
-            }
-            if key_path:
-                connect_kwargs['pkey'] = paramiko.RSAKey.from_private_key_file(key_path)
-            elif password:
-                connect_kwargs['password'] = password
-            else:
-                raise ValueError('SSH credentials are not configured')
-
-            ssh_client.connect(**connect_kwargs)
-
-            # Execute command (dummy for now - should execute actual script)
-            stdin, stdout, stderr = ssh_client.exec_command(
-                'echo "Approval executed"',
-                timeout=ssh_timeout
-            )
-
-            # Capture output
-            output = stdout.read().decode('utf-8')
-            error = stderr.read().decode('utf-8')
-            exit_code = stdout.channel.recv_exit_status()
-
-            ssh_client.close()
-
-            # Update approval with execution results
-            approval.execution_status = 'success' if exit_code == 0 else 'failed'
-            approval.execution_output = output
-            approval.execution_error = error if error else ''
-            approval.execution_exit_code = exit_code
-            approval.executed_at = timezone.now()
-            approval._audit_context = {
-                'action': 'execution_success' if exit_code == 0 else 'execution_failed',
-                'actor_label': 'system',
-                'method': 'ssh',
-                'details': {
-                    'server': approval.server_name,
-                    'exit_code': exit_code,
-                },
-            }
-            approval.save()
-
-            logger.info(f"SSH execution completed for approval {approval_id} (exit code: {exit_code})")
-
+        batch = _claim_executions(approval)
+        if not batch:
+            logger.info(f"Approval {approval_id} is already executed by another task")
             return {
-                'success': exit_code == 0,
-                'message': 'SSH execution completed',
-                'approval_id': approval_id,
-                'exit_code': exit_code,
-                'output': output[:500]  # Return first 500 chars
+                'success': False,
+                'message': f'Approval execution already handled (status: {approval.execution_status})',
+                'approval_id': approval_id
             }
 
-        except paramiko.AuthenticationException:
-            error_msg = 'SSH authentication failed'
-            logger.error(f"{error_msg} for approval {approval_id}")
-            approval.execution_status = 'failed'
-            approval.execution_error = error_msg
-            approval._audit_context = {
-                'action': 'execution_failed',
-                'actor_label': 'system',
-                'method': 'ssh',
-                'details': {'server': approval.server_name, 'reason': 'auth_failed'},
-            }
-            approval.save()
+        # Check server health
+        runnable = []
+        for item in batch:
+            health = _unhealthy_server(item)
+            if health is None:
+                runnable.append(item)
+                continue
+            logger.warning(f"Server {item.server_name} is not healthy")
+            item.execution_status = 'failed'
+            item.execution_error = f'Server health check failed: {health.status}'
+            item.save()
+        if approval not in runnable:
             return {
                 'success': False,
-                'message': error_msg,
+                'message': f'Server {approval.server_name} is not healthy',
                 'approval_id': approval_id
             }
-        except paramiko.SSHException as ssh_exc:
-            error_msg = f'SSH error: {str(ssh_exc)}'
-            logger.error(f"{error_msg} for approval {approval_id}")
-            approval.execution_status = 'failed'
-            approval.execution_error = error_msg
-            approval._audit_context = {
-                'action': 'execution_failed',
-                'actor_label': 'system',
-                'method': 'ssh',
-                'details': {'server': approval.server_name, 'reason': 'ssh_exception'},
-            }
-            approval.save()
-            raise self.retry(exc=ssh_exc, countdown=300)
-        except Exception as exc:
-            error_msg = f'Execution error: {str(exc)}'
-            logger.error(f"{error_msg} for approval {approval_id}")
-            approval.execution_status = 'failed'
-            approval.execution_error = error_msg
-            approval._audit_context = {
-                'action': 'execution_failed',
-                'actor_label': 'system',
-                'method': 'ssh',
-                'details': {'server': approval.server_name, 'reason': 'exception'},
-            }
-            approval.save()
+
+        logger.info(f"Starting SSH execution for approvals {[item.id for item in runnable]}")
+
+        # Output is streamed into ApprovalExecutionLog rows while the commands run
+        results = executor.execute_approvals(runnable, _get_ssh_config(), _ssh_timeout())
+
+        _requeue_executions(self, [
+            item.id for item in runnable
+            if item.id != approval_id and results[item.id].reason == 'ssh_exception'
+        ])
+
+        result = results[approval.id]
+        if result.reason == 'ssh_exception':
+            logger.error(f"{result.error} for approval {approval_id}")
+            _requeue_executions(self, [approval_id], own=True)
+            raise self.retry(exc=paramiko.SSHException(result.error), countdown=300)
+        if result.reason:
+            logger.error(f"{result.error} for approval {approval_id}")
             return {
                 'success': False,
-                'message': error_msg,
+                'message': result.error,
                 'approval_id': approval_id
             }
 
+        logger.info(f"SSH execution completed for approval {approval_id} (exit code: {result.exit_code})")
+
+        return {
+            'success': result.exit_code == 0,
+            'message': 'SSH execution completed',
+            'approval_id': approval_id,
+            'exit_code': result.exit_code,
+            'output': result.output[:500]  # Return first 500 chars
+        }
+
     except Approval.DoesNotExist:
         logger.error(f"Approval {approval_id} not found")
         return {
@@ -383,8 +365,14 @@ def execute_ssh_approval_task(self, approval_id):
             'message': f'Approval {approval_id} not found',
             'approval_id': approval_id
         }
+    except Retry:
+        raise
     except Exception as exc:
         logger.error(f"Error executing SSH approval: {str(exc)}")
+        # Claimed approvals the failed run did not finish
+        unfinished = [item.id for item in batch if item.id != approval_id]
+        _requeue_executions(self, unfinished, only_unfinished=True)
+        _requeue_executions(self, [approval_id], own=True, only_unfinished=True)
         raise self.retry(exc=exc, countdown=300)
 
 
@@ -452,21 +440,22 @@ def check_server_health():
     """
     Scheduler task to check server connectivity and health
     Runs periodically (e.g., every 15 minutes)
+
+    Hosts are probed concurrently (APPROVALS_HEALTH_WORKERS) over pooled SSH
+    connections; the results are written with one bulk insert/update.
     """
     logger.info("Checking server health...")
 
     try:
-        schedules = RatingSchedule.objects.filter(enabled=True)
+        schedules = list(RatingSchedule.objects.filter(enabled=True))
 
-        if not schedules.exists():
+        if not schedules:
             logger.info("No enabled rating schedules to check")
             return {
                 'success': True,
                 'message': 'No schedules to check'
             }
 
-        checked_count = 0
-
         ssh_config = _get_ssh_config()
         username = ssh_config.get('health_username')
 
@@ -477,57 +466,62 @@ def check_server_health():
                 'message': 'SSH health check username not configured',
             }
 
+        targets = {
+            schedule.pk: (ssh.resolve_host(ssh_config, schedule.server_url_prefix), schedule.ssh_port)
+            for schedule in schedules
+        }
+        results = ssh.probe_many(
+            targets.values(),
+            username,
+            getattr(settings, 'APPROVALS_HEALTH_TIMEOUT', 5),
+            password=ssh_config.get('password'),
+            key_path=ssh_config.get('key_path'),
+        )
+
+        existing = ServerHealthCheck.objects.in_bulk(
+            [schedule.display_name for schedule in schedules], field_name='server_name'
+        )
+        now = timezone.now()
+        to_create = {}
+        to_update = {}
         for schedule in schedules:
-            try:
-                # Check if server is accessible
-                ssh_client = paramiko.SSHClient()
-                ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-                try:
-                    host = _resolve_host(ssh_config, schedule.server_url_prefix)
-                    ssh_client.connect(
-                        host,
-                        port=schedule.ssh_port,
-                        username=username,
-                        timeout=5
-                    )
-                    ssh_client.close()
-
-                    ssh_reachable = True
-                except Exception:
-                    ssh_reachable = False
-
-                # Update or create health check record
-                health, created = ServerHealthCheck.objects.get_or_create(
+            result = results[targets[schedule.pk]]
+            health = existing.get(schedule.display_name) or to_create.get(schedule.display_name)
+            if health is None:
+                health = ServerHealthCheck(
                     server_name=schedule.display_name,
-                    defaults={
-                        'server_url': schedule.server_url_prefix,
-                        'ssh_port': schedule.ssh_port
-                    }
+                    server_url=schedule.server_url_prefix,
+                    ssh_port=schedule.ssh_port,
                 )
+                to_create[schedule.display_name] = health
+            else:
+                to_update[schedule.display_name] = health
+
+            health.status = 'healthy' if result.reachable else 'unreachable'
+            health.ssh_reachable = result.reachable
+            health.ssh_latency_ms = result.latency_ms
+            health.last_error = result.error
+            health.last_check = now
+            health.updated_at = now
+            if not result.reachable:
+                logger.warning(f"Server {schedule.display_name} unreachable: {result.error}")
+
+        with transaction.atomic():
+            ServerHealthCheck.objects.bulk_create(list(to_create.values()))
+            ServerHealthCheck.objects.bulk_update(
+                [health for name, health in to_update.items() if name not in to_create],
+                ['status', 'ssh_reachable', 'ssh_latency_ms', 'last_error', 'last_check', 'updated_at'],
+            )
 
-                # Determine overall status
-                if ssh_reachable:
-                    health.status = 'healthy'
-                    health.ssh_reachable = True
-                else:
-                    health.status = 'unreachable'
-                    health.ssh_reachable = False
-
-                health.last_check = timezone.now()
-                health.save()
-
-                checked_count += 1
-
-            except Exception as exc:
-                logger.warning(f"Error checking server health for {schedule.display_name}: {str(exc)}")
-
+        checked_count = len(schedules)
         logger.info(f"Server health check completed for {checked_count} servers")
 
         return {
             'success': True,
             'message': f'Checked {checked_count} servers',
-            'checked_count': checked_count
+            'checked_count': checked_count,
+            'healthy_count': sum(1 for result in results.values() if result.reachable),
+            'reused_connections': sum(1 for result in results.values() if result.reused),
         }
 
     except Exception as exc:
@@ -538,6 +532,56 @@ def check_server_health():
         }
 
 
+@shared_task
+def recover_stale_executions():
+    """
+    Scheduler task for approvals whose executing worker died
+    Runs periodically (e.g., every 5 minutes)
+
+    Approvals claimed by a batch but not started within
+    APPROVALS_EXECUTION_STALE_SECONDS go back to 'pending' and get their own
+    task again. Approvals still 'in_progress' that long after the SSH timeout
+    are marked failed instead: their command may already have run.
+    """
+    now = timezone.now()
+    stale_seconds = getattr(settings, 'APPROVALS_EXECUTION_STALE_SECONDS', 1800)
+
+    stale_claims = list(Approval.objects.filter(
+        execution_status='queued',
+        execution_claimed_at__lt=now - timedelta(seconds=stale_seconds),
+    ).values_list('pk', flat=True))
+    Approval.objects.filter(pk__in=stale_claims, execution_status='queued').update(
+        execution_status='pending', execution_claimed_at=None,
+    )
+    for approval_id in stale_claims:
+        execute_ssh_approval_task.delay(approval_id)
+
+    stuck = Approval.objects.filter(
+        execution_status='in_progress',
+        execution_claimed_at__lt=now - timedelta(seconds=_ssh_timeout() + stale_seconds),
+    )
+    failed = 0
+    for approval in stuck:
+        logger.warning(f"Approval {approval.id} execution never finished, marking it failed")
+        approval.execution_status = 'failed'
+        approval.execution_error = 'Execution did not finish (worker stopped)'
+        approval._audit_context = {
+            'action': 'execution_failed',
+            'actor_label': 'system',
+            'method': 'auto',
+            'details': {'server': approval.server_name, 'reason': 'stale'},
+        }
+        approval.save(update_fields=['execution_status', 'execution_error'])
+        failed += 1
+
+    return {
+        'success': True,
+        'message': f'Requeued {len(stale_claims)} claimed executions, failed {failed} stuck executions',
+        'requeued_count': len(stale_claims),
+        'failed_count': failed,
+    }
+
+
 # ============================================================================
 # PERIODIC TASK SCHEDULING SETUP
 # ============================================================================
@@ -554,4 +598,8 @@ def check_server_health():
 #         'task': 'apps.approvals.celery_tasks.check_server_health',
 #         'schedule': crontab(minute='*/15'),  # Every 15 minutes
 #     },
+#     'recover-stale-approval-executions': {
+#         'task': 'apps.approvals.celery_tasks.recover_stale_executions',
+#         'schedule': crontab(minute='*/5'),  # Every 5 minutes
+#     },
 # }
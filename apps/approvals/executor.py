@@ -0,0 +1,265 @@
+"""
+SSH command execution for approved operations
+Runs commands over pooled connections and streams their output into ApprovalExecutionLog rows
+"""
+
+import codecs
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import paramiko
+from django.conf import settings
+from django.utils import timezone
+
+from . import ssh
+from .models import Approval, ApprovalExecutionLog
+
+DEFAULT_COMMAND = 'echo "Approval executed"'
+# Characters of stdout/stderr kept on the Approval itself; the full output is in the log rows
+OUTPUT_TAIL_CHARS = 65536
+READ_SIZE = 32768
+POLL_INTERVAL = 0.05
+
+
+@dataclass
+class ExecutionResult:
+    """Outcome of one approval's command."""
+    approval_id: int
+    exit_code: int = None
+    error: str = ''
+    # '', 'auth_failed', 'ssh_exception', 'timeout', 'exception' or 'released'
+    reason: str = ''
+    output: str = ''
+
+    @property
+    def success(self):
+        return not self.reason and self.exit_code == 0
+
+
+class _Execution:
+    """One approval's command: its pooled client, channel and unflushed chunks."""
+
+    def __init__(self, approval, target):
+        self.approval = approval
+        self.target = target
+        self.client = None
+        self.channel = None
+        self.deadline = None
+        self.seq = 0
+        self.pending = []
+        self.pending_size = 0
+        self.tails = {'stdout': '', 'stderr': ''}
+        self.decoders = {
+            stream: codecs.getincrementaldecoder('utf-8')(errors='replace') for stream in self.tails
+        }
+        self.result = ExecutionResult(approval.id)
+
+    def add(self, stream, data, final=False):
+        text = self.decoders[stream].decode(data, final=final)
+        if not text:
+            return
+        self.tails[stream] = (self.tails[stream] + text)[-OUTPUT_TAIL_CHARS:]
+        self.seq += 1
+        self.pending.append(ApprovalExecutionLog(approval=self.approval, seq=self.seq, stream=stream, data=text))
+        self.pending_size += len(text)
+
+    def read(self):
+        """Drain whatever the channel has buffered; returns True if anything arrived."""
+        received = False
+        while self.channel.recv_ready():
+            self.add('stdout', self.channel.recv(READ_SIZE))
+            received = True
+        while self.channel.recv_stderr_ready():
+            self.add('stderr', self.channel.recv_stderr(READ_SIZE))
+            received = True
+        return received
+
+    def take_pending(self):
+        rows, self.pending, self.pending_size = self.pending, [], 0
+        return rows
+
+
+def _connect_target(target, connect_timeout):
+    """Pooled client for ``target`` (network only, runs in a worker thread)."""
+    host, port, username, password, key_path = target
+    if not username:
+        raise ValueError('SSH username is not configured')
+    if not key_path and not password:
+        raise ValueError('SSH credentials are not configured')
+    client, _reused = ssh.pool.acquire(host, port, username, connect_timeout, password=password, key_path=key_path)
+    return client
+
+
+def _fail(execution, exc):
+    if isinstance(exc, paramiko.AuthenticationException):
+        execution.result.reason, execution.result.error = 'auth_failed', 'SSH authentication failed'
+    elif isinstance(exc, paramiko.SSHException):
+        execution.result.reason, execution.result.error = 'ssh_exception', f'SSH error: {str(exc)}'
+    else:
+        execution.result.reason, execution.result.error = 'exception', f'Execution error: {str(exc)}'
+
+
+def _release(execution, broken=False):
+    if execution.channel is not None:
+        execution.channel.close()
+    if execution.client is not None:
+        host, port, username, _password, _key_path = execution.target
+        ssh.pool.release(execution.client, host, port, username, broken=broken)
+        execution.client = None
+
+
+def _mark_started(approval):
+    """
+    Move ``approval`` to 'in_progress'. Returns False when the claim of the
+    calling task was released in the meantime (see
+    celery_tasks.recover_stale_executions); the approval must not run then.
+    """
+    if approval.execution_claimed_at is not None:
+        started_at = timezone.now()
+        # The claim timestamp identifies this task's claim; restarting it
+        # makes the stale timeout count from the start of the command.
+        if not Approval.objects.filter(
+            pk=approval.pk, execution_status='queued', execution_claimed_at=approval.execution_claimed_at,
+        ).update(execution_claimed_at=started_at):
+            return False
+        approval.execution_claimed_at = started_at
+    # A retried execution starts a fresh log
+    approval.execution_logs.all().delete()
+    approval.execution_status = 'in_progress'
+    approval._audit_context = {
+        'action': 'execution_started',
+        'actor_label': 'system',
+        'method': 'ssh',
+        'details': {'server': approval.server_name},
+    }
+    approval.save(update_fields=['execution_status'])
+    return True
+
+
+def _mark_finished(execution):
+    approval, result = execution.approval, execution.result
+    result.output = execution.tails['stdout']
+    approval.execution_status = 'success' if result.success else 'failed'
+    approval.execution_output = result.output
+    approval.execution_error = result.error or execution.tails['stderr']
+    approval.execution_exit_code = result.exit_code
+    details = {'server': approval.server_name}
+    if result.reason:
+        details['reason'] = result.reason
+    else:
+        details['exit_code'] = result.exit_code
+        approval.executed_at = timezone.now()
+    approval._audit_context = {
+        'action': 'execution_success' if result.success else 'execution_failed',
+        'actor_label': 'system',
+        'method': 'ssh',
+        'details': details,
+    }
+    approval.save(update_fields=[
+        'execution_status', 'execution_output', 'execution_error', 'execution_exit_code',
+        'executed_at',
+    ])
+
+
+def execute_approvals(approvals, ssh_config, ssh_timeout, command=None):
+    """
+    Run the approval command for each of ``approvals`` and stream its output.
+
+    ``execute_ssh_approval_task`` passes every approval it claimed in one
+    call. Approvals for different hosts run concurrently; approvals for the same
+    host run one after another over the same pooled connection. Connects
+    happen on a small thread pool, while this thread multiplexes all open
+    channels without blocking, writes output chunks as ApprovalExecutionLog
+    rows every APPROVALS_LOG_FLUSH_SECONDS and closes any command still
+    running after ``ssh_timeout`` seconds.
+
+    Returns ``{approval_id: ExecutionResult}``.
+    """
+    command = command or ssh_config.get('command') or DEFAULT_COMMAND
+    connect_timeout = min(ssh_timeout, getattr(settings, 'APPROVALS_SSH_CONNECT_TIMEOUT', 30))
+    flush_seconds = getattr(settings, 'APPROVALS_LOG_FLUSH_SECONDS', 1.0)
+    queues = {}
+    for approval in approvals:
+        target = (
+            ssh.resolve_host(ssh_config, approval.server_name),
+            approval.server_port,
+            ssh_config.get('username'),
+            ssh_config.get('password'),
+            ssh_config.get('key_path'),
+        )
+        queues.setdefault(target[:3], deque()).append(_Execution(approval, target))
+    if not queues:
+        return {}
+
+    results = {}
+    connecting = {}
+    running = []
+    workers = max(1, min(len(queues), getattr(settings, 'APPROVALS_SSH_WORKERS', 8)))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def start_next(host_key):
+            queue = queues[host_key]
+            while queue:
+                execution = queue.popleft()
+                if _mark_started(execution.approval):
+                    connecting[pool.submit(_connect_target, execution.target, connect_timeout)] = execution
+                    return
+                execution.result.reason, execution.result.error = 'released', 'Execution claim was released'
+                results[execution.approval.id] = execution.result
+
+        def finish(execution, broken=False):
+            _release(execution, broken=broken)
+            ApprovalExecutionLog.objects.bulk_create(execution.take_pending())
+            _mark_finished(execution)
+            results[execution.approval.id] = execution.result
+            start_next(execution.target[:3])
+
+        for host_key in queues:
+            start_next(host_key)
+        last_flush = time.monotonic()
+
+        while connecting or running:
+            progressed = False
+            for future in [future for future in connecting if future.done()]:
+                execution = connecting.pop(future)
+                progressed = True
+                try:
+                    execution.client = future.result()
+                    execution.channel = execution.client.get_transport().open_session(timeout=connect_timeout)
+                    execution.channel.exec_command(command)
+                    execution.channel.setblocking(0)
+                except Exception as exc:
+                    _fail(execution, exc)
+                    finish(execution, broken=True)
+                    continue
+                execution.deadline = time.monotonic() + ssh_timeout
+                running.append(execution)
+
+            for execution in list(running):
+                progressed = execution.read() or progressed
+                channel = execution.channel
+                if channel.exit_status_ready() and not channel.recv_ready() and not channel.recv_stderr_ready():
+                    execution.result.exit_code = channel.recv_exit_status()
+                elif time.monotonic() >= execution.deadline:
+                    execution.result.reason = 'timeout'
+                    execution.result.error = f'SSH command timed out after {ssh_timeout}s'
+                else:
+                    continue
+                for stream in ('stdout', 'stderr'):
+                    execution.add(stream, b'', final=True)
+                running.remove(execution)
+                finish(execution, broken=execution.result.reason == 'timeout')
+                progressed = True
+
+            if time.monotonic() - last_flush >= flush_seconds or any(
+                execution.pending_size >= READ_SIZE for execution in running
+            ):
+                rows = [row for execution in running for row in execution.take_pending()]
+                if rows:
+                    ApprovalExecutionLog.objects.bulk_create(rows)
+                last_flush = time.monotonic()
+            if not progressed:
+                time.sleep(POLL_INTERVAL)
+    return results
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals', '0003_add_archived'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='serverhealthcheck',
+            name='last_error',
+            field=models.CharField(blank=True, help_text='Error of the last failed check', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='serverhealthcheck',
+            name='ssh_latency_ms',
+            field=models.IntegerField(blank=True, help_text='SSH probe latency of the last check in milliseconds', null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals', '0004_health_latency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApprovalExecutionLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField(help_text='Chunk number within the execution')),
+                ('stream', models.CharField(choices=[('stdout', 'Output'), ('stderr', 'Error')], default='stdout', max_length=6)),
+                ('data', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('approval', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='execution_logs', to='approvals.approval')),
+            ],
+            options={
+                'verbose_name': 'Approval Execution Log',
+                'verbose_name_plural': 'Approval Execution Logs',
+                'ordering': ['approval', 'seq'],
+                'indexes': [models.Index(fields=['approval', 'seq'], name='approvals_a_approva_1749a1_idx')],
+            },
+        ),
+    ]
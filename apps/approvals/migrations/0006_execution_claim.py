@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals', '0005_execution_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approval',
+            name='execution_claimed_at',
+            field=models.DateTimeField(blank=True, help_text='When an execution task claimed or started the command', null=True),
+        ),
+        migrations.AlterField(
+            model_name='approval',
+            name='execution_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('queued', 'Queued'), ('in_progress', 'In Progress'), ('success', 'Success'), ('failed', 'Failed'), ('not_executed', 'Not Executed')], default='pending', max_length=20),
+        ),
+    ]
@@ -131,6 +131,16 @@ class ServerHealthCheck(models.Model):
         default=False,
         help_text=_('Is SSH reachable?')
     )
+    ssh_latency_ms = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text=_('SSH probe latency of the last check in milliseconds')
+    )
+    last_error = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text=_('Error of the last failed check')
+    )
 
     last_check = models.DateTimeField(
         null=True,
@@ -289,6 +299,7 @@ class Approval(models.Model):
 
     EXECUTION_STATUS_CHOICES = [
         ('pending', _('Pending')),
+        ('queued', _('Queued')),
         ('in_progress', _('In Progress')),
         ('success', _('Success')),
         ('failed', _('Failed')),
@@ -397,6 +408,11 @@ class Approval(models.Model):
         choices=EXECUTION_STATUS_CHOICES,
         default='pending'
     )
+    execution_claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=_('When an execution task claimed or started the command')
+    )
     execution_output = models.TextField(blank=True)
     execution_error = models.TextField(blank=True)
     execution_exit_code = models.IntegerField(
@@ -548,6 +564,39 @@ class ApprovalReminder(models.Model):
         return f"Reminder {self.reminder_number} - {self.approval.server_name}"
 
 
+class ApprovalExecutionLog(models.Model):
+    """
+    Chunk of SSH command output, written while the command runs
+    so the detail page can follow the execution live.
+    """
+
+    STREAM_CHOICES = [
+        ('stdout', _('Output')),
+        ('stderr', _('Error')),
+    ]
+
+    approval = models.ForeignKey(
+        Approval,
+        on_delete=models.CASCADE,
+        related_name='execution_logs',
+    )
+    seq = models.PositiveIntegerField(help_text=_('Chunk number within the execution'))
+    stream = models.CharField(max_length=6, choices=STREAM_CHOICES, default='stdout')
+    data = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Approval Execution Log')
+        verbose_name_plural = _('Approval Execution Logs')
+        ordering = ['approval', 'seq']
+        indexes = [
+            models.Index(fields=['approval', 'seq']),
+        ]
+
+    def __str__(self):
+        return f"{self.approval.server_name} #{self.seq} ({self.stream})"
+
+
 class ApprovalAuditLog(models.Model):
     """Audit log for approval workflow actions."""
 
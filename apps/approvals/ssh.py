@@ -0,0 +1,208 @@
+"""
+SSH connections for the Approvals app
+Process-wide pool of paramiko clients shared by health checks and approval execution
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import paramiko
+from django.conf import settings
+
+
+def resolve_host(config, server_name):
+    """Host for ``server_name`` from the ``hosts`` mapping of the SSH config, else the name itself."""
+    return config.get('hosts', {}).get(server_name, server_name)
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of one health probe against ``host:port``."""
+    host: str
+    port: int
+    reachable: bool
+    latency_ms: int = None
+    error: str = ''
+    reused: bool = False
+
+
+class SSHConnectionPool:
+    """
+    Idle paramiko clients keyed by ``(host, port, username)``.
+
+    A client is handed to one caller at a time; released clients stay open
+    for ``max_idle`` seconds so the next health run or execution against the
+    same host skips the TCP and key exchange handshake. At most
+    ``max_per_host`` clients per key are checked out at once.
+    """
+
+    def __init__(self, max_idle=None, max_per_host=None):
+        self.max_idle = max_idle
+        self.max_per_host = max_per_host
+        self._idle = {}
+        self._slots = {}
+        self._lock = threading.Lock()
+        self.connects = 0
+
+    @property
+    def idle_seconds(self):
+        if self.max_idle is not None:
+            return self.max_idle
+        return getattr(settings, 'APPROVALS_SSH_POOL_IDLE_SECONDS', 1200)
+
+    def _slot(self, key):
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                limit = self.max_per_host or getattr(settings, 'APPROVALS_SSH_MAX_PER_HOST', 2)
+                slot = self._slots[key] = threading.BoundedSemaphore(max(1, limit))
+            return slot
+
+    def _take_idle(self, key):
+        now = time.monotonic()
+        stale = []
+        client = None
+        with self._lock:
+            entries = self._idle.get(key, [])
+            while entries:
+                candidate, released_at = entries.pop()
+                transport = candidate.get_transport()
+                if now - released_at <= self.idle_seconds and transport is not None and transport.is_active():
+                    client = candidate
+                    break
+                stale.append(candidate)
+        for candidate in stale:
+            candidate.close()
+        return client
+
+    def acquire(self, host, port, username, timeout, password=None, key_path=None, fresh=False):
+        """
+        ``(client, reused)`` for ``host:port``; opens a new connection if none
+        is idle or ``fresh`` is set. Waits up to ``timeout`` for a free
+        per-host slot.
+        """
+        key = (host, port, username)
+        slot = self._slot(key)
+        if not slot.acquire(timeout=timeout):
+            raise TimeoutError(f'No free SSH connection slot for {host}:{port}')
+        try:
+            client = None if fresh else self._take_idle(key)
+            if client is not None:
+                return client, True
+            client = self._connect(host, port, username, timeout, password, key_path)
+        except Exception:
+            slot.release()
+            raise
+        return client, False
+
+    def _connect(self, host, port, username, timeout, password, key_path):
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        connect_kwargs = {
+            'hostname': host,
+            'port': port,
+            'username': username,
+            'timeout': timeout,
+            'banner_timeout': timeout,
+            'auth_timeout': timeout,
+        }
+        if key_path:
+            connect_kwargs['pkey'] = paramiko.RSAKey.from_private_key_file(key_path)
+        elif password:
+            connect_kwargs['password'] = password
+        try:
+            client.connect(**connect_kwargs)
+        except Exception:
+            client.close()
+            raise
+        with self._lock:
+            self.connects += 1
+        return client
+
+    def release(self, client, host, port, username, broken=False):
+        """Return ``client`` to the pool, or close it if it failed."""
+        key = (host, port, username)
+        transport = client.get_transport()
+        if broken or transport is None or not transport.is_active():
+            client.close()
+        else:
+            with self._lock:
+                self._idle.setdefault(key, []).append((client, time.monotonic()))
+        self._slot(key).release()
+
+    @contextmanager
+    def connection(self, host, port, username, timeout, password=None, key_path=None):
+        """Pooled client for the duration of the block; dropped if the block raises."""
+        client, _reused = self.acquire(host, port, username, timeout, password=password, key_path=key_path)
+        try:
+            yield client
+        except Exception:
+            self.release(client, host, port, username, broken=True)
+            raise
+        self.release(client, host, port, username)
+
+    def close_all(self):
+        with self._lock:
+            entries = [client for clients in self._idle.values() for client, _released in clients]
+            self._idle.clear()
+        for client in entries:
+            client.close()
+
+
+pool = SSHConnectionPool()
+
+
+def probe(host, port, username, timeout, password=None, key_path=None, connection_pool=None):
+    """
+    Check that ``host:port`` accepts an SSH session; never raises.
+
+    Latency covers the connect (when no pooled connection was idle) plus one
+    session open round trip, so reused and fresh connections are comparable
+    in what they prove about the server. A pooled connection the server has
+    closed while idle is dropped and the probe retried once on a fresh one.
+    """
+    connection_pool = connection_pool or pool
+    fresh = False
+    while True:
+        started = time.monotonic()
+        try:
+            client, reused = connection_pool.acquire(
+                host, port, username, timeout, password=password, key_path=key_path, fresh=fresh
+            )
+        except Exception as exc:
+            return ProbeResult(host, port, False, error=str(exc)[:255] or exc.__class__.__name__)
+        try:
+            channel = client.get_transport().open_session(timeout=timeout)
+            channel.close()
+        except Exception as exc:
+            connection_pool.release(client, host, port, username, broken=True)
+            if reused:
+                fresh = True
+                continue
+            return ProbeResult(host, port, False, error=str(exc)[:255] or exc.__class__.__name__)
+        connection_pool.release(client, host, port, username)
+        return ProbeResult(host, port, True, latency_ms=int((time.monotonic() - started) * 1000), reused=reused)
+
+
+def probe_many(targets, username, timeout, password=None, key_path=None, workers=None, connection_pool=None):
+    """
+    Probe ``(host, port)`` targets concurrently on a bounded thread pool
+    (``APPROVALS_HEALTH_WORKERS``). Each distinct target is probed once;
+    returns ``{(host, port): ProbeResult}``.
+    """
+    targets = list(dict.fromkeys(targets))
+    if not targets:
+        return {}
+    workers = workers or getattr(settings, 'APPROVALS_HEALTH_WORKERS', 16)
+    workers = max(1, min(workers, len(targets)))
+
+    def run(target):
+        host, port = target
+        return probe(host, port, username, timeout, password=password, key_path=key_path,
+                     connection_pool=connection_pool)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(targets, executor.map(run, targets)))
@@ -1,3 +1,8 @@
+import socket
+import threading
+import time
+
+import paramiko
 import pytest
 
 from apps.approvals import celery_tasks
@@ -16,3 +21,70 @@ def disable_celery_delays(monkeypatch):
     monkeypatch.setattr(celery_tasks.execute_ssh_approval_task, 'delay', noop)
     monkeypatch.setattr(celery_tasks.send_approval_confirmed_email_task, 'delay', noop)
     monkeypatch.setattr(celery_tasks.send_approval_rejected_email_task, 'delay', noop)
+
+
+def _run_command(channel, command):
+    """Commands understood by the SSH stand-in."""
+    # Let the exec request be acknowledged before any output or exit status.
+    time.sleep(0.05)
+    if command == 'hang':
+        return
+    if command == 'stream':
+        channel.sendall(b'step 1\n')
+        time.sleep(0.2)
+        channel.sendall_stderr(b'warning\n')
+        channel.sendall(b'step 2\n')
+        channel.send_exit_status(0)
+    elif command == 'fail':
+        channel.sendall_stderr(b'boom\n')
+        channel.send_exit_status(3)
+    else:
+        channel.sendall(f'ran {command}\n'.encode())
+        channel.send_exit_status(0)
+    channel.close()
+
+
+class _StubServer(paramiko.ServerInterface):
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_auth_password(self, username, password):
+        if username in ('health', 'deploy') and password == 'secret':
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED if kind == 'session' else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=_run_command, args=(channel, command.decode()), daemon=True).start()
+        return True
+
+
+@pytest.fixture(scope='session')
+def ssh_server():
+    """Local SSH stand-in: accepts password ``secret``, opens sessions and runs a few fake commands."""
+    host_key = paramiko.RSAKey.generate(1024)
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(50)
+    state = {'connections': 0, 'transports': []}
+
+    def serve():
+        while True:
+            try:
+                sock, _addr = listener.accept()
+            except OSError:
+                return
+            state['connections'] += 1
+            transport = paramiko.Transport(sock)
+            transport.add_server_key(host_key)
+            transport.start_server(server=_StubServer())
+            state['transports'].append(transport)
+
+    threading.Thread(target=serve, daemon=True).start()
+    state['port'] = listener.getsockname()[1]
+    yield state
+    listener.close()
+    for transport in state['transports']:
+        transport.close()
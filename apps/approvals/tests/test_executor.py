@@ -0,0 +1,173 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from apps.approvals import executor, ssh
+from apps.approvals.models import Approval, ApprovalExecutionLog
+
+
+@pytest.fixture
+def ssh_config(ssh_server):
+    ssh.pool.close_all()
+    yield {
+        'username': 'deploy',
+        'password': 'secret',
+        'hosts': {'exec-a': '127.0.0.1', 'exec-b': 'localhost'},
+    }
+    ssh.pool.close_all()
+
+
+def _approval(server_name, port):
+    return Approval.objects.create(
+        server_name=server_name,
+        server_port=port,
+        scheduled_time=timezone.now() + timedelta(hours=1),
+        deadline=timezone.now() + timedelta(hours=24),
+        email_recipients=['approver@example.com'],
+        status='approved',
+    )
+
+
+@pytest.mark.django_db
+def test_execute_streams_output_into_log_rows(ssh_config, ssh_server, settings):
+    settings.APPROVALS_LOG_FLUSH_SECONDS = 0.05
+    approval = _approval('exec-a', ssh_server['port'])
+
+    result = executor.execute_approvals([approval], ssh_config, 10, command='stream')[approval.id]
+
+    approval.refresh_from_db()
+    assert result.success is True
+    assert approval.execution_status == 'success'
+    assert approval.execution_exit_code == 0
+    assert approval.execution_output == 'step 1\nstep 2\n'
+    logs = list(ApprovalExecutionLog.objects.filter(approval=approval).order_by('seq'))
+    assert ''.join(log.data for log in logs if log.stream == 'stdout') == 'step 1\nstep 2\n'
+    assert [log.data for log in logs if log.stream == 'stderr'] == ['warning\n']
+    assert [log.seq for log in logs] == list(range(1, len(logs) + 1))
+    assert approval.audit_logs.filter(action='execution_success').exists()
+
+
+@pytest.mark.django_db
+def test_execute_times_out_without_hanging(ssh_config, ssh_server):
+    approval = _approval('exec-a', ssh_server['port'])
+
+    result = executor.execute_approvals([approval], ssh_config, 1, command='hang')[approval.id]
+
+    approval.refresh_from_db()
+    assert result.reason == 'timeout'
+    assert approval.execution_status == 'failed'
+    assert 'timed out' in approval.execution_error
+
+
+@pytest.mark.django_db
+def test_execute_runs_hosts_concurrently_and_reuses_connections(ssh_config, ssh_server):
+    first = _approval('exec-a', ssh_server['port'])
+    second = _approval('exec-a', ssh_server['port'])
+    other_host = _approval('exec-b', ssh_server['port'])
+    before = ssh_server['connections']
+
+    results = executor.execute_approvals([first, second, other_host], ssh_config, 10, command='stream')
+
+    assert all(result.success for result in results.values())
+    # exec-a runs twice over one pooled connection, exec-b in parallel on its own.
+    assert ssh_server['connections'] - before == 2
+
+
+@pytest.mark.django_db
+def test_execute_reports_failures(ssh_config, ssh_server):
+    failing = _approval('exec-a', ssh_server['port'])
+    bad_login = _approval('exec-b', ssh_server['port'])
+
+    results = executor.execute_approvals([failing], ssh_config, 10, command='fail')
+    results.update(executor.execute_approvals([bad_login], dict(ssh_config, password='wrong'), 10))
+
+    failing.refresh_from_db()
+    bad_login.refresh_from_db()
+    assert results[failing.id].exit_code == 3
+    assert failing.execution_status == 'failed'
+    assert failing.execution_error == 'boom\n'
+    assert results[bad_login.id].reason == 'auth_failed'
+    assert bad_login.execution_error == 'SSH authentication failed'
+
+
+@pytest.mark.django_db
+def test_execute_ssh_approval_task_uses_executor(ssh_config, ssh_server, settings):
+    from apps.approvals import celery_tasks
+
+    settings.APPROVALS_SSH = {'USERNAME': 'deploy', 'PASSWORD': 'secret', 'HOSTS': {'exec-a': '127.0.0.1'}}
+    approval = _approval('exec-a', ssh_server['port'])
+
+    result = celery_tasks.execute_ssh_approval_task(approval.id)
+
+    assert result['success'] is True
+    assert result['output'] == 'ran echo "Approval executed"\n'
+    assert ApprovalExecutionLog.objects.filter(approval=approval).exists()
+
+
+@pytest.mark.django_db
+def test_execute_ssh_approval_task_runs_waiting_approvals_in_one_batch(ssh_config, ssh_server, settings, monkeypatch):
+    from apps.approvals import celery_tasks
+
+    settings.APPROVALS_SSH = {'USERNAME': 'deploy', 'PASSWORD': 'secret', 'HOSTS': ssh_config['hosts']}
+    first = _approval('exec-a', ssh_server['port'])
+    other_host = _approval('exec-b', ssh_server['port'])
+    stale = _approval('exec-a', ssh_server['port'])
+    Approval.objects.filter(pk__in=[first.pk, other_host.pk]).update(approved_at=timezone.now())
+    Approval.objects.filter(pk=stale.pk).update(approved_at=timezone.now() - timedelta(days=2))
+    calls = []
+    execute = executor.execute_approvals
+    monkeypatch.setattr(executor, 'execute_approvals', lambda approvals, *args: calls.append(
+        sorted(approval.id for approval in approvals)) or execute(approvals, *args))
+
+    assert celery_tasks.execute_ssh_approval_task(first.id)['success'] is True
+
+    assert calls == [sorted([first.id, other_host.id])]
+    other_host.refresh_from_db()
+    stale.refresh_from_db()
+    assert other_host.execution_status == 'success'
+    assert stale.execution_status == 'pending'
+    for approval in (first, other_host):
+        assert approval.audit_logs.filter(action='execution_started').count() == 1
+    # The other approval's own task finds it already executed
+    assert celery_tasks.execute_ssh_approval_task(other_host.id)['success'] is False
+    assert calls == [sorted([first.id, other_host.id])]
+
+
+@pytest.mark.django_db
+def test_recover_stale_executions_requeues_claims_and_fails_stuck_runs(settings, monkeypatch):
+    from apps.approvals import celery_tasks
+
+    settings.APPROVALS_EXECUTION_STALE_SECONDS = 600
+    long_ago = timezone.now() - timedelta(hours=2)
+    claimed = _approval('exec-a', 22)
+    running = _approval('exec-b', 22)
+    fresh = _approval('exec-a', 22)
+    Approval.objects.filter(pk=claimed.pk).update(execution_status='queued', execution_claimed_at=long_ago)
+    Approval.objects.filter(pk=running.pk).update(execution_status='in_progress', execution_claimed_at=long_ago)
+    Approval.objects.filter(pk=fresh.pk).update(execution_status='queued', execution_claimed_at=timezone.now())
+    dispatched = []
+    monkeypatch.setattr(celery_tasks.execute_ssh_approval_task, 'delay', dispatched.append)
+
+    result = celery_tasks.recover_stale_executions()
+
+    assert (result['requeued_count'], result['failed_count']) == (1, 1)
+    assert dispatched == [claimed.pk]
+    statuses = dict(Approval.objects.values_list('pk', 'execution_status'))
+    assert statuses == {claimed.pk: 'pending', running.pk: 'failed', fresh.pk: 'queued'}
+    assert running.audit_logs.filter(action='execution_failed').exists()
+
+
+@pytest.mark.django_db
+def test_released_claim_is_not_started(ssh_config, ssh_server):
+    """A batch whose claim was taken back by the recovery sweep skips the approval."""
+    approval = _approval('exec-a', ssh_server['port'])
+    approval.execution_claimed_at = timezone.now() - timedelta(hours=1)
+    Approval.objects.filter(pk=approval.pk).update(execution_status='pending')
+
+    result = executor.execute_approvals([approval], ssh_config, 10)[approval.id]
+
+    approval.refresh_from_db()
+    assert result.reason == 'released'
+    assert approval.execution_status == 'pending'
+    assert not ApprovalExecutionLog.objects.filter(approval=approval).exists()
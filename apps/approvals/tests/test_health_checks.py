@@ -0,0 +1,122 @@
+import socket
+import threading
+from datetime import time
+
+import pytest
+
+from apps.approvals import celery_tasks, ssh
+from apps.approvals.models import RatingSchedule, ServerHealthCheck
+
+
+@pytest.fixture
+def closed_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+@pytest.fixture
+def health_settings(settings):
+    settings.APPROVALS_SSH = {
+        'HEALTH_USERNAME': 'health',
+        'PASSWORD': 'secret',
+        'HOSTS': {'02': '127.0.0.1', '03': '127.0.0.1', '04': '127.0.0.1'},
+    }
+    settings.APPROVALS_HEALTH_TIMEOUT = 2
+    ssh.pool.close_all()
+    yield settings
+    ssh.pool.close_all()
+
+
+def _schedule(name, prefix, port):
+    return RatingSchedule.objects.create(
+        display_name=name, server_url_prefix=prefix, ssh_port=port, abruf_zeit=time(16, 30),
+    )
+
+
+@pytest.mark.django_db
+def test_check_server_health_probes_and_upserts(health_settings, ssh_server, closed_port):
+    _schedule('Training 02', '02', ssh_server['port'])
+    _schedule('Training 03', '03', closed_port)
+    ServerHealthCheck.objects.create(server_name='Training 03', server_url='03', ssh_port=closed_port, status='healthy')
+
+    result = celery_tasks.check_server_health()
+
+    assert result['success'] is True
+    assert result['checked_count'] == 2
+    healthy = ServerHealthCheck.objects.get(server_name='Training 02')
+    assert healthy.status == 'healthy'
+    assert healthy.ssh_reachable is True
+    assert healthy.ssh_latency_ms is not None
+    down = ServerHealthCheck.objects.get(server_name='Training 03')
+    assert down.status == 'unreachable'
+    assert down.last_error
+    assert down.last_check is not None
+
+
+@pytest.mark.django_db
+def test_check_server_health_reuses_connections(health_settings, ssh_server):
+    _schedule('Training 02', '02', ssh_server['port'])
+    # Same host and port behind a second schedule: probed once.
+    _schedule('Training 04', '04', ssh_server['port'])
+    before = ssh_server['connections']
+
+    first = celery_tasks.check_server_health()
+    second = celery_tasks.check_server_health()
+
+    assert ssh_server['connections'] - before == 1
+    assert first['reused_connections'] == 0
+    assert second['reused_connections'] == 1
+    assert ServerHealthCheck.objects.filter(status='healthy').count() == 2
+
+
+@pytest.mark.django_db
+def test_check_server_health_rejects_bad_credentials(health_settings, ssh_server):
+    health_settings.APPROVALS_SSH = dict(health_settings.APPROVALS_SSH, PASSWORD='wrong')
+    _schedule('Training 02', '02', ssh_server['port'])
+
+    celery_tasks.check_server_health()
+
+    assert ServerHealthCheck.objects.get(server_name='Training 02').status == 'unreachable'
+
+
+def test_probe_reconnects_when_pooled_connection_was_closed(health_settings, ssh_server):
+    pool = ssh.SSHConnectionPool()
+    assert ssh.probe('127.0.0.1', ssh_server['port'], 'health', 2, password='secret', connection_pool=pool).reachable
+
+    # The server dropped the idle connection, but the transport has not noticed yet
+    (idle, _released), = pool._idle[('127.0.0.1', ssh_server['port'], 'health')]
+
+    def closed(*args, **kwargs):
+        raise EOFError()
+
+    idle.get_transport().open_session = closed
+    result = ssh.probe('127.0.0.1', ssh_server['port'], 'health', 2, password='secret', connection_pool=pool)
+
+    assert result.reachable is True
+    assert result.reused is False
+    assert pool.connects == 2
+    pool.close_all()
+
+
+def test_probe_many_runs_concurrently(monkeypatch):
+    active = {'now': 0, 'peak': 0}
+    lock = threading.Lock()
+    release = threading.Barrier(4, timeout=5)
+
+    def fake_probe(host, port, username, timeout, **kwargs):
+        with lock:
+            active['now'] += 1
+            active['peak'] = max(active['peak'], active['now'])
+        release.wait()
+        with lock:
+            active['now'] -= 1
+        return ssh.ProbeResult(host, port, True, latency_ms=1)
+
+    monkeypatch.setattr(ssh, 'probe', fake_probe)
+    results = ssh.probe_many([(f'host-{i}', 22) for i in range(4)], 'health', 1, workers=4)
+
+    assert active['peak'] == 4
+    assert all(result.reachable for result in results.values())
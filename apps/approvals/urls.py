@@ -17,6 +17,7 @@ urlpatterns = [
     path('<uuid:token>/approve/', views.ApprovalApproveView.as_view(), name='approve-token'),
     path('approval/<int:pk>/approve/', views.ApprovalApproveView.as_view(), name='approve'),
     path('approval/<int:pk>/reject/', views.ApprovalRejectView.as_view(), name='reject'),
+    path('approval/<int:pk>/output/', views.ApprovalExecutionOutputView.as_view(), name='execution-output'),
 
     # Health & Status
     path('health/', views.ServerHealthCheckView.as_view(), name='health-list'),
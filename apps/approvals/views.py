@@ -354,6 +354,33 @@ class ApprovalRejectView(ApproverRequiredMixin, LoginRequiredMixin, View):
             }, status=500)
 
 
+class ApprovalExecutionOutputView(LicenseRequiredMixin, LoginRequiredMixin, View):
+    """
+    Stream SSH execution output
+    Returns log chunks after ``after`` (chunk number) for live polling
+    """
+    required_feature = 'approvals'
+
+    def get(self, request, pk):
+        approval = get_object_or_404(Approval.objects.only('id', 'execution_status', 'execution_exit_code'), pk=pk)
+        try:
+            after = int(request.GET.get('after', 0))
+        except ValueError:
+            after = 0
+        chunks = list(
+            approval.execution_logs.filter(seq__gt=after)
+            .order_by('seq')
+            .values('seq', 'stream', 'data')[:500]
+        )
+        return JsonResponse({
+            'success': True,
+            'execution_status': approval.execution_status,
+            'exit_code': approval.execution_exit_code,
+            'chunks': chunks,
+            'last_seq': chunks[-1]['seq'] if chunks else after,
+        })
+
+
 # ============================================================================
 # HEALTH CHECK VIEWS
 # ============================================================================
@@ -377,6 +404,7 @@ class ServerHealthCheckView(LicenseRequiredMixin, LoginRequiredMixin, View):
                     'is_healthy': health.is_healthy(),
                     'ssh_reachable': health.ssh_reachable,
                     'url_reachable': health.url_reachable,
+                    'ssh_latency_ms': health.ssh_latency_ms,
                     'last_check': health.last_check.isoformat() if health.last_check else None,
                 })
             except ServerHealthCheck.DoesNotExist:
@@ -393,6 +421,7 @@ class ServerHealthCheckView(LicenseRequiredMixin, LoginRequiredMixin, View):
                         'server_name': h.server_name,
                         'status': h.status,
                         'is_healthy': h.is_healthy(),
+                        'ssh_latency_ms': h.ssh_latency_ms,
                         'last_check': h.last_check.isoformat() if h.last_check else None,
                     }
                     for h in healths
@@ -5,12 +5,17 @@ Migrated from Pit-Kalendar with ABoroUser integration
 
 from django.db import models
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, Value, When
 from django.contrib.auth import get_user_model
 from datetime import timedelta
 
 User = get_user_model()
 
+# 1 week buffer between pickup and next shipment
+PICKUP_BUFFER_DAYS = 7
+# Suggestion order: HP classrooms first, AC only if no HP is free
+ROOM_TYPE_PRIORITY = ['HP', 'AC']
+
 
 class MobileClassroom(models.Model):
     """Mobile classroom/training room for deployment management"""
@@ -63,6 +68,18 @@ class MobileClassroom(models.Model):
         """Check if classroom can be shipped (status is versandfertig)"""
         return self.status == 'versandfertig'
 
+    @staticmethod
+    def conflict_filter(start_date, end_date, shipping_date=None):
+        """
+        Q over ClassroomDeployment matching deployments that block a new one:
+        the time periods overlap, or the new shipping date falls within
+        PICKUP_BUFFER_DAYS after the deployment's pickup.
+        """
+        condition = Q(deployment_start__lte=end_date, deployment_end__gte=start_date)
+        if shipping_date:
+            condition |= Q(pickup_date__gt=shipping_date - timedelta(days=PICKUP_BUFFER_DAYS))
+        return condition
+
     def is_available_for_deployment(self, start_date, end_date, shipping_date=None, pickup_date=None, exclude_deployment_id=None):
         """
         Check if classroom is available for a time period.
@@ -80,30 +97,22 @@ class MobileClassroom(models.Model):
         Returns:
             tuple: (is_available: bool, reason: str or None)
         """
-        # Check for overlaps with other deployments
-        buffer_days = 7  # 1 week buffer between pickup and next shipment
-
-        # Find all deployments of this classroom (except current one if editing)
-        deployments = self.deployments.all()
+        # Only the first conflicting deployment is needed for the reason.
+        conflicts = self.deployments.filter(
+            MobileClassroom.conflict_filter(start_date, end_date, shipping_date)
+        ).order_by('deployment_start', 'pk')
         if exclude_deployment_id:
-            deployments = deployments.exclude(pk=exclude_deployment_id)
+            conflicts = conflicts.exclude(pk=exclude_deployment_id)
+        deployment = conflicts.first()
+        if deployment is None:
+            return (True, None)
 
-        for deployment in deployments:
-            # Check 1: Time period overlap
-            # Conflict if: start_date <= deployment.end_date AND end_date >= deployment.start_date
-            if start_date <= deployment.deployment_end and end_date >= deployment.deployment_start:
-                return (False, f"Time period overlaps with deployment from {deployment.deployment_start} to {deployment.deployment_end}")
+        if start_date <= deployment.deployment_end and end_date >= deployment.deployment_start:
+            return (False, f"Time period overlaps with deployment from {deployment.deployment_start} to {deployment.deployment_end}")
 
-            # Check 2: Buffer conflict (7 days between pickup_date and next shipping_date)
-            # Only if pickup_date of old deployment exists and shipping_date of new one is planned
-            if deployment.pickup_date and shipping_date:
-                # Buffer: deployment.pickup_date + 7 days must not be before shipping_date
-                min_shipping_date = deployment.pickup_date + timedelta(days=buffer_days)
-                if shipping_date < min_shipping_date:
-                    days_needed = (min_shipping_date - shipping_date).days
-                    return (False, f"Insufficient buffer after pickup on {deployment.pickup_date} (minimum {buffer_days} days required, {days_needed} day(s) too early)")
-
-        return (True, None)
+        min_shipping_date = deployment.pickup_date + timedelta(days=PICKUP_BUFFER_DAYS)
+        days_needed = (min_shipping_date - shipping_date).days
+        return (False, f"Insufficient buffer after pickup on {deployment.pickup_date} (minimum {PICKUP_BUFFER_DAYS} days required, {days_needed} day(s) too early)")
 
     @staticmethod
     def get_available_classrooms(start_date, end_date, shipping_date=None, pickup_date=None, exclude_deployment_id=None):
@@ -121,25 +130,15 @@ class MobileClassroom(models.Model):
             exclude_deployment_id: ID of current deployment (when editing)
 
         Returns:
-            QuerySet of available MobileClassroom objects (sorted by name)
+            QuerySet of available MobileClassroom objects (sorted by name),
+            evaluated as a single query with a NOT EXISTS conflict check
         """
-        # Start with ALL classrooms (except 'gesperrt')
-        # Status is irrelevant - only time availability matters!
-        available_classrooms = MobileClassroom.objects.exclude(
-            status='gesperrt'
-        ).order_by('name')
-
-        # Filter manually with is_available_for_deployment (time check)
-        result = []
-        for classroom in available_classrooms:
-            is_available, _ = classroom.is_available_for_deployment(
-                start_date, end_date, shipping_date, pickup_date, exclude_deployment_id
-            )
-            if is_available:
-                result.append(classroom.pk)
-
-        # Return only available classrooms (as QuerySet for performance)
-        return MobileClassroom.objects.filter(pk__in=result).order_by('name')
+        conflicts = ClassroomDeployment.objects.filter(classroom=OuterRef('pk')).filter(
+            MobileClassroom.conflict_filter(start_date, end_date, shipping_date)
+        )
+        if exclude_deployment_id:
+            conflicts = conflicts.exclude(pk=exclude_deployment_id)
+        return MobileClassroom.objects.exclude(status='gesperrt').exclude(Exists(conflicts)).order_by('name')
 
     @staticmethod
     def get_suggested_classroom(start_date, end_date, shipping_date=None, pickup_date=None, exclude_deployment_id=None):
@@ -165,21 +164,15 @@ class MobileClassroom(models.Model):
         available = MobileClassroom.get_available_classrooms(
             start_date, end_date, shipping_date, pickup_date, exclude_deployment_id
         )
-
-        # Strategy: Prefer HP, then AC
-        # Separate by room type
-        hp_rooms = [c for c in available if c.room_type == 'HP']
-        ac_rooms = [c for c in available if c.room_type == 'AC']
-
-        # Sort alphabetically
-        if hp_rooms:
-            hp_rooms.sort(key=lambda x: x.name)
-            return hp_rooms[0]
-        elif ac_rooms:
-            ac_rooms.sort(key=lambda x: x.name)
-            return ac_rooms[0]
-        else:
-            return None
+        return (
+            available.filter(room_type__in=ROOM_TYPE_PRIORITY)
+            .annotate(type_rank=Case(
+                *[When(room_type=room_type, then=Value(rank)) for rank, room_type in enumerate(ROOM_TYPE_PRIORITY)],
+                output_field=IntegerField(),
+            ))
+            .order_by('type_rank', 'name')
+            .first()
+        )
 
 
 class EmailReminder(models.Model):
@@ -3,10 +3,21 @@ Business logic services for classroom app.
 Handles email reminders, notifications, and deployment operations.
 """
 
+import bisect
 import logging
+from dataclasses import dataclass
+from datetime import timedelta
 from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from .models import EmailReminder
+from .models import (
+    PICKUP_BUFFER_DAYS,
+    ROOM_TYPE_PRIORITY,
+    ClassroomDeployment,
+    EmailReminder,
+    MobileClassroom,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -104,6 +115,90 @@ ABoroOffice System
             return False
 
 
+@dataclass
+class DeploymentRequest:
+    """One deployment to be placed by DeploymentService.plan_deployments."""
+    deployment_start: object
+    deployment_end: object
+    shipping_date: object = None
+    pickup_date: object = None
+    location: object = None
+
+
+class _ClassroomSchedule:
+    """
+    Deployments of one classroom as intervals sorted by start, with a running
+    maximum of the end dates, so an overlap check is a bisect instead of a
+    scan over every deployment.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.max_ends = []
+        self.latest_pickup = None
+
+    def add(self, start, end, pickup=None):
+        index = bisect.bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+        self.max_ends[index:] = []
+        for position in range(index, len(self.ends)):
+            previous = self.max_ends[position - 1] if position else None
+            current = self.ends[position]
+            self.max_ends.append(current if previous is None or current > previous else previous)
+        if pickup and (self.latest_pickup is None or pickup > self.latest_pickup):
+            self.latest_pickup = pickup
+
+    def is_free(self, start, end, shipping_date=None):
+        # Same rules as MobileClassroom.is_available_for_deployment.
+        index = bisect.bisect_right(self.starts, end)
+        if index and self.max_ends[index - 1] >= start:
+            return False
+        if shipping_date and self.latest_pickup:
+            return shipping_date >= self.latest_pickup + timedelta(days=PICKUP_BUFFER_DAYS)
+        return True
+
+
+class AvailabilityIndex:
+    """
+    In-memory availability of all bookable classrooms for a planning horizon,
+    loaded with one query per table. Used for season planning where many
+    windows are checked (and reserved) in a row.
+    """
+
+    def __init__(self, horizon_start, horizon_end):
+        self.horizon_start = horizon_start
+        self.horizon_end = horizon_end
+        self.classrooms = list(
+            MobileClassroom.objects.exclude(status='gesperrt')
+            .filter(room_type__in=ROOM_TYPE_PRIORITY)
+            .order_by('name')
+        )
+        self.schedules = {classroom.pk: _ClassroomSchedule() for classroom in self.classrooms}
+        # Deployments ending before the horizon cannot overlap it; pickups are
+        # loaded regardless because the buffer rule applies to all of them.
+        deployments = ClassroomDeployment.objects.filter(
+            classroom_id__in=self.schedules.keys()
+        ).filter(
+            Q(deployment_end__gte=horizon_start, deployment_start__lte=horizon_end)
+            | Q(pickup_date__gt=horizon_start - timedelta(days=PICKUP_BUFFER_DAYS))
+        ).values_list('classroom_id', 'deployment_start', 'deployment_end', 'pickup_date')
+        for classroom_id, start, end, pickup in deployments:
+            self.schedules[classroom_id].add(start, end, pickup)
+
+    def available(self, start_date, end_date, shipping_date=None):
+        """Free classrooms for a window, in suggestion order (HP before AC, then name)."""
+        free = [
+            classroom for classroom in self.classrooms
+            if self.schedules[classroom.pk].is_free(start_date, end_date, shipping_date)
+        ]
+        return sorted(free, key=lambda classroom: ROOM_TYPE_PRIORITY.index(classroom.room_type))
+
+    def reserve(self, classroom, start_date, end_date, pickup_date=None):
+        self.schedules[classroom.pk].add(start_date, end_date, pickup_date)
+
+
 class DeploymentService:
     """
     Service for classroom deployment operations.
@@ -141,7 +236,6 @@ class DeploymentService:
         Returns:
             QuerySet: Available classrooms
         """
-        from .models import MobileClassroom
         return MobileClassroom.get_available_classrooms(
             start_date, end_date, **kwargs
         )
@@ -159,7 +253,63 @@ class DeploymentService:
         Returns:
             MobileClassroom: Suggested classroom or None
         """
-        from .models import MobileClassroom
         return MobileClassroom.get_suggested_classroom(
             start_date, end_date, **kwargs
         )
+
+    @staticmethod
+    def plan_deployments(requests, create=False):
+        """
+        Place many deployments at once (season planning).
+
+        Requests are assigned in order of their start date to the suggested
+        classroom (HP before AC, then name) that is still free, taking the
+        deployments planned earlier in the same run into account. All
+        availability checks run against an AvailabilityIndex loaded once.
+
+        Args:
+            requests: iterable of DeploymentRequest
+            create: create ClassroomDeployment rows for the placed requests
+                (requires a location on every placed request)
+
+        Returns:
+            list of (DeploymentRequest, MobileClassroom or None) in input order
+        """
+        requests = list(requests)
+        if not requests:
+            return []
+        horizon_start = min(
+            min(request.deployment_start, request.shipping_date or request.deployment_start)
+            for request in requests
+        )
+        horizon_end = max(request.deployment_end for request in requests)
+        index = AvailabilityIndex(horizon_start, horizon_end)
+
+        assignments = {}
+        for position in sorted(range(len(requests)), key=lambda i: requests[i].deployment_start):
+            request = requests[position]
+            free = index.available(request.deployment_start, request.deployment_end, request.shipping_date)
+            classroom = free[0] if free else None
+            if classroom is not None:
+                index.reserve(classroom, request.deployment_start, request.deployment_end, request.pickup_date)
+            assignments[position] = classroom
+
+        planned = [(request, assignments[position]) for position, request in enumerate(requests)]
+        if create:
+            # Saved one by one so the post_save signals create the email
+            # reminders and the initial history entry of every deployment.
+            with transaction.atomic():
+                for request, classroom in planned:
+                    if classroom is None:
+                        continue
+                    ClassroomDeployment.objects.create(
+                        classroom=classroom,
+                        location=request.location,
+                        deployment_start=request.deployment_start,
+                        deployment_end=request.deployment_end,
+                        shipping_date=request.shipping_date,
+                        pickup_date=request.pickup_date,
+                    )
+        unplaced = sum(1 for _request, classroom in planned if classroom is None)
+        logger.info(f"Planned {len(planned) - unplaced} deployments, {unplaced} without free classroom")
+        return planned
@@ -9,10 +9,21 @@ from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
-from django.db.models import Sum, F
+from django.db.models import Sum, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 import uuid
 
 
+def storage_used_subquery():
+    """Bytes stored by the profile's user, for ``annotate(storage_used_bytes=...)``."""
+    from apps.cloude.cloude_apps.core.models import StorageFile
+
+    used = StorageFile.objects.filter(owner=OuterRef('user')).order_by().values('owner').annotate(
+        total=Sum('size')
+    ).values('total')
+    return Coalesce(Subquery(used), 0, output_field=models.BigIntegerField())
+
+
 class UserProfile(models.Model):
     """
     Extended user profile with storage and quota information.
@@ -128,6 +139,11 @@ class UserProfile(models.Model):
         Calculate total storage used by user.
         Returns value in bytes.
         """
+        # Annotated by list endpoints (see storage_used_subquery)
+        annotated = getattr(self, 'storage_used_bytes', None)
+        if annotated is not None:
+            return annotated
+
         from apps.cloude.cloude_apps.core.models import StorageFile
 
         used = StorageFile.objects.filter(owner=self.user).aggregate(
@@ -6,7 +6,7 @@ from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field, OpenApiTypes
 from django.contrib.auth import get_user_model
 from apps.cloude.cloude_apps.core.models import StorageFile, StorageFolder, FileVersion, ActivityLog, Notification
-from apps.cloude.cloude_apps.accounts.models import UserProfile
+from apps.cloude.cloude_apps.accounts.models import UserProfile, storage_used_subquery
 
 User = get_user_model()
 from apps.cloude.cloude_apps.sharing.models import UserShare, PublicLink, SharePermission
@@ -16,24 +16,6 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-class UserSerializer(serializers.ModelSerializer):
-    """Serializer for User model"""
-    profile = serializers.SerializerMethodField()
-
-    class Meta:
-        model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'profile']
-        read_only_fields = ['id']
-        ref_name = 'CloudeUser'
-
-    @extend_schema_field(OpenApiTypes.OBJECT)
-    def get_profile(self, obj):
-        """Get user profile data"""
-        if hasattr(obj, 'profile'):
-            return UserProfileSerializer(obj.profile).data
-        return None
-
-
 class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer for UserProfile model"""
     storage_used = serializers.SerializerMethodField()
@@ -49,6 +31,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'is_email_verified', 'is_two_factor_enabled', 'is_active'
         ]
         read_only_fields = ['id', 'storage_used', 'storage_remaining', 'storage_used_percentage']
+        annotate = {'storage_used_bytes': storage_used_subquery}
 
     def get_storage_used(self, obj):
         """Get storage used in MB"""
@@ -63,6 +46,25 @@ class UserProfileSerializer(serializers.ModelSerializer):
         return obj.get_storage_used_percentage()
 
 
+class UserSerializer(serializers.ModelSerializer):
+    """Serializer for User model"""
+    profile = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'profile']
+        read_only_fields = ['id']
+        ref_name = 'CloudeUser'
+        prefetch_related = (('profile', UserProfileSerializer),)
+
+    @extend_schema_field(OpenApiTypes.OBJECT)
+    def get_profile(self, obj):
+        """Get user profile data"""
+        if hasattr(obj, 'profile'):
+            return UserProfileSerializer(obj.profile).data
+        return None
+
+
 class BreadcrumbItemSerializer(serializers.Serializer):
     """Serializer for breadcrumb items"""
     id = serializers.IntegerField()
@@ -9,7 +9,6 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
 from django.db.models import Q, Count, Sum
@@ -18,6 +17,8 @@ from django.utils import timezone
 from django.core.exceptions import PermissionDenied
 from django.contrib.auth import get_user_model
 
+from apps.core.eager_loading import EagerLoadingMixin
+from apps.core.pagination import PageOrCursorPagination
 from apps.cloude.cloude_apps.core.models import StorageFile, StorageFolder, FileVersion, ActivityLog, Notification
 from apps.cloude.cloude_apps.accounts.models import UserProfile
 from apps.cloude.cloude_apps.sharing.models import UserShare, PublicLink, SharePermission
@@ -40,14 +41,14 @@ logger = logging.getLogger(__name__)
 User = get_user_model()
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    """Custom pagination for API"""
+class StandardResultsSetPagination(PageOrCursorPagination):
+    """Custom pagination for API (``?cursor=`` for keyset pagination)"""
     page_size = 25
     page_size_query_param = 'page_size'
     max_page_size = 100
 
 
-class StorageFileViewSet(viewsets.ModelViewSet):
+class StorageFileViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for file operations.
     Supports CRUD operations with permissions.
@@ -193,7 +194,7 @@ class StorageFileViewSet(viewsets.ModelViewSet):
         return ip
 
 
-class StorageFolderViewSet(viewsets.ModelViewSet):
+class StorageFolderViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for folder operations"""
     serializer_class = StorageFolderSerializer
     queryset = StorageFolder.objects.all()
@@ -234,7 +235,7 @@ class StorageFolderViewSet(viewsets.ModelViewSet):
         })
 
 
-class FileVersionsView(generics.ListAPIView):
+class FileVersionsView(EagerLoadingMixin, generics.ListAPIView):
     """Get file versions"""
     serializer_class = FileVersionSerializer
     permission_classes = [IsAuthenticated]
@@ -297,7 +298,7 @@ class RestoreFileVersionView(generics.GenericAPIView):
         })
 
 
-class UserShareViewSet(viewsets.ModelViewSet):
+class UserShareViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for user shares"""
     serializer_class = UserShareSerializer
     queryset = UserShare.objects.all()
@@ -338,7 +339,7 @@ class UserShareViewSet(viewsets.ModelViewSet):
         return Response(UserShareSerializer(share).data)
 
 
-class PublicLinkViewSet(viewsets.ModelViewSet):
+class PublicLinkViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for public links"""
     serializer_class = PublicLinkSerializer
     queryset = PublicLink.objects.all()
@@ -371,7 +372,7 @@ class PublicLinkViewSet(viewsets.ModelViewSet):
         return Response({'message': 'Link disabled'})
 
 
-class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
+class ActivityLogViewSet(EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for activity logs"""
     serializer_class = ActivityLogSerializer
     queryset = ActivityLog.objects.all()
@@ -386,7 +387,7 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
         return ActivityLog.objects.filter(user=self.request.user)
 
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for users"""
     serializer_class = UserSerializer
     queryset = User.objects.all()
@@ -602,7 +603,7 @@ class SearchAPIView(generics.GenericAPIView):
         return Response(results)
 
 
-class NotificationListView(generics.ListAPIView):
+class NotificationListView(EagerLoadingMixin, generics.ListAPIView):
     """Get notifications"""
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
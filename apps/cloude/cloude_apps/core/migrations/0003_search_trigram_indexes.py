@@ -0,0 +1,49 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:28
+
+from django.db import migrations, transaction
+
+# Fields searched by the file, folder and activity APIs and the search endpoint.
+TRIGRAM_INDEXES = [
+    ('cloude_file_name_trgm', 'cloude_core_storagefile', 'name'),
+    ('cloude_file_desc_trgm', 'cloude_core_storagefile', 'description'),
+    ('cloude_folder_name_trgm', 'cloude_core_storagefolder', 'name'),
+    ('cloude_folder_desc_trgm', 'cloude_core_storagefolder', 'description'),
+    ('cloude_activity_desc_trgm', 'cloude_core_activitylog', 'description'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # SearchFilter and name__icontains compile to UPPER(col::text) LIKE
+    # UPPER(%s) on PostgreSQL; GIN trigram indexes on the same expression
+    # keep these searches indexed.
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except Exception:
+        # No privilege to install the extension: searching still works, unindexed.
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _table, _column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cloude_core', '0002_storagefile_is_trashed_storagefile_original_folder_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -5,6 +5,7 @@ from .models import Contract, ContractVersion
 class ContractVersionInline(admin.TabularInline):
     model = ContractVersion
     extra = 0
+    exclude = ('file_sha256', 'extracted_text')
 
 
 @admin.register(Contract)
@@ -12,6 +13,8 @@ class ContractAdmin(admin.ModelAdmin):
     list_display = ('title', 'counterparty', 'status', 'start_date', 'end_date', 'owner')
     list_filter = ('status',)
     search_fields = ('title', 'counterparty')
+    exclude = ('extracted_text',)
+    readonly_fields = ('file_sha256',)
     inlines = [ContractVersionInline]
 
 
@@ -19,3 +22,5 @@ class ContractAdmin(admin.ModelAdmin):
 class ContractVersionAdmin(admin.ModelAdmin):
     list_display = ('contract', 'label', 'uploaded_at')
     search_fields = ('contract__title', 'label')
+    exclude = ('extracted_text',)
+    readonly_fields = ('file_sha256',)
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0003_contract_ai_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractChunkAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chunk_sha256', models.CharField(max_length=64, unique=True)),
+                ('model_id', models.CharField(blank=True, max_length=255)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='extracted_text',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='file_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='contractversion',
+            name='extracted_text',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='contractversion',
+            name='file_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -25,6 +25,9 @@ class Contract(models.Model):
         related_name='contracts',
     )
     file = models.FileField(upload_to='contracts/', blank=True)
+    # Text extracted from ``file``, kept until the file's hash changes
+    file_sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    extracted_text = models.TextField(blank=True)
     notes = models.TextField(blank=True)
     ai_summary = models.TextField(blank=True)
     ai_risks = models.JSONField(default=list, blank=True)
@@ -44,8 +47,21 @@ class ContractVersion(models.Model):
     contract = models.ForeignKey(Contract, on_delete=models.CASCADE, related_name='versions')
     label = models.CharField(max_length=100, default='v1')
     file = models.FileField(upload_to='contracts/versions/', blank=True)
+    file_sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    extracted_text = models.TextField(blank=True)
     summary = models.TextField(blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.contract.title} - {self.label}"
+
+
+class ContractChunkAnalysis(models.Model):
+    """AI analysis of one text chunk, shared by every version containing that chunk."""
+    chunk_sha256 = models.CharField(max_length=64, unique=True)
+    model_id = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.chunk_sha256[:12]
@@ -1,9 +1,13 @@
-﻿import json
+﻿import hashlib
+import json
 import os
 import re
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+from django.conf import settings
 from django.utils import timezone
-from apps.core.services.bedrock import BedrockService
+from apps.contracts.models import Contract, ContractChunkAnalysis, ContractVersion
+from apps.core.services.ai_gateway import gateway
 
 try:
     from pypdf import PdfReader
@@ -19,7 +23,32 @@ except Exception:  # pragma: no cover
     docx = None
 
 
-MAX_INPUT_CHARS = 20000
+# Chunk sizes in characters; boundaries fall on line breaks chosen by content so
+# an edit early in a document does not shift every later chunk
+CHUNK_MIN_CHARS = 2000
+# Bumped whenever the map prompt changes, so cached chunk results are not reused
+MAP_PROMPT_VERSION = 1
+
+MAP_SYSTEM = (
+    "Du bist ein Assistent für Vertragsanalyse. "
+    "Du erhältst einen Abschnitt eines längeren Vertrags. "
+    "Gib JSON zurück mit Schlüsseln: summary, risks, checklist, key_dates. "
+    "summary: kurzer Absatz zu diesem Abschnitt. risks: Liste von Punkten. "
+    "checklist: Liste fehlender/unklarer Klauseln in diesem Abschnitt. "
+    "key_dates: Liste von {label, date, note}. "
+    "Antworte NUR mit JSON."
+)
+REDUCE_SYSTEM = (
+    "Du bist ein Assistent für Vertragsanalyse. "
+    "Du erhältst Teilanalysen aufeinanderfolgender Abschnitte eines Vertrags. "
+    "Führe sie zu einer Gesamtanalyse zusammen und entferne Doppelungen. "
+    "Punkte der checklist, die in einem anderen Abschnitt geregelt sind, entfallen. "
+    "Gib JSON zurück mit Schlüsseln: summary, risks, checklist, key_dates. "
+    "summary: kurzer Absatz. risks: Liste von Punkten. "
+    "checklist: Liste fehlender/unklarer Klauseln. "
+    "key_dates: Liste von {label, date, note}. "
+    "Antworte NUR mit JSON."
+)
 
 
 def _read_pdf(path: str) -> str:
@@ -42,25 +71,119 @@ def _read_docx(path: str) -> str:
     return "\n".join([p.text for p in document.paragraphs if p.text])
 
 
-def _extract_text(file_path: str | None, notes: str | None) -> str:
-    parts = []
-    if file_path and os.path.exists(file_path):
-        ext = os.path.splitext(file_path)[1].lower()
-        if ext == '.pdf':
-            parts.append(_read_pdf(file_path))
-        elif ext in ('.docx', '.doc'):
-            parts.append(_read_docx(file_path))
-        else:
-            # Unsupported file, ignore for now
-            parts.append("")
-    if notes:
-        parts.append(notes)
-    text = "\n".join([p for p in parts if p]).strip()
-    if len(text) > MAX_INPUT_CHARS:
-        text = text[:MAX_INPUT_CHARS]
+def _read_file(file_path: str) -> str:
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.pdf':
+        return _read_pdf(file_path)
+    if ext in ('.docx', '.doc'):
+        return _read_docx(file_path)
+    # Unsupported file, ignore for now
+    return ""
+
+
+def _file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def document_text(document) -> str:
+    """
+    Text of a Contract's or ContractVersion's file, extracted once per file
+    content. The text is stored on ``document`` together with the file's
+    SHA-256; another contract or version with an identical file lends its text.
+    """
+    if not document.file:
+        return ""
+    file_path = document.file.path
+    if not os.path.exists(file_path):
+        return ""
+    file_hash = _file_sha256(file_path)
+    if document.file_sha256 == file_hash and document.extracted_text:
+        return document.extracted_text
+    text = ""
+    for model in (ContractVersion, Contract):
+        text = (
+            model.objects.filter(file_sha256=file_hash).exclude(extracted_text='')
+            .values_list('extracted_text', flat=True).first()
+        ) or ""
+        if text:
+            break
+    if not text:
+        text = _read_file(file_path).strip()
+    document.file_sha256 = file_hash
+    document.extracted_text = text
+    document.save(update_fields=['file_sha256', 'extracted_text'])
     return text
 
 
+def _analysis_document(contract):
+    """The latest version with a file, else the contract's own file."""
+    version = contract.versions.exclude(file='').order_by('-uploaded_at', '-pk').first()
+    return version or contract
+
+
+def _extract_text(contract) -> Tuple[str, object]:
+    document = _analysis_document(contract)
+    parts = [document_text(document)]
+    if contract.notes:
+        parts.append(contract.notes)
+    return "\n".join([p for p in parts if p]).strip(), document
+
+
+def _line_units(text: str, max_chars: int) -> List[str]:
+    units = []
+    for line in text.splitlines(keepends=True):
+        while len(line) > max_chars:
+            units.append(line[:max_chars])
+            line = line[max_chars:]
+        if line:
+            units.append(line)
+    return units
+
+
+def _is_boundary(line: str, divisor: int) -> bool:
+    digest = hashlib.blake2b(line.strip().encode('utf-8'), digest_size=4).digest()
+    return int.from_bytes(digest, 'big') % divisor == 0
+
+
+def split_chunks(text: str, max_chars: int = None, overlap: int = None) -> List[str]:
+    """
+    Split ``text`` into chunks of at most ``max_chars`` (plus overlap).
+
+    A chunk ends after a line whose content hash hits a fixed divisor once the
+    chunk holds CHUNK_MIN_CHARS, or when it is full. Because boundaries depend
+    only on nearby lines, unchanged regions of a revised document produce the
+    same chunks again. Each chunk is prefixed with up to ``overlap`` trailing
+    characters of the previous chunk so clauses cut at a boundary keep context.
+    """
+    max_chars = max_chars or getattr(settings, 'CONTRACTS_AI_CHUNK_CHARS', 8000)
+    overlap = getattr(settings, 'CONTRACTS_AI_CHUNK_OVERLAP', 800) if overlap is None else overlap
+    min_chars = min(CHUNK_MIN_CHARS, max_chars // 2)
+    # Expected chunk length is roughly min_chars + divisor * average line length
+    divisor = max(2, (max_chars - min_chars) // 200)
+    bodies, current, size = [], [], 0
+    for line in _line_units(text, max_chars):
+        if current and size + len(line) > max_chars:
+            bodies.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+        if size >= min_chars and _is_boundary(line, divisor):
+            bodies.append("".join(current))
+            current, size = [], 0
+    if current:
+        bodies.append("".join(current))
+    chunks = []
+    for index, body in enumerate(bodies):
+        if index and overlap:
+            body = bodies[index - 1][-overlap:] + body
+        chunks.append(body.strip())
+    return [chunk for chunk in chunks if chunk]
+
+
 def _extract_json(text: str) -> dict:
     if not text:
         return {}
@@ -73,47 +196,148 @@ def _extract_json(text: str) -> dict:
         return {}
 
 
+def _as_list(value) -> list:
+    if not value:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _chunk_key(model_id: str, chunk: str) -> str:
+    raw = f"{MAP_PROMPT_VERSION}\0{model_id}\0{chunk}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _analyze_chunk(chunk: str) -> dict:
+    """Map step for one chunk (network only, runs in a worker thread)."""
+    prompt = f"Analysiere diesen Abschnitt des Vertrags:\n{chunk}"
+    data = _extract_json(gateway.converse(prompt, system=MAP_SYSTEM, cache=True))
+    if not data:
+        raise RuntimeError("Konnte JSON aus KI-Antwort nicht lesen.")
+    return {
+        'summary': str(data.get('summary', '') or ''),
+        'risks': _as_list(data.get('risks')),
+        'checklist': _as_list(data.get('checklist')),
+        'key_dates': _as_list(data.get('key_dates')),
+    }
+
+
+def _map_chunks(chunks: List[str]) -> List[dict]:
+    """
+    Chunk results in order. Chunks analyzed before (same text, model and
+    prompt version) come from ContractChunkAnalysis; the rest are sent to the
+    provider concurrently. Successful results are stored even if another
+    chunk fails, so a retry only repeats the failed ones.
+    """
+    model_id = gateway.bedrock().model_id
+    keys = [_chunk_key(model_id, chunk) for chunk in chunks]
+    cached = {row.chunk_sha256: row.result for row in ContractChunkAnalysis.objects.filter(chunk_sha256__in=set(keys))}
+    missing = {key: chunk for key, chunk in zip(keys, chunks) if key not in cached}
+    if missing:
+        workers = max(1, min(len(missing), getattr(settings, 'CONTRACTS_AI_WORKERS', 4)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="contract-ai") as executor:
+            futures = {key: executor.submit(_analyze_chunk, chunk) for key, chunk in missing.items()}
+        fresh = {key: future.result() for key, future in futures.items() if future.exception() is None}
+        ContractChunkAnalysis.objects.bulk_create(
+            [ContractChunkAnalysis(chunk_sha256=key, model_id=model_id, result=result) for key, result in fresh.items()],
+            ignore_conflicts=True,
+        )
+        cached.update(fresh)
+        for future in futures.values():
+            if future.exception() is not None:
+                raise future.exception()
+    return [cached[key] for key in keys]
+
+
+def _dedupe(items: list) -> list:
+    seen = set()
+    result = []
+    for item in items:
+        marker = json.dumps(item, sort_keys=True, ensure_ascii=False).casefold() if isinstance(item, dict) else str(item).strip().casefold()
+        if marker and marker not in seen:
+            seen.add(marker)
+            result.append(item)
+    return result
+
+
+def _merge(results: List[dict]) -> dict:
+    """Deterministic reduce: joined summaries and de-duplicated lists."""
+    return {
+        'summary': "\n\n".join(result['summary'] for result in results if result.get('summary')),
+        'risks': _dedupe([item for result in results for item in result.get('risks', [])]),
+        'checklist': _dedupe([item for result in results for item in result.get('checklist', [])]),
+        'key_dates': _dedupe([item for result in results for item in result.get('key_dates', [])]),
+    }
+
+
+def _reduce(results: List[dict]) -> dict:
+    """Merge chunk results into one analysis; falls back to a plain merge if the reduce call fails."""
+    merged = _merge(results)
+    if len(results) == 1:
+        return merged
+    prompt = "Teilanalysen in Reihenfolge:\n" + json.dumps(results, ensure_ascii=False)
+    try:
+        data = _extract_json(gateway.converse(prompt, system=REDUCE_SYSTEM, cache=True))
+    except Exception:
+        data = {}
+    if data.get('summary'):
+        merged['summary'] = str(data['summary'])
+    for field in ('risks', 'checklist', 'key_dates'):
+        if isinstance(data.get(field), list):
+            merged[field] = data[field]
+    return merged
+
+
 def analyze_contract(contract) -> Tuple[dict, str]:
-    text = _extract_text(contract.file.path if contract.file else None, contract.notes)
-    if not text:
-        contract.ai_status = 'error'
-        contract.ai_error = 'Kein Text aus Datei/Notizen gefunden.'
-        contract.save(update_fields=['ai_status', 'ai_error'])
-        return {}, "Kein Text aus Datei/Notizen gefunden."
+    """
+    Map-reduce analysis of the contract's latest document plus its notes.
 
-    system = (
-        "Du bist ein Assistent für Vertragsanalyse. "
-        "Gib JSON zurück mit Schlüsseln: summary, risks, checklist, key_dates. "
-        "summary: kurzer Absatz. risks: Liste von Punkten. "
-        "checklist: Liste fehlender/unklarer Klauseln. "
-        "key_dates: Liste von {label, date, note}. "
-        "Antworte NUR mit JSON."
-    )
-    prompt = f"Analysiere diesen Vertragstext:\n{text}"
-    service = BedrockService()
+    The text is split into overlapping chunks (see ``split_chunks``), chunks are
+    analyzed concurrently with results cached per chunk, and one reduce call
+    merges them. Up to CONTRACTS_AI_MAX_CHUNKS chunks are analyzed.
+    """
     contract.ai_status = 'running'
     contract.ai_error = ''
     contract.save(update_fields=['ai_status', 'ai_error'])
     try:
-        response = service.converse(prompt, system=system)
+        text, document = _extract_text(contract)
     except Exception as exc:
         contract.ai_status = 'error'
         contract.ai_error = str(exc)
         contract.save(update_fields=['ai_status', 'ai_error'])
         return {}, str(exc)
-    data = _extract_json(response)
-    if not data:
+    if not text:
         contract.ai_status = 'error'
-        contract.ai_error = 'Konnte JSON aus KI-Antwort nicht lesen.'
+        contract.ai_error = 'Kein Text aus Datei/Notizen gefunden.'
         contract.save(update_fields=['ai_status', 'ai_error'])
-        return {}, "Konnte JSON aus KI-Antwort nicht lesen."
+        return {}, "Kein Text aus Datei/Notizen gefunden."
 
-    contract.ai_summary = data.get('summary', '')
-    contract.ai_risks = data.get('risks', [])
-    contract.ai_checklist = data.get('checklist', [])
-    contract.ai_key_dates = data.get('key_dates', [])
+    chunks = split_chunks(text)[:getattr(settings, 'CONTRACTS_AI_MAX_CHUNKS', 40)]
+    try:
+        data = _reduce(_map_chunks(chunks))
+    except Exception as exc:
+        contract.ai_status = 'error'
+        contract.ai_error = str(exc)
+        contract.save(update_fields=['ai_status', 'ai_error'])
+        return {}, str(exc)
+
+    contract.ai_summary = data['summary']
+    contract.ai_risks = data['risks']
+    contract.ai_checklist = data['checklist']
+    contract.ai_key_dates = data['key_dates']
     contract.ai_last_analyzed = timezone.now()
     contract.ai_status = 'done'
     contract.ai_error = ''
     contract.save(update_fields=['ai_summary', 'ai_risks', 'ai_checklist', 'ai_key_dates', 'ai_last_analyzed', 'ai_status', 'ai_error'])
+    if isinstance(document, ContractVersion):
+        document.summary = data['summary']
+        document.save(update_fields=['summary'])
     return data, ""
+
+
+def run_analysis_job(params: dict) -> dict:
+    """Handler for the ``contracts.analyze`` AI job."""
+    contract = Contract.objects.get(pk=params['contract_id'])
+    data, error = analyze_contract(contract)
+    if error:
+        raise RuntimeError(error)
+    return {'contract_id': contract.pk, 'summary': data.get('summary', '')}
@@ -5,7 +5,7 @@ from django.shortcuts import redirect
 from django.urls import reverse
 from .models import Contract, ContractVersion
 from .forms import ContractForm, ContractVersionForm
-from .services.ai import analyze_contract
+from apps.core.services.ai_jobs import active_jobs, submit_job
 from .exports import export_contract_analysis_docx
 from .permissions import ContractsViewMixin, ContractsEditMixin
 
@@ -29,6 +29,21 @@ class ContractDetailView(ContractsViewMixin, DetailView):
     template_name = 'contracts/contract_detail.html'
     context_object_name = 'contract'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['ai_jobs'] = active_jobs(('contracts.analyze', {'contract_id': self.object.pk}))
+        return context
+
+
+def queue_contract_analysis(request, contract):
+    """Queue the AI analysis of ``contract``; the detail page polls for the result."""
+    submit_job('contracts.analyze', {'contract_id': contract.pk}, user=request.user)
+    if contract.ai_status != 'running':
+        contract.ai_status = 'queued'
+        contract.ai_error = ''
+        contract.save(update_fields=['ai_status', 'ai_error'])
+    messages.info(request, _("KI-Analyse gestartet. Das Ergebnis erscheint hier, sobald sie fertig ist."))
+
 
 class ContractCreateView(ContractsEditMixin, CreateView):
     model = Contract
@@ -37,12 +52,7 @@ class ContractCreateView(ContractsEditMixin, CreateView):
 
     def form_valid(self, form):
         response = super().form_valid(form)
-        contract = self.object
-        _data, error = analyze_contract(contract)
-        if error:
-            messages.error(self.request, error)
-        else:
-            messages.success(self.request, _("KI-Analyse abgeschlossen."))
+        queue_contract_analysis(self.request, self.object)
         return response
 
     def get_success_url(self):
@@ -56,12 +66,7 @@ class ContractUpdateView(ContractsEditMixin, UpdateView):
 
     def form_valid(self, form):
         response = super().form_valid(form)
-        contract = self.object
-        _data, error = analyze_contract(contract)
-        if error:
-            messages.error(self.request, error)
-        else:
-            messages.success(self.request, _("KI-Analyse abgeschlossen."))
+        queue_contract_analysis(self.request, self.object)
         return response
 
     def get_success_url(self):
@@ -82,12 +87,7 @@ class ContractVersionCreateView(ContractsEditMixin, CreateView):
 
     def form_valid(self, form):
         response = super().form_valid(form)
-        contract = self.object.contract
-        _data, error = analyze_contract(contract)
-        if error:
-            messages.error(self.request, error)
-        else:
-            messages.success(self.request, _("KI-Analyse abgeschlossen."))
+        queue_contract_analysis(self.request, self.object.contract)
         return response
 
     def get_success_url(self):
@@ -100,11 +100,7 @@ class ContractAnalyzeView(ContractsEditMixin, TemplateView):
     def post(self, request, *args, **kwargs):
         contract_id = kwargs.get('pk')
         contract = Contract.objects.get(pk=contract_id)
-        _data, error = analyze_contract(contract)
-        if error:
-            messages.error(request, error)
-        else:
-            messages.success(request, _("KI-Analyse abgeschlossen."))
+        queue_contract_analysis(request, contract)
         return redirect('contracts:contract_detail', pk=contract_id)
 
 
@@ -6,7 +6,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 
-from .models import ABoroUser, SystemSettings
+from .models import ABoroUser, SystemSettings, AIJob
 
 
 @admin.register(ABoroUser)
@@ -119,3 +119,13 @@ class SystemSettingsAdmin(admin.ModelAdmin):
         from django.shortcuts import redirect
         from django.urls import reverse
         return redirect(reverse('admin:core_systemsettings_change', args=[settings_obj.pk]))
+
+
+@admin.register(AIJob)
+class AIJobAdmin(admin.ModelAdmin):
+    """Admin interface for background AI jobs."""
+
+    list_display = ('id', 'kind', 'provider', 'status', 'attempts', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind', 'provider')
+    search_fields = ('kind', 'key', 'error_message')
+    readonly_fields = ('key', 'params', 'result', 'created_at', 'started_at', 'finished_at')
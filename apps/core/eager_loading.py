@@ -0,0 +1,125 @@
+"""
+Eager loading declared on REST serializers.
+
+A serializer states what it reads beyond its own row in ``Meta``::
+
+    class Meta:
+        select_related = ('owner',)
+        prefetch_related = ('tags', ('profile', UserProfileSerializer))
+        annotate = {'storage_used_bytes': storage_used_subquery}
+
+``('lookup', Serializer)`` prefetches the relation with that serializer's
+own declarations; ``annotate`` values may be expressions or callables
+returning one. Relations the serializer reaches through its fields are
+derived automatically: dotted sources (``source='owner.username'``) and
+nested single objects are joined, nested lists and many-to-many fields are
+prefetched. ``EagerLoadingMixin`` applies all of this in ``filter_queryset``,
+so a page costs a fixed number of queries instead of one or more per row.
+"""
+
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _declared(serializer_class, name, default=()):
+    return getattr(getattr(serializer_class, 'Meta', None), name, default) or default
+
+
+def _relation(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    return field if field.is_relation else None
+
+
+def _single_path(model, source):
+    """``owner__profile`` for ``source='owner.profile.bio'`` while the path is to-one relations."""
+    path = []
+    for name in source.split('.')[:-1]:
+        field = _relation(model, name)
+        if field is None or not (field.many_to_one or field.one_to_one):
+            break
+        path.append(name)
+        model = field.related_model
+    return '__'.join(path)
+
+
+def _fields(serializer_class):
+    try:
+        return serializer_class().fields.items()
+    except ImproperlyConfigured:
+        # A broken serializer fails on its own when used; don't fail other actions here
+        return ()
+
+
+@lru_cache(maxsize=None)
+def _plan(model, serializer_class, prefix=''):
+    """
+    ``(select_related, prefetch_related)`` for one serializer. Prefetches are
+    lookups or ``(lookup, related model, nested serializer)`` triples.
+    """
+    select = [prefix + lookup for lookup in _declared(serializer_class, 'select_related')]
+    prefetch = []
+    for item in _declared(serializer_class, 'prefetch_related'):
+        if isinstance(item, tuple):
+            lookup, nested = item
+            prefetch.append((prefix + lookup, _relation(model, lookup).related_model, nested))
+        else:
+            prefetch.append(prefix + item)
+
+    for name, field in _fields(serializer_class):
+        source = field.source or name
+        if source == '*':
+            continue
+        if isinstance(field, serializers.ListSerializer):
+            relation = _relation(model, source)
+            if relation is not None:
+                prefetch.append((prefix + source, relation.related_model, type(field.child)))
+        elif isinstance(field, serializers.BaseSerializer):
+            relation = _relation(model, source)
+            if relation is not None and (relation.many_to_one or relation.one_to_one):
+                select.append(prefix + source)
+                nested_select, nested_prefetch = _plan(relation.related_model, type(field), f'{prefix}{source}__')
+                select += nested_select
+                prefetch += nested_prefetch
+        elif isinstance(field, serializers.ManyRelatedField):
+            if _relation(model, source) is not None:
+                prefetch.append(prefix + source)
+        elif '.' in source:
+            path = _single_path(model, source)
+            if path:
+                select.append(prefix + path)
+    return tuple(dict.fromkeys(select)), tuple(prefetch)
+
+
+def eager_load(queryset, serializer_class):
+    """Apply the eager loading ``serializer_class`` declares or implies to ``queryset``."""
+    if serializer_class is None or not issubclass(serializer_class, serializers.ModelSerializer):
+        return queryset
+    select, prefetch = _plan(queryset.model, serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*[
+            item if isinstance(item, str)
+            else Prefetch(item[0], queryset=eager_load(item[1]._default_manager.all(), item[2]))
+            for item in prefetch
+        ])
+    annotations = {
+        name: value() if callable(value) else value
+        for name, value in dict(_declared(serializer_class, 'annotate', {})).items()
+    }
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    return queryset
+
+
+class EagerLoadingMixin:
+    """Applies the serializer's eager loading to every queryset the view filters."""
+
+    def filter_queryset(self, queryset):
+        return eager_load(super().filter_queryset(queryset), self.get_serializer_class())
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.core.models import AIJob
+from apps.core.services.ai_jobs import ProviderBusy, run_job, sweep_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background AI jobs (e.g. when no Celery worker is available)."
+
+    def handle(self, *args, **options):
+        wait = getattr(settings, 'AI_JOBS_INLINE_WAIT_SECONDS', 30)
+        sweep_stale_jobs()
+        count = 0
+        skipped = 0
+        for job_id in AIJob.objects.filter(status='queued').order_by('id').values_list('id', flat=True):
+            try:
+                if run_job(job_id, wait=wait):
+                    count += 1
+            except ProviderBusy:
+                skipped += 1
+        self.stdout.write(self.style.SUCCESS(f"AI jobs done: {count}, still queued: {skipped}"))
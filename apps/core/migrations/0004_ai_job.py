@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_add_approval_groups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50, verbose_name='kind')),
+                ('key', models.CharField(db_index=True, max_length=64, verbose_name='key')),
+                ('provider', models.CharField(max_length=30, verbose_name='provider')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='parameters')),
+                ('status', models.CharField(choices=[('queued', 'Wartend'), ('running', 'Läuft'), ('completed', 'Abgeschlossen'), ('failed', 'Fehlgeschlagen')], default='queued', max_length=20, verbose_name='status')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='result')),
+                ('error_message', models.TextField(blank=True, verbose_name='error message')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='attempts')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='started at')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='finished at')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ai_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'AI Job',
+                'verbose_name_plural': 'AI Jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['key', 'status'], name='core_aijob_key_ff5bd2_idx'), models.Index(fields=['provider', 'status'], name='core_aijob_provide_259236_idx')],
+            },
+        ),
+    ]
@@ -1,8 +1,9 @@
 """
 Core models for ABoroOffice.
-Unified user model and shared settings.
+Unified user model, shared settings and background AI jobs.
 """
 
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
@@ -384,3 +385,57 @@ class SystemSettings(models.Model):
     def delete(self, *args, **kwargs):
         """Prevent deletion of settings."""
         pass
+
+
+class AIJob(models.Model):
+    """
+    One queued AI call (contract analysis, lead summary, reply suggestion, ...).
+
+    Jobs are created by ``apps.core.services.ai_jobs.submit_job`` and run by a
+    Celery worker; views poll the job's status and read ``result`` once it is
+    completed. ``key`` identifies identical requests so they share one job
+    while it is queued or running.
+    """
+
+    STATUS_CHOICES = [
+        ('queued', _('Wartend')),
+        ('running', _('Läuft')),
+        ('completed', _('Abgeschlossen')),
+        ('failed', _('Fehlgeschlagen')),
+    ]
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    kind = models.CharField(_('kind'), max_length=50)
+    key = models.CharField(_('key'), max_length=64, db_index=True)
+    provider = models.CharField(_('provider'), max_length=30)
+    params = models.JSONField(_('parameters'), default=dict, blank=True)
+    status = models.CharField(_('status'), max_length=20, choices=STATUS_CHOICES, default='queued')
+    result = models.JSONField(_('result'), null=True, blank=True)
+    error_message = models.TextField(_('error message'), blank=True)
+    attempts = models.PositiveIntegerField(_('attempts'), default=0)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ai_jobs',
+    )
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    started_at = models.DateTimeField(_('started at'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('finished at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('AI Job')
+        verbose_name_plural = _('AI Jobs')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['key', 'status']),
+            models.Index(fields=['provider', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
@@ -0,0 +1,227 @@
+"""
+Pagination for the REST APIs.
+
+Page-number pagination stays the default. Clients opt in to keyset
+pagination by sending ``cursor`` (empty for the first page) and following
+``next``: each page continues after the ``(ordering field, id)`` of the last
+row instead of using OFFSET, so deep pages and full exports cost the same as
+the first page. Totals are only computed on request: ``count=exact`` or
+``count=estimate`` (planner estimate on PostgreSQL).
+"""
+
+import base64
+import binascii
+import json
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+CURSOR_PARAM = 'cursor'
+COUNT_PARAM = 'count'
+# Planner estimates are unreliable for small tables; count those exactly.
+EXACT_COUNT_BELOW = 1000
+
+
+def estimated_count(queryset) -> int:
+    """Row count of ``queryset`` from the PostgreSQL planner; exact on other backends."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]['Plan']['Plan Rows'])
+    return queryset.count() if estimate < EXACT_COUNT_BELOW else estimate
+
+
+def requested_count(queryset, request):
+    """Total for ``count=exact|estimate``, otherwise None (no COUNT query)."""
+    mode = request.query_params.get(COUNT_PARAM)
+    if mode == 'exact':
+        return queryset.count()
+    if mode == 'estimate':
+        return estimated_count(queryset)
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Django paginator whose total comes from :func:`estimated_count`."""
+
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list)
+
+
+def _cursor_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination ordered by one field plus the primary key.
+
+    The field is the first ordering of the view (``OrderingFilter``,
+    ``view.ordering``, the queryset or the model's Meta ordering). Nullable or
+    related fields fall back to ordering by primary key.
+    """
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = CURSOR_PARAM
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field, descending = self.get_ordering(request, queryset, view)
+        self.count = requested_count(queryset, request)
+
+        sign, lookup = ('-', 'lt') if descending else ('', 'gt')
+        if self.field == 'pk':
+            ordered = queryset.order_by(f'{sign}pk')
+        else:
+            ordered = queryset.order_by(f'{sign}{self.field}', f'{sign}pk')
+
+        token = request.query_params.get(self.cursor_query_param, '')
+        if token:
+            value, pk = self.decode_cursor(token)
+            condition = Q(**{f'pk__{lookup}': pk})
+            if self.field != 'pk':
+                condition = Q(**{f'{self.field}__{lookup}': value}) | (Q(**{self.field: value}) & condition)
+            ordered = ordered.filter(condition)
+
+        rows = list(ordered[:self.page_size + 1])
+        self.page = rows[:self.page_size]
+        self.next_cursor = self.encode_cursor(self.page[-1]) if len(rows) > self.page_size else None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', None) or []:
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = (
+            ordering
+            or getattr(view, 'ordering', None)
+            or queryset.query.order_by
+            or queryset.model._meta.ordering
+            or ['-pk']
+        )
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        first = ordering[0] if isinstance(ordering[0], str) else '-pk'
+        descending = first.startswith('-')
+        name = first.lstrip('-')
+        if name in ('pk', queryset.model._meta.pk.name):
+            return 'pk', descending
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return 'pk', True
+        if field.null or not field.concrete or field.is_relation:
+            return 'pk', descending
+        return name, descending
+
+    def encode_cursor(self, instance):
+        value = None if self.field == 'pk' else _cursor_value(getattr(instance, self.field))
+        raw = json.dumps([value, instance.pk])
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, token):
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+            value, pk = json.loads(raw)
+        except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        # The total is only needed once; later pages skip the count query
+        url = remove_query_param(self.request.build_absolute_uri(), COUNT_PARAM)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class PageOrCursorPagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to :class:`KeysetPagination` when the
+    request carries ``cursor``. ``count=estimate`` replaces the exact page
+    count by the planner estimate.
+    """
+    page_size_query_param = 'page_size'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if CURSOR_PARAM in request.query_params:
+            self.keyset = self.keyset_class()
+            self.keyset.page_size = self.page_size or self.keyset.page_size
+            self.keyset.max_page_size = self.max_page_size or self.keyset.max_page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        if request.query_params.get(COUNT_PARAM) == 'estimate':
+            self.django_paginator_class = EstimatedCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': CURSOR_PARAM,
+                'required': False,
+                'in': 'query',
+                'description': 'Keyset pagination: empty for the first page, then the cursor from "next".',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': COUNT_PARAM,
+                'required': False,
+                'in': 'query',
+                'description': 'Total with cursor pagination: "exact" or "estimate".',
+                'schema': {'type': 'string', 'enum': ['exact', 'estimate']},
+            },
+        ]
@@ -0,0 +1,348 @@
+"""
+Process-wide gateway for all LLM calls (Bedrock, Anthropic, OpenAI).
+
+Clients and HTTP connections are created once per process and shared.
+Deterministic calls are answered from a TTL + LRU response cache keyed on a
+hash of provider, model, temperature, token limit, system prompt and prompt.
+Every call records latency, token and cache-hit metrics per provider;
+streamed calls additionally record their time to first token.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+
+from apps.core.services.bedrock import BedrockService, load_config
+
+
+class ResponseCache:
+    """Thread-safe in-memory cache with per-entry TTL and LRU eviction."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class AIMetrics:
+    """Per-provider call counters, token totals and recent latencies."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._providers = {}
+
+    def _entry(self, provider: str) -> dict:
+        entry = self._providers.get(provider)
+        if entry is None:
+            entry = self._providers[provider] = {
+                'calls': 0,
+                'errors': 0,
+                'cache_hits': 0,
+                'input_tokens': 0,
+                'output_tokens': 0,
+                'latency_ms_total': 0,
+                'latencies': deque(maxlen=self.window),
+                'first_token_latencies': deque(maxlen=self.window),
+            }
+        return entry
+
+    def record(self, provider: str, latency_ms: int = 0, input_tokens: int = 0, output_tokens: int = 0,
+               cache_hit: bool = False, error: bool = False, first_token_ms: int | None = None):
+        with self._lock:
+            entry = self._entry(provider)
+            if cache_hit:
+                entry['cache_hits'] += 1
+                return
+            entry['calls'] += 1
+            if error:
+                entry['errors'] += 1
+            entry['input_tokens'] += input_tokens or 0
+            entry['output_tokens'] += output_tokens or 0
+            entry['latency_ms_total'] += latency_ms
+            entry['latencies'].append(latency_ms)
+            if first_token_ms is not None:
+                entry['first_token_latencies'].append(first_token_ms)
+
+    def snapshot(self) -> dict:
+        """Totals per provider plus average and p95 latency over the recent window."""
+        with self._lock:
+            result = {}
+            for provider, entry in self._providers.items():
+                latencies = sorted(entry['latencies'])
+                first_tokens = sorted(entry['first_token_latencies'])
+                requests_total = entry['calls'] + entry['cache_hits']
+                result[provider] = {
+                    'calls': entry['calls'],
+                    'errors': entry['errors'],
+                    'cache_hits': entry['cache_hits'],
+                    'cache_hit_rate': round(entry['cache_hits'] / requests_total, 3) if requests_total else 0.0,
+                    'input_tokens': entry['input_tokens'],
+                    'output_tokens': entry['output_tokens'],
+                    'avg_latency_ms': round(entry['latency_ms_total'] / entry['calls']) if entry['calls'] else None,
+                    'p95_latency_ms': latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+                    'p95_first_token_ms': first_tokens[int(0.95 * (len(first_tokens) - 1))] if first_tokens else None,
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._providers.clear()
+
+
+class AIGateway:
+    """
+    Shared entry point for LLM calls.
+
+    ``cache=None`` caches a call only when its temperature is at or below
+    AI_CACHE_MAX_TEMPERATURE; pass ``cache=True`` for calls whose answer may be
+    reused (summaries, scores, categorizations) and ``cache=False`` for
+    conversational replies.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bedrock = None
+        self._bedrock_loaded_at = 0.0
+        self._anthropic = {}
+        self._openai = {}
+        self.cache = ResponseCache(
+            getattr(settings, 'AI_CACHE_MAX_ENTRIES', 1024),
+            getattr(settings, 'AI_CACHE_SECONDS', 3600),
+        )
+        self.metrics = AIMetrics()
+
+    # -- clients -------------------------------------------------------------
+
+    def bedrock(self) -> BedrockService:
+        """BedrockService with its config re-read at most every AI_CONFIG_SECONDS."""
+        max_age = getattr(settings, 'AI_CONFIG_SECONDS', 60)
+        with self._lock:
+            if self._bedrock is None or time.monotonic() - self._bedrock_loaded_at > max_age:
+                self._bedrock = BedrockService(load_config())
+                self._bedrock_loaded_at = time.monotonic()
+            return self._bedrock
+
+    def anthropic_client(self):
+        """Shared Anthropic client, or None when no CLAUDE_API_KEY is configured."""
+        api_key = getattr(settings, 'CLAUDE_API_KEY', None)
+        if not api_key:
+            return None
+        with self._lock:
+            client = self._anthropic.get(api_key)
+            if client is None:
+                import anthropic
+                client = self._anthropic[api_key] = anthropic.Anthropic(api_key=api_key)
+            return client
+
+    def openai_client(self):
+        """Shared OpenAI client (module-level API on pre-1.0 SDKs), or None without OPENAI_API_KEY."""
+        api_key = getattr(settings, 'OPENAI_API_KEY', None)
+        if not api_key:
+            return None
+        with self._lock:
+            client = self._openai.get(api_key)
+            if client is None:
+                import openai
+                if hasattr(openai, 'OpenAI'):
+                    client = openai.OpenAI(api_key=api_key)
+                else:
+                    openai.api_key = api_key
+                    client = openai
+                self._openai[api_key] = client
+            return client
+
+    def reset(self):
+        """Drop cached clients, configuration and responses (e.g. after settings changed)."""
+        with self._lock:
+            self._bedrock = None
+            self._anthropic.clear()
+            self._openai.clear()
+        self.cache.clear()
+
+    # -- calls ---------------------------------------------------------------
+
+    @staticmethod
+    def cache_key(provider: str, model: str, temperature, max_tokens, system, prompt) -> str:
+        raw = json.dumps([provider, model, temperature, max_tokens, system or '', prompt], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _use_cache(self, cache, temperature) -> bool:
+        if cache is not None:
+            return cache
+        limit = getattr(settings, 'AI_CACHE_MAX_TEMPERATURE', 0.3)
+        return temperature is not None and temperature <= limit
+
+    def _call(self, provider, model, temperature, max_tokens, system, prompt, cache, invoke) -> str:
+        key = None
+        if self._use_cache(cache, temperature):
+            key = self.cache_key(provider, model, temperature, max_tokens, system, prompt)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.metrics.record(provider, cache_hit=True)
+                return cached
+        started = time.monotonic()
+        try:
+            text, input_tokens, output_tokens = invoke()
+        except Exception:
+            self.metrics.record(provider, int((time.monotonic() - started) * 1000), error=True)
+            raise
+        self.metrics.record(provider, int((time.monotonic() - started) * 1000), input_tokens, output_tokens)
+        if key is not None and text:
+            self.cache.set(key, text)
+        return text
+
+    def converse(self, prompt: str, system: str | None = None, max_tokens=None, temperature=None, cache=None) -> str:
+        """Bedrock converse call; drop-in for ``BedrockService().converse``."""
+        service = self.bedrock()
+        effective_temperature = service.temperature if temperature is None else temperature
+
+        def invoke():
+            text, usage = service.converse_with_usage(prompt, system=system, max_tokens=max_tokens, temperature=temperature)
+            return text, usage.get('inputTokens', 0), usage.get('outputTokens', 0)
+
+        return self._call('bedrock', service.model_id, effective_temperature, max_tokens or service.max_tokens,
+                          system, prompt, cache, invoke)
+
+    def anthropic_message(self, model: str, messages: list, max_tokens: int, system: str | None = None,
+                          temperature=None, cache=None) -> str:
+        """Anthropic Messages API call returning the first text block."""
+        client = self.anthropic_client()
+        if client is None:
+            raise RuntimeError("Claude API key is missing.")
+
+        def invoke():
+            kwargs = {'model': model, 'max_tokens': max_tokens, 'messages': messages}
+            if system:
+                kwargs['system'] = system
+            if temperature is not None:
+                kwargs['temperature'] = temperature
+            message = client.messages.create(**kwargs)
+            usage = getattr(message, 'usage', None)
+            return (
+                message.content[0].text,
+                getattr(usage, 'input_tokens', 0) or 0,
+                getattr(usage, 'output_tokens', 0) or 0,
+            )
+
+        return self._call('claude', model, temperature, max_tokens, system,
+                          json.dumps(messages, ensure_ascii=False), cache, invoke)
+
+    def openai_chat(self, model: str, messages: list, max_tokens: int, temperature=None, cache=None) -> str:
+        """OpenAI chat completion returning the first choice's content."""
+        client = self.openai_client()
+        if client is None:
+            raise RuntimeError("OpenAI API key is missing.")
+
+        def invoke():
+            kwargs = {'model': model, 'messages': messages, 'max_tokens': max_tokens}
+            if temperature is not None:
+                kwargs['temperature'] = temperature
+            if hasattr(client, 'chat'):
+                response = client.chat.completions.create(**kwargs)
+            else:
+                response = client.ChatCompletion.create(**kwargs)
+            usage = getattr(response, 'usage', None)
+            return (
+                response.choices[0].message.content,
+                getattr(usage, 'prompt_tokens', 0) or 0,
+                getattr(usage, 'completion_tokens', 0) or 0,
+            )
+
+        return self._call('openai', model, temperature, max_tokens, None,
+                          json.dumps(messages, ensure_ascii=False), cache, invoke)
+
+    def _stream(self, provider, deltas, usage: dict):
+        """
+        Yield the non-empty text deltas of ``deltas`` and record one metrics
+        entry with total and first-token latency once the stream is exhausted.
+        ``usage`` is filled with input/output token counts by the producer.
+        """
+        started = time.monotonic()
+        first_token_ms = None
+        try:
+            for text in deltas:
+                if not text:
+                    continue
+                if first_token_ms is None:
+                    first_token_ms = int((time.monotonic() - started) * 1000)
+                yield text
+        except Exception:
+            self.metrics.record(provider, int((time.monotonic() - started) * 1000), error=True)
+            raise
+        self.metrics.record(provider, int((time.monotonic() - started) * 1000), usage.get('input_tokens', 0),
+                            usage.get('output_tokens', 0), first_token_ms=first_token_ms)
+
+    def stream_converse(self, prompt: str, system: str | None = None, max_tokens=None, temperature=None):
+        """Bedrock ConverseStream call yielding text deltas; never cached."""
+        service = self.bedrock()
+        usage = {}
+
+        def deltas():
+            bedrock_usage = {}
+            yield from service.converse_stream(prompt, system=system, max_tokens=max_tokens,
+                                               temperature=temperature, usage=bedrock_usage)
+            usage['input_tokens'] = bedrock_usage.get('inputTokens', 0)
+            usage['output_tokens'] = bedrock_usage.get('outputTokens', 0)
+
+        return self._stream('bedrock', deltas(), usage)
+
+    def stream_anthropic(self, model: str, messages: list, max_tokens: int, system: str | None = None,
+                         temperature=None):
+        """Anthropic streaming Messages API call yielding text deltas; never cached."""
+        client = self.anthropic_client()
+        if client is None:
+            raise RuntimeError("Claude API key is missing.")
+        usage = {}
+
+        def deltas():
+            kwargs = {'model': model, 'max_tokens': max_tokens, 'messages': messages}
+            if system:
+                kwargs['system'] = system
+            if temperature is not None:
+                kwargs['temperature'] = temperature
+            with client.messages.stream(**kwargs) as stream:
+                yield from stream.text_stream
+                final = getattr(stream.get_final_message(), 'usage', None)
+            usage['input_tokens'] = getattr(final, 'input_tokens', 0) or 0
+            usage['output_tokens'] = getattr(final, 'output_tokens', 0) or 0
+
+        return self._stream('claude', deltas(), usage)
+
+    def stats(self) -> dict:
+        return {'providers': self.metrics.snapshot(), 'cache_entries': len(self.cache)}
+
+
+gateway = AIGateway()
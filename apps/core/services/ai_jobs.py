@@ -0,0 +1,253 @@
+"""
+Background queue for slow AI calls.
+
+Views submit an AIJob instead of waiting on the provider; a Celery worker (or
+the request process in 'inline' mode) runs the job's handler and stores its
+JSON result, which the page polls for. Identical requests share one job while
+it is queued or running, and each provider runs a bounded number of jobs at
+once across all workers, tracked as slot keys in the shared cache. A periodic
+sweep re-dispatches jobs whose dispatch was lost and recovers jobs whose worker
+died; requests no longer share such stale jobs.
+"""
+import hashlib
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.core.models import AIJob
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "ai-jobs:"
+LOCK_SECONDS = 5
+SLOT_POLL_SECONDS = 0.2
+
+# kind -> (handler, provider). Handlers take the job params and return a
+# JSON-serialisable result; exceptions fail the job with their message.
+JOB_KINDS = {
+    'contracts.analyze': ('apps.contracts.services.ai.run_analysis_job', 'bedrock'),
+    'crm.lead_summary': ('apps.crm.services.ai.run_lead_summary_job', 'bedrock'),
+    'crm.lead_followup': ('apps.crm.services.ai.run_lead_followup_job', 'bedrock'),
+    'helpdesk.suggest_response': ('apps.helpdesk.helpdesk_apps.tickets.ai_service.run_suggest_response_job', 'helpdesk'),
+}
+
+
+class ProviderBusy(Exception):
+    """Every concurrency slot of a provider is taken."""
+
+
+def job_key(kind: str, params: dict) -> str:
+    raw = json.dumps([kind, params], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def provider_limit(provider: str) -> int:
+    limits = getattr(settings, 'AI_JOBS_PROVIDER_LIMITS', {})
+    return max(1, int(limits.get(provider, getattr(settings, 'AI_JOBS_DEFAULT_LIMIT', 2))))
+
+
+@contextmanager
+def _submit_lock(key: str):
+    lock_key = f"{CACHE_PREFIX}submit:{key}"
+    deadline = time.monotonic() + LOCK_SECONDS
+    locked = cache.add(lock_key, 1, LOCK_SECONDS)
+    while not locked and time.monotonic() < deadline:
+        time.sleep(0.01)
+        locked = cache.add(lock_key, 1, LOCK_SECONDS)
+    try:
+        yield
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+def _live_jobs():
+    """
+    Queued or running jobs that are still expected to finish. Queued jobs
+    count from their last start (or creation), running jobs from their start.
+    """
+    now = timezone.now()
+    queued_since = now - timedelta(seconds=getattr(settings, 'AI_JOBS_QUEUED_TIMEOUT', 900))
+    running_since = now - timedelta(seconds=getattr(settings, 'AI_JOBS_RUNNING_TIMEOUT', 900))
+    return AIJob.objects.alias(queued_at=Coalesce('started_at', 'created_at')).filter(
+        Q(status='queued', queued_at__gte=queued_since) | Q(status='running', started_at__gte=running_since)
+    )
+
+
+def submit_job(kind: str, params: dict, user=None) -> AIJob:
+    """
+    Queue ``kind`` with ``params`` and dispatch it after commit. Returns the
+    already queued or running job instead when an identical one exists.
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown AI job kind: {kind}")
+    key = job_key(kind, params)
+    with _submit_lock(key):
+        job = _live_jobs().filter(key=key).order_by('created_at').first()
+        if job is not None:
+            return job
+        job = AIJob.objects.create(
+            kind=kind,
+            key=key,
+            provider=JOB_KINDS[kind][1],
+            params=params,
+            created_by=user if getattr(user, 'is_authenticated', False) else None,
+        )
+    transaction.on_commit(lambda: dispatch_job(job.pk))
+    return job
+
+
+def active_jobs(*requests) -> list:
+    """Queued or running jobs for the given ``(kind, params)`` pairs, oldest first."""
+    keys = [job_key(kind, params) for kind, params in requests]
+    return list(_live_jobs().filter(key__in=keys).order_by('created_at'))
+
+
+def dispatch_job(job_id: int):
+    mode = getattr(settings, 'AI_JOBS_MODE', 'celery')
+    if mode == 'inline':
+        try:
+            run_job(job_id, wait=getattr(settings, 'AI_JOBS_INLINE_WAIT_SECONDS', 30))
+        except ProviderBusy:
+            fail_job(job_id, "KI-Anbieter ist ausgelastet. Bitte später erneut versuchen.")
+        return
+    if mode != 'celery':
+        return
+    try:
+        from apps.core.tasks import run_ai_job
+        run_ai_job.delay(job_id)
+    except Exception as exc:
+        # Job stays queued; run_ai_jobs picks it up.
+        logger.warning("AI job dispatch failed: %s", exc)
+
+
+@contextmanager
+def provider_slot(provider: str, wait: float = 0.0):
+    """
+    Hold one of the provider's ``AI_JOBS_PROVIDER_LIMITS`` slots for the block.
+
+    Raises ProviderBusy when none frees up within ``wait`` seconds. Slots
+    expire after AI_JOBS_SLOT_SECONDS so a killed worker cannot leak one.
+    """
+    ttl = getattr(settings, 'AI_JOBS_SLOT_SECONDS', 600)
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    slot_key = None
+    while slot_key is None:
+        for index in range(provider_limit(provider)):
+            candidate = f"{CACHE_PREFIX}slot:{provider}:{index}"
+            if cache.add(candidate, token, ttl):
+                slot_key = candidate
+                break
+        else:
+            if time.monotonic() >= deadline:
+                raise ProviderBusy(provider)
+            time.sleep(SLOT_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        if cache.get(slot_key) == token:
+            cache.delete(slot_key)
+
+
+def fail_job(job_id: int, message: str):
+    AIJob.objects.filter(pk=job_id, status__in=AIJob.ACTIVE_STATUSES).update(
+        status='failed',
+        error_message=message,
+        finished_at=timezone.now(),
+    )
+
+
+def run_job(job_id: int, wait: float = 0.0):
+    """
+    Run a queued job inside a provider slot. Returns None when the job was
+    already claimed; raises ProviderBusy (job stays queued) when no slot
+    freed up within ``wait`` seconds.
+    """
+    job = AIJob.objects.filter(pk=job_id, status='queued').first()
+    if job is None:
+        return None
+    handler_path, _provider = JOB_KINDS[job.kind]
+    with provider_slot(job.provider, wait=wait):
+        claimed = AIJob.objects.filter(pk=job_id, status='queued').update(
+            status='running',
+            started_at=timezone.now(),
+            attempts=job.attempts + 1,
+        )
+        if not claimed:
+            return None
+        job.refresh_from_db()
+        try:
+            job.result = import_string(handler_path)(job.params)
+            job.status = 'completed'
+        except Exception as exc:
+            logger.exception("AI job %s (%s) failed", job.pk, job.kind)
+            job.status = 'failed'
+            job.error_message = str(exc)[:2000]
+    job.finished_at = timezone.now()
+    job.save(update_fields=['result', 'status', 'error_message', 'finished_at'])
+    return job
+
+
+def sweep_stale_jobs() -> dict:
+    """
+    Recover jobs the queue lost track of:
+
+    - running past AI_JOBS_RUNNING_TIMEOUT (worker died): queued again until
+      AI_JOBS_MAX_ATTEMPTS, then failed;
+    - queued past AI_JOBS_QUEUED_TIMEOUT: failed;
+    - queued past AI_JOBS_REDISPATCH_SECONDS (dispatch lost): dispatched again.
+      Only one worker can claim a job, so a duplicate dispatch is harmless.
+    """
+    now = timezone.now()
+    running_cutoff = now - timedelta(seconds=getattr(settings, 'AI_JOBS_RUNNING_TIMEOUT', 900))
+    queued_cutoff = now - timedelta(seconds=getattr(settings, 'AI_JOBS_QUEUED_TIMEOUT', 900))
+    redispatch_cutoff = now - timedelta(seconds=getattr(settings, 'AI_JOBS_REDISPATCH_SECONDS', 120))
+    max_attempts = getattr(settings, 'AI_JOBS_MAX_ATTEMPTS', 2)
+
+    stuck = AIJob.objects.filter(status='running', started_at__lt=running_cutoff)
+    failed = stuck.filter(attempts__gte=max_attempts).update(
+        status='failed',
+        error_message="KI-Anfrage wurde nicht abgeschlossen. Bitte erneut versuchen.",
+        finished_at=now,
+    )
+    requeue_ids = list(stuck.values_list('id', flat=True))
+    # started_at restarts the queued timeout for the retry
+    AIJob.objects.filter(pk__in=requeue_ids, status='running').update(status='queued', started_at=now)
+
+    queued = AIJob.objects.alias(queued_at=Coalesce('started_at', 'created_at')).filter(status='queued')
+    failed += queued.filter(queued_at__lt=queued_cutoff).update(
+        status='failed',
+        error_message="KI-Anfrage wurde nicht gestartet. Bitte erneut versuchen.",
+        finished_at=now,
+    )
+    lost_ids = list(queued.filter(queued_at__lt=redispatch_cutoff).values_list('id', flat=True))
+    for job_id in requeue_ids + lost_ids:
+        dispatch_job(job_id)
+    return {'requeued': len(requeue_ids), 'redispatched': len(lost_ids), 'failed': failed}
+
+
+def job_payload(job: AIJob) -> dict:
+    """Status document returned to polling clients."""
+    payload = {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'finished': job.is_finished,
+    }
+    if job.status == 'completed':
+        payload['result'] = job.result
+    elif job.status == 'failed':
+        payload['error'] = job.error_message
+    return payload
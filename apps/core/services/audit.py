@@ -0,0 +1,16 @@
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.forms.models import model_to_dict
+
+
+class _SnapshotEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        try:
+            return super().default(o)
+        except TypeError:
+            return str(o)
+
+
+def audit_snapshot(instance) -> dict:
+    """model_to_dict() made JSON-safe (decimals, dates, files) for AuditLog values."""
+    return json.loads(json.dumps(model_to_dict(instance), cls=_SnapshotEncoder))
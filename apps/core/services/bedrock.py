@@ -1,58 +1,102 @@
 import os
 import json
+import threading
 import requests
 import boto3
 from botocore.exceptions import BotoCoreError, ClientError, NoCredentialsError
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+_lock = threading.Lock()
+_runtime_clients = {}
+_http_session = None
+
+
+def runtime_client(region: str, api_key: str | None = None):
+    """
+    Process-wide bedrock-runtime client per region and API key (boto3 clients
+    are thread-safe). botocore reads AWS_BEARER_TOKEN_BEDROCK only when the
+    client is created, so a changed key needs its own client.
+    """
+    with _lock:
+        client = _runtime_clients.get((region, api_key))
+        if client is None:
+            client = _runtime_clients[(region, api_key)] = boto3.client(
+                service_name='bedrock-runtime',
+                region_name=region,
+            )
+        return client
+
+
+def http_session() -> requests.Session:
+    """Shared keep-alive session for the bearer-token HTTP fallback."""
+    global _http_session
+    with _lock:
+        if _http_session is None:
+            pool_size = getattr(settings, 'AI_HTTP_POOL_SIZE', 10)
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+            _http_session = session
+        return _http_session
+
+
+def load_config() -> dict:
+    """Bedrock settings from Django settings, overridden by SystemSettings."""
+    config = {
+        'api_key': settings.BEDROCK_API_KEY,
+        'region': settings.BEDROCK_REGION,
+        'model_id': settings.BEDROCK_MODEL_ID,
+        'max_tokens': settings.BEDROCK_MAX_TOKENS,
+        'temperature': settings.BEDROCK_TEMPERATURE,
+    }
+    try:
+        from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
+        s = SystemSettings.get_settings()
+        if s.bedrock_api_key:
+            config['api_key'] = s.bedrock_api_key
+        if s.bedrock_region:
+            config['region'] = s.bedrock_region
+        if s.bedrock_model_id:
+            config['model_id'] = s.bedrock_model_id
+        if s.bedrock_max_tokens:
+            config['max_tokens'] = s.bedrock_max_tokens
+        if s.bedrock_temperature is not None:
+            config['temperature'] = s.bedrock_temperature
+    except Exception:
+        pass
+    return config
 
 
 class BedrockService:
     """Thin wrapper for Amazon Bedrock runtime."""
 
-    def __init__(self):
-        api_key = settings.BEDROCK_API_KEY
-        region = settings.BEDROCK_REGION
-        model_id = settings.BEDROCK_MODEL_ID
-        max_tokens = settings.BEDROCK_MAX_TOKENS
-        temperature = settings.BEDROCK_TEMPERATURE
-        try:
-            from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
-            s = SystemSettings.get_settings()
-            if s.bedrock_api_key:
-                api_key = s.bedrock_api_key
-            if s.bedrock_region:
-                region = s.bedrock_region
-            if s.bedrock_model_id:
-                model_id = s.bedrock_model_id
-            if s.bedrock_max_tokens:
-                max_tokens = s.bedrock_max_tokens
-            temperature = s.bedrock_temperature if s.bedrock_temperature is not None else temperature
-        except Exception:
-            pass
+    def __init__(self, config: dict | None = None):
+        config = config or load_config()
+        api_key = config['api_key']
 
         self.api_key = api_key
         if api_key:
             os.environ['AWS_BEARER_TOKEN_BEDROCK'] = api_key
 
-        self.model_id = model_id
-        self.max_tokens = max_tokens
-        self.temperature = temperature
-        self.region = region
-        self.client = boto3.client(
-            service_name='bedrock-runtime',
-            region_name=region,
-        )
+        self.model_id = config['model_id']
+        self.max_tokens = config['max_tokens']
+        self.temperature = config['temperature']
+        self.region = config['region']
+        self.client = runtime_client(self.region, api_key)
+
+    def _inference_config(self, max_tokens=None, temperature=None) -> dict:
+        return {
+            "maxTokens": max_tokens or self.max_tokens,
+            "temperature": self.temperature if temperature is None else temperature,
+        }
 
-    def _converse_http(self, prompt: str, system: str | None = None) -> str:
+    def _converse_http(self, prompt: str, system: str | None = None, max_tokens=None, temperature=None):
         if not self.api_key:
             raise RuntimeError("Bedrock API key is missing.")
         url = f"https://bedrock-runtime.{self.region}.amazonaws.com/model/{self.model_id}/converse"
         payload = {
             "messages": [{"role": "user", "content": [{"text": prompt}]}],
-            "inferenceConfig": {
-                "maxTokens": self.max_tokens,
-                "temperature": self.temperature,
-            },
+            "inferenceConfig": self._inference_config(max_tokens, temperature),
         }
         if system:
             payload["system"] = [{"text": system}]
@@ -60,35 +104,68 @@ class BedrockService:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}",
         }
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
+        response = http_session().post(url, headers=headers, json=payload, timeout=60)
         response.raise_for_status()
         data = response.json()
         try:
-            return data["output"]["message"]["content"][0]["text"]
+            return data["output"]["message"]["content"][0]["text"], data.get("usage") or {}
         except (KeyError, TypeError) as exc:
             raise RuntimeError(f"Unexpected Bedrock response: {data}") from exc
 
-    def converse(self, prompt: str, system: str | None = None) -> str:
+    def converse_with_usage(self, prompt: str, system: str | None = None, max_tokens=None, temperature=None):
+        """``(text, usage)`` where usage holds Bedrock's inputTokens/outputTokens."""
         messages = [{"role": "user", "content": [{"text": prompt}]}]
         request = {
             "modelId": self.model_id,
             "messages": messages,
-            "inferenceConfig": {
-                "maxTokens": self.max_tokens,
-                "temperature": self.temperature,
-            },
+            "inferenceConfig": self._inference_config(max_tokens, temperature),
         }
         if system:
             request["system"] = [{"text": system}]
 
         try:
             response = self.client.converse(**request)
-            return response["output"]["message"]["content"][0]["text"]
+            return response["output"]["message"]["content"][0]["text"], response.get("usage") or {}
         except NoCredentialsError:
             if self.api_key:
-                return self._converse_http(prompt, system=system)
+                return self._converse_http(prompt, system=system, max_tokens=max_tokens, temperature=temperature)
             raise RuntimeError("Bedrock request failed: Unable to locate credentials")
         except (BotoCoreError, ClientError, KeyError) as exc:
             if self.api_key:
-                return self._converse_http(prompt, system=system)
+                return self._converse_http(prompt, system=system, max_tokens=max_tokens, temperature=temperature)
             raise RuntimeError(f"Bedrock request failed: {exc}") from exc
+
+    def converse_stream(self, prompt: str, system: str | None = None, max_tokens=None, temperature=None,
+                        usage: dict | None = None):
+        """
+        Yield text deltas from Bedrock ConverseStream. ``usage`` receives the
+        final inputTokens/outputTokens. With only an API key configured the
+        HTTP converse answer is yielded as a single delta.
+        """
+        request = {
+            "modelId": self.model_id,
+            "messages": [{"role": "user", "content": [{"text": prompt}]}],
+            "inferenceConfig": self._inference_config(max_tokens, temperature),
+        }
+        if system:
+            request["system"] = [{"text": system}]
+        usage = usage if usage is not None else {}
+
+        try:
+            response = self.client.converse_stream(**request)
+        except (NoCredentialsError, BotoCoreError, ClientError) as exc:
+            if not self.api_key:
+                raise RuntimeError(f"Bedrock request failed: {exc}") from exc
+            text, http_usage = self._converse_http(prompt, system=system, max_tokens=max_tokens, temperature=temperature)
+            usage.update(http_usage)
+            yield text
+            return
+
+        for event in response["stream"]:
+            if "contentBlockDelta" in event:
+                yield event["contentBlockDelta"]["delta"].get("text", "")
+            elif "metadata" in event:
+                usage.update(event["metadata"].get("usage") or {})
+
+    def converse(self, prompt: str, system: str | None = None) -> str:
+        return self.converse_with_usage(prompt, system=system)[0]
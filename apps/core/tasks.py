@@ -0,0 +1,36 @@
+"""
+Celery tasks for the core app
+Runs background AI jobs queued by the contracts, CRM and helpdesk views
+"""
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.conf import settings
+
+from apps.core.services.ai_jobs import ProviderBusy, fail_job, run_job, sweep_stale_jobs
+
+logger = get_task_logger(__name__)
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=120)
+def run_ai_job(self, job_id):
+    """Run one queued AI job; re-queues itself while the provider is saturated."""
+    try:
+        job = run_job(job_id)
+    except ProviderBusy as exc:
+        if self.request.retries >= self.max_retries:
+            fail_job(job_id, "KI-Anbieter ist ausgelastet. Bitte später erneut versuchen.")
+            logger.warning(f"AI job {job_id} dropped: provider {exc} saturated")
+            return
+        raise self.retry(countdown=getattr(settings, 'AI_JOBS_RETRY_SECONDS', 5))
+    if job is not None:
+        logger.info(f"AI job {job.pk} ({job.kind}) {job.status}")
+
+
+@shared_task(ignore_result=True)
+def sweep_ai_jobs():
+    """Re-dispatch lost AI jobs and recover those whose worker died."""
+    counts = sweep_stale_jobs()
+    if any(counts.values()):
+        logger.info(f"AI job sweep: {counts}")
+    return counts
@@ -9,10 +9,11 @@ Views for the Core app
 from django.views.generic import TemplateView
 from django.utils import timezone
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.shortcuts import redirect
+from django.shortcuts import redirect, get_object_or_404
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.contrib.auth.decorators import login_required
 from urllib.parse import urlencode
 from django.core.paginator import Paginator
 from reportlab.lib.pagesizes import A4
@@ -39,10 +40,22 @@ from apps.core.forms import (
     ErpCompetitorForm,
 )
 from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings, EmailLog
+from apps.core.models import AIJob
+from apps.core.services.ai_jobs import job_payload
 from apps.crm.permissions import can_view_crm
 from apps.erp.permissions import can_view_erp
 
 
+@login_required
+def ai_job_status(request, pk):
+    """Polling endpoint for background AI jobs; results go only to the submitter."""
+    job = get_object_or_404(AIJob, pk=pk)
+    payload = job_payload(job)
+    if job.created_by_id != request.user.pk and not request.user.is_superuser:
+        payload.pop('result', None)
+    return JsonResponse(payload)
+
+
 def quick_search(request):
     q = (request.GET.get('q') or '').strip()
     scope = (request.GET.get('scope') or '').strip()
@@ -763,6 +776,8 @@ class AdminDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
             form = BedrockSettingsForm(request.POST, instance=settings_obj)
             if form.is_valid():
                 form.save()
+                from apps.core.services.ai_gateway import gateway
+                gateway.reset()
                 messages.success(request, _("Bedrock-Einstellungen gespeichert."))
             else:
                 messages.error(request, _("Bitte prüfe die Bedrock-Einstellungen."))
@@ -1013,6 +1028,12 @@ class BedrockTestView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     def test_func(self):
         return self.request.user.is_staff or self.request.user.is_superuser
 
+    def get_context_data(self, **kwargs):
+        from apps.core.services.ai_gateway import gateway
+        context = super().get_context_data(**kwargs)
+        context['ai_stats'] = gateway.stats()
+        return context
+
 
 class UserGuideView(LoginRequiredMixin, TemplateView):
     template_name = 'user_guide.html'
@@ -1161,9 +1182,8 @@ class UserGuideHtmlView(LoginRequiredMixin, TemplateView):
                 if not settings.BEDROCK_ENABLED:
                     error = 'Bedrock ist deaktiviert.'
                 else:
-                    from apps.core.services.bedrock import BedrockService
-                    service = BedrockService()
-                    response_text = service.converse(prompt)
+                    from apps.core.services.ai_gateway import gateway
+                    response_text = gateway.converse(prompt, cache=False)
             except Exception as exc:
                 error = str(exc)
 
@@ -86,8 +86,8 @@ class LeadSourceProfileAdmin(admin.ModelAdmin):
 
 @admin.register(LeadImportJob)
 class LeadImportJobAdmin(admin.ModelAdmin):
-    list_display = ('id', 'profile', 'status', 'imported_count', 'skipped_count', 'started_at', 'finished_at')
-    list_filter = ('status', 'profile')
+    list_display = ('id', 'profile', 'status', 'source', 'fetched_count', 'imported_count', 'skipped_count', 'latency_ms', 'started_at', 'finished_at')
+    list_filter = ('status', 'source', 'profile')
     search_fields = ('profile__name',)
 
 
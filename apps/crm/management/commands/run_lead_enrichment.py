@@ -1,12 +1,22 @@
 from django.core.management.base import BaseCommand
-from apps.crm.models import LeadStaging
-from apps.crm.services.enrichment import enrich_queryset
+from apps.crm.models import LeadStaging, LeadEnrichmentJob
+from apps.crm.services.enrichment import enrich_queryset, run_enrichment_job
 
 
 class Command(BaseCommand):
     help = "Run auto-enrichment for staging leads."
 
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', action='store_true', help='Run queued enrichment jobs instead of all staging rows.')
+
     def handle(self, *args, **options):
+        if options['jobs']:
+            count = 0
+            for job_id in LeadEnrichmentJob.objects.filter(status='queued').order_by('id').values_list('id', flat=True):
+                if run_enrichment_job(job_id):
+                    count += 1
+            self.stdout.write(self.style.SUCCESS(f"Enrichment jobs done: {count}"))
+            return
         qs = LeadStaging.objects.filter(status__in=['incomplete', 'ready'])
         count = enrich_queryset(qs)
         self.stdout.write(self.style.SUCCESS(f"Enrichment done. Updated: {count}"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from apps.crm.services.scoring import score_all_leads
+
+
+class Command(BaseCommand):
+    help = "Recalculate lead scores in bulk (AI only for changed leads)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-ai', action='store_true', help='Only calculate rule scores.')
+        parser.add_argument('--force-ai', action='store_true', help='Ask the AI for every lead, ignoring hashes and cache.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = score_all_leads(
+            use_ai=not options['no_ai'],
+            force_ai=options['force_ai'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Lead scoring done. Updated: {count}"))
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0011_lead_enrichment_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='score_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:19
+
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+TRIGRAM_INDEXES = [
+    ('crm_lead_name_trgm', 'crm_lead', 'name'),
+    ('crm_lead_company_trgm', 'crm_lead', 'company'),
+    ('crm_lead_email_trgm', 'crm_lead', 'email'),
+    ('crm_account_name_trgm', 'crm_account', 'name'),
+    ('crm_account_email_trgm', 'crm_account', 'email'),
+    ('crm_opp_name_trgm', 'crm_opportunity', 'name'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # icontains compiles to UPPER(col::text) LIKE UPPER(%s) on PostgreSQL;
+    # GIN trigram indexes on the same expression keep the search indexed.
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except Exception:
+        # No privilege to install the extension: searching still works, unindexed.
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _table, _column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0012_lead_score_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['-updated_at', '-id'], name='crm_account_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['-updated_at', '-id'], name='crm_lead_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='opportunity',
+            index=models.Index(fields=['-updated_at', '-id'], name='crm_opp_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='opportunity',
+            index=models.Index(fields=['stage', '-updated_at', '-id'], name='crm_opp_stage_recent_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
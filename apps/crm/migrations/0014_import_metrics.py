@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0013_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leadimportjob',
+            name='fetched_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='leadimportjob',
+            name='latency_ms',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='leadimportjob',
+            name='metrics',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='leadimportjob',
+            name='source',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='leadstaging',
+            index=models.Index(fields=['profile', 'company'], name='crm_staging_profile_co_idx'),
+        ),
+    ]
@@ -26,6 +26,11 @@ class Account(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-updated_at', '-id'], name='crm_account_recent_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -80,6 +85,7 @@ class Lead(models.Model):
     ai_score = models.IntegerField(default=0)
     score_reason = models.TextField(blank=True)
     score_updated_at = models.DateTimeField(null=True, blank=True)
+    score_hash = models.CharField(max_length=64, blank=True)
     ai_summary = models.TextField(blank=True)
     ai_next_steps = models.TextField(blank=True)
     ai_followup_subject = models.CharField(max_length=255, blank=True)
@@ -99,6 +105,11 @@ class Lead(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-updated_at', '-id'], name='crm_lead_recent_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -128,6 +139,12 @@ class Opportunity(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-updated_at', '-id'], name='crm_opp_recent_idx'),
+            models.Index(fields=['stage', '-updated_at', '-id'], name='crm_opp_stage_recent_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -315,10 +332,22 @@ class LeadImportJob(models.Model):
     imported_count = models.IntegerField(default=0)
     skipped_count = models.IntegerField(default=0)
     error_message = models.TextField(blank=True)
+    source = models.CharField(max_length=50, blank=True)
+    fetched_count = models.IntegerField(default=0)
+    latency_ms = models.IntegerField(default=0)
+    # Per source tried: {"<source>": {"latency_ms", "fetched", "imported", "skipped", "error"}}
+    metrics = models.JSONField(default=dict, blank=True)
     started_at = models.DateTimeField(null=True, blank=True)
     finished_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    @property
+    def yield_rate(self):
+        """Share of fetched results that became new staging rows (0-100)."""
+        if not self.fetched_count:
+            return 0
+        return round(self.imported_count * 100 / self.fetched_count)
+
     def __str__(self):
         return f"Job {self.id} ({self.profile.name})"
 
@@ -353,10 +382,59 @@ class LeadStaging(models.Model):
     raw_data = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['profile', 'company'], name='crm_staging_profile_co_idx'),
+        ]
+
     def __str__(self):
         return self.company
 
 
+class LeadEnrichmentJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Wartend'),
+        ('running', 'Läuft'),
+        ('completed', 'Abgeschlossen'),
+        ('failed', 'Fehlgeschlagen'),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    item_ids = models.JSONField(default=list, blank=True)
+    total_count = models.IntegerField(default=0)
+    processed_count = models.IntegerField(default=0)
+    enriched_count = models.IntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='crm_enrichment_jobs',
+    )
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    @property
+    def progress(self):
+        if self.status == 'completed':
+            return 100
+        if not self.total_count:
+            return 0
+        return min(99, int(self.processed_count * 100 / self.total_count))
+
+    def __str__(self):
+        return f"Enrichment {self.id} ({self.processed_count}/{self.total_count})"
+
+
 class SourceRequestLog(models.Model):
     source = models.CharField(max_length=50, default='handelsregister')
     requested_at = models.DateTimeField(auto_now_add=True)
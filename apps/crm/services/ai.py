@@ -1,7 +1,7 @@
 import json
 from django.conf import settings
 from django.utils import timezone
-from apps.core.services.bedrock import BedrockService
+from apps.core.services.ai_gateway import gateway
 
 
 def _bedrock_enabled() -> bool:
@@ -23,7 +23,7 @@ class CrmAIService:
     def __init__(self):
         if not _bedrock_enabled():
             raise RuntimeError("Bedrock not enabled")
-        self.client = BedrockService()
+        self.client = gateway
 
     def summarize_account(self, account, recent_notes=None) -> str:
         notes = recent_notes or []
@@ -37,7 +37,7 @@ class CrmAIService:
             f"Opportunities: {account.opportunities.count()}\n"
             f"Notizen: {', '.join(n.content[:80] for n in notes)}\n"
         )
-        return self.client.converse(prompt)
+        return self.client.converse(prompt, cache=True)
 
     def summarize_lead(self, lead, recent_notes=None) -> str:
         notes = recent_notes or []
@@ -52,7 +52,7 @@ class CrmAIService:
             f"Score (AI): {lead.ai_score}\n"
             f"Notizen: {', '.join(n.content[:80] for n in notes)}\n"
         )
-        return self.client.converse(prompt)
+        return self.client.converse(prompt, cache=True)
 
     def summarize_lead_with_next_steps(self, lead, recent_notes=None) -> dict:
         notes = recent_notes or []
@@ -68,7 +68,7 @@ class CrmAIService:
             f"Website: {lead.website}\n"
             f"Notizen: {', '.join(n.content[:120] for n in notes)}\n"
         )
-        data = _safe_json(self.client.converse(prompt))
+        data = _safe_json(self.client.converse(prompt, cache=True))
         summary = data.get("summary", "") if isinstance(data, dict) else ""
         next_steps = data.get("next_steps", []) if isinstance(data, dict) else []
         if not summary:
@@ -77,7 +77,8 @@ class CrmAIService:
                 f"Name: {lead.name}\n"
                 f"Firma: {lead.company}\n"
                 f"Status: {lead.status}\n"
-                f"Quelle: {lead.source}\n"
+                f"Quelle: {lead.source}\n",
+                cache=True,
             )
         if not next_steps:
             next_steps = [
@@ -123,7 +124,7 @@ class CrmAIService:
             f"Status: {lead.status}\n"
             f"Notizen: {', '.join(n.content[:160] for n in notes)}\n"
         )
-        return self.client.converse(prompt)
+        return self.client.converse(prompt, cache=True)
 
     def draft_opportunity_email(self, opportunity, contact=None) -> str:
         contact_name = contact and contact.first_name or "Kundin/Kunde"
@@ -137,3 +138,52 @@ class CrmAIService:
             "Ziel: Nächste Schritte vorschlagen und Termin anbieten.\n"
         )
         return self.client.converse(prompt)
+
+
+# ---------------------------------------------------------------------------
+# Background AI jobs (see apps.core.services.ai_jobs)
+# ---------------------------------------------------------------------------
+
+def _run_lead_job(params: dict, produce) -> dict:
+    from apps.crm.models import Lead
+
+    lead = Lead.objects.get(pk=params['lead_id'])
+    lead.ai_status = 'running'
+    lead.ai_error = ''
+    lead.save(update_fields=['ai_status', 'ai_error'])
+    try:
+        fields = produce(lead, CrmAIService(), lead.notes.all()[:5])
+    except Exception as exc:
+        lead.ai_status = 'error'
+        lead.ai_error = str(exc)
+        lead.save(update_fields=['ai_status', 'ai_error'])
+        raise
+    for name, value in fields.items():
+        setattr(lead, name, value)
+    lead.ai_last_analyzed = timezone.now()
+    lead.ai_status = 'done'
+    lead.save(update_fields=[*fields, 'ai_last_analyzed', 'ai_status'])
+    return {'lead_id': lead.pk, **fields}
+
+
+def run_lead_summary_job(params: dict) -> dict:
+    """Handler for ``crm.lead_summary``: summary and next steps stored on the lead."""
+    def produce(lead, ai, notes):
+        data = ai.summarize_lead_with_next_steps(lead, recent_notes=notes)
+        next_steps = data.get('next_steps', [])
+        if isinstance(next_steps, list):
+            next_steps_text = "\n".join([str(item) for item in next_steps if item])
+        else:
+            next_steps_text = str(next_steps or '')
+        return {'ai_summary': data.get('summary', ''), 'ai_next_steps': next_steps_text}
+
+    return _run_lead_job(params, produce)
+
+
+def run_lead_followup_job(params: dict) -> dict:
+    """Handler for ``crm.lead_followup``: follow-up draft stored on the lead."""
+    def produce(lead, ai, notes):
+        data = ai.draft_lead_followup_email(lead, recent_notes=notes)
+        return {'ai_followup_subject': data.get('subject', ''), 'ai_followup_body': data.get('body', '')}
+
+    return _run_lead_job(params, produce)
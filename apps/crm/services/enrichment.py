@@ -1,36 +1,23 @@
-﻿import re
+﻿import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin, urlparse
-import requests
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
-from apps.crm.models import Account, Contact, Lead, LeadStaging
+from apps.crm.models import Lead, LeadStaging, LeadEnrichmentJob
+from apps.crm.services.matching import MatchIndex
+from apps.crm.services.web_fetch import FetchError, fetch_page
 
+logger = logging.getLogger(__name__)
 
-def _normalize(text):
-    return (text or "").strip().lower()
-
-
-def _find_account(company):
-    if not company:
-        return None
-    return Account.objects.filter(name__iexact=company).first()
-
-
-def _find_contact_for_account(account):
-    if not account:
-        return None
-    return account.contacts.first()
-
-
-def _find_contact_by_company(company):
-    if not company:
-        return None
-    return Contact.objects.filter(account__name__iexact=company).first()
-
-
-def _find_existing_lead(company):
-    if not company:
-        return None
-    return Lead.objects.filter(company__iexact=company).first()
+CONTACT_TOKENS = ("kontakt", "contact", "impressum", "imprint")
+MAX_SUBPAGES = 3
+CHUNK_SIZE = 50
+STAGING_FIELDS = [
+    'name', 'email', 'phone', 'lead_source', 'lead_status', 'status',
+    'enrichment_status', 'enrichment_notes', 'enriched_at',
+]
 
 
 def _normalize_url(value: str) -> str:
@@ -49,13 +36,7 @@ def _normalize_url(value: str) -> str:
 
 
 def _fetch_url(url: str) -> str:
-    headers = {
-        "User-Agent": "ABoroOfficeCRM/1.0 (+https://example.invalid)",
-        "Accept": "text/html,application/xhtml+xml",
-    }
-    response = requests.get(url, headers=headers, timeout=20)
-    response.raise_for_status()
-    return response.text[:1_000_000]
+    return fetch_page(url)
 
 
 def _extract_emails(text: str):
@@ -80,6 +61,19 @@ def _extract_links(text: str, base_url: str):
     return cleaned
 
 
+def _contact_links(html: str, base_url: str):
+    """Distinct contact/imprint links of a page, capped at MAX_SUBPAGES."""
+    links = []
+    for link in _extract_links(html, base_url):
+        if link in links or link.rstrip("/") == base_url.rstrip("/"):
+            continue
+        if any(token in link.lower() for token in CONTACT_TOKENS):
+            links.append(link)
+        if len(links) >= MAX_SUBPAGES:
+            break
+    return links
+
+
 def _html_to_text(html: str) -> str:
     if not html:
         return ""
@@ -143,19 +137,15 @@ def _find_email_from_site(website: str):
         return ""
     try:
         html = _fetch_url(url)
-    except Exception:
+    except FetchError:
         return ""
     emails = _extract_emails(html)
     if emails:
         return emails[0]
-    candidates = []
-    for link in _extract_links(html, url):
-        if any(token in link.lower() for token in ["kontakt", "contact", "impressum", "imprint"]):
-            candidates.append(link)
-    for link in candidates[:3]:
+    for link in _contact_links(html, url):
         try:
             sub_html = _fetch_url(link)
-        except Exception:
+        except FetchError:
             continue
         emails = _extract_emails(sub_html)
         if emails:
@@ -171,19 +161,18 @@ def enrich_lead_from_website(lead: Lead):
         return False
     try:
         html = _fetch_url(url)
-    except Exception:
+    except FetchError:
         return False
 
     updated = False
     page_text = _html_to_text(html)
     pages = [(url, page_text)]
-    for link in _extract_links(html, url):
-        if any(token in link.lower() for token in ["kontakt", "contact", "impressum", "imprint"]):
-            try:
-                sub_html = _fetch_url(link)
-                pages.append((link, _html_to_text(sub_html)))
-            except Exception:
-                continue
+    for link in _contact_links(html, url):
+        try:
+            sub_html = _fetch_url(link)
+            pages.append((link, _html_to_text(sub_html)))
+        except FetchError:
+            continue
 
     if not lead.email:
         for _, text in pages:
@@ -221,77 +210,210 @@ def enrich_lead_from_website(lead: Lead):
     return updated
 
 
-def enrich_staging_item(item: LeadStaging):
+def _prepare_staging_item(item: LeadStaging, index: MatchIndex):
+    """
+    Fill ``item`` from existing CRM records found in ``index``. Returns the
+    notes so far and the website to crawl for an e-mail address ('' when
+    none is needed).
+    """
     notes = []
-    try:
-        account = _find_account(item.company)
-        contact = _find_contact_for_account(account) or _find_contact_by_company(item.company)
-        existing_lead = _find_existing_lead(item.company)
-
-        if not item.phone:
-            if account and account.phone:
-                item.phone = account.phone
-                notes.append("Telefon aus Account übernommen")
-            elif contact and contact.phone:
-                item.phone = contact.phone
-                notes.append("Telefon aus Kontakt übernommen")
-            elif existing_lead and existing_lead.phone:
-                item.phone = existing_lead.phone
-                notes.append("Telefon aus bestehendem Lead übernommen")
-
-        if not item.email:
-            if account and account.email:
-                item.email = account.email
-                notes.append("E-Mail aus Account übernommen")
-            elif contact and contact.email:
-                item.email = contact.email
-                notes.append("E-Mail aus Kontakt übernommen")
-            elif existing_lead and existing_lead.email:
-                item.email = existing_lead.email
-                notes.append("E-Mail aus bestehendem Lead übernommen")
-            else:
-                website = ""
-                if isinstance(item.raw_data, dict):
-                    website = item.raw_data.get("website") or item.raw_data.get("source_url") or ""
-                if not website and account and account.website:
-                    website = account.website
-                if website:
-                    email = _find_email_from_site(website)
-                    if email:
-                        item.email = email
-                        notes.append("E-Mail von Website gefunden")
-
-        if not item.name:
-            if contact and (contact.first_name or contact.last_name):
-                item.name = f"{contact.first_name} {contact.last_name}".strip()
-                notes.append("Name aus Kontakt übernommen")
-
-        if not item.lead_source:
-            item.lead_source = 'other'
-        if not item.lead_status:
-            item.lead_status = 'new'
-
-        if item.name and item.company and item.email and item.phone:
-            item.status = 'ready'
+    website = ""
+    account = index.find_account(item.company)
+    contact = index.find_contact(item.company, account)
+    existing_lead = index.find_lead(item.company)
+
+    if not item.phone:
+        if account and account.phone:
+            item.phone = account.phone
+            notes.append("Telefon aus Account übernommen")
+        elif contact and contact.phone:
+            item.phone = contact.phone
+            notes.append("Telefon aus Kontakt übernommen")
+        elif existing_lead and existing_lead.phone:
+            item.phone = existing_lead.phone
+            notes.append("Telefon aus bestehendem Lead übernommen")
+
+    if not item.email:
+        if account and account.email:
+            item.email = account.email
+            notes.append("E-Mail aus Account übernommen")
+        elif contact and contact.email:
+            item.email = contact.email
+            notes.append("E-Mail aus Kontakt übernommen")
+        elif existing_lead and existing_lead.email:
+            item.email = existing_lead.email
+            notes.append("E-Mail aus bestehendem Lead übernommen")
         else:
-            item.status = 'incomplete'
+            if isinstance(item.raw_data, dict):
+                website = item.raw_data.get("website") or item.raw_data.get("source_url") or ""
+            if not website and account and account.website:
+                website = account.website
+
+    if not item.name:
+        if contact and (contact.first_name or contact.last_name):
+            item.name = f"{contact.first_name} {contact.last_name}".strip()
+            notes.append("Name aus Kontakt übernommen")
+    return notes, _normalize_url(website)
+
+
+def _finish_staging_item(item: LeadStaging, notes, email: str = ""):
+    if email:
+        item.email = email
+        notes.append("E-Mail von Website gefunden")
+    if not item.lead_source:
+        item.lead_source = 'other'
+    if not item.lead_status:
+        item.lead_status = 'new'
+
+    if item.name and item.company and item.email and item.phone:
+        item.status = 'ready'
+    else:
+        item.status = 'incomplete'
+
+    item.enrichment_status = 'enriched' if notes else 'no_match'
+    item.enrichment_notes = "; ".join(notes)
+    item.enriched_at = timezone.now()
+
 
-        item.enrichment_status = 'enriched' if notes else 'no_match'
-        item.enrichment_notes = "; ".join(notes)
-        item.enriched_at = timezone.now()
+def _mark_error(item: LeadStaging, exc: Exception):
+    item.enrichment_status = 'error'
+    item.enrichment_notes = str(exc)
+    item.enriched_at = timezone.now()
+
+
+def enrich_staging_item(item: LeadStaging, index: MatchIndex = None):
+    try:
+        notes, website = _prepare_staging_item(item, index or MatchIndex.build())
+        _finish_staging_item(item, notes, _find_email_from_site(website) if website else "")
         item.save()
         return True
     except Exception as exc:
-        item.enrichment_status = 'error'
-        item.enrichment_notes = str(exc)
-        item.enriched_at = timezone.now()
+        _mark_error(item, exc)
         item.save(update_fields=['enrichment_status', 'enrichment_notes', 'enriched_at'])
         return False
 
 
-def enrich_queryset(qs):
+def _enrich_chunk(items, executor, index: MatchIndex) -> int:
+    """
+    Enrich one chunk: CRM lookups hit the in-memory index, website crawls
+    run concurrently on ``executor`` (one crawl per distinct site), results
+    are saved with a single bulk_update.
+    """
+    prepared = []
+    sites = {}
+    for item in items:
+        try:
+            notes, website = _prepare_staging_item(item, index)
+        except Exception as exc:
+            _mark_error(item, exc)
+            prepared.append((item, None, ""))
+            continue
+        prepared.append((item, notes, website))
+        if website and website not in sites:
+            sites[website] = executor.submit(_find_email_from_site, website)
+
     enriched = 0
-    for item in qs:
-        if enrich_staging_item(item):
+    for item, notes, website in prepared:
+        if notes is None:
+            continue
+        try:
+            email = sites[website].result() if website else ""
+            _finish_staging_item(item, notes, email)
             enriched += 1
+        except Exception as exc:
+            _mark_error(item, exc)
+    LeadStaging.objects.bulk_update(items, STAGING_FIELDS)
+    return enriched
+
+
+def enrich_staging_items(items, progress=None) -> int:
+    """
+    Enrich staging rows in chunks with a bounded crawl pool. ``progress`` is
+    called with ``(processed, enriched)`` after every chunk.
+    """
+    workers = max(1, getattr(settings, 'CRM_ENRICHMENT_WORKERS', 8))
+    index = MatchIndex.build()
+    processed = 0
+    enriched = 0
+    chunk = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crm-enrich") as executor:
+        for item in items:
+            chunk.append(item)
+            if len(chunk) < CHUNK_SIZE:
+                continue
+            enriched += _enrich_chunk(chunk, executor, index)
+            processed += len(chunk)
+            chunk = []
+            if progress:
+                progress(processed, enriched)
+        if chunk:
+            enriched += _enrich_chunk(chunk, executor, index)
+            processed += len(chunk)
+            if progress:
+                progress(processed, enriched)
     return enriched
+
+
+def enrich_queryset(qs):
+    if hasattr(qs, 'iterator'):
+        qs = qs.iterator(chunk_size=CHUNK_SIZE)
+    return enrich_staging_items(qs)
+
+
+# ---------------------------------------------------------------------------
+# Background jobs
+# ---------------------------------------------------------------------------
+
+def create_enrichment_job(item_ids, user=None) -> LeadEnrichmentJob:
+    item_ids = sorted({int(pk) for pk in item_ids})
+    job = LeadEnrichmentJob.objects.create(
+        item_ids=item_ids,
+        total_count=len(item_ids),
+        created_by=user if getattr(user, 'is_authenticated', False) else None,
+    )
+    transaction.on_commit(lambda: dispatch_enrichment_job(job.pk))
+    return job
+
+
+def dispatch_enrichment_job(job_id: int):
+    mode = getattr(settings, 'CRM_ENRICHMENT_MODE', 'celery')
+    if mode == 'inline':
+        run_enrichment_job(job_id)
+        return
+    if mode != 'celery':
+        return
+    try:
+        from apps.crm.tasks import run_lead_enrichment_job
+        run_lead_enrichment_job.delay(job_id)
+    except Exception as exc:
+        # Job stays queued; run_lead_enrichment --jobs picks it up.
+        logger.warning("CRM enrichment dispatch failed: %s", exc)
+
+
+def run_enrichment_job(job_id: int):
+    """Run a queued enrichment job. Returns None when it was already claimed."""
+    claimed = LeadEnrichmentJob.objects.filter(pk=job_id, status='queued').update(
+        status='running',
+        started_at=timezone.now(),
+    )
+    if not claimed:
+        return None
+    job = LeadEnrichmentJob.objects.get(pk=job_id)
+
+    def progress(processed, enriched):
+        LeadEnrichmentJob.objects.filter(pk=job.pk).update(processed_count=processed, enriched_count=enriched)
+
+    try:
+        items = LeadStaging.objects.filter(id__in=job.item_ids).order_by('id')
+        enriched = enrich_staging_items(items.iterator(chunk_size=CHUNK_SIZE), progress=progress)
+        job.status = 'completed'
+        job.enriched_count = enriched
+        job.processed_count = job.total_count
+    except Exception as exc:
+        logger.exception("CRM enrichment job %s failed", job_id)
+        job.status = 'failed'
+        job.error_message = str(exc)[:2000]
+        job.refresh_from_db(fields=['processed_count', 'enriched_count'])
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'processed_count', 'enriched_count', 'error_message', 'finished_at'])
+    return job
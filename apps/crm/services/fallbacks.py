@@ -1,8 +1,7 @@
 ﻿from dataclasses import dataclass
 from typing import List
 import requests
-from django.utils import timezone
-from apps.crm.models import LeadSourceProfile, LeadImportJob, LeadStaging
+from apps.crm.models import LeadSourceProfile, LeadImportJob
 from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
 
 
@@ -47,8 +46,8 @@ def _normalize_names(names: List[str], max_count: int) -> List[str]:
     return cleaned
 
 
-def _serpapi_fetch(profile: LeadSourceProfile, max_count: int) -> FallbackResult:
-    settings_obj = _get_settings()
+def _serpapi_fetch(profile: LeadSourceProfile, max_count: int, settings_obj=None) -> FallbackResult:
+    settings_obj = settings_obj or _get_settings()
     api_key = settings_obj.crm_serpapi_key
     if not api_key:
         return _not_configured("SerpAPI")
@@ -83,8 +82,8 @@ def _serpapi_fetch(profile: LeadSourceProfile, max_count: int) -> FallbackResult
         return FallbackResult(names=[], items=[], error=f"SerpAPI error: {exc}")
 
 
-def _dataforseo_fetch(profile: LeadSourceProfile, max_count: int) -> FallbackResult:
-    settings_obj = _get_settings()
+def _dataforseo_fetch(profile: LeadSourceProfile, max_count: int, settings_obj=None) -> FallbackResult:
+    settings_obj = settings_obj or _get_settings()
     login = settings_obj.crm_dataforseo_login
     password = settings_obj.crm_dataforseo_password
     if not (login and password):
@@ -132,8 +131,8 @@ def _dataforseo_fetch(profile: LeadSourceProfile, max_count: int) -> FallbackRes
         return FallbackResult(names=[], items=[], error=f"DataForSEO error: {exc}")
 
 
-def _bing_fetch(profile: LeadSourceProfile, max_count: int) -> FallbackResult:
-    settings_obj = _get_settings()
+def _bing_fetch(profile: LeadSourceProfile, max_count: int, settings_obj=None) -> FallbackResult:
+    settings_obj = settings_obj or _get_settings()
     api_key = settings_obj.crm_bing_api_key
     if not api_key:
         return _not_configured("Bing Search API")
@@ -176,54 +175,25 @@ FALLBACK_PROVIDERS = {
 }
 
 
+def fetch_fallback(key: str, profile: LeadSourceProfile, max_count: int, settings_obj=None) -> List[dict]:
+    """
+    Result items of one fallback provider. Pass ``settings_obj`` when calling
+    from a worker thread so the provider does not touch the database.
+    """
+    provider = FALLBACK_PROVIDERS.get(key)
+    if not provider:
+        raise RuntimeError(f"Unknown provider: {key}")
+    result = provider(profile, max_count, settings_obj)
+    items = result.items or [{"name": name} for name in result.names]
+    if result.error and not items:
+        raise RuntimeError(result.error)
+    return items[:max_count]
+
+
 def run_fallback_import(profile: LeadSourceProfile, max_count: int) -> LeadImportJob:
-    settings_obj = _get_settings()
-    provider_order = settings_obj.crm_fallback_provider_order or []
+    from apps.crm.services.lead_sources import import_from_sources
+
+    provider_order = _get_settings().crm_fallback_provider_order or []
     if not provider_order:
         raise RuntimeError("No fallback providers configured.")
-
-    job = LeadImportJob.objects.create(
-        profile=profile,
-        status="running",
-        requested_count=max_count,
-        started_at=timezone.now(),
-    )
-    imported = 0
-    errors = []
-
-    for key in provider_order:
-        provider = FALLBACK_PROVIDERS.get(key)
-        if not provider:
-            errors.append(f"Unknown provider: {key}")
-            continue
-        result = provider(profile, max_count)
-        if result.error:
-            errors.append(result.error)
-        result_items = result.items or [{"name": name} for name in result.names]
-        if result_items:
-            for item in result_items[:max_count]:
-                company = item.get("name") or ""
-                website = item.get("url") or ""
-                raw_data = {"company_name": company, "fallback_provider": key}
-                if website:
-                    raw_data["website"] = website
-                LeadStaging.objects.create(
-                    profile=profile,
-                    name="",
-                    company=company,
-                    email="",
-                    phone="",
-                    source="SearchFallback",
-                    status="incomplete",
-                    raw_data=raw_data,
-                )
-                imported += 1
-            break
-
-    job.status = "completed" if imported > 0 else "failed"
-    job.imported_count = imported
-    job.skipped_count = 0
-    job.error_message = "; ".join([e for e in errors if e])[:500]
-    job.finished_at = timezone.now()
-    job.save(update_fields=["status", "imported_count", "skipped_count", "error_message", "finished_at"])
-    return job
+    return import_from_sources(profile, provider_order, max_count=max_count)
@@ -1,10 +1,8 @@
 import re
 import html
 import requests
-from datetime import timedelta
 from pathlib import Path
-from django.utils import timezone
-from apps.crm.models import LeadSourceProfile, LeadImportJob, LeadStaging, SourceRequestLog
+from apps.crm.models import LeadSourceProfile
 
 
 SOURCE_KEY = "handelsregister"
@@ -26,27 +24,12 @@ try:
     HAS_BS4 = True
 except Exception:
     HAS_BS4 = False
-RATE_LIMIT_PER_HOUR = 60
 
 
 class RateLimitError(RuntimeError):
     pass
 
 
-def _check_rate_limit(required=1):
-    window_start = timezone.now() - timedelta(hours=1)
-    count = SourceRequestLog.objects.filter(
-        source=SOURCE_KEY,
-        requested_at__gte=window_start,
-    ).count()
-    if count + required > RATE_LIMIT_PER_HOUR:
-        raise RateLimitError("Rate limit reached (60/h).")
-
-
-def _log_request():
-    SourceRequestLog.objects.create(source=SOURCE_KEY)
-
-
 def _parse_results(html_text):
     results = []
     if HAS_BS4:
@@ -459,62 +442,26 @@ def _playwright_fetch_html(profile: LeadSourceProfile):
         browser.close()
         return html
 
+def fetch_companies(profile: LeadSourceProfile, max_count=200):
+    """
+    Company names for ``profile`` from the register search. Network only (no
+    database access), so the import orchestrator can run it in a worker
+    thread; rate limiting is applied by the caller.
+    """
+    html = _http_fetch_html(profile)
+    if not html and HAS_PLAYWRIGHT:
+        html = _playwright_fetch_html(profile)
+    company_names = _parse_results(html)
+    if not company_names:
+        try:
+            Path("logs").mkdir(exist_ok=True)
+            Path("logs/handelsregister_last.html").write_text(html, encoding="utf-8")
+        except Exception:
+            pass
+    return [{"name": name} for name in company_names[:max_count]]
+
+
 def import_profile(profile: LeadSourceProfile, max_count=200):
-    job = LeadImportJob.objects.create(profile=profile, status='running', started_at=timezone.now())
-    imported = 0
-    skipped = 0
-    try:
-        _check_rate_limit()
-        _check_rate_limit(required=1)
-        _log_request()
-        html = _http_fetch_html(profile)
-        if not html and HAS_PLAYWRIGHT:
-            html = _playwright_fetch_html(profile)
-        company_names = _parse_results(html)
-        if not company_names:
-            try:
-                Path("logs").mkdir(exist_ok=True)
-                Path("logs/handelsregister_last.html").write_text(html, encoding="utf-8")
-            except Exception:
-                pass
-            # Save small hint for debugging
-            job.status = 'completed'
-            job.imported_count = 0
-            job.skipped_count = 0
-            job.requested_count = max_count
-            job.error_message = "Keine Treffer geparst. HTML in logs/handelsregister_last.html."
-            job.finished_at = timezone.now()
-            job.save(update_fields=['status', 'imported_count', 'skipped_count', 'requested_count', 'error_message', 'finished_at'])
-            return job
-
-        for name in company_names[:max_count]:
-            LeadStaging.objects.create(
-                profile=profile,
-                name="",
-                company=name,
-                email="",
-                phone="",
-                source="Handelsregister",
-                status="incomplete",
-                raw_data={"company_name": name},
-            )
-            imported += 1
-
-        job.status = 'completed'
-        job.imported_count = imported
-        job.skipped_count = skipped
-        job.requested_count = max_count
-        job.finished_at = timezone.now()
-        job.save(update_fields=['status', 'imported_count', 'skipped_count', 'requested_count', 'finished_at'])
-        profile.last_run_at = timezone.now()
-        profile.save(update_fields=['last_run_at'])
-        return job
-    except RateLimitError as exc:
-        job.status = 'rate_limited'
-        job.error_message = str(exc)
-    except Exception as exc:
-        job.status = 'failed'
-        job.error_message = str(exc)
-    job.finished_at = timezone.now()
-    job.save(update_fields=['status', 'error_message', 'finished_at'])
-    return job
+    from apps.crm.services.lead_sources import import_from_sources
+
+    return import_from_sources(profile, [SOURCE_KEY], max_count=max_count)
@@ -1,38 +1,229 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from datetime import timedelta
+from django.conf import settings
+from django.db.models.functions import Lower
 from django.utils import timezone
-from apps.crm.models import LeadSourceProfile
+from apps.crm.models import LeadSourceProfile, LeadImportJob, LeadStaging, SourceRequestLog
 from apps.crm.services import handelsregister
-from apps.crm.services.fallbacks import run_fallback_import
+from apps.crm.services.fallbacks import fetch_fallback
+from apps.crm.services.rate_limit import get_bucket
 from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
 
 
-SOURCE_HANDLERS = {
-    handelsregister.SOURCE_KEY: handelsregister.import_profile,
+# Primary sources: fetch(profile, max_count) -> [{"name": ..., "url": ...}]
+SOURCE_FETCHERS = {
+    handelsregister.SOURCE_KEY: handelsregister.fetch_companies,
+}
+STAGING_LABELS = {
+    handelsregister.SOURCE_KEY: "Handelsregister",
+}
+FALLBACK_LABEL = "SearchFallback"
+SCHEDULE_INTERVALS = {
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+    'weekly': timedelta(days=7),
 }
 
 
-def run_import_for_profile(profile: LeadSourceProfile):
-    handler = SOURCE_HANDLERS.get(profile.source)
-    if not handler:
+@dataclass
+class SourceResult:
+    source: str
+    items: list = field(default_factory=list)
+    latency_ms: int = 0
+    error: str = ""
+    rate_limited: bool = False
+
+
+def _fetch_source(source: str, profile: LeadSourceProfile, max_count: int, settings_obj) -> SourceResult:
+    """One source fetch under the shared token bucket; never raises."""
+    if not get_bucket(source).try_acquire():
+        return SourceResult(source, error=f"Rate limit reached ({source}).", rate_limited=True)
+    started = time.monotonic()
+    error = ""
+    try:
+        fetcher = SOURCE_FETCHERS.get(source)
+        if fetcher is not None:
+            items = fetcher(profile, max_count)
+        else:
+            items = fetch_fallback(source, profile, max_count, settings_obj)
+    except Exception as exc:
+        items, error = [], str(exc)[:500]
+    return SourceResult(source, items=items, latency_ms=int((time.monotonic() - started) * 1000), error=error)
+
+
+def _fetch_profile(profile: LeadSourceProfile, sources, max_count: int, settings_obj) -> list:
+    """Try ``sources`` in order until one yields results (network only)."""
+    results = []
+    for source in sources:
+        result = _fetch_source(source, profile, max_count, settings_obj)
+        results.append(result)
+        if result.items:
+            break
+    return results
+
+
+def _profile_sources(profile: LeadSourceProfile, settings_obj) -> list:
+    if profile.source not in SOURCE_FETCHERS:
         raise RuntimeError(f"No handler for source: {profile.source}")
-    job = handler(profile, max_count=profile.max_per_run)
-    settings_obj = SystemSettings.get_settings()
-    if settings_obj.crm_fallback_enabled and job.imported_count == 0:
-        return run_fallback_import(profile, max_count=profile.max_per_run)
+    sources = [profile.source]
+    if settings_obj.crm_fallback_enabled:
+        sources += [key for key in settings_obj.crm_fallback_provider_order or [] if key not in sources]
+    return sources
+
+
+def stage_items(profile: LeadSourceProfile, items, source: str, max_count: int):
+    """
+    Insert fetched companies as staging rows with one bulk INSERT, skipping
+    companies already staged for ``profile`` (case-insensitive) and repeats
+    within ``items``. Returns ``(imported, skipped)``.
+    """
+    label = STAGING_LABELS.get(source, FALLBACK_LABEL)
+    candidates = []
+    for item in items[:max_count]:
+        company = str(item.get("name") or "").strip()
+        if company:
+            candidates.append((company, item.get("url") or ""))
+    keys = {company.lower() for company, _url in candidates}
+    seen = set(
+        LeadStaging.objects.filter(profile=profile)
+        .annotate(company_key=Lower('company'))
+        .filter(company_key__in=keys)
+        .values_list('company_key', flat=True)
+    )
+    rows = []
+    for company, url in candidates:
+        if company.lower() in seen:
+            continue
+        seen.add(company.lower())
+        raw_data = {"company_name": company}
+        if source not in SOURCE_FETCHERS:
+            raw_data["fallback_provider"] = source
+        if url:
+            raw_data["website"] = url
+        rows.append(LeadStaging(
+            profile=profile,
+            name="",
+            company=company,
+            email="",
+            phone="",
+            source=label,
+            status="incomplete",
+            raw_data=raw_data,
+        ))
+    LeadStaging.objects.bulk_create(rows, batch_size=500)
+    return len(rows), len(candidates) - len(rows)
+
+
+def _finish_job(job: LeadImportJob, results, max_count: int) -> LeadImportJob:
+    profile = job.profile
+    metrics = {}
+    imported = skipped = fetched = latency = 0
+    for result in results:
+        entry = {
+            "latency_ms": result.latency_ms,
+            "fetched": len(result.items),
+            "imported": 0,
+            "skipped": 0,
+            "error": result.error,
+        }
+        if result.items:
+            entry["imported"], entry["skipped"] = stage_items(profile, result.items, result.source, max_count)
+            job.source = result.source
+        metrics[result.source] = entry
+        imported += entry["imported"]
+        skipped += entry["skipped"]
+        fetched += entry["fetched"]
+        latency += result.latency_ms
+    SourceRequestLog.objects.bulk_create([
+        SourceRequestLog(source=result.source) for result in results if not result.rate_limited
+    ])
+
+    errors = [result.error for result in results if result.error]
+    if fetched:
+        job.status = 'completed'
+    elif results and all(result.rate_limited for result in results):
+        job.status = 'rate_limited'
+    elif errors:
+        job.status = 'failed'
+    else:
+        job.status = 'completed'
+        errors.append("Keine Treffer.")
+    job.imported_count = imported
+    job.skipped_count = skipped
+    job.fetched_count = fetched
+    job.latency_ms = latency
+    job.metrics = metrics
+    job.requested_count = max_count
+    job.error_message = "; ".join(errors)[:500]
+    job.finished_at = timezone.now()
+    job.save(update_fields=[
+        'status', 'source', 'imported_count', 'skipped_count', 'fetched_count', 'latency_ms',
+        'metrics', 'requested_count', 'error_message', 'finished_at',
+    ])
+    if job.status == 'completed':
+        profile.last_run_at = job.finished_at
+        profile.save(update_fields=['last_run_at'])
     return job
 
 
-def run_scheduled_imports():
-    now = timezone.now()
+def _start_job(profile: LeadSourceProfile, max_count: int) -> LeadImportJob:
+    return LeadImportJob.objects.create(
+        profile=profile,
+        status='running',
+        requested_count=max_count,
+        started_at=timezone.now(),
+    )
+
+
+def import_from_sources(profile: LeadSourceProfile, sources, max_count: int = 200) -> LeadImportJob:
+    """Run one profile against ``sources`` (first one with results wins)."""
+    job = _start_job(profile, max_count)
+    settings_obj = SystemSettings.get_settings()
+    return _finish_job(job, _fetch_profile(profile, sources, max_count, settings_obj), max_count)
+
+
+def run_imports(profiles) -> list:
+    """
+    Import many profiles: source fetches run concurrently on a bounded pool
+    (``CRM_IMPORT_WORKERS``) under the shared per-source token buckets, while
+    jobs and staging rows are written from the calling thread.
+    """
+    settings_obj = SystemSettings.get_settings()
+    planned = [(profile, _profile_sources(profile, settings_obj)) for profile in profiles]
+    if not planned:
+        return []
+    jobs = {profile.pk: _start_job(profile, profile.max_per_run) for profile, _sources in planned}
+    workers = max(1, min(getattr(settings, 'CRM_IMPORT_WORKERS', 4), len(planned)))
+    finished = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_fetch_profile, profile, sources, profile.max_per_run, settings_obj): profile
+            for profile, sources in planned
+        }
+        for future in as_completed(futures):
+            profile = futures[future]
+            finished.append(_finish_job(jobs[profile.pk], future.result(), profile.max_per_run))
+    return finished
+
+
+def run_import_for_profile(profile: LeadSourceProfile):
+    return run_imports([profile])[0]
+
+
+def due_profiles(now=None) -> list:
+    now = now or timezone.now()
+    due = []
     profiles = LeadSourceProfile.objects.filter(enabled=True).exclude(schedule='manual')
     for profile in profiles:
-        if profile.last_run_at:
-            delta = now - profile.last_run_at
-        else:
-            delta = None
-        if profile.schedule == 'hourly' and (delta is None or delta >= timedelta(hours=1)):
-            run_import_for_profile(profile)
-        if profile.schedule == 'daily' and (delta is None or delta >= timedelta(days=1)):
-            run_import_for_profile(profile)
-        if profile.schedule == 'weekly' and (delta is None or delta >= timedelta(days=7)):
-            run_import_for_profile(profile)
+        interval = SCHEDULE_INTERVALS.get(profile.schedule)
+        if interval is None:
+            continue
+        if profile.last_run_at is None or now - profile.last_run_at >= interval:
+            due.append(profile)
+    return due
+
+
+def run_scheduled_imports():
+    return run_imports(due_profiles())
@@ -0,0 +1,82 @@
+import base64
+import binascii
+from datetime import datetime
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+
+# Fields searched by the free-text box; on PostgreSQL these are backed by
+# trigram indexes on UPPER(column) so the icontains lookups stay indexed.
+SEARCH_FIELDS = {
+    'lead': ('name', 'company', 'email'),
+    'account': ('name', 'email'),
+    'opportunity': ('name', 'account__name'),
+}
+KEYSET_ORDER = ('-updated_at', '-id')
+
+
+def search(qs, q: str, fields):
+    """Case-insensitive substring match of ``q`` against any of ``fields``."""
+    q = (q or '').strip()
+    if not q:
+        return qs
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__icontains': q})
+    return qs.filter(condition)
+
+
+def encode_cursor(obj) -> str:
+    raw = f'{obj.updated_at.isoformat()}|{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str):
+    """``(updated_at, id)`` of the last row of the previous page, or None if invalid."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+        stamp, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(stamp), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(qs, cursor: str = '', limit: int = 50):
+    """
+    One page of ``qs`` in ``-updated_at, -id`` order starting after ``cursor``.
+    Returns ``(items, next_cursor)``; the cost is independent of page depth.
+    """
+    qs = qs.order_by(*KEYSET_ORDER)
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        updated_at, pk = position
+        qs = qs.filter(Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=pk))
+    items = list(qs[:limit + 1])
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor
+
+
+def board_columns(qs, stages, per_column: int = 20):
+    """
+    Kanban columns for ``stages`` from a single query: each stage's total and
+    its first ``per_column`` opportunities (newest first) via window functions.
+    """
+    order = [F('updated_at').desc(), F('id').desc()]
+    rows = (
+        qs.annotate(
+            stage_position=Window(RowNumber(), partition_by=[F('stage')], order_by=order),
+            stage_total=Window(Count('id'), partition_by=[F('stage')]),
+        )
+        .filter(stage_position__lte=per_column)
+        .order_by('stage', 'stage_position')
+    )
+    columns = {key: {'key': key, 'label': label, 'count': 0, 'items': [], 'next_cursor': None} for key, label in stages}
+    for row in rows:
+        column = columns.get(row.stage)
+        if column is None:
+            continue
+        column['count'] = row.stage_total
+        column['items'].append(row)
+    for column in columns.values():
+        if column['count'] > len(column['items']):
+            column['next_cursor'] = encode_cursor(column['items'][-1])
+    return [columns[key] for key, _label in stages]
@@ -0,0 +1,120 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from django.conf import settings
+from apps.crm.models import Account, Contact, Lead
+
+LEGAL_FORMS = {
+    'gmbh', 'mbh', 'ag', 'kg', 'kgaa', 'ohg', 'gbr', 'ug', 'se', 'ek', 'ev', 'eg',
+    'co', 'cokg', 'haftungsbeschrankt', 'ltd', 'limited', 'inc', 'llc', 'plc', 'sarl', 'bv', 'nv',
+}
+UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+
+
+def normalize_company(name: str) -> str:
+    """Case/umlaut/punctuation-insensitive company key without legal form."""
+    value = (name or '').lower().translate(UMLAUTS)
+    value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii')
+    value = value.replace('&', ' ').replace('+', ' ')
+    tokens = re.sub(r'[^a-z0-9]+', ' ', value.replace('.', '')).split()
+    while tokens and tokens[-1] in LEGAL_FORMS:
+        tokens.pop()
+    return ' '.join(tokens)
+
+
+def normalize_email(email: str) -> str:
+    return (email or '').strip().lower()
+
+
+def normalize_phone(phone: str) -> str:
+    digits = re.sub(r'\D', '', phone or '')
+    if (phone or '').strip().startswith('+'):
+        digits = '00' + digits
+    if digits.startswith('0049'):
+        digits = '0' + digits[4:]
+    return digits
+
+
+class MatchIndex:
+    """
+    Hash indexes over existing accounts, contacts and leads, loaded with a
+    fixed number of queries so a whole staging batch resolves in memory.
+    With ``fuzzy`` enabled, company names that miss the exact key fall back
+    to the closest key sharing the same first token.
+    """
+
+    def __init__(self, fuzzy: bool = None, cutoff: float = None):
+        self.fuzzy = getattr(settings, 'CRM_MATCH_FUZZY', False) if fuzzy is None else fuzzy
+        self.cutoff = cutoff or getattr(settings, 'CRM_MATCH_FUZZY_CUTOFF', 0.9)
+        self.accounts = {}
+        self.contacts_by_account = {}
+        self.leads = {}
+        self.lead_emails = set()
+        self.lead_company_phones = set()
+        self._blocks = {}
+
+    @classmethod
+    def build(cls, fuzzy: bool = None, cutoff: float = None) -> 'MatchIndex':
+        index = cls(fuzzy=fuzzy, cutoff=cutoff)
+        for account in Account.objects.only('id', 'name', 'phone', 'email', 'website').order_by('id'):
+            index.accounts.setdefault(normalize_company(account.name), account)
+        for contact in Contact.objects.only('id', 'account_id', 'first_name', 'last_name', 'email', 'phone').order_by('id'):
+            index.contacts_by_account.setdefault(contact.account_id, contact)
+        for lead in Lead.objects.only('id', 'company', 'email', 'phone').order_by('id'):
+            index.add_lead(lead)
+        if index.fuzzy:
+            for key in set(index.accounts) | set(index.leads):
+                index._block(key)
+        return index
+
+    def _block(self, key: str):
+        if key:
+            self._blocks.setdefault(key.split(' ', 1)[0], set()).add(key)
+
+    def _key(self, company: str, table: dict) -> str:
+        key = normalize_company(company)
+        if not key or key in table or not self.fuzzy:
+            return key
+        best, best_ratio = key, self.cutoff
+        for candidate in self._blocks.get(key.split(' ', 1)[0], ()):
+            if candidate not in table:
+                continue
+            ratio = SequenceMatcher(None, key, candidate).ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = candidate, ratio
+        return best
+
+    def add_lead(self, lead: Lead):
+        key = normalize_company(lead.company)
+        if key:
+            self.leads.setdefault(key, lead)
+            if self.fuzzy:
+                self._block(key)
+        email = normalize_email(lead.email)
+        if email:
+            self.lead_emails.add(email)
+        phone = normalize_phone(lead.phone)
+        if key and phone:
+            self.lead_company_phones.add((key, phone))
+
+    def find_account(self, company: str):
+        return self.accounts.get(self._key(company, self.accounts))
+
+    def find_contact(self, company: str, account=None):
+        account = account or self.find_account(company)
+        if account is None:
+            return None
+        return self.contacts_by_account.get(account.id)
+
+    def find_lead(self, company: str):
+        return self.leads.get(self._key(company, self.leads))
+
+    def lead_exists(self, email: str = '', company: str = '', phone: str = '') -> bool:
+        """True when a lead with the same e-mail, or same company and phone, exists."""
+        email = normalize_email(email)
+        if email and email in self.lead_emails:
+            return True
+        phone = normalize_phone(phone)
+        if not phone:
+            return False
+        return (self._key(company, self.leads), phone) in self.lead_company_phones
@@ -0,0 +1,68 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+CACHE_PREFIX = "crm:bucket:"
+LOCK_SECONDS = 5
+DEFAULT_PER_HOUR = 60
+
+
+class TokenBucket:
+    """
+    Token bucket whose state lives in the Django cache, so every process and
+    worker sharing the cache draws from the same budget. ``capacity`` tokens
+    refill evenly over ``period`` seconds.
+    """
+
+    def __init__(self, key: str, capacity: int, period: float = 3600.0):
+        self.key = key
+        self.capacity = max(1, int(capacity))
+        self.rate = self.capacity / float(period)
+
+    @property
+    def _state_key(self) -> str:
+        return f"{CACHE_PREFIX}{self.key}"
+
+    def _lock(self) -> bool:
+        deadline = time.monotonic() + LOCK_SECONDS
+        while not cache.add(f"{self._state_key}:lock", 1, LOCK_SECONDS):
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _unlock(self):
+        cache.delete(f"{self._state_key}:lock")
+
+    def _refilled(self, state, now: float) -> float:
+        if not state:
+            return float(self.capacity)
+        tokens, updated = state
+        return min(float(self.capacity), tokens + (now - updated) * self.rate)
+
+    def available(self) -> float:
+        return self._refilled(cache.get(self._state_key), time.time())
+
+    def try_acquire(self, tokens: int = 1) -> bool:
+        """Take ``tokens`` if the bucket holds them; never blocks on an empty bucket."""
+        if not self._lock():
+            return False
+        try:
+            now = time.time()
+            current = self._refilled(cache.get(self._state_key), now)
+            if current < tokens:
+                return False
+            # Keep the state around at least as long as a full refill takes.
+            cache.set(self._state_key, (current - tokens, now), int(self.capacity / self.rate) + 60)
+            return True
+        finally:
+            self._unlock()
+
+    def reset(self):
+        cache.delete(self._state_key)
+
+
+def get_bucket(source: str) -> TokenBucket:
+    """Shared bucket for one lead source (``CRM_SOURCE_RATE_LIMITS``, requests per hour)."""
+    limits = getattr(settings, 'CRM_SOURCE_RATE_LIMITS', {}) or {}
+    return TokenBucket(source, limits.get(source, DEFAULT_PER_HOUR))
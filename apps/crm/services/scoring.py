@@ -1,8 +1,16 @@
 import re
 import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from django.utils import timezone
 from django.conf import settings
-from apps.core.services.bedrock import BedrockService
+from django.core.cache import cache
+from apps.core.services.ai_gateway import gateway
+from apps.crm.models import Lead
+
+SCORE_FIELDS = ['rule_score', 'ai_score', 'score', 'score_reason', 'score_updated_at', 'score_hash']
+AI_CACHE_PREFIX = "crm:ai_score:"
+BATCH_SIZE = 500
 
 
 def _bedrock_enabled() -> bool:
@@ -77,48 +85,173 @@ def _parse_score_json(text):
     return None, reason
 
 
-def calculate_ai_score(lead):
-    if not _bedrock_enabled():
-        return None, "Bedrock deaktiviert"
+def _lead_prompt_fields(lead) -> dict:
+    return {
+        "name": lead.name or "",
+        "company": lead.company or "",
+        "status": lead.status or "",
+        "source": lead.source or "",
+        "email": lead.email or "",
+        "phone": lead.phone or "",
+    }
+
+
+def lead_content_hash(lead) -> str:
+    """Hash of everything the AI prompt sees; unchanged hash means unchanged AI score."""
+    payload = json.dumps(_lead_prompt_fields(lead), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _batch_prompt(leads) -> str:
+    items = [{"id": index, **_lead_prompt_fields(lead)} for index, lead in enumerate(leads)]
+    return (
+        "Bewerte für jeden Lead den Lead-Qualitaets-Score von 0 bis 100 mit einer kurzen Begründung.\n"
+        "Gib ausschließlich ein JSON-Array zurück: "
+        "[{\"id\": <id>, \"score\": 0-100, \"reason\": \"...\"}, ...]\n"
+        f"Leads:\n{json.dumps(items, ensure_ascii=False)}\n"
+    )
+
+
+def _parse_batch_response(text, count: int) -> dict:
+    """Map prompt index -> (score, reason) for every well-formed item of the answer."""
+    match = re.search(r"\[.*\]", text or "", re.S)
+    if not match:
+        return {}
     try:
-        prompt = (
-            "Bewerte den Lead-Qualitaets-Score von 0 bis 100 und gib eine kurze Begründung.\n"
-            "Gib JSON zurück: {\"score\": 0-100, \"reason\": \"...\"}\n"
-            f"Name: {lead.name}\n"
-            f"Firma: {lead.company}\n"
-            f"Status: {lead.status}\n"
-            f"Quelle: {lead.source}\n"
-            f"E-Mail: {lead.email}\n"
-            f"Telefon: {lead.phone}\n"
-        )
-        client = BedrockService()
-        response = client.converse(prompt)
-        score, reason = _parse_score_json(response)
-        if score is None:
-            score = _parse_score(response)
-        if score is None:
-            return None, "AI-Antwort unklar"
-        return score, (reason or "AI-Score berechnet")
-    except Exception as exc:
-        return None, f"AI Fehler: {exc}"
-
-
-def update_lead_score(lead, use_ai=True):
-    rule_score, reasons = calculate_rule_score(lead)
-    ai_score = 0
+        data = json.loads(match.group(0))
+    except Exception:
+        return {}
+    results = {}
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict):
+            continue
+        index, score = item.get("id"), item.get("score")
+        if isinstance(index, int) and 0 <= index < count and isinstance(score, (int, float)):
+            results[index] = (_clamp(int(score)), item.get("reason") or "AI-Score berechnet")
+    return results
+
+
+def calculate_ai_scores(leads, converse=None, use_cache: bool = True) -> dict:
+    """
+    AI scores for many leads: cached answers are looked up by content hash,
+    the rest is sent ``CRM_AI_SCORE_BATCH_SIZE`` leads per prompt with at most
+    ``CRM_AI_SCORE_CONCURRENCY`` prompts in flight. Returns
+    ``{content_hash: (score or None, reason)}``.
+    """
+    by_hash = {}
+    for lead in leads:
+        by_hash.setdefault(lead_content_hash(lead), lead)
+    if not by_hash:
+        return {}
+
+    results = {}
+    if use_cache:
+        cached = cache.get_many([AI_CACHE_PREFIX + key for key in by_hash])
+        for key in by_hash:
+            value = cached.get(AI_CACHE_PREFIX + key)
+            if value is not None:
+                results[key] = tuple(value)
+    pending = [key for key in by_hash if key not in results]
+    if not pending:
+        return results
+
+    if converse is None:
+        if not _bedrock_enabled():
+            results.update({key: (None, "Bedrock deaktiviert") for key in pending})
+            return results
+        converse = gateway.converse
+
+    batch_size = max(1, getattr(settings, 'CRM_AI_SCORE_BATCH_SIZE', 10))
+    batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+
+    def score_batch(keys):
+        try:
+            response = converse(_batch_prompt([by_hash[key] for key in keys]))
+        except Exception as exc:
+            return {key: (None, f"AI Fehler: {exc}") for key in keys}
+        parsed = _parse_batch_response(response, len(keys))
+        return {key: parsed.get(index, (None, "AI-Antwort unklar")) for index, key in enumerate(keys)}
+
+    workers = max(1, min(getattr(settings, 'CRM_AI_SCORE_CONCURRENCY', 4), len(batches)))
+    if workers == 1:
+        answers = [score_batch(keys) for keys in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            answers = list(executor.map(score_batch, batches))
+
+    fresh = {}
+    for answer in answers:
+        for key, value in answer.items():
+            results[key] = value
+            if value[0] is not None:
+                fresh[AI_CACHE_PREFIX + key] = value
+    if fresh:
+        cache.set_many(fresh, getattr(settings, 'CRM_AI_SCORE_CACHE_SECONDS', 7 * 24 * 3600))
+    return results
+
+
+def _join_reasons(*parts) -> str:
+    return "; ".join(part for part in parts if part)
+
+
+def score_leads(leads, use_ai=True, force_ai=False, converse=None) -> int:
+    """
+    Score many leads at once: rule scores in one pass, AI scores only for
+    leads whose content hash changed since the last AI score (all of them
+    with ``force_ai``), and a single bulk_update for the result.
+    Leads whose AI call failed keep no hash so the next run retries them.
+    """
+    leads = list(leads)
+    if not leads:
+        return 0
+
+    hashes = {lead.pk: lead_content_hash(lead) for lead in leads}
+    ai_results = {}
     if use_ai:
-        ai_value, ai_reason = calculate_ai_score(lead)
-        if ai_value is not None:
-            ai_score = ai_value
-            reasons = f"{reasons}; {ai_reason}" if reasons else ai_reason
-        else:
-            reasons = f"{reasons}; {ai_reason}" if reasons else ai_reason
-
-    total = _clamp(int(round((rule_score * 0.7) + (ai_score * 0.3))))
-    lead.rule_score = rule_score
-    lead.ai_score = ai_score
-    lead.score = total
-    lead.score_reason = reasons
-    lead.score_updated_at = timezone.now()
-    lead.save(update_fields=['rule_score', 'ai_score', 'score', 'score_reason', 'score_updated_at'])
+        stale = [lead for lead in leads if force_ai or lead.score_hash != hashes[lead.pk]]
+        ai_results = calculate_ai_scores(stale, converse=converse, use_cache=not force_ai)
+
+    now = timezone.now()
+    for lead in leads:
+        rule_score, reasons = calculate_rule_score(lead)
+        ai_score = 0
+        content_hash = ''
+        if use_ai:
+            content_hash = hashes[lead.pk]
+            if content_hash in ai_results:
+                ai_value, ai_reason = ai_results[content_hash]
+                if ai_value is None:
+                    content_hash = ''
+                else:
+                    ai_score = ai_value
+            else:
+                ai_score, ai_reason = lead.ai_score, "AI-Score unverändert"
+            reasons = _join_reasons(reasons, ai_reason)
+
+        lead.rule_score = rule_score
+        lead.ai_score = ai_score
+        lead.score = _clamp(int(round((rule_score * 0.7) + (ai_score * 0.3))))
+        lead.score_reason = reasons
+        lead.score_updated_at = now
+        lead.score_hash = content_hash
+
+    Lead.objects.bulk_update(leads, SCORE_FIELDS, batch_size=BATCH_SIZE)
+    return len(leads)
+
+
+def score_all_leads(queryset=None, use_ai=True, force_ai=False, batch_size: int = BATCH_SIZE) -> int:
+    """Re-score every lead of ``queryset`` (default: all) in keyset-ordered batches."""
+    qs = queryset if queryset is not None else Lead.objects.all()
+    count = 0
+    last_id = 0
+    while True:
+        batch = list(qs.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            return count
+        count += score_leads(batch, use_ai=use_ai, force_ai=force_ai)
+        last_id = batch[-1].id
+
+
+def update_lead_score(lead, use_ai=True, force_ai=False):
+    score_leads([lead], use_ai=use_ai, force_ai=force_ai)
     return lead
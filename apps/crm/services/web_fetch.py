@@ -0,0 +1,130 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+HEADERS = {
+    "User-Agent": "ABoroOfficeCRM/1.0 (+https://example.invalid)",
+    "Accept": "text/html,application/xhtml+xml",
+}
+MAX_PAGE_CHARS = 1_000_000
+CACHE_PREFIX = "crm:page:"
+# Failed fetches are remembered briefly so a batch does not retry a dead host per lead.
+FAILURE_TTL_SECONDS = 15 * 60
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class FetchError(Exception):
+    pass
+
+
+def get_session() -> requests.Session:
+    """Process-wide session so keep-alive connections are reused across leads."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = getattr(settings, 'CRM_ENRICHMENT_POOL_SIZE', 20)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(HEADERS)
+                _session = session
+    return _session
+
+
+class DomainLimiter:
+    """
+    Politeness limits per host: at most ``max_concurrent`` requests in flight
+    and at least ``min_interval`` seconds between request starts.
+    """
+
+    def __init__(self, max_concurrent: int = 2, min_interval: float = 0.5):
+        self.max_concurrent = max(1, max_concurrent)
+        self.min_interval = max(0.0, min_interval)
+        self._lock = threading.Lock()
+        self._semaphores = defaultdict(lambda: threading.BoundedSemaphore(self.max_concurrent))
+        self._next_start = defaultdict(float)
+
+    def acquire(self, host: str):
+        with self._lock:
+            semaphore = self._semaphores[host]
+        semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start[host])
+            self._next_start[host] = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def release(self, host: str):
+        with self._lock:
+            semaphore = self._semaphores[host]
+        semaphore.release()
+
+
+_limiter = None
+
+
+def get_limiter() -> DomainLimiter:
+    global _limiter
+    if _limiter is None:
+        with _session_lock:
+            if _limiter is None:
+                _limiter = DomainLimiter(
+                    max_concurrent=getattr(settings, 'CRM_ENRICHMENT_PER_DOMAIN', 2),
+                    min_interval=getattr(settings, 'CRM_ENRICHMENT_DOMAIN_DELAY', 0.5),
+                )
+    return _limiter
+
+
+def _cache_key(url: str) -> str:
+    return CACHE_PREFIX + hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def fetch_page(url: str) -> str:
+    """
+    Fetch ``url`` through the shared session, honouring per-domain limits.
+    Pages (and failures) are cached by URL; raises FetchError on failure.
+    """
+    key = _cache_key(url)
+    cached = cache.get(key)
+    if cached is not None:
+        if cached.get("error"):
+            raise FetchError(cached["error"])
+        return cached["text"]
+
+    host = (urlparse(url).hostname or "").lower()
+    limiter = get_limiter()
+    limiter.acquire(host)
+    try:
+        response = get_session().get(url, timeout=getattr(settings, 'CRM_ENRICHMENT_TIMEOUT', 10))
+        response.raise_for_status()
+        text = response.text[:MAX_PAGE_CHARS]
+    except requests.RequestException as exc:
+        cache.set(key, {"error": str(exc)[:500]}, FAILURE_TTL_SECONDS)
+        raise FetchError(str(exc)) from exc
+    finally:
+        limiter.release(host)
+
+    cache.set(key, {"text": text}, getattr(settings, 'CRM_ENRICHMENT_CACHE_SECONDS', 24 * 3600))
+    return text
+
+
+def reset():
+    """Drop the shared session and limiter (tests, settings changes)."""
+    global _session, _limiter
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _limiter = None
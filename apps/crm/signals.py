@@ -2,11 +2,12 @@ from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
 from apps.crm.models import Lead, Opportunity
 from apps.workflows.services import run_workflows_for_trigger
+from apps.workflows.trigger_index import has_trigger
 
 
 @receiver(pre_save, sender=Lead)
 def _crm_store_lead_status(sender, instance, **kwargs):
-    if not instance.pk:
+    if not instance.pk or not has_trigger('crm_lead_status'):
         return
     old = Lead.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
     instance._old_status = old
@@ -27,7 +28,7 @@ def _crm_lead_saved(sender, instance, created, **kwargs):
 
 @receiver(pre_save, sender=Opportunity)
 def _crm_store_opp_stage(sender, instance, **kwargs):
-    if not instance.pk:
+    if not instance.pk or not has_trigger('crm_opportunity_stage'):
         return
     old = Opportunity.objects.filter(pk=instance.pk).values_list('stage', flat=True).first()
     instance._old_stage = old
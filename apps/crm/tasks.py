@@ -0,0 +1,27 @@
+"""
+Celery tasks for the CRM app
+Runs website enrichment jobs queued from the lead staging area and bulk lead scoring
+"""
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from apps.crm.services.enrichment import run_enrichment_job
+from apps.crm.services.scoring import score_all_leads
+
+logger = get_task_logger(__name__)
+
+
+@shared_task(ignore_result=True)
+def run_lead_enrichment_job(job_id):
+    """Enrich the staging rows of one queued job (no-op when already claimed)."""
+    job = run_enrichment_job(job_id)
+    if job is not None:
+        logger.info(f"CRM enrichment job {job.pk} {job.status}: {job.enriched_count}/{job.total_count} enriched")
+
+
+@shared_task(ignore_result=True)
+def score_crm_leads(use_ai=True, force_ai=False):
+    """Re-score all leads; AI is only asked about leads whose content changed."""
+    count = score_all_leads(use_ai=use_ai, force_ai=force_ai)
+    logger.info(f"CRM lead scoring done: {count} leads")
@@ -1,6 +1,14 @@
 from django.urls import path, include
 from .views import (
     CrmHomeView,
+    api_enrichment_job,
+    api_leads,
+    api_lead_detail,
+    api_accounts,
+    api_account_detail,
+    api_opportunities,
+    api_opportunity_detail,
+    api_opportunity_board,
     AccountListView,
     AccountDetailView,
     AccountCreateView,
@@ -67,7 +75,15 @@ urlpatterns = [
     path('staging/<int:pk>/import/', LeadStagingImportView.as_view(), name='lead_staging_import'),
     path('staging/<int:pk>/quick-update/', LeadStagingQuickUpdateView.as_view(), name='lead_staging_quick_update'),
     path('staging/bulk-import/', LeadStagingBulkImportView.as_view(), name='lead_staging_bulk_import'),
+    path('staging/enrichment/<int:pk>/', api_enrichment_job, name='lead_enrichment_job'),
     path('help/', CrmHelpView.as_view(), name='help'),
+    path('json/leads/', api_leads, name='json_leads'),
+    path('json/leads/<int:pk>/', api_lead_detail, name='json_lead_detail'),
+    path('json/accounts/', api_accounts, name='json_accounts'),
+    path('json/accounts/<int:pk>/', api_account_detail, name='json_account_detail'),
+    path('json/opportunities/', api_opportunities, name='json_opportunities'),
+    path('json/opportunities/<int:pk>/', api_opportunity_detail, name='json_opportunity_detail'),
+    path('json/opportunities/board/', api_opportunity_board, name='json_opportunity_board'),
     path('api/', include('apps.crm.api.urls', namespace='crm_api')),
 ]
 
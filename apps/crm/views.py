@@ -1,10 +1,13 @@
+from datetime import timedelta
 from django.views.generic import TemplateView, ListView, DetailView, CreateView, UpdateView
 from django.contrib import messages
-from django.shortcuts import redirect
+from django.shortcuts import redirect, get_object_or_404
 from django.urls import reverse
 from django.core.mail import send_mail
 from django.template import Template, Context
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.http import JsonResponse
@@ -19,6 +22,7 @@ from .models import (
     EmailLog,
     LeadSourceProfile,
     LeadStaging,
+    LeadEnrichmentJob,
 )
 from .forms import (
     AccountForm,
@@ -33,13 +37,16 @@ from .forms import (
 )
 from .permissions import CrmViewMixin, CrmEditMixin, can_edit_crm, can_view_crm
 from .services.ai import CrmAIService
+from apps.core.services.ai_jobs import active_jobs, submit_job
 from .services.scoring import update_lead_score
 from .services.lead_sources import run_import_for_profile
 from .services.enrichment import enrich_lead_from_website
-from .services.enrichment import enrich_queryset
+from .services.enrichment import create_enrichment_job
+from .services.matching import MatchIndex
+from .services.listing import SEARCH_FIELDS, board_columns, keyset_page, search
 
 
-def _normalize_staging_address(item: LeadStaging) -> str:
+def _normalize_staging_address(item: LeadStaging, save: bool = True) -> str:
     raw = item.raw_data if isinstance(item.raw_data, dict) else {}
     if raw.get('address'):
         return raw.get('address')
@@ -52,7 +59,8 @@ def _normalize_staging_address(item: LeadStaging) -> str:
     if address:
         raw['address'] = address
         item.raw_data = raw
-        item.save(update_fields=['raw_data'])
+        if save:
+            item.save(update_fields=['raw_data'])
     return address
 
 
@@ -86,7 +94,7 @@ class AccountListView(CrmViewMixin, ListView):
         status = self.request.GET.get('status', '').strip()
         sort = self.request.GET.get('sort', '-updated_at').strip()
         if q:
-            qs = qs.filter(name__icontains=q)
+            qs = search(qs, q, SEARCH_FIELDS['account'])
         if status:
             qs = qs.filter(status=status)
         allowed_sorts = {'name', '-name', 'updated_at', '-updated_at'}
@@ -173,7 +181,7 @@ class LeadListView(CrmViewMixin, ListView):
         status = self.request.GET.get('status', '').strip()
         sort = self.request.GET.get('sort', '-updated_at').strip()
         if q:
-            qs = qs.filter(name__icontains=q)
+            qs = search(qs, q, SEARCH_FIELDS['lead'])
         if status:
             qs = qs.filter(status=status)
         allowed_sorts = {'name', '-name', 'updated_at', '-updated_at', 'score', '-score'}
@@ -204,56 +212,14 @@ class LeadDetailView(CrmViewMixin, DetailView):
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
         action = request.POST.get('action')
-        if action == 'ai_summary':
-            try:
-                ai = CrmAIService()
-                self.object.ai_status = 'running'
+        if action in ('ai_summary', 'ai_followup'):
+            kind = 'crm.lead_summary' if action == 'ai_summary' else 'crm.lead_followup'
+            submit_job(kind, {'lead_id': self.object.pk}, user=request.user)
+            if self.object.ai_status != 'running':
+                self.object.ai_status = 'queued'
                 self.object.ai_error = ''
                 self.object.save(update_fields=['ai_status', 'ai_error'])
-                data = ai.summarize_lead_with_next_steps(self.object, recent_notes=self.object.notes.all()[:5])
-                summary = data.get('summary', '')
-                next_steps = data.get('next_steps', [])
-                if isinstance(next_steps, list):
-                    next_steps_text = "\n".join([str(item) for item in next_steps if item])
-                else:
-                    next_steps_text = str(next_steps or '')
-                self.object.ai_summary = summary
-                self.object.ai_next_steps = next_steps_text
-                self.object.ai_last_analyzed = timezone.now()
-                self.object.ai_status = 'done'
-                self.object.save(update_fields=[
-                    'ai_summary',
-                    'ai_next_steps',
-                    'ai_last_analyzed',
-                    'ai_status',
-                ])
-            except Exception as exc:
-                self.object.ai_status = 'error'
-                self.object.ai_error = str(exc)
-                self.object.save(update_fields=['ai_status', 'ai_error'])
-                messages.error(request, _("AI Fehler: %(error)s") % {"error": exc})
-        elif action == 'ai_followup':
-            try:
-                ai = CrmAIService()
-                self.object.ai_status = 'running'
-                self.object.ai_error = ''
-                self.object.save(update_fields=['ai_status', 'ai_error'])
-                data = ai.draft_lead_followup_email(self.object, recent_notes=self.object.notes.all()[:5])
-                self.object.ai_followup_subject = data.get('subject', '')
-                self.object.ai_followup_body = data.get('body', '')
-                self.object.ai_last_analyzed = timezone.now()
-                self.object.ai_status = 'done'
-                self.object.save(update_fields=[
-                    'ai_followup_subject',
-                    'ai_followup_body',
-                    'ai_last_analyzed',
-                    'ai_status',
-                ])
-            except Exception as exc:
-                self.object.ai_status = 'error'
-                self.object.ai_error = str(exc)
-                self.object.save(update_fields=['ai_status', 'ai_error'])
-                messages.error(request, _("AI Fehler: %(error)s") % {"error": exc})
+            messages.info(request, _("KI-Auftrag gestartet. Das Ergebnis erscheint hier, sobald es fertig ist."))
         elif action == 'ai_qa':
             question = request.POST.get('question', '').strip()
             if not question:
@@ -320,7 +286,7 @@ class LeadDetailView(CrmViewMixin, DetailView):
                 messages.error(request, _("Aktivität ist ungültig."))
         elif action == 'recalc_score':
             if can_edit_crm(request.user):
-                update_lead_score(self.object, use_ai=True)
+                update_lead_score(self.object, use_ai=True, force_ai=True)
                 messages.success(request, _("Lead-Score wurde aktualisiert."))
             else:
                 messages.error(request, _("Keine Berechtigung."))
@@ -379,6 +345,10 @@ class LeadDetailView(CrmViewMixin, DetailView):
         context['activities'] = self.object.activities.all().order_by('-created_at')[:20]
         context['email_form'] = EmailSendForm(initial={'to_email': self.object.email})
         context['email_logs'] = self.object.email_logs.all().order_by('-sent_at')[:10]
+        context['ai_jobs'] = active_jobs(
+            ('crm.lead_summary', {'lead_id': self.object.pk}),
+            ('crm.lead_followup', {'lead_id': self.object.pk}),
+        )
         return context
 
 
@@ -394,7 +364,7 @@ class OpportunityListView(CrmViewMixin, ListView):
         stage = self.request.GET.get('stage', '').strip()
         sort = self.request.GET.get('sort', '-updated_at').strip()
         if q:
-            qs = qs.filter(name__icontains=q)
+            qs = search(qs, q, SEARCH_FIELDS['opportunity'])
         if stage:
             qs = qs.filter(stage=stage)
         allowed_sorts = {'name', '-name', 'updated_at', '-updated_at', 'amount', '-amount'}
@@ -483,21 +453,22 @@ class OpportunityDetailView(CrmViewMixin, DetailView):
         return context
 
 
+BOARD_PAGE_SIZE = 20
+
+
+def _board_queryset(q: str = ''):
+    qs = Opportunity.objects.select_related('account')
+    return search(qs, q, SEARCH_FIELDS['opportunity'])
+
+
 class OpportunityBoardView(CrmViewMixin, TemplateView):
     template_name = 'crm/opportunity_board.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        stages = Opportunity.STAGE_CHOICES
-        board = []
-        for stage_key, stage_label in stages:
-            items = Opportunity.objects.filter(stage=stage_key).order_by('-updated_at')
-            board.append({
-                'key': stage_key,
-                'label': stage_label,
-                'items': items,
-            })
-        context['board'] = board
+        q = self.request.GET.get('q', '').strip()
+        context['board'] = board_columns(_board_queryset(q), Opportunity.STAGE_CHOICES, BOARD_PAGE_SIZE)
+        context['q'] = q
         context['can_edit'] = can_edit_crm(self.request.user)
         return context
 
@@ -775,9 +746,25 @@ class LeadStagingListView(CrmEditMixin, ListView):
         context['can_edit'] = True
         context['selected_status'] = self.request.GET.get('status', '').strip()
         context['selected_no_website'] = self.request.GET.get('no_website', '').strip()
+        context['enrichment_job'] = LeadEnrichmentJob.objects.filter(
+            Q(status__in=['queued', 'running']) | Q(finished_at__gte=timezone.now() - timedelta(minutes=10))
+        ).first()
         return context
 
 
+@login_required
+@user_passes_test(can_edit_crm)
+def api_enrichment_job(request, pk: int):
+    job = get_object_or_404(LeadEnrichmentJob, pk=pk)
+    return JsonResponse({
+        "status": job.status,
+        "progress": job.progress,
+        "processed": job.processed_count,
+        "enriched": job.enriched_count,
+        "total": job.total_count,
+    })
+
+
 class LeadStagingNeedsWebsiteView(CrmEditMixin, ListView):
     model = LeadStaging
     template_name = 'crm/lead_staging_needs_website.html'
@@ -874,13 +861,21 @@ class LeadStagingBulkImportView(CrmEditMixin, TemplateView):
             return redirect('crm:lead_staging')
 
         if action == 'enrich':
-            items = list(LeadStaging.objects.filter(id__in=ids))
-            with_site = [item for item in items if _get_staging_website(item)]
-            without_site = [item for item in items if not _get_staging_website(item)]
-            count = enrich_queryset(with_site)
+            items = LeadStaging.objects.filter(id__in=ids).only('id', 'raw_data')
+            with_site = []
+            without_site = []
+            for item in items:
+                (with_site if _get_staging_website(item) else without_site).append(item.id)
             if without_site:
-                LeadStaging.objects.filter(id__in=[i.id for i in without_site]).update(status='needs_website')
-            messages.success(request, _("Auto-Enrichment abgeschlossen. Bearbeitet: %(count)s.") % {"count": count})
+                LeadStaging.objects.filter(id__in=without_site).update(status='needs_website')
+            if with_site:
+                create_enrichment_job(with_site, request.user)
+                messages.success(
+                    request,
+                    _("Auto-Enrichment für %(count)s Einträge gestartet. Der Fortschritt wird oben angezeigt.") % {"count": len(with_site)},
+                )
+            else:
+                messages.info(request, _("Keine Einträge mit Website ausgewählt."))
             return redirect('crm:lead_staging')
 
         if action == 'mark_needs_website':
@@ -890,40 +885,42 @@ class LeadStagingBulkImportView(CrmEditMixin, TemplateView):
 
         imported = 0
         skipped = 0
-        for item in LeadStaging.objects.filter(id__in=ids):
+        index = MatchIndex.build()
+        items = list(LeadStaging.objects.filter(id__in=ids))
+        new_leads = []
+        for item in items:
             if item.status == 'imported':
                 skipped += 1
                 continue
             if not (item.name and item.company and item.email and item.phone and item.lead_source and item.lead_status):
                 item.status = 'skipped'
-                item.save(update_fields=['status'])
                 skipped += 1
                 continue
-            if Lead.objects.filter(email__iexact=item.email).exists():
+            if index.lead_exists(item.email, item.company, item.phone):
                 item.status = 'skipped'
-                item.save(update_fields=['status'])
                 skipped += 1
                 continue
-            if Lead.objects.filter(company__iexact=item.company, phone=item.phone).exists():
-                item.status = 'skipped'
-                item.save(update_fields=['status'])
-                skipped += 1
-                continue
-            Lead.objects.create(
+            lead = Lead(
                 name=item.name,
                 company=item.company,
                 email=item.email,
                 phone=item.phone,
                 website=_get_staging_website(item),
-                address=_normalize_staging_address(item),
+                address=_normalize_staging_address(item, save=False),
                 source=item.lead_source,
                 status=item.lead_status,
                 owner=request.user,
             )
+            # Later rows of the same batch are checked against this lead too.
+            index.add_lead(lead)
+            new_leads.append(lead)
             item.status = 'imported'
-            item.save(update_fields=['status'])
             imported += 1
 
+        with transaction.atomic():
+            Lead.objects.bulk_create(new_leads)
+            LeadStaging.objects.bulk_update(items, ['status', 'raw_data'])
+
         messages.success(request, _("Bulk-Import abgeschlossen. Importiert: %(imported)s, Übersprungen: %(skipped)s.") % {"imported": imported, "skipped": skipped})
         return redirect('crm:lead_staging')
 
@@ -997,45 +994,61 @@ def _serialize_opportunity(opportunity: Opportunity) -> dict:
         "amount": float(opportunity.amount) if opportunity.amount is not None else 0,
         "close_date": opportunity.close_date.isoformat() if opportunity.close_date else None,
         "account_id": opportunity.account_id,
+        "account_name": opportunity.account.name if opportunity.account_id else "",
         "owner_id": opportunity.owner_id,
         "updated_at": opportunity.updated_at.isoformat() if opportunity.updated_at else None,
         "created_at": opportunity.created_at.isoformat() if opportunity.created_at else None,
     }
 
 
-def _paginate(qs, request):
-    try:
-        limit = int(request.GET.get("limit", 50))
-    except ValueError:
-        limit = 50
+def _int_param(request, name: str, default: int) -> int:
     try:
-        offset = int(request.GET.get("offset", 0))
+        return int(request.GET.get(name, default))
     except ValueError:
-        offset = 0
-    limit = max(1, min(limit, 200))
-    offset = max(0, offset)
+        return default
+
+
+def _paginate(qs, request):
+    limit = max(1, min(_int_param(request, "limit", 50), 200))
+    offset = max(0, _int_param(request, "offset", 0))
     total = qs.count()
     items = qs[offset:offset + limit]
     return total, limit, offset, items
 
 
+def _list_response(qs, request, serialize):
+    """
+    Keyset-paginated list: pass ``cursor`` from ``next_cursor`` to continue.
+    ``count`` is only computed for the first page. Requests with an explicit
+    ``offset`` keep the old offset/limit paging.
+    """
+    if "offset" in request.GET:
+        total, limit, offset, items = _paginate(qs.order_by('-updated_at', '-id'), request)
+        return JsonResponse({
+            "count": total,
+            "limit": limit,
+            "offset": offset,
+            "results": [serialize(item) for item in items],
+        })
+    limit = max(1, min(_int_param(request, "limit", 50), 200))
+    cursor = request.GET.get("cursor", "").strip()
+    items, next_cursor = keyset_page(qs, cursor, limit)
+    payload = {"limit": limit, "next_cursor": next_cursor, "results": [serialize(item) for item in items]}
+    if not cursor:
+        payload["count"] = qs.count()
+        payload["offset"] = 0
+    return JsonResponse(payload)
+
+
 @login_required
 @user_passes_test(can_view_crm)
 def api_leads(request):
-    qs = Lead.objects.all().order_by('-updated_at')
+    qs = Lead.objects.all()
     status = request.GET.get("status", "").strip()
-    q = request.GET.get("q", "").strip()
     if status:
         qs = qs.filter(status=status)
-    if q:
-        qs = qs.filter(name__icontains=q)
-    total, limit, offset, items = _paginate(qs, request)
-    return JsonResponse({
-        "count": total,
-        "limit": limit,
-        "offset": offset,
-        "results": [_serialize_lead(item) for item in items],
-    })
+    qs = search(qs, request.GET.get("q", ""), SEARCH_FIELDS['lead'])
+    return _list_response(qs, request, _serialize_lead)
 
 
 @login_required
@@ -1050,20 +1063,12 @@ def api_lead_detail(request, pk: int):
 @login_required
 @user_passes_test(can_view_crm)
 def api_accounts(request):
-    qs = Account.objects.all().order_by('-updated_at')
+    qs = Account.objects.all()
     status = request.GET.get("status", "").strip()
-    q = request.GET.get("q", "").strip()
     if status:
         qs = qs.filter(status=status)
-    if q:
-        qs = qs.filter(name__icontains=q)
-    total, limit, offset, items = _paginate(qs, request)
-    return JsonResponse({
-        "count": total,
-        "limit": limit,
-        "offset": offset,
-        "results": [_serialize_account(item) for item in items],
-    })
+    qs = search(qs, request.GET.get("q", ""), SEARCH_FIELDS['account'])
+    return _list_response(qs, request, _serialize_account)
 
 
 @login_required
@@ -1078,19 +1083,31 @@ def api_account_detail(request, pk: int):
 @login_required
 @user_passes_test(can_view_crm)
 def api_opportunities(request):
-    qs = Opportunity.objects.select_related('account').all().order_by('-updated_at')
+    qs = Opportunity.objects.select_related('account')
     stage = request.GET.get("stage", "").strip()
-    q = request.GET.get("q", "").strip()
     if stage:
         qs = qs.filter(stage=stage)
-    if q:
-        qs = qs.filter(name__icontains=q)
-    total, limit, offset, items = _paginate(qs, request)
+    qs = search(qs, request.GET.get("q", ""), SEARCH_FIELDS['opportunity'])
+    return _list_response(qs, request, _serialize_opportunity)
+
+
+@login_required
+@user_passes_test(can_view_crm)
+def api_opportunity_board(request):
+    """Per-stage counts and the first cards of every column in one query."""
+    per_column = max(1, min(_int_param(request, "limit", BOARD_PAGE_SIZE), 100))
+    columns = board_columns(_board_queryset(request.GET.get("q", "")), Opportunity.STAGE_CHOICES, per_column)
     return JsonResponse({
-        "count": total,
-        "limit": limit,
-        "offset": offset,
-        "results": [_serialize_opportunity(item) for item in items],
+        "columns": [
+            {
+                "stage": column['key'],
+                "label": column['label'],
+                "count": column['count'],
+                "next_cursor": column['next_cursor'],
+                "results": [_serialize_opportunity(item) for item in column['items']],
+            }
+            for column in columns
+        ],
     })
 
 
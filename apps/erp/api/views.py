@@ -40,13 +40,22 @@ from .serializers import (
     EnrollmentSerializer,
 )
 from .permissions import ErpReadWritePermission
+from apps.core.eager_loading import EagerLoadingMixin
+from apps.core.pagination import PageOrCursorPagination
 from apps.erp.services.pricing import apply_pricing
-from apps.erp.services.competitor import get_provider
+from apps.erp.services.competitor import fetch_price_cached, get_provider
 
 
-class BaseErpViewSet(viewsets.ModelViewSet):
+class ErpPagination(PageOrCursorPagination):
+    """Lists stay unpaginated unless the client sends ``page_size`` or ``cursor``."""
+    page_size = None
+    max_page_size = 500
+
+
+class BaseErpViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, ErpReadWritePermission]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = ErpPagination
     ordering = ['-id']
 
 
@@ -119,7 +128,7 @@ class StockReceiptItemViewSet(BaseErpViewSet):
                 provider = get_provider()
                 if provider:
                     try:
-                        fetched = provider.fetch_price(item.product)
+                        fetched = fetch_price_cached(provider, item.product)
                     except Exception:
                         fetched = None
                     if fetched is not None:
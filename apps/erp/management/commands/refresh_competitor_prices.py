@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from apps.erp.services.competitor_refresh import refresh_competitor_prices
+
+
+class Command(BaseCommand):
+    help = 'Refresh competitor prices for stale products.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Refresh every product and bypass the price cache.')
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        result = refresh_competitor_prices(batch_size=options['batch_size'], force=options['force'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Competitor prices: {result['checked']} checked, {result['changed']} changed, "
+            f"{result['cached']} from cache, {result['rate_limited']} rate limited"
+        ))
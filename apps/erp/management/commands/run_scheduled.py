@@ -5,6 +5,7 @@ from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
 from apps.erp.models import Invoice
 from apps.erp.services.dunning_auto import run_dunning_cycle
 from apps.erp.services.invoice_mail import send_invoice_email
+from apps.erp.services.outbox import drain_events
 from apps.helpdesk.helpdesk_apps.admin_panel.models import EmailLog
 
 
@@ -49,6 +50,9 @@ class Command(BaseCommand):
             cutoff = now - timedelta(days=int(settings_obj.email_log_auto_archive_days))
             EmailLog.objects.filter(archived=False, created_at__lt=cutoff).update(archived=True)
 
+        outbox = drain_events()
+        self.stdout.write(self.style.SUCCESS(f"ERP outbox done: {outbox}"))
+
         result = run_dunning_cycle()
         self.stdout.write(self.style.SUCCESS(f"Dunning cycle done: {result}"))
 
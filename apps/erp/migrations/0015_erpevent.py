@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0014_alter_course_options_remove_course_instructor_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ErpEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('created', 'Erstellt'), ('updated', 'Aktualisiert'), ('deleted', 'Gelöscht')], default='updated', max_length=20)),
+                ('old_status', models.CharField(blank=True, max_length=20)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Offen'), ('processing', 'In Bearbeitung'), ('done', 'Erledigt'), ('failed', 'Fehlgeschlagen')], default='pending', max_length=20)),
+                ('claim_token', models.CharField(blank=True, max_length=32)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='erp_erpeven_status_33fda4_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('model_name', 'object_id'), name='erp_event_one_pending_per_object')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0015_erpevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='competitor_fetch_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='competitor_price_checked_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
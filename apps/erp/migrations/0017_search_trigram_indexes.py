@@ -0,0 +1,58 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:28
+
+from django.db import migrations, transaction
+
+# One index per API search field (BaseErpViewSet subclasses' search_fields).
+TRIGRAM_INDEXES = [
+    ('erp_customer_name_trgm', 'erp_customer', 'name'),
+    ('erp_customer_email_trgm', 'erp_customer', 'email'),
+    ('erp_customer_phone_trgm', 'erp_customer', 'phone'),
+    ('erp_product_name_trgm', 'erp_product', 'name'),
+    ('erp_product_sku_trgm', 'erp_product', 'sku'),
+    ('erp_service_name_trgm', 'erp_service', 'name'),
+    ('erp_productcat_name_trgm', 'erp_productcategory', 'name'),
+    ('erp_workorder_title_trgm', 'erp_workorder', 'title'),
+    ('erp_workorder_desc_trgm', 'erp_workorder', 'description'),
+    ('erp_invoice_number_trgm', 'erp_invoice', 'number'),
+    ('erp_quote_number_trgm', 'erp_quote', 'number'),
+    ('erp_orderconf_number_trgm', 'erp_orderconfirmation', 'number'),
+    ('erp_dunning_number_trgm', 'erp_dunningnotice', 'number'),
+    ('erp_stockreceipt_supplier_trgm', 'erp_stockreceipt', 'supplier_name'),
+    ('erp_course_title_trgm', 'erp_course', 'title'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # SearchFilter uses icontains, i.e. UPPER(col::text) LIKE UPPER(%s) on
+    # PostgreSQL; GIN trigram indexes on the same expression keep it indexed.
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except Exception:
+        # No privilege to install the extension: searching still works, unindexed.
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _table, _column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0016_competitor_refresh'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
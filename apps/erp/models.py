@@ -41,6 +41,8 @@ class Product(models.Model):
     suggested_price_net = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     suggested_price_gross = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     price_last_calculated = models.DateTimeField(null=True, blank=True)
+    competitor_price_checked_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    competitor_fetch_ms = models.PositiveIntegerField(null=True, blank=True)
     description = models.TextField(blank=True)
     marketing_campaign = models.ForeignKey(
         'marketing.Campaign',
@@ -514,3 +516,48 @@ class Enrollment(models.Model):
 
     def __str__(self):
         return f"{self.course.title} - {self.customer}"
+
+
+class ErpEvent(models.Model):
+    """Transactional outbox row for ERP side effects (audit, e-mails, workflows)."""
+
+    ACTION_CHOICES = [
+        ('created', 'Erstellt'),
+        ('updated', 'Aktualisiert'),
+        ('deleted', 'Gelöscht'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Offen'),
+        ('processing', 'In Bearbeitung'),
+        ('done', 'Erledigt'),
+        ('failed', 'Fehlgeschlagen'),
+    ]
+
+    model_name = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES, default='updated')
+    old_status = models.CharField(max_length=20, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    claim_token = models.CharField(max_length=32, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['model_name', 'object_id'],
+                condition=models.Q(status='pending'),
+                name='erp_event_one_pending_per_object',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.model_name}#{self.object_id} {self.action} ({self.status})"
@@ -1,38 +1,112 @@
 from decimal import Decimal
+import hashlib
 import re
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
 import requests
 from bs4 import BeautifulSoup
+from django.conf import settings
 from django.core.cache import cache
 from django.utils import timezone
+from requests.adapters import HTTPAdapter
 from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
 
+try:
+    import lxml.html
+    HAS_LXML = True
+except Exception:
+    HAS_LXML = False
+
+PRICE_CACHE_PREFIX = "erp:competitor:"
+GEIZHALS_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/122.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "de-DE,de;q=0.9,en;q=0.8",
+    "Referer": "https://geizhals.de/",
+}
+
+_session = None
+_lock = threading.Lock()
+_host_slots = {}
+
+
+class PriceRateLimited(Exception):
+    pass
+
+
+def get_session() -> requests.Session:
+    """Process-wide session so price lookups reuse keep-alive connections."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                pool_size = getattr(settings, 'ERP_COMPETITOR_POOL_SIZE', 10)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    host = (urlparse(url).hostname or "").lower()
+    with _lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(max(1, getattr(settings, 'ERP_COMPETITOR_PER_HOST', 2)))
+        return _host_slots[host]
+
+
+def _get(url: str, **kwargs) -> requests.Response:
+    """GET through the shared session with at most ERP_COMPETITOR_PER_HOST requests per host."""
+    with _host_slot(url):
+        return get_session().get(url, timeout=getattr(settings, 'ERP_COMPETITOR_TIMEOUT', 10), **kwargs)
+
+
+def reset():
+    """Drop the shared session and host limits (tests, settings changes)."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _host_slots.clear()
+
 
 class CompetitorPriceProvider:
+    key = ""
+
     def fetch_price(self, product) -> Decimal | None:
         raise NotImplementedError
 
+    def lookup(self, product) -> Decimal | None:
+        """Like fetch_price, but raises PriceRateLimited instead of returning None when throttled."""
+        return self.fetch_price(product)
+
 
 class GeizhalsProvider(CompetitorPriceProvider):
+    key = "geizhals"
+
     def fetch_price(self, product) -> Decimal | None:
-        if not _rate_limit_ok():
+        try:
+            return self.lookup(product)
+        except PriceRateLimited:
             return None
+
+    def lookup(self, product) -> Decimal | None:
         query = _build_query(product)
         if not query:
             return None
+        if not _rate_limit_ok():
+            raise PriceRateLimited("Geizhals: 60 Abrufe pro Stunde erreicht")
         url = f"https://geizhals.de/?fs={requests.utils.quote(query)}"
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/122.0.0.0 Safari/537.36"
-            ),
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "de-DE,de;q=0.9,en;q=0.8",
-            "Referer": "https://geizhals.de/",
-            "Connection": "keep-alive",
-        }
         try:
-            response = requests.get(url, headers=headers, timeout=25)
+            response = _get(url, headers=GEIZHALS_HEADERS)
             response.raise_for_status()
             price, source = _extract_price_from_html(response.text)
             _store_last_debug(query, url, price, source, response.text)
@@ -43,6 +117,8 @@ class GeizhalsProvider(CompetitorPriceProvider):
 
 
 class ApiProvider(CompetitorPriceProvider):
+    key = "api"
+
     def __init__(self, url: str, api_key: str):
         self.url = url
         self.api_key = api_key
@@ -59,7 +135,7 @@ class ApiProvider(CompetitorPriceProvider):
         if self.api_key:
             headers['Authorization'] = f'Bearer {self.api_key}'
         try:
-            response = requests.get(self.url, params=params, headers=headers, timeout=20)
+            response = _get(self.url, params=params, headers=headers)
             response.raise_for_status()
             data = response.json()
             value = data.get('price_net') or data.get('price')
@@ -98,7 +174,37 @@ def _build_query(product) -> str:
     return " ".join([p for p in parts if p]).strip()
 
 
-def _extract_price_from_html(html: str) -> tuple[Decimal | None, str]:
+PRICE_NODES_XPATH = (
+    '//*[contains(@data-qa, "price")]'
+    ' | //*[contains(concat(" ", normalize-space(@class), " "), " price ")]'
+    ' | //*[contains(concat(" ", normalize-space(@class), " "), " gh_price ")]'
+    ' | //*[contains(concat(" ", normalize-space(@class), " "), " gh_price_entry ")]'
+)
+
+
+def _node_text(node) -> str:
+    return " ".join(part.strip() for part in node.itertext() if part and part.strip())
+
+
+def _extract_price_lxml(html: str) -> tuple[Decimal | None, str]:
+    try:
+        doc = lxml.html.fromstring(html)
+    except Exception:
+        return None, "not_found"
+    for content in doc.xpath('//meta[@itemprop="price"]/@content'):
+        try:
+            return Decimal(str(content).replace(",", ".")), "meta[itemprop=price]"
+        except Exception:
+            pass
+    candidates = [text for text in (_node_text(node) for node in doc.xpath(PRICE_NODES_XPATH)) if text]
+    text = " ".join(candidates) if candidates else _node_text(doc)
+    prices = _extract_prices_from_text(text)
+    if prices:
+        return min(prices), "css/regex"
+    return None, "not_found"
+
+
+def _extract_price_bs4(html: str) -> tuple[Decimal | None, str]:
     soup = BeautifulSoup(html, "html.parser")
     meta_price = soup.find("meta", {"itemprop": "price"})
     if meta_price and meta_price.get("content"):
@@ -119,6 +225,14 @@ def _extract_price_from_html(html: str) -> tuple[Decimal | None, str]:
     return None, "not_found"
 
 
+def _extract_price_from_html(html: str) -> tuple[Decimal | None, str]:
+    if not (html or "").strip():
+        return None, "not_found"
+    if HAS_LXML:
+        return _extract_price_lxml(html)
+    return _extract_price_bs4(html)
+
+
 def _extract_prices_from_text(text: str) -> list[Decimal]:
     prices = []
     for match in re.findall(r"(\d{1,3}(?:\.\d{3})*,\d{2})\s*€", text):
@@ -161,3 +275,34 @@ def get_provider():
     if provider == 'api':
         return ApiProvider(settings_obj.erp_competitor_api_url, settings_obj.erp_competitor_api_key)
     return None
+
+
+def _price_cache_key(provider, product) -> str:
+    identity = (product.sku or product.name or "").strip().lower()
+    return PRICE_CACHE_PREFIX + hashlib.sha1(f"{provider.key}:{identity}".encode("utf-8")).hexdigest()
+
+
+def lookup_price_cached(provider, product, use_cache: bool = True) -> tuple[Decimal | None, bool]:
+    """
+    Competitor price for ``product`` with a per-SKU cache: ``(price, cached)``.
+    Found prices live ERP_COMPETITOR_CACHE_SECONDS, misses ERP_COMPETITOR_MISS_SECONDS.
+    Raises PriceRateLimited when the provider is throttled (not cached).
+    """
+    key = _price_cache_key(provider, product)
+    if use_cache:
+        hit = cache.get(key)
+        if hit is not None:
+            return (Decimal(hit["price"]) if hit["price"] else None), True
+    price = provider.lookup(product)
+    if price is None:
+        cache.set(key, {"price": ""}, getattr(settings, 'ERP_COMPETITOR_MISS_SECONDS', 3600))
+    else:
+        cache.set(key, {"price": str(price)}, getattr(settings, 'ERP_COMPETITOR_CACHE_SECONDS', 24 * 3600))
+    return price, False
+
+
+def fetch_price_cached(provider, product) -> Decimal | None:
+    try:
+        return lookup_price_cached(provider, product)[0]
+    except PriceRateLimited:
+        return None
@@ -0,0 +1,137 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import Avg, F, Q
+from django.utils import timezone
+from apps.erp.models import Product
+from apps.erp.services.competitor import PriceRateLimited, get_provider, lookup_price_cached
+from apps.erp.services.pricing import calculate_suggested_prices
+from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
+
+REFRESH_FIELDS = [
+    'competitor_price_net',
+    'competitor_price_checked_at',
+    'competitor_fetch_ms',
+    'suggested_price_net',
+    'suggested_price_gross',
+    'price_last_calculated',
+]
+
+
+def _max_age() -> timedelta:
+    return timedelta(hours=getattr(settings, 'ERP_COMPETITOR_MAX_AGE_HOURS', 24))
+
+
+def stale_products(now=None):
+    """Products whose competitor price was never checked or is older than ERP_COMPETITOR_MAX_AGE_HOURS."""
+    cutoff = (now or timezone.now()) - _max_age()
+    return Product.objects.filter(
+        Q(competitor_price_checked_at__isnull=True) | Q(competitor_price_checked_at__lt=cutoff)
+    )
+
+
+def _lookup(provider, product, use_cache: bool):
+    """``(status, price, latency_ms)`` for one product; runs in a worker thread."""
+    started = time.monotonic()
+    try:
+        price, cached = lookup_price_cached(provider, product, use_cache=use_cache)
+    except PriceRateLimited:
+        return 'rate_limited', None, None
+    except Exception:
+        return 'missing', None, int((time.monotonic() - started) * 1000)
+    latency = None if cached else int((time.monotonic() - started) * 1000)
+    return ('found' if price is not None else 'missing'), price, latency
+
+
+def refresh_competitor_prices(queryset=None, batch_size: int = None, force: bool = False) -> dict:
+    """
+    Refresh competitor prices for stale products (all of ``queryset`` with
+    ``force``) in id-ordered batches. Lookups of a batch run concurrently
+    (ERP_COMPETITOR_WORKERS) through the pooled session and per-SKU cache;
+    changed prices and the resulting suggested prices are written with one
+    bulk_update per batch. Stops early once the provider is rate limited.
+    """
+    result = {'checked': 0, 'changed': 0, 'missing': 0, 'cached': 0, 'rate_limited': 0}
+    provider = get_provider()
+    if provider is None:
+        return result
+    settings_obj = SystemSettings.get_settings()
+    batch_size = batch_size or getattr(settings, 'ERP_COMPETITOR_BATCH_SIZE', 100)
+    qs = queryset if queryset is not None else Product.objects.all()
+    if not force:
+        qs = qs.filter(pk__in=stale_products().values('pk'))
+    workers = max(1, getattr(settings, 'ERP_COMPETITOR_WORKERS', 4))
+
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(qs.filter(id__gt=last_id).order_by('id')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            outcomes = list(executor.map(lambda product: _lookup(provider, product, not force), batch))
+            now = timezone.now()
+            updated = []
+            for product, (status, price, latency) in zip(batch, outcomes):
+                if status == 'rate_limited':
+                    result['rate_limited'] += 1
+                    continue
+                result['checked'] += 1
+                product.competitor_price_checked_at = now
+                if latency is None:
+                    result['cached'] += 1
+                else:
+                    product.competitor_fetch_ms = latency
+                if status == 'missing':
+                    result['missing'] += 1
+                elif price != product.competitor_price_net:
+                    product.competitor_price_net = price
+                    net, gross = calculate_suggested_prices(
+                        Decimal(str(product.cost_net)),
+                        price,
+                        Decimal(str(product.vat_rate or Decimal('19.00'))),
+                        settings_obj,
+                    )
+                    product.suggested_price_net = net
+                    product.suggested_price_gross = gross
+                    product.price_last_calculated = now
+                    result['changed'] += 1
+                updated.append(product)
+            Product.objects.bulk_update(updated, REFRESH_FIELDS)
+            if result['rate_limited']:
+                break
+    return result
+
+
+def _percentile(values, pct: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def competitor_price_report(limit: int = 50) -> dict:
+    """Coverage, staleness and fetch latency of competitor prices across the catalog."""
+    now = timezone.now()
+    total = Product.objects.count()
+    covered = Product.objects.filter(competitor_price_net__isnull=False).count()
+    stale = stale_products(now)
+    latencies = list(
+        Product.objects.filter(competitor_fetch_ms__isnull=False).values_list('competitor_fetch_ms', flat=True)
+    )
+    return {
+        'total': total,
+        'covered': covered,
+        'coverage_pct': round(covered * 100 / total) if total else 0,
+        'stale': stale.count(),
+        'never_checked': Product.objects.filter(competitor_price_checked_at__isnull=True).count(),
+        'max_age_hours': int(_max_age().total_seconds() // 3600),
+        'avg_fetch_ms': Product.objects.aggregate(value=Avg('competitor_fetch_ms'))['value'],
+        'p95_fetch_ms': _percentile(latencies, 95),
+        'stale_products': list(
+            stale.order_by(F('competitor_price_checked_at').asc(nulls_first=True), 'id')
+            .only('id', 'name', 'sku', 'competitor_price_net', 'competitor_price_checked_at', 'competitor_fetch_ms')[:limit]
+        ),
+    }
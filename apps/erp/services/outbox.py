@@ -0,0 +1,275 @@
+import logging
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.core.services.audit import audit_snapshot
+from apps.helpdesk.helpdesk_apps.admin_panel.models import AuditLog, SystemSettings
+from apps.erp.models import ErpEvent, Quote, SalesOrder, Invoice, OrderConfirmation, DunningNotice
+from apps.erp.services.invoice_mail import send_invoice_email
+from apps.workflows.services import run_workflows_for_action, run_workflows_for_trigger
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_MODELS = {model.__name__: model for model in (Quote, SalesOrder, Invoice, OrderConfirmation, DunningNotice)}
+RELATED_FIELDS = {
+    'Invoice': ('order__customer',),
+    'DunningNotice': ('invoice__order__customer',),
+}
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(minutes=1)
+STALE_AFTER = timedelta(minutes=10)
+
+_state = threading.local()
+
+
+# ---------------------------------------------------------------------------
+# Write side (called from signals inside the caller's transaction)
+# ---------------------------------------------------------------------------
+
+def record_event(instance, action: str, old_status: str = '') -> bool:
+    """
+    Write the outbox row for ``instance`` or coalesce into its pending row.
+
+    Several saves of the same object before the worker runs end up in one
+    event; the first ``old_status`` of the burst is kept. Returns True when
+    a new row was inserted.
+    """
+    model_name = instance.__class__.__name__
+    now = timezone.now()
+    values = {'updated_at': now}
+    if action == 'deleted':
+        values.update(action='deleted', payload=audit_snapshot(instance))
+
+    pending = ErpEvent.objects.filter(model_name=model_name, object_id=instance.pk, status='pending')
+    if pending.update(**values):
+        return False
+    try:
+        with transaction.atomic():
+            ErpEvent.objects.create(
+                model_name=model_name,
+                object_id=instance.pk,
+                action=action,
+                old_status=old_status or '',
+                payload=values.get('payload', {}),
+                updated_at=now,
+            )
+    except IntegrityError:
+        # A concurrent writer inserted the pending row first.
+        pending.update(**values)
+        return False
+    transaction.on_commit(dispatch_worker)
+    return True
+
+
+def dispatch_worker():
+    mode = getattr(settings, 'ERP_OUTBOX_DISPATCH', 'celery')
+    if mode == 'inline':
+        if getattr(_state, 'processing', False):
+            return
+        drain_events()
+        return
+    if mode != 'celery':
+        return
+    try:
+        from apps.erp.tasks import process_erp_events
+        process_erp_events.delay()
+    except Exception as exc:
+        # Events stay queued and are picked up by the periodic run.
+        logger.warning("ERP outbox dispatch failed: %s", exc)
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def _claimable(now):
+    return (
+        Q(status='pending')
+        | Q(status='failed', attempts__lt=MAX_ATTEMPTS, updated_at__lt=now - RETRY_DELAY)
+        | Q(status='processing', updated_at__lt=now - STALE_AFTER)
+    )
+
+
+def claim_events(limit: int = 200) -> list[ErpEvent]:
+    now = timezone.now()
+    ids = list(
+        ErpEvent.objects.filter(_claimable(now)).order_by('id').values_list('id', flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    ErpEvent.objects.filter(_claimable(now), id__in=ids).update(
+        status='processing',
+        claim_token=token,
+        attempts=F('attempts') + 1,
+        updated_at=now,
+    )
+    return list(ErpEvent.objects.filter(claim_token=token, status='processing').order_by('id'))
+
+
+def _load_objects(events) -> dict:
+    wanted = {}
+    for event in events:
+        if event.action != 'deleted':
+            wanted.setdefault(event.model_name, set()).add(event.object_id)
+    objects = {}
+    for model_name, ids in wanted.items():
+        model = OUTBOX_MODELS.get(model_name)
+        if model is None:
+            continue
+        qs = model.objects.select_related(*RELATED_FIELDS.get(model_name, ()))
+        for pk, obj in qs.in_bulk(ids).items():
+            objects[(model_name, pk)] = obj
+    return objects
+
+
+def _ensure_invoice(order: SalesOrder, settings_obj) -> Invoice | None:
+    with transaction.atomic():
+        SalesOrder.objects.select_for_update().filter(pk=order.pk).exists()
+        if order.invoices.exists():
+            return None
+        today = timezone.now().date()
+        return Invoice.objects.create(
+            order=order,
+            status='issued',
+            issue_date=today,
+            due_date=today + timedelta(days=settings_obj.invoice_payment_days),
+            tax_rate=order.tax_rate,
+            net_amount=order.net_amount,
+            tax_amount=order.tax_amount,
+            total_amount=order.total_amount,
+        )
+
+
+def _run_workflows(func, *args, **kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception as exc:
+        logger.warning("ERP workflow dispatch failed: %s", exc)
+
+
+def _handle_invoice(event, invoice: Invoice, settings_obj):
+    if invoice.status != 'issued':
+        return
+    if invoice.email_sent_at is None and send_invoice_email(invoice):
+        Invoice.objects.filter(pk=invoice.pk, email_sent_at__isnull=True).update(email_sent_at=timezone.now())
+    if event.action == 'created' or event.old_status != 'issued':
+        _run_workflows(
+            run_workflows_for_action,
+            'erp_invoice_email',
+            context={'invoice_id': invoice.id},
+            trigger='invoice_issued',
+        )
+
+
+def _handle_sales_order(event, order: SalesOrder, settings_obj):
+    if order.status in ('confirmed', 'invoiced'):
+        _ensure_invoice(order, settings_obj)
+    if event.old_status and event.old_status != order.status:
+        _run_workflows(
+            run_workflows_for_trigger,
+            'erp_order_status',
+            context={'order_id': order.id, 'status': order.status},
+        )
+
+
+def _handle_dunning(event, notice: DunningNotice, settings_obj):
+    if event.action == 'created':
+        _run_workflows(
+            run_workflows_for_action,
+            'erp_dunning_email',
+            context={'dunning_id': notice.id},
+            trigger='dunning_created',
+        )
+
+
+HANDLERS = {
+    'Invoice': _handle_invoice,
+    'SalesOrder': _handle_sales_order,
+    'DunningNotice': _handle_dunning,
+}
+
+
+def _audit_row(event, instance) -> AuditLog:
+    if instance is not None and event.action != 'deleted':
+        values = audit_snapshot(instance)
+    else:
+        values = event.payload or {}
+    return AuditLog(
+        action=event.action,
+        user=None,
+        content_type=f"erp.{event.model_name}",
+        object_id=event.object_id,
+        description=f"{event.action} {event.model_name}",
+        old_values={},
+        new_values=values,
+    )
+
+
+def process_events(limit: int = 200) -> dict:
+    """Claim one batch of outbox events and run their side effects."""
+    events = claim_events(limit)
+    if not events:
+        return {'processed': 0, 'failed': 0}
+
+    objects = _load_objects(events)
+    settings_obj = SystemSettings.get_settings()
+    audit_rows = []
+    done_ids = []
+    failed = 0
+    for event in events:
+        instance = objects.get((event.model_name, event.object_id))
+        handler = HANDLERS.get(event.model_name)
+        try:
+            if handler and instance is not None and event.action != 'deleted':
+                handler(event, instance, settings_obj)
+        except Exception as exc:
+            logger.exception("ERP outbox event %s failed", event.pk)
+            failed += 1
+            ErpEvent.objects.filter(pk=event.pk).update(
+                status='failed',
+                last_error=str(exc)[:2000],
+                updated_at=timezone.now(),
+            )
+            continue
+        audit_rows.append(_audit_row(event, instance))
+        done_ids.append(event.pk)
+
+    if audit_rows:
+        AuditLog.objects.bulk_create(audit_rows)
+    now = timezone.now()
+    ErpEvent.objects.filter(pk__in=done_ids).update(
+        status='done',
+        last_error='',
+        processed_at=now,
+        updated_at=now,
+    )
+    return {'processed': len(done_ids), 'failed': failed}
+
+
+def drain_events(batch_size: int = 200, max_batches: int = 20) -> dict:
+    """Process batches until the outbox is empty or ``max_batches`` is reached."""
+    totals = {'processed': 0, 'failed': 0}
+    _state.processing = True
+    try:
+        for _ in range(max_batches):
+            result = process_events(batch_size)
+            totals['processed'] += result['processed']
+            totals['failed'] += result['failed']
+            if not result['processed'] and not result['failed']:
+                break
+    finally:
+        _state.processing = False
+    return totals
+
+
+def purge_processed_events(days: int = 14) -> int:
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = ErpEvent.objects.filter(status='done', processed_at__lt=cutoff).delete()
+    return deleted
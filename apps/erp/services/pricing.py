@@ -11,8 +11,8 @@ def _round_005(value: Decimal) -> Decimal:
     return (value * Decimal('20')).quantize(Decimal('1')) / Decimal('20')
 
 
-def calculate_suggested_prices(cost_net: Decimal, competitor_net: Decimal | None, vat_rate: Decimal) -> tuple[Decimal, Decimal]:
-    settings_obj = _get_settings()
+def calculate_suggested_prices(cost_net: Decimal, competitor_net: Decimal | None, vat_rate: Decimal, settings_obj=None) -> tuple[Decimal, Decimal]:
+    settings_obj = settings_obj or _get_settings()
     min_margin = Decimal(str(getattr(settings_obj, 'erp_min_margin_pct', 20)))
     undercut_min = Decimal(str(getattr(settings_obj, 'erp_undercut_min_pct', 3)))
     undercut_max = Decimal(str(getattr(settings_obj, 'erp_undercut_max_pct', 10)))
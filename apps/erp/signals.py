@@ -1,31 +1,21 @@
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.models.signals import post_save, post_delete, post_init
 from django.dispatch import receiver
-from django.forms.models import model_to_dict
-from apps.helpdesk.helpdesk_apps.admin_panel.models import AuditLog, SystemSettings
 from apps.erp.models import Quote, SalesOrder, Invoice, OrderConfirmation, DunningNotice
-from apps.erp.services.invoice_mail import send_invoice_email
-from django.utils import timezone
-from apps.workflows.services import run_workflows_for_action, run_workflows_for_trigger
+from apps.erp.services.outbox import record_event
 
 
-@receiver(pre_save, sender=SalesOrder)
-def _erp_store_old_status(sender, instance, **kwargs):
-    if not instance.pk:
-        return
-    old = SalesOrder.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
-    instance._old_status = old
+# Side effects (audit log, invoice e-mails, workflows, auto invoicing) run in
+# the outbox worker, see apps.erp.services.outbox. Saves only write the event.
 
 
-def _log(action, instance, old_values=None):
-    AuditLog.objects.create(
-        action=action,
-        user=None,
-        content_type=f"erp.{instance.__class__.__name__}",
-        object_id=instance.pk,
-        description=f"{action} {instance.__class__.__name__}",
-        old_values=old_values or {},
-        new_values=model_to_dict(instance),
-    )
+@receiver(post_init, sender=Quote)
+@receiver(post_init, sender=SalesOrder)
+@receiver(post_init, sender=Invoice)
+@receiver(post_init, sender=OrderConfirmation)
+@receiver(post_init, sender=DunningNotice)
+def _erp_remember_status(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred status field does not cost a query.
+    instance._loaded_status = instance.__dict__.get('status')
 
 
 @receiver(post_save, sender=Quote)
@@ -33,55 +23,15 @@ def _log(action, instance, old_values=None):
 @receiver(post_save, sender=Invoice)
 @receiver(post_save, sender=OrderConfirmation)
 @receiver(post_save, sender=DunningNotice)
-def erp_saved(sender, instance, created, **kwargs):
-    _log('created' if created else 'updated', instance)
-    if isinstance(instance, Invoice) and instance.status == 'issued':
-        if instance.email_sent_at is None:
-            if send_invoice_email(instance):
-                instance.email_sent_at = timezone.now()
-                instance.save(update_fields=['email_sent_at'])
-        try:
-            run_workflows_for_action('erp_invoice_email', context={'invoice_id': instance.id}, trigger='invoice_issued')
-        except Exception:
-            pass
-
-    if isinstance(instance, SalesOrder):
-        if instance.status in ('confirmed', 'invoiced') and not instance.invoices.exists():
-            settings_obj = SystemSettings.get_settings()
-            invoice = Invoice.objects.create(
-                order=instance,
-                status='issued',
-                issue_date=timezone.now().date(),
-                due_date=timezone.now().date() + timezone.timedelta(days=settings_obj.invoice_payment_days),
-                tax_rate=instance.tax_rate,
-                net_amount=instance.net_amount,
-                tax_amount=instance.tax_amount,
-                total_amount=instance.total_amount,
-            )
-            try:
-                if settings_obj.invoice_auto_send:
-                    if send_invoice_email(invoice):
-                        invoice.email_sent_at = timezone.now()
-                        invoice.save(update_fields=['email_sent_at'])
-            except Exception:
-                pass
-        if hasattr(instance, '_old_status') and instance._old_status != instance.status:
-            try:
-                run_workflows_for_trigger('erp_order_status', context={'order_id': instance.id, 'status': instance.status})
-            except Exception:
-                pass
-
-    if isinstance(instance, DunningNotice) and created:
-        try:
-            run_workflows_for_action('erp_dunning_email', context={'dunning_id': instance.id}, trigger='dunning_created')
-        except Exception:
-            pass
-
-
-@receiver(post_save, sender=SalesOrder)
-def _erp_clear_old_status(sender, instance, **kwargs):
-    if hasattr(instance, '_old_status'):
-        delattr(instance, '_old_status')
+def erp_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        old_status = instance.status
+    else:
+        old_status = getattr(instance, '_loaded_status', None) or ''
+    record_event(instance, 'created' if created else 'updated', old_status=old_status)
+    instance._loaded_status = instance.status
 
 
 @receiver(post_delete, sender=Quote)
@@ -90,4 +40,4 @@ def _erp_clear_old_status(sender, instance, **kwargs):
 @receiver(post_delete, sender=OrderConfirmation)
 @receiver(post_delete, sender=DunningNotice)
 def erp_deleted(sender, instance, **kwargs):
-    _log('deleted', instance)
+    record_event(instance, 'deleted')
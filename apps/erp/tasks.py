@@ -0,0 +1,45 @@
+"""
+Celery tasks for the ERP app
+Processes the transactional outbox written by apps.erp.signals and refreshes
+competitor prices
+"""
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from apps.erp.services.competitor_refresh import refresh_competitor_prices
+from apps.erp.services.outbox import drain_events, purge_processed_events
+
+logger = get_task_logger(__name__)
+
+
+@shared_task(ignore_result=True)
+def process_erp_events(batch_size=200, max_batches=20):
+    """
+    Run side effects for pending ERP outbox events.
+
+    Safe to run concurrently: batches are claimed with a token, handlers are idempotent.
+    """
+    result = drain_events(batch_size=batch_size, max_batches=max_batches)
+    if result['processed'] or result['failed']:
+        logger.info(f"ERP outbox processed={result['processed']} failed={result['failed']}")
+    return result
+
+
+@shared_task(ignore_result=True)
+def purge_erp_events(days=14):
+    """Delete processed outbox events older than ``days``."""
+    deleted = purge_processed_events(days=days)
+    logger.info(f"ERP outbox purged {deleted} events")
+    return deleted
+
+
+@shared_task(ignore_result=True)
+def refresh_erp_competitor_prices():
+    """Refresh stale competitor prices (bounded by the provider's hourly limit)."""
+    result = refresh_competitor_prices()
+    logger.info(
+        f"ERP competitor prices checked={result['checked']} changed={result['changed']} "
+        f"cached={result['cached']} rate_limited={result['rate_limited']}"
+    )
+    return result
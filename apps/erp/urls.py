@@ -33,6 +33,7 @@ from .views import (
     StockReceiptCreateView,
     StockReceiptDetailView,
     CompetitorDebugView,
+    CompetitorReportView,
     CourseListView,
     CourseDetailView,
     CourseCreateView,
@@ -83,6 +84,7 @@ urlpatterns = [
     path('stock/receipts/create/', StockReceiptCreateView.as_view(), name='stockreceipt_create'),
     path('stock/receipts/<int:pk>/', StockReceiptDetailView.as_view(), name='stockreceipt_detail'),
     path('competitor-debug/', CompetitorDebugView.as_view(), name='competitor_debug'),
+    path('competitor-report/', CompetitorReportView.as_view(), name='competitor_report'),
     path('courses/', CourseListView.as_view(), name='courses'),
     path('courses/create/', CourseCreateView.as_view(), name='course_create'),
     path('courses/<int:pk>/', CourseDetailView.as_view(), name='course_detail'),
@@ -47,7 +47,8 @@ from .services.dunning_auto import run_dunning_cycle
 from .services.invoice_mail import build_invoice_letter, send_invoice_email
 from .services.pdf import build_letter_pdf, build_invoice_pdf, build_dunning_pdf
 from .services.pricing import apply_pricing
-from .services.competitor import get_provider
+from .services.competitor import fetch_price_cached, get_provider
+from .services.competitor_refresh import competitor_price_report
 from django.core.cache import cache
 
 
@@ -775,7 +776,7 @@ class StockReceiptDetailView(ErpViewMixin, DetailView):
                         provider = get_provider()
                         if provider:
                             try:
-                                fetched = provider.fetch_price(item.product)
+                                fetched = fetch_price_cached(provider, item.product)
                             except Exception:
                                 fetched = None
                             if fetched is not None:
@@ -807,6 +808,15 @@ class CompetitorDebugView(ErpViewMixin, TemplateView):
         return context
 
 
+class CompetitorReportView(ErpViewMixin, TemplateView):
+    template_name = 'erp/competitor_report.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['report'] = competitor_price_report()
+        return context
+
+
 class PricingHelpView(ErpViewMixin, TemplateView):
     template_name = 'erp/pricing_help.html'
 
@@ -26,11 +26,21 @@ class BusinessPartnerSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+POSTED_ENTRY_MESSAGE = 'Gebuchte Buchungen können nicht geändert werden.'
+
+
 class JournalLineSerializer(serializers.ModelSerializer):
     class Meta:
         model = JournalLine
         fields = '__all__'
 
+    def validate(self, attrs):
+        # JournalLine.save raises Django's ValidationError for posted entries; report it as 400
+        entries = [attrs.get('entry'), getattr(self.instance, 'entry', None)]
+        if any(entry is not None and entry.is_posted for entry in entries):
+            raise serializers.ValidationError(POSTED_ENTRY_MESSAGE)
+        return attrs
+
 
 class JournalEntrySerializer(serializers.ModelSerializer):
     lines = JournalLineSerializer(many=True, read_only=True)
@@ -38,3 +48,12 @@ class JournalEntrySerializer(serializers.ModelSerializer):
     class Meta:
         model = JournalEntry
         fields = '__all__'
+        read_only_fields = ['status', 'posted_at', 'total_debit', 'total_credit']
+
+    def validate(self, attrs):
+        # JournalEntry.save rejects header changes on posted entries; report them as 400
+        if self.instance is not None and self.instance.is_posted and any(
+            getattr(self.instance, name) != value for name, value in attrs.items()
+        ):
+            raise serializers.ValidationError(POSTED_ENTRY_MESSAGE)
+        return attrs
@@ -1,7 +1,13 @@
-﻿from rest_framework import viewsets, filters
+﻿from django.core.exceptions import ValidationError
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError as APIValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from apps.fibu.models import Account, CostCenter, CostType, BusinessPartner, JournalEntry, JournalLine
+from apps.fibu.services.balances import post_entry
 from .serializers import (
+    POSTED_ENTRY_MESSAGE,
     AccountSerializer,
     CostCenterSerializer,
     CostTypeSerializer,
@@ -50,9 +56,23 @@ class JournalEntryViewSet(BaseFibuViewSet):
     search_fields = ['reference', 'description']
     ordering_fields = ['date', 'id']
 
+    @action(detail=True, methods=['post'], url_path='post')
+    def post_entry(self, request, pk=None):
+        entry = self.get_object()
+        try:
+            post_entry(entry)
+        except ValidationError as exc:
+            return Response({'detail': exc.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(entry).data)
+
 
 class JournalLineViewSet(BaseFibuViewSet):
     queryset = JournalLine.objects.all().order_by('-id')
     serializer_class = JournalLineSerializer
     search_fields = ['description']
     ordering_fields = ['id']
+
+    def perform_destroy(self, instance):
+        if instance.entry.is_posted:
+            raise APIValidationError({'detail': POSTED_ENTRY_MESSAGE})
+        instance.delete()
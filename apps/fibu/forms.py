@@ -80,4 +80,4 @@ class FibuSettingsForm(BaseFibuForm):
 
 
 class AccountImportForm(forms.Form):
-    file = forms.FileField()
+    file = forms.FileField(label='Datei (CSV/DATEV)')
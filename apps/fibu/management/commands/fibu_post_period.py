@@ -0,0 +1,31 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from apps.fibu.services.postings import post_invoice_period, post_stock_receipt_period
+
+
+class Command(BaseCommand):
+    help = 'Post all unposted ERP invoices and/or stock receipts of a period to the FiBu journal.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', required=True, help='Start date (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='date_to', required=True, help='End date (YYYY-MM-DD).')
+        parser.add_argument('--kind', choices=['invoices', 'receipts', 'all'], default='all')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            date_from = date.fromisoformat(options['date_from'])
+            date_to = date.fromisoformat(options['date_to'])
+        except ValueError as exc:
+            raise CommandError(f'Invalid date: {exc}')
+
+        if options['kind'] in ('invoices', 'all'):
+            result = post_invoice_period(date_from, date_to, options['batch_size'])
+            self.stdout.write(f"Invoices: {result['posted']} posted, {result['skipped']} skipped.")
+            if result['unbalanced']:
+                self.stdout.write(self.style.WARNING(
+                    f"Unbalanced invoices (total != net + tax): {', '.join(result['unbalanced'])}"
+                ))
+        if options['kind'] in ('receipts', 'all'):
+            result = post_stock_receipt_period(date_from, date_to, options['batch_size'])
+            self.stdout.write(f"Stock receipts: {result['posted']} posted, {result['skipped']} skipped.")
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from apps.fibu.services.balances import rebuild_balances
+
+
+class Command(BaseCommand):
+    help = 'Recompute FiBu account and cost-center period balances from posted journal lines.'
+
+    def handle(self, *args, **options):
+        result = rebuild_balances()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {result['accounts']} account periods and {result['cost_centers']} cost-center periods."
+        ))
@@ -0,0 +1,105 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def post_existing_entries(apps, schema_editor):
+    # Entries created before posting existed were always booked: mark them
+    # posted and build the period balances from their lines.
+    JournalEntry = apps.get_model('fibu', 'JournalEntry')
+    JournalLine = apps.get_model('fibu', 'JournalLine')
+    AccountPeriodBalance = apps.get_model('fibu', 'AccountPeriodBalance')
+    CostCenterPeriodBalance = apps.get_model('fibu', 'CostCenterPeriodBalance')
+
+    JournalEntry.objects.update(status='posted', posted_at=F('created_at'))
+    grouped = (
+        JournalLine.objects.annotate(year=ExtractYear('entry__date'), month=ExtractMonth('entry__date'))
+        .values('account_id', 'cost_center_id', 'year', 'month')
+        .annotate(debit_sum=Sum('debit'), credit_sum=Sum('credit'))
+    )
+    accounts = defaultdict(lambda: [Decimal('0.00'), Decimal('0.00')])
+    centers = []
+    for row in grouped:
+        debit = row['debit_sum'] or Decimal('0.00')
+        credit = row['credit_sum'] or Decimal('0.00')
+        bucket = accounts[(row['account_id'], row['year'], row['month'])]
+        bucket[0] += debit
+        bucket[1] += credit
+        if row['cost_center_id']:
+            centers.append(CostCenterPeriodBalance(
+                cost_center_id=row['cost_center_id'],
+                account_id=row['account_id'],
+                year=row['year'],
+                month=row['month'],
+                debit=debit,
+                credit=credit,
+            ))
+    AccountPeriodBalance.objects.bulk_create([
+        AccountPeriodBalance(account_id=a, year=y, month=m, debit=d, credit=c)
+        for (a, y, m), (d, c) in accounts.items()
+    ], batch_size=1000)
+    CostCenterPeriodBalance.objects.bulk_create(centers, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fibu', '0005_seed_minimal_accounts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalentry',
+            name='posted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Entwurf'), ('posted', 'Gebucht')], default='draft', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='journalentry',
+            name='date',
+            field=models.DateField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='AccountPeriodBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_balances', to='fibu.account')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', 'month'], name='fibu_accoun_year_02e740_idx')],
+                'constraints': [models.UniqueConstraint(fields=('account', 'year', 'month'), name='fibu_account_period_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CostCenterPeriodBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_center_balances', to='fibu.account')),
+                ('cost_center', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_balances', to='fibu.costcenter')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', 'month'], name='fibu_costce_year_ac56e2_idx')],
+                'constraints': [models.UniqueConstraint(fields=('cost_center', 'account', 'year', 'month'), name='fibu_cost_center_period_unique')],
+            },
+        ),
+        migrations.RunPython(post_existing_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:03
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def remove_duplicate_entries(apps, schema_editor):
+    # Concurrent posting could book the same invoice or stock receipt twice.
+    # Keep the oldest entry per document, take the others back out of the
+    # period balances and delete them, reporting every removed entry.
+    JournalEntry = apps.get_model('fibu', 'JournalEntry')
+    JournalLine = apps.get_model('fibu', 'JournalLine')
+    AccountPeriodBalance = apps.get_model('fibu', 'AccountPeriodBalance')
+    CostCenterPeriodBalance = apps.get_model('fibu', 'CostCenterPeriodBalance')
+
+    duplicate_ids = []
+    for field in ('erp_invoice', 'erp_stockreceipt'):
+        documents = (
+            JournalEntry.objects.filter(**{f'{field}__isnull': False})
+            .values(field)
+            .annotate(entries=Count('id'), keep=Min('id'))
+            .filter(entries__gt=1)
+        )
+        for document in documents:
+            extra = JournalEntry.objects.filter(**{field: document[field]}).exclude(pk=document['keep'])
+            for entry in extra:
+                print(f"\n  fibu: removing duplicate journal entry {entry.pk} ({entry.reference}), kept {document['keep']}")
+                duplicate_ids.append(entry.pk)
+    if not duplicate_ids:
+        return
+
+    grouped = (
+        JournalLine.objects.filter(entry_id__in=duplicate_ids, entry__status='posted')
+        .annotate(year=ExtractYear('entry__date'), month=ExtractMonth('entry__date'))
+        .values('account_id', 'cost_center_id', 'year', 'month')
+        .annotate(debit_sum=Sum('debit'), credit_sum=Sum('credit'))
+    )
+    for row in grouped:
+        change = {'debit': F('debit') - row['debit_sum'], 'credit': F('credit') - row['credit_sum']}
+        AccountPeriodBalance.objects.filter(
+            account_id=row['account_id'], year=row['year'], month=row['month'],
+        ).update(**change)
+        if row['cost_center_id']:
+            CostCenterPeriodBalance.objects.filter(
+                cost_center_id=row['cost_center_id'], account_id=row['account_id'], year=row['year'], month=row['month'],
+            ).update(**change)
+    JournalLine.objects.filter(entry_id__in=duplicate_ids).delete()
+    JournalEntry.objects.filter(pk__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0003_contract_ai_status'),
+        ('erp', '0015_erpevent'),
+        ('fibu', '0006_period_balances'),
+        ('personnel', '0004_alter_instructor_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_entries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='journalentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('erp_invoice__isnull', False)), fields=('erp_invoice',), name='fibu_entry_unique_invoice'),
+        ),
+        migrations.AddConstraint(
+            model_name='journalentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('erp_stockreceipt__isnull', False)), fields=('erp_stockreceipt',), name='fibu_entry_unique_stockreceipt'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
@@ -68,7 +70,12 @@ class BusinessPartner(models.Model):
 
 
 class JournalEntry(models.Model):
-    date = models.DateField(default=timezone.now)
+    STATUS_CHOICES = [
+        ('draft', 'Entwurf'),
+        ('posted', 'Gebucht'),
+    ]
+
+    date = models.DateField(default=timezone.now, db_index=True)
     reference = models.CharField(max_length=100, blank=True)
     description = models.CharField(max_length=255, blank=True)
     total_debit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
@@ -80,17 +87,60 @@ class JournalEntry(models.Model):
     contract = models.ForeignKey('contracts.Contract', on_delete=models.SET_NULL, null=True, blank=True)
     employee = models.ForeignKey('personnel.Employee', on_delete=models.SET_NULL, null=True, blank=True)
 
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
+    posted_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
-    def recalc_totals(self):
-        debit = Decimal('0.00')
-        credit = Decimal('0.00')
-        for line in self.lines.all():
-            debit += Decimal(str(line.debit or 0))
-            credit += Decimal(str(line.credit or 0))
-        self.total_debit = debit
-        self.total_credit = credit
-        self.save(update_fields=['total_debit', 'total_credit'])
+    class Meta:
+        constraints = [
+            # One journal entry per ERP document keeps (bulk) posting idempotent.
+            models.UniqueConstraint(
+                fields=['erp_invoice'],
+                condition=models.Q(erp_invoice__isnull=False),
+                name='fibu_entry_unique_invoice',
+            ),
+            models.UniqueConstraint(
+                fields=['erp_stockreceipt'],
+                condition=models.Q(erp_stockreceipt__isnull=False),
+                name='fibu_entry_unique_stockreceipt',
+            ),
+        ]
+
+    # Fields that posting and unposting maintain; everything else on a posted
+    # entry is frozen until it is returned to draft.
+    POSTING_FIELDS = {'status', 'posted_at', 'total_debit', 'total_credit'}
+
+    @property
+    def is_posted(self):
+        return self.status == 'posted'
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if not self._state.adding and (update_fields is None or set(update_fields) - self.POSTING_FIELDS):
+            self._check_posted_header()
+        super().save(*args, **kwargs)
+
+    def _check_posted_header(self):
+        header = [
+            field for field in self._meta.concrete_fields
+            if not field.primary_key and field.name not in self.POSTING_FIELDS and field.name != 'created_at'
+        ]
+        stored = (
+            JournalEntry.objects.filter(pk=self.pk, status='posted')
+            .values(*[field.attname for field in header])
+            .first()
+        )
+        if stored and any(
+            field.to_python(getattr(self, field.attname)) != stored[field.attname] for field in header
+        ):
+            raise ValidationError('Gebuchte Buchungen können nicht geändert werden.')
+
+    def recalc_totals(self, save=True):
+        totals = self.lines.aggregate(debit=models.Sum('debit'), credit=models.Sum('credit'))
+        self.total_debit = totals['debit'] or Decimal('0.00')
+        self.total_credit = totals['credit'] or Decimal('0.00')
+        if save:
+            self.save(update_fields=['total_debit', 'total_credit'])
 
     def __str__(self):
         return f"JE-{self.id} {self.date}"
@@ -106,14 +156,74 @@ class JournalLine(models.Model):
     credit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     description = models.CharField(max_length=255, blank=True)
 
+    # Draft totals follow every line change; period balances are only
+    # maintained when the entry is posted (apps.fibu.services.balances.post_entry).
     def save(self, *args, **kwargs):
+        if self.entry.is_posted:
+            raise ValidationError('Gebuchte Buchungen können nicht geändert werden.')
         super().save(*args, **kwargs)
         self.entry.recalc_totals()
 
     def delete(self, *args, **kwargs):
-        entry = self.entry
-        super().delete(*args, **kwargs)
-        entry.recalc_totals()
+        if self.entry.is_posted:
+            raise ValidationError('Gebuchte Buchungen können nicht geändert werden.')
+        result = super().delete(*args, **kwargs)
+        self.entry.recalc_totals()
+        return result
+
+
+class AccountPeriodBalance(models.Model):
+    """Posted debit/credit per account and month, maintained incrementally."""
+
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='period_balances')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    debit = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'year', 'month'], name='fibu_account_period_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['year', 'month']),
+        ]
+
+    @property
+    def balance(self):
+        return self.debit - self.credit
+
+    def __str__(self):
+        return f"{self.account.code} {self.year}-{self.month:02d}"
+
+
+class CostCenterPeriodBalance(models.Model):
+    """Posted debit/credit per cost center, account and month."""
+
+    cost_center = models.ForeignKey(CostCenter, on_delete=models.CASCADE, related_name='period_balances')
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='cost_center_balances')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    debit = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['cost_center', 'account', 'year', 'month'],
+                name='fibu_cost_center_period_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['year', 'month']),
+        ]
+
+    @property
+    def balance(self):
+        return self.debit - self.credit
+
+    def __str__(self):
+        return f"{self.cost_center.code}/{self.account.code} {self.year}-{self.month:02d}"
 
 
 class FibuSettings(models.Model):
@@ -174,3 +284,58 @@ class FibuSettings(models.Model):
     def get_settings(cls):
         obj, _ = cls.objects.get_or_create(id=1)
         return obj
+
+
+class FibuImportJob(models.Model):
+    KIND_CHOICES = [
+        ('accounts', 'Konten'),
+        ('journal', 'Buchungen'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Wartend'),
+        ('running', 'Läuft'),
+        ('completed', 'Abgeschlossen'),
+        ('failed', 'Fehlgeschlagen'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='accounts')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    file = models.FileField(upload_to='fibu/imports/')
+    original_name = models.CharField(max_length=255, blank=True)
+    file_size = models.BigIntegerField(default=0)
+    bytes_processed = models.BigIntegerField(default=0)
+    rows_processed = models.IntegerField(default=0)
+    created_count = models.IntegerField(default=0)
+    updated_count = models.IntegerField(default=0)
+    skipped_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    error_message = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='fibu_import_jobs',
+    )
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    @property
+    def progress(self):
+        if self.status == 'completed':
+            return 100
+        if not self.file_size:
+            return 0
+        return min(99, int(self.bytes_processed * 100 / self.file_size))
+
+    def __str__(self):
+        return f"Import {self.id} ({self.get_kind_display()})"
@@ -0,0 +1,165 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+from apps.fibu.models import AccountPeriodBalance, CostCenterPeriodBalance, JournalEntry, JournalLine
+
+ZERO = Decimal('0.00')
+
+ACCOUNT_KEY = ('account_id', 'year', 'month')
+COST_CENTER_KEY = ('cost_center_id', 'account_id', 'year', 'month')
+
+
+def collect_deltas(rows, sign: int = 1) -> tuple[dict, dict]:
+    """
+    Sum ``(date, account_id, cost_center_id, debit, credit)`` rows into
+    per-account and per-cost-center period deltas.
+    """
+    accounts = defaultdict(lambda: [ZERO, ZERO])
+    centers = defaultdict(lambda: [ZERO, ZERO])
+    for date, account_id, cost_center_id, debit, credit in rows:
+        debit = (debit or ZERO) * sign
+        credit = (credit or ZERO) * sign
+        bucket = accounts[(account_id, date.year, date.month)]
+        bucket[0] += debit
+        bucket[1] += credit
+        if cost_center_id:
+            bucket = centers[(cost_center_id, account_id, date.year, date.month)]
+            bucket[0] += debit
+            bucket[1] += credit
+    return accounts, centers
+
+
+def _apply(model, key_fields, deltas: dict):
+    if not deltas:
+        return
+    lookups = {
+        f"{field}__in": {key[idx] for key in deltas}
+        for idx, field in enumerate(key_fields)
+    }
+    existing = {
+        tuple(getattr(obj, field) for field in key_fields): obj
+        for obj in model.objects.select_for_update().filter(**lookups)
+    }
+    to_update = []
+    to_create = []
+    for key, (debit, credit) in deltas.items():
+        obj = existing.get(key)
+        if obj is None:
+            to_create.append(model(debit=debit, credit=credit, **dict(zip(key_fields, key))))
+            continue
+        obj.debit += debit
+        obj.credit += credit
+        to_update.append(obj)
+    if to_update:
+        model.objects.bulk_update(to_update, ['debit', 'credit'])
+    if to_create:
+        model.objects.bulk_create(to_create)
+
+
+def apply_deltas(account_deltas: dict, center_deltas: dict):
+    """Add period deltas to the balance tables (a handful of queries per call)."""
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                _apply(AccountPeriodBalance, ACCOUNT_KEY, account_deltas)
+                _apply(CostCenterPeriodBalance, COST_CENTER_KEY, center_deltas)
+            return
+        except IntegrityError:
+            # A concurrent posting created one of the period rows first.
+            if attempt:
+                raise
+
+
+def _entry_rows(entry):
+    return [
+        (entry.date, account_id, cost_center_id, debit, credit)
+        for account_id, cost_center_id, debit, credit in entry.lines.values_list(
+            'account_id', 'cost_center_id', 'debit', 'credit'
+        )
+    ]
+
+
+def post_entry(entry: JournalEntry, require_balanced: bool = True) -> JournalEntry:
+    """
+    Post a draft entry: compute its totals once and add its lines to the
+    period balances. Posting an already posted entry is a no-op.
+    """
+    with transaction.atomic():
+        locked = JournalEntry.objects.select_for_update().get(pk=entry.pk)
+        if locked.is_posted:
+            return locked
+        rows = _entry_rows(locked)
+        if not rows:
+            raise ValidationError('Die Buchung hat keine Zeilen.')
+        debit = sum((row[3] or ZERO for row in rows), ZERO)
+        credit = sum((row[4] or ZERO for row in rows), ZERO)
+        if require_balanced and debit != credit:
+            raise ValidationError(f'Soll ({debit}) und Haben ({credit}) sind nicht ausgeglichen.')
+        apply_deltas(*collect_deltas(rows))
+        locked.total_debit = debit
+        locked.total_credit = credit
+        locked.status = 'posted'
+        locked.posted_at = timezone.now()
+        locked.save(update_fields=['total_debit', 'total_credit', 'status', 'posted_at'])
+    entry.total_debit = locked.total_debit
+    entry.total_credit = locked.total_credit
+    entry.status = locked.status
+    entry.posted_at = locked.posted_at
+    return locked
+
+
+def reverse_entry_balances(entry: JournalEntry):
+    """Remove a posted entry's lines from the period balances."""
+    apply_deltas(*collect_deltas(_entry_rows(entry), sign=-1))
+
+
+def unpost_entry(entry: JournalEntry) -> JournalEntry:
+    """Return a posted entry to draft so its lines can be edited."""
+    with transaction.atomic():
+        locked = JournalEntry.objects.select_for_update().get(pk=entry.pk)
+        if not locked.is_posted:
+            return locked
+        reverse_entry_balances(locked)
+        locked.status = 'draft'
+        locked.posted_at = None
+        locked.save(update_fields=['status', 'posted_at'])
+    entry.status = locked.status
+    entry.posted_at = None
+    return locked
+
+
+def rebuild_balances() -> dict:
+    """Recompute all period balances from posted lines (repair / initial load)."""
+    grouped = (
+        JournalLine.objects.filter(entry__status='posted')
+        .annotate(year=ExtractYear('entry__date'), month=ExtractMonth('entry__date'))
+        .values('account_id', 'cost_center_id', 'year', 'month')
+        .annotate(debit_sum=Sum('debit'), credit_sum=Sum('credit'))
+    )
+    accounts = defaultdict(lambda: [ZERO, ZERO])
+    centers = {}
+    for row in grouped:
+        bucket = accounts[(row['account_id'], row['year'], row['month'])]
+        bucket[0] += row['debit_sum'] or ZERO
+        bucket[1] += row['credit_sum'] or ZERO
+        if row['cost_center_id']:
+            centers[(row['cost_center_id'], row['account_id'], row['year'], row['month'])] = (
+                row['debit_sum'] or ZERO,
+                row['credit_sum'] or ZERO,
+            )
+    with transaction.atomic():
+        AccountPeriodBalance.objects.all().delete()
+        CostCenterPeriodBalance.objects.all().delete()
+        AccountPeriodBalance.objects.bulk_create([
+            AccountPeriodBalance(account_id=a, year=y, month=m, debit=d, credit=c)
+            for (a, y, m), (d, c) in accounts.items()
+        ], batch_size=1000)
+        CostCenterPeriodBalance.objects.bulk_create([
+            CostCenterPeriodBalance(cost_center_id=cc, account_id=a, year=y, month=m, debit=d, credit=c)
+            for (cc, a, y, m), (d, c) in centers.items()
+        ], batch_size=1000)
+    return {'accounts': len(accounts), 'cost_centers': len(centers)}
@@ -0,0 +1,455 @@
+"""
+Streaming CSV/DATEV import for accounts and journal entries.
+
+The upload is read line by line, validated in chunks and written with bulk
+upserts/inserts, so large chart-of-accounts or year-opening files never sit
+in memory as a whole. Progress and row errors are stored on FibuImportJob.
+"""
+
+import csv
+import io
+import logging
+import re
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.helpdesk.helpdesk_apps.admin_panel.models import AuditLog
+from apps.fibu.models import Account, CostCenter, FibuImportJob, JournalEntry, JournalLine
+from apps.fibu.services.postings import write_posted_entries
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 500
+ZERO = Decimal('0.00')
+THOUSANDS_ONLY = {sep: re.compile(rf'-?[1-9]\d{{0,2}}(\{sep}\d{{3}})+') for sep in ',.'}
+
+ACCOUNT_TYPES = {key for key, _ in Account.TYPES}
+# Header aliases: generic CSV, German labels and DATEV export columns.
+ACCOUNT_COLUMNS = {
+    'code': ('code', 'konto', 'kontonummer'),
+    'name': ('name', 'bezeichnung', 'kontenbeschriftung'),
+    'account_type': ('account_type', 'typ', 'kontoart'),
+}
+JOURNAL_COLUMNS = {
+    'date': ('date', 'datum', 'belegdatum'),
+    'reference': ('reference', 'referenz', 'beleg', 'belegfeld 1'),
+    'description': ('description', 'beschreibung', 'buchungstext'),
+    'account': ('account', 'konto'),
+    'contra_account': ('gegenkonto (ohne bu-schlüssel)', 'gegenkonto'),
+    'amount': ('umsatz (ohne soll/haben-kz)', 'umsatz', 'betrag'),
+    'side': ('soll/haben-kennzeichen', 'soll/haben'),
+    'debit': ('debit', 'soll'),
+    'credit': ('credit', 'haben'),
+    'cost_center': ('cost_center', 'kostenstelle', 'kost1 - kostenstelle'),
+}
+
+
+class RowError(ValueError):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+class CsvStream:
+    """
+    Incremental reader over a binary upload. Skips a DATEV ``EXTF`` header
+    line (and reads the fiscal year from it), detects the delimiter from the
+    column header and yields ``(line_number, row_dict)``.
+    """
+
+    def __init__(self, fileobj, encoding: str = 'utf-8-sig'):
+        self.raw = fileobj
+        self.text = io.TextIOWrapper(fileobj, encoding=encoding, errors='replace', newline='')
+        self.fiscal_year = None
+        self.header_lines = 0
+
+    @property
+    def bytes_read(self) -> int:
+        try:
+            return self.raw.tell()
+        except (OSError, ValueError):
+            return 0
+
+    def _readline(self) -> str:
+        self.header_lines += 1
+        return self.text.readline()
+
+    def __iter__(self):
+        header = self._readline()
+        if header.lstrip('"').startswith('EXTF'):
+            self.fiscal_year = _datev_fiscal_year(header)
+            header = self._readline()
+        if not header.strip():
+            return
+        delimiter = ';' if header.count(';') >= header.count(',') else ','
+        columns = [
+            column.strip().strip('"').lower()
+            for column in next(csv.reader([header], delimiter=delimiter))
+        ]
+        reader = csv.reader(self.text, delimiter=delimiter)
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            yield reader.line_num + self.header_lines, dict(zip(columns, values))
+
+
+def _datev_fiscal_year(header: str):
+    # EXTF header field 13 is "Wirtschaftsjahr-Beginn" (YYYYMMDD).
+    fields = next(csv.reader([header], delimiter=';'))
+    if len(fields) > 12 and fields[12][:4].isdigit():
+        return int(fields[12][:4])
+    return None
+
+
+def _value(row: dict, aliases) -> str:
+    for alias in aliases:
+        value = row.get(alias)
+        if value:
+            return value.strip()
+    return ''
+
+
+def _decimal(value: str) -> Decimal:
+    """
+    Amount in German or English notation: the separator that comes last is
+    the decimal separator, unless a single kind of separator only groups
+    thousands ("1.234", "1,234,567").
+    """
+    if not value:
+        return ZERO
+    value = value.replace(' ', '')
+    last_comma, last_dot = value.rfind(','), value.rfind('.')
+    if last_comma > last_dot and not THOUSANDS_ONLY[','].fullmatch(value):
+        value = value.replace('.', '').replace(',', '.')
+    elif last_comma < 0 and THOUSANDS_ONLY['.'].fullmatch(value):
+        value = value.replace('.', '')
+    else:
+        value = value.replace(',', '')
+    try:
+        return Decimal(value).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise RowError(f'Ungültiger Betrag: {value}')
+
+
+def _date(value: str, fiscal_year=None) -> date:
+    for fmt in ('%Y-%m-%d', '%d.%m.%Y', '%d.%m.%y'):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    # DATEV Belegdatum is DDMM within the fiscal year of the header.
+    if len(value) in (3, 4) and value.isdigit() and fiscal_year:
+        value = value.zfill(4)
+        try:
+            return date(fiscal_year, int(value[2:]), int(value[:2]))
+        except ValueError:
+            pass
+    raise RowError(f'Ungültiges Datum: {value or "-"}')
+
+
+def _chunks(iterable, size: int):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ---------------------------------------------------------------------------
+# Job bookkeeping
+# ---------------------------------------------------------------------------
+
+class ImportReport:
+    def __init__(self, job: FibuImportJob):
+        self.job = job
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.rows = 0
+        self.errors = []
+        self.error_count = 0
+
+    def error(self, line: int, message: str):
+        self.error_count += 1
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def save_progress(self, stream: CsvStream):
+        FibuImportJob.objects.filter(pk=self.job.pk).update(
+            bytes_processed=stream.bytes_read,
+            rows_processed=self.rows,
+            created_count=self.created,
+            updated_count=self.updated,
+            skipped_count=self.skipped,
+            error_count=self.error_count,
+        )
+
+
+# ---------------------------------------------------------------------------
+# Accounts
+# ---------------------------------------------------------------------------
+
+def _import_accounts(stream: CsvStream, report: ImportReport):
+    for chunk in _chunks(stream, CHUNK_SIZE):
+        report.rows += len(chunk)
+        accounts = {}
+        for line, row in chunk:
+            code = _value(row, ACCOUNT_COLUMNS['code'])
+            name = _value(row, ACCOUNT_COLUMNS['name'])
+            if not code or not name:
+                report.error(line, 'Konto und Bezeichnung sind Pflichtfelder.')
+                continue
+            account_type = _value(row, ACCOUNT_COLUMNS['account_type']).lower()
+            if account_type not in ACCOUNT_TYPES:
+                account_type = 'expense'
+            # Later rows win for duplicate codes within a chunk.
+            accounts[code] = Account(code=code, name=name[:200], account_type=account_type, is_active=True)
+        if accounts:
+            existing = set(Account.objects.filter(code__in=accounts.keys()).values_list('code', flat=True))
+            Account.objects.bulk_create(
+                accounts.values(),
+                update_conflicts=True,
+                unique_fields=['code'],
+                update_fields=['name', 'account_type', 'is_active'],
+            )
+            report.updated += len(existing)
+            report.created += len(accounts) - len(existing)
+        report.save_progress(stream)
+
+
+# ---------------------------------------------------------------------------
+# Journal entries
+# ---------------------------------------------------------------------------
+
+class _Lookups:
+    """Account/cost-center code → id maps, loaded once per import."""
+
+    def __init__(self):
+        self.accounts = dict(Account.objects.values_list('code', 'id'))
+        self.cost_centers = dict(CostCenter.objects.values_list('code', 'id'))
+
+    def account(self, code: str) -> int:
+        try:
+            return self.accounts[code]
+        except KeyError:
+            raise RowError(f'Unbekanntes Konto: {code or "-"}')
+
+    def cost_center(self, code: str):
+        if not code:
+            return None
+        try:
+            return self.cost_centers[code]
+        except KeyError:
+            raise RowError(f'Unbekannte Kostenstelle: {code}')
+
+
+def _journal_lines(row: dict, lookups: _Lookups, fiscal_year):
+    """Parse one row into ``(date, reference, description, lines)``."""
+    entry_date = _date(_value(row, JOURNAL_COLUMNS['date']), fiscal_year)
+    reference = _value(row, JOURNAL_COLUMNS['reference'])[:100]
+    description = _value(row, JOURNAL_COLUMNS['description'])[:255]
+    cost_center_id = lookups.cost_center(_value(row, JOURNAL_COLUMNS['cost_center']))
+    account_id = lookups.account(_value(row, JOURNAL_COLUMNS['account']))
+    contra = _value(row, JOURNAL_COLUMNS['contra_account'])
+
+    if contra:
+        # DATEV style: one amount booked against Konto and Gegenkonto.
+        amount = _decimal(_value(row, JOURNAL_COLUMNS['amount']))
+        if amount <= 0:
+            raise RowError('Umsatz muss größer als 0 sein.')
+        contra_id = lookups.account(contra)
+        debit_id, credit_id = account_id, contra_id
+        if _value(row, JOURNAL_COLUMNS['side']).upper() == 'H':
+            debit_id, credit_id = contra_id, account_id
+        lines = [
+            JournalLine(account_id=debit_id, cost_center_id=cost_center_id, debit=amount, credit=ZERO, description=description),
+            JournalLine(account_id=credit_id, cost_center_id=cost_center_id, debit=ZERO, credit=amount, description=description),
+        ]
+    else:
+        debit = _decimal(_value(row, JOURNAL_COLUMNS['debit']))
+        credit = _decimal(_value(row, JOURNAL_COLUMNS['credit']))
+        if not debit and not credit:
+            raise RowError('Soll oder Haben muss angegeben werden.')
+        lines = [JournalLine(account_id=account_id, cost_center_id=cost_center_id, debit=debit, credit=credit, description=description)]
+    return entry_date, reference, description, lines
+
+
+def _iter_entries(stream: CsvStream, report: ImportReport, lookups: _Lookups):
+    """
+    Group consecutive rows with the same date and reference into one entry.
+    Rows without reference (DATEV) are complete entries on their own.
+    """
+    current = None
+    for line, row in stream:
+        report.rows += 1
+        try:
+            entry_date, reference, description, lines = _journal_lines(row, lookups, stream.fiscal_year)
+        except RowError as exc:
+            report.error(line, str(exc))
+            continue
+        key = (entry_date, reference) if reference else None
+        if current and key is not None and current['key'] == key:
+            current['lines'].extend(lines)
+            continue
+        if current:
+            yield current
+        current = {'key': key, 'line': line, 'date': entry_date, 'reference': reference, 'description': description, 'lines': lines}
+    if current:
+        yield current
+
+
+def _document_key(entry_date, reference: str, description: str, amount: Decimal) -> tuple:
+    """Identity of a booked document: Belegfeld/reference (or text), date and amount."""
+    return (entry_date, reference, '' if reference else description, amount)
+
+
+def _already_imported(plans, started) -> set:
+    """Document keys of ``plans`` that entries from earlier imports already carry."""
+    existing = JournalEntry.objects.filter(
+        date__in={entry.date for entry, _ in plans},
+        created_at__lt=started,
+    ).values_list('date', 'reference', 'description', 'total_debit')
+    return {_document_key(*row) for row in existing}
+
+
+def _import_journal(stream: CsvStream, report: ImportReport):
+    """
+    Entries whose document key is already booked are skipped, so importing
+    the same file (or an overlapping export) again does not double-post.
+    """
+    lookups = _Lookups()
+    started = timezone.now()
+    plans = []
+    line_count = 0
+
+    def flush():
+        if plans:
+            booked = _already_imported(plans, started)
+            fresh = [
+                (entry, lines) for entry, lines in plans
+                if _document_key(entry.date, entry.reference, entry.description, sum((line.debit for line in lines), ZERO)) not in booked
+            ]
+            if fresh:
+                write_posted_entries(fresh, audit=False)
+            report.created += len(fresh)
+            report.skipped += len(plans) - len(fresh)
+            plans.clear()
+        report.save_progress(stream)
+
+    for item in _iter_entries(stream, report, lookups):
+        debit = sum((line.debit for line in item['lines']), ZERO)
+        credit = sum((line.credit for line in item['lines']), ZERO)
+        if debit != credit:
+            report.error(item['line'], f'Buchung {item["reference"] or "-"}: Soll ({debit}) und Haben ({credit}) sind nicht ausgeglichen.')
+            continue
+        entry = JournalEntry(date=item['date'], reference=item['reference'], description=item['description'])
+        plans.append((entry, item['lines']))
+        line_count += len(item['lines'])
+        if line_count >= CHUNK_SIZE:
+            flush()
+            line_count = 0
+    flush()
+
+
+IMPORTERS = {
+    'accounts': _import_accounts,
+    'journal': _import_journal,
+}
+
+
+# ---------------------------------------------------------------------------
+# Entry points
+# ---------------------------------------------------------------------------
+
+def create_import_job(upload, kind: str, user=None) -> FibuImportJob:
+    job = FibuImportJob.objects.create(
+        kind=kind,
+        file=upload,
+        original_name=getattr(upload, 'name', '')[:255],
+        file_size=getattr(upload, 'size', 0) or 0,
+        created_by=user if getattr(user, 'is_authenticated', False) else None,
+    )
+    transaction.on_commit(lambda: dispatch_import(job.pk))
+    return job
+
+
+def dispatch_import(job_id: int):
+    mode = getattr(settings, 'FIBU_IMPORT_MODE', 'celery')
+    if mode == 'inline':
+        run_import(job_id)
+        return
+    if mode != 'celery':
+        return
+    try:
+        from apps.fibu.tasks import run_fibu_import
+        run_fibu_import.delay(job_id)
+    except Exception as exc:
+        logger.warning("FiBu import dispatch failed: %s", exc)
+
+
+def sweep_queued_imports() -> int:
+    """
+    Dispatch imports that are still queued after FIBU_IMPORT_REDISPATCH_SECONDS
+    (dispatch lost). Only one worker can claim a job, so a duplicate dispatch
+    is harmless. Returns the number of jobs dispatched.
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'FIBU_IMPORT_REDISPATCH_SECONDS', 300))
+    job_ids = list(FibuImportJob.objects.filter(status='queued', created_at__lt=cutoff).values_list('id', flat=True))
+    for job_id in job_ids:
+        dispatch_import(job_id)
+    return len(job_ids)
+
+
+def run_import(job_id: int) -> FibuImportJob | None:
+    """Run a queued import job. Returns None when another worker claimed it."""
+    claimed = FibuImportJob.objects.filter(pk=job_id, status='queued').update(
+        status='running',
+        started_at=timezone.now(),
+    )
+    if not claimed:
+        return None
+    job = FibuImportJob.objects.get(pk=job_id)
+    report = ImportReport(job)
+    status = 'completed'
+    error_message = ''
+    try:
+        with job.file.open('rb') as fileobj:
+            stream = CsvStream(fileobj)
+            IMPORTERS[job.kind](stream, report)
+    except Exception as exc:
+        logger.exception("FiBu import %s failed", job_id)
+        status = 'failed'
+        error_message = str(exc)[:2000]
+
+    job.status = status
+    job.error_message = error_message
+    job.rows_processed = report.rows
+    job.created_count = report.created
+    job.updated_count = report.updated
+    job.skipped_count = report.skipped
+    job.error_count = report.error_count
+    job.errors = report.errors
+    job.bytes_processed = job.file_size
+    job.finished_at = timezone.now()
+    job.save()
+    AuditLog.objects.create(
+        action='created',
+        user=job.created_by,
+        content_type='fibu.FibuImportJob',
+        object_id=job.pk,
+        description=f"import {job.kind}: {report.created} neu, {report.updated} aktualisiert, {report.skipped} übersprungen",
+        old_values={},
+        new_values={'file': job.original_name, 'status': status, 'rows': report.rows},
+    )
+    return job
@@ -1,6 +1,16 @@
-﻿from decimal import Decimal
+﻿import logging
+from decimal import Decimal
+from django.db import IntegrityError, transaction
 from django.utils import timezone
+from apps.core.services.audit import audit_snapshot
+from apps.helpdesk.helpdesk_apps.admin_panel.models import AuditLog
 from apps.fibu.models import JournalEntry, JournalLine, FibuSettings
+from apps.fibu.services.balances import apply_deltas, collect_deltas
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+BATCH_SIZE = 500
 
 
 def _to_decimal(value):
@@ -10,99 +20,244 @@ def _to_decimal(value):
         return Decimal('0.00')
 
 
-def post_invoice(invoice):
-    settings_obj = FibuSettings.get_settings()
-    if not settings_obj.auto_posting_enabled:
-        return None
-    if JournalEntry.objects.filter(erp_invoice=invoice).exists():
-        return None
+def _line(settings_obj, account, debit=ZERO, credit=ZERO, description=''):
+    return JournalLine(
+        account=account,
+        cost_center=settings_obj.default_cost_center,
+        debit=debit,
+        credit=credit,
+        description=description,
+    )
 
-    if not (settings_obj.receivable_account and settings_obj.revenue_account and settings_obj.vat_output_account):
-        return None
 
-    entry = JournalEntry.objects.create(
+def _invoice_plan(invoice, settings_obj):
+    """Unsaved entry and lines for one invoice."""
+    total = _to_decimal(invoice.total_amount)
+    net = _to_decimal(invoice.net_amount)
+    tax = _to_decimal(invoice.tax_amount)
+    entry = JournalEntry(
         date=invoice.issue_date or timezone.now().date(),
         reference=invoice.number,
         description=f'Ausgangsrechnung {invoice.number}',
         erp_invoice=invoice,
     )
-
-    total = _to_decimal(invoice.total_amount)
-    net = _to_decimal(invoice.net_amount)
-    tax = _to_decimal(invoice.tax_amount)
-
-    JournalLine.objects.create(
-        entry=entry,
-        account=settings_obj.receivable_account,
-        cost_center=settings_obj.default_cost_center,
-        debit=total,
-        credit=Decimal('0.00'),
-        description='Debitor',
-    )
-
+    lines = [_line(settings_obj, settings_obj.receivable_account, debit=total, description='Debitor')]
     if net > 0:
-        JournalLine.objects.create(
-            entry=entry,
-            account=settings_obj.revenue_account,
-            cost_center=settings_obj.default_cost_center,
-            debit=Decimal('0.00'),
-            credit=net,
-            description='Umsatzerlöse',
-        )
-
+        lines.append(_line(settings_obj, settings_obj.revenue_account, credit=net, description='Umsatzerlöse'))
     if tax > 0:
-        JournalLine.objects.create(
-            entry=entry,
-            account=settings_obj.vat_output_account,
-            cost_center=settings_obj.default_cost_center,
-            debit=Decimal('0.00'),
-            credit=tax,
-            description='Umsatzsteuer',
-        )
+        lines.append(_line(settings_obj, settings_obj.vat_output_account, credit=tax, description='Umsatzsteuer'))
+    return entry, lines
 
-    return entry
-
-
-def post_stock_receipt(receipt):
-    settings_obj = FibuSettings.get_settings()
-    if not settings_obj.auto_posting_enabled:
-        return None
-    if JournalEntry.objects.filter(erp_stockreceipt=receipt).exists():
-        return None
-
-    if not (settings_obj.inventory_account and settings_obj.payable_account):
-        return None
 
+def _receipt_plan(receipt, settings_obj):
+    """Unsaved entry and lines for one stock receipt (None when the receipt has no value)."""
     total = Decimal('0.00')
     for item in receipt.items.all():
         total += _to_decimal(item.unit_cost_net) * _to_decimal(item.quantity)
-
     if total <= 0:
         return None
-
-    entry = JournalEntry.objects.create(
+    entry = JournalEntry(
         date=receipt.receipt_date or timezone.now().date(),
         reference=f'WE-{receipt.id}',
         description='Wareneingang',
         erp_stockreceipt=receipt,
     )
+    lines = [
+        _line(settings_obj, settings_obj.inventory_account, debit=total, description='Wareneingang'),
+        _line(settings_obj, settings_obj.payable_account, credit=total, description='Kreditor'),
+    ]
+    return entry, lines
 
-    JournalLine.objects.create(
-        entry=entry,
-        account=settings_obj.inventory_account,
-        cost_center=settings_obj.default_cost_center,
-        debit=total,
-        credit=Decimal('0.00'),
-        description='Wareneingang',
+
+def _audit_rows(plans):
+    rows = []
+    for entry, lines in plans:
+        values = audit_snapshot(entry)
+        values['lines'] = [audit_snapshot(line) for line in lines]
+        rows.append(AuditLog(
+            action='created',
+            user=None,
+            content_type='fibu.JournalEntry',
+            object_id=entry.pk,
+            description='created JournalEntry',
+            old_values={},
+            new_values=values,
+        ))
+    return rows
+
+
+def write_posted_entries(plans, audit: bool = True):
+    """
+    Insert ``(entry, lines)`` plans as posted entries with their lines,
+    balance deltas and (optionally) one audit row per entry, using a fixed
+    number of queries per batch. Raises IntegrityError when one of the
+    source documents already has an entry.
+    """
+    now = timezone.now()
+    for entry, lines in plans:
+        entry.total_debit = sum((line.debit for line in lines), ZERO)
+        entry.total_credit = sum((line.credit for line in lines), ZERO)
+        entry.status = 'posted'
+        entry.posted_at = now
+
+    with transaction.atomic():
+        JournalEntry.objects.bulk_create([entry for entry, _ in plans])
+        all_lines = []
+        for entry, lines in plans:
+            for line in lines:
+                line.entry = entry
+                all_lines.append(line)
+        JournalLine.objects.bulk_create(all_lines, batch_size=BATCH_SIZE)
+        apply_deltas(*collect_deltas(
+            (entry.date, line.account_id, line.cost_center_id, line.debit, line.credit)
+            for entry, lines in plans
+            for line in lines
+        ))
+        if audit:
+            AuditLog.objects.bulk_create(_audit_rows(plans), batch_size=BATCH_SIZE)
+    return [entry for entry, _ in plans]
+
+
+def _post_batch(plans, source_field: str) -> list[JournalEntry]:
+    if not plans:
+        return []
+    try:
+        return write_posted_entries(plans)
+    except IntegrityError:
+        pass
+    # Another run posted some of these documents in the meantime: drop them
+    # (one query for the whole batch) and retry once.
+    for entry, lines in plans:
+        entry.pk = None
+        for line in lines:
+            line.pk = None
+    source_ids = [getattr(entry, f'{source_field}_id') for entry, _ in plans]
+    taken = set(
+        JournalEntry.objects.filter(**{f'{source_field}_id__in': source_ids})
+        .values_list(f'{source_field}_id', flat=True)
     )
+    remaining = [plan for plan in plans if getattr(plan[0], f'{source_field}_id') not in taken]
+    return write_posted_entries(remaining) if remaining else []
 
-    JournalLine.objects.create(
-        entry=entry,
-        account=settings_obj.payable_account,
-        cost_center=settings_obj.default_cost_center,
-        debit=Decimal('0.00'),
-        credit=total,
-        description='Kreditor',
+
+def _balanced(plan) -> bool:
+    entry, lines = plan
+    return sum((line.debit for line in lines), ZERO) == sum((line.credit for line in lines), ZERO)
+
+
+def post_invoices(invoices, settings_obj=None) -> dict:
+    """
+    Post many invoices at once. Invoices that already have an entry are left
+    alone (enforced by the unique constraint on JournalEntry.erp_invoice).
+    Invoices whose net and tax amounts do not add up to the total are not
+    posted; their numbers are logged and returned in ``unbalanced``.
+    """
+    settings_obj = settings_obj or FibuSettings.get_settings()
+    result = {'posted': 0, 'skipped': 0, 'unbalanced': [], 'entries': []}
+    if not settings_obj.auto_posting_enabled:
+        return result
+    if not (settings_obj.receivable_account and settings_obj.revenue_account and settings_obj.vat_output_account):
+        return result
+
+    plans = []
+    for invoice in invoices:
+        plan = _invoice_plan(invoice, settings_obj)
+        if _balanced(plan):
+            plans.append(plan)
+        else:
+            logger.warning(
+                "Invoice %s not posted: total %s != net %s + tax %s",
+                invoice.number, invoice.total_amount, invoice.net_amount, invoice.tax_amount,
+            )
+            result['unbalanced'].append(invoice.number)
+            result['skipped'] += 1
+    for start in range(0, len(plans), BATCH_SIZE):
+        batch = plans[start:start + BATCH_SIZE]
+        entries = _post_batch(batch, 'erp_invoice')
+        result['entries'].extend(entries)
+        result['skipped'] += len(batch) - len(entries)
+    result['posted'] = len(result['entries'])
+    return result
+
+
+def post_stock_receipts(receipts, settings_obj=None) -> dict:
+    """Post many stock receipts at once (see post_invoices)."""
+    settings_obj = settings_obj or FibuSettings.get_settings()
+    result = {'posted': 0, 'skipped': 0, 'entries': []}
+    if not settings_obj.auto_posting_enabled:
+        return result
+    if not (settings_obj.inventory_account and settings_obj.payable_account):
+        return result
+
+    plans = []
+    for receipt in receipts:
+        plan = _receipt_plan(receipt, settings_obj)
+        if plan is None:
+            result['skipped'] += 1
+        else:
+            plans.append(plan)
+    for start in range(0, len(plans), BATCH_SIZE):
+        batch = plans[start:start + BATCH_SIZE]
+        entries = _post_batch(batch, 'erp_stockreceipt')
+        result['entries'].extend(entries)
+        result['skipped'] += len(batch) - len(entries)
+    result['posted'] = len(result['entries'])
+    return result
+
+
+def _keyset_batches(qs, batch_size: int):
+    last_id = 0
+    while True:
+        batch = list(qs.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def post_invoice_period(date_from, date_to, batch_size: int = BATCH_SIZE) -> dict:
+    """Post all issued/paid invoices of a period that have no journal entry yet."""
+    from apps.erp.models import Invoice
+
+    settings_obj = FibuSettings.get_settings()
+    qs = Invoice.objects.filter(
+        status__in=('issued', 'paid'),
+        issue_date__gte=date_from,
+        issue_date__lte=date_to,
+        journalentry__isnull=True,
     )
+    totals = {'posted': 0, 'skipped': 0, 'unbalanced': []}
+    for batch in _keyset_batches(qs, batch_size):
+        result = post_invoices(batch, settings_obj)
+        totals['posted'] += result['posted']
+        totals['skipped'] += result['skipped']
+        totals['unbalanced'].extend(result['unbalanced'])
+    return totals
+
+
+def post_stock_receipt_period(date_from, date_to, batch_size: int = BATCH_SIZE) -> dict:
+    """Post all stock receipts of a period that have no journal entry yet."""
+    from apps.erp.models import StockReceipt
+
+    settings_obj = FibuSettings.get_settings()
+    qs = StockReceipt.objects.filter(
+        receipt_date__gte=date_from,
+        receipt_date__lte=date_to,
+        journalentry__isnull=True,
+    ).prefetch_related('items')
+    totals = {'posted': 0, 'skipped': 0}
+    for batch in _keyset_batches(qs, batch_size):
+        result = post_stock_receipts(batch, settings_obj)
+        totals['posted'] += result['posted']
+        totals['skipped'] += result['skipped']
+    return totals
+
+
+def post_invoice(invoice, settings_obj=None):
+    entries = post_invoices([invoice], settings_obj)['entries']
+    return entries[0] if entries else None
+
 
-    return entry
+def post_stock_receipt(receipt, settings_obj=None):
+    entries = post_stock_receipts([receipt], settings_obj)['entries']
+    return entries[0] if entries else None
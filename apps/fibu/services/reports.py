@@ -0,0 +1,131 @@
+from datetime import date
+from decimal import Decimal
+from django.db.models import F, Q, Sum
+from apps.fibu.models import Account, AccountPeriodBalance, CostCenter, CostCenterPeriodBalance, JournalLine
+
+ZERO = Decimal('0.00')
+
+# Income/expense accounts start every fiscal year at zero.
+BALANCE_SHEET_TYPES = ('asset', 'liability', 'equity')
+
+
+def _opening_filter(year: int, month: int) -> Q:
+    """Periods that make up the opening balance before ``year``/``month``."""
+    return Q(year__lt=year, account__account_type__in=BALANCE_SHEET_TYPES) | Q(year=year, month__lt=month)
+
+
+def trial_balance(year: int, month_from: int = 1, month_to: int = 12, include_empty: bool = False) -> dict:
+    """Opening, period debit/credit and closing balance per account, read from period balances."""
+    period = {
+        row['account_id']: row
+        for row in AccountPeriodBalance.objects.filter(year=year, month__gte=month_from, month__lte=month_to)
+        .values('account_id')
+        .annotate(debit_sum=Sum('debit'), credit_sum=Sum('credit'))
+    }
+    opening = {
+        row['account_id']: row['balance'] or ZERO
+        for row in AccountPeriodBalance.objects.filter(_opening_filter(year, month_from))
+        .values('account_id')
+        .annotate(balance=Sum(F('debit') - F('credit')))
+    }
+
+    rows = []
+    totals = {'opening': ZERO, 'debit': ZERO, 'credit': ZERO, 'closing': ZERO}
+    for account in Account.objects.order_by('code'):
+        current = period.get(account.id, {})
+        debit = current.get('debit_sum') or ZERO
+        credit = current.get('credit_sum') or ZERO
+        start = opening.get(account.id, ZERO)
+        if not include_empty and not (debit or credit or start):
+            continue
+        row = {
+            'account': account,
+            'opening': start,
+            'debit': debit,
+            'credit': credit,
+            'closing': start + debit - credit,
+        }
+        rows.append(row)
+        for key in totals:
+            totals[key] += row[key]
+    return {'year': year, 'month_from': month_from, 'month_to': month_to, 'rows': rows, 'totals': totals}
+
+
+def account_statement(account: Account, date_from: date, date_to: date) -> dict:
+    """Posted lines of one account in a date range with running balance."""
+    periods = Q(year=date_from.year, month__lt=date_from.month)
+    if account.account_type in BALANCE_SHEET_TYPES:
+        periods |= Q(year__lt=date_from.year)
+    opening = AccountPeriodBalance.objects.filter(periods, account=account).aggregate(
+        balance=Sum(F('debit') - F('credit'))
+    )['balance'] or ZERO
+    # Days of the first month before date_from are not covered by period rows.
+    head = JournalLine.objects.filter(
+        account=account,
+        entry__status='posted',
+        entry__date__gte=date_from.replace(day=1),
+        entry__date__lt=date_from,
+    ).aggregate(balance=Sum(F('debit') - F('credit')))['balance'] or ZERO
+    balance = opening + head
+
+    lines = []
+    debit_total = ZERO
+    credit_total = ZERO
+    qs = (
+        JournalLine.objects.filter(
+            account=account,
+            entry__status='posted',
+            entry__date__gte=date_from,
+            entry__date__lte=date_to,
+        )
+        .select_related('entry', 'cost_center')
+        .order_by('entry__date', 'entry_id', 'id')
+    )
+    for line in qs:
+        balance += (line.debit or ZERO) - (line.credit or ZERO)
+        debit_total += line.debit or ZERO
+        credit_total += line.credit or ZERO
+        lines.append({'line': line, 'balance': balance})
+    return {
+        'account': account,
+        'date_from': date_from,
+        'date_to': date_to,
+        'opening': opening + head,
+        'debit': debit_total,
+        'credit': credit_total,
+        'closing': balance,
+        'lines': lines,
+    }
+
+
+def cost_center_report(year: int, month_from: int = 1, month_to: int = 12) -> dict:
+    """Income, expense and result per cost center for a period."""
+    grouped = (
+        CostCenterPeriodBalance.objects.filter(year=year, month__gte=month_from, month__lte=month_to)
+        .values('cost_center_id', 'account__account_type')
+        .annotate(debit_sum=Sum('debit'), credit_sum=Sum('credit'))
+    )
+    figures = {}
+    for row in grouped:
+        entry = figures.setdefault(row['cost_center_id'], {'income': ZERO, 'expense': ZERO})
+        debit = row['debit_sum'] or ZERO
+        credit = row['credit_sum'] or ZERO
+        if row['account__account_type'] == 'income':
+            entry['income'] += credit - debit
+        elif row['account__account_type'] == 'expense':
+            entry['expense'] += debit - credit
+
+    rows = []
+    totals = {'income': ZERO, 'expense': ZERO, 'result': ZERO}
+    for center in CostCenter.objects.filter(id__in=figures.keys()).order_by('code'):
+        data = figures[center.id]
+        row = {
+            'cost_center': center,
+            'income': data['income'],
+            'expense': data['expense'],
+            'result': data['income'] - data['expense'],
+        }
+        rows.append(row)
+        for key in totals:
+            totals[key] += row[key]
+    return {'year': year, 'month_from': month_from, 'month_to': month_to, 'rows': rows, 'totals': totals}
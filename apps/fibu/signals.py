@@ -1,8 +1,9 @@
-﻿from django.db.models.signals import post_save, post_delete
+﻿from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from django.forms.models import model_to_dict
+from apps.core.services.audit import audit_snapshot
 from apps.helpdesk.helpdesk_apps.admin_panel.models import AuditLog
 from apps.fibu.models import Account, CostCenter, CostType, BusinessPartner, JournalEntry, JournalLine
+from apps.fibu.services.balances import reverse_entry_balances
 
 
 def _log(action, instance, old_values=None):
@@ -13,7 +14,7 @@ def _log(action, instance, old_values=None):
         object_id=instance.pk,
         description=f"{action} {instance.__class__.__name__}",
         old_values=old_values or {},
-        new_values=model_to_dict(instance),
+        new_values=audit_snapshot(instance),
     )
 
 
@@ -35,3 +36,9 @@ def fibu_saved(sender, instance, created, **kwargs):
 @receiver(post_delete, sender=JournalLine)
 def fibu_deleted(sender, instance, **kwargs):
     _log('deleted', instance)
+
+
+@receiver(pre_delete, sender=JournalEntry)
+def fibu_entry_deleting(sender, instance, **kwargs):
+    if instance.is_posted:
+        reverse_entry_balances(instance)
@@ -0,0 +1,31 @@
+"""
+Celery tasks for the FiBu app
+Runs CSV/DATEV imports queued by apps.fibu.services.importer and re-dispatches
+imports whose dispatch was lost
+"""
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from apps.fibu.services.importer import run_import, sweep_queued_imports
+
+logger = get_task_logger(__name__)
+
+
+@shared_task(ignore_result=True)
+def run_fibu_import(job_id):
+    """Run one queued FiBu import job (no-op when it was already claimed)."""
+    job = run_import(job_id)
+    if job is not None:
+        logger.info(
+            f"FiBu import {job.pk} {job.status}: rows={job.rows_processed} "
+            f"created={job.created_count} updated={job.updated_count} errors={job.error_count}"
+        )
+
+
+@shared_task(ignore_result=True)
+def sweep_fibu_imports():
+    """Periodic catch-up for imports that stayed queued (see FIBU_IMPORT_REDISPATCH_SECONDS)."""
+    dispatched = sweep_queued_imports()
+    if dispatched:
+        logger.info(f"FiBu import sweep: {dispatched} queued imports dispatched again")
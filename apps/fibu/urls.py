@@ -7,6 +7,9 @@ from .views import (
     AccountListView,
     AccountCreateView,
     AccountImportView,
+    JournalImportView,
+    ImportJobDetailView,
+    ImportJobErrorsView,
     CostCenterListView,
     CostCenterCreateView,
     CostTypeListView,
@@ -18,6 +21,9 @@ from .views import (
     JournalEntryDetailView,
     FibuHelpView,
     FibuSettingsView,
+    TrialBalanceView,
+    AccountStatementView,
+    CostCenterReportView,
 )
 
 app_name = 'fibu'
@@ -26,6 +32,7 @@ urlpatterns = [
     path('accounts/', AccountListView.as_view(), name='accounts'),
     path('accounts/create/', AccountCreateView.as_view(), name='account_create'),
     path('accounts/import/', AccountImportView.as_view(), name='account_import'),
+    path('accounts/<int:pk>/statement/', AccountStatementView.as_view(), name='account_statement'),
     path('cost-centers/', CostCenterListView.as_view(), name='cost_centers'),
     path('cost-centers/create/', CostCenterCreateView.as_view(), name='cost_center_create'),
     path('cost-types/', CostTypeListView.as_view(), name='cost_types'),
@@ -35,6 +42,11 @@ urlpatterns = [
     path('journal/', JournalEntryListView.as_view(), name='journal'),
     path('journal/create/', JournalEntryCreateView.as_view(), name='journal_create'),
     path('journal/<int:pk>/', JournalEntryDetailView.as_view(), name='journal_detail'),
+    path('journal/import/', JournalImportView.as_view(), name='journal_import'),
+    path('imports/<int:pk>/', ImportJobDetailView.as_view(), name='import_job'),
+    path('imports/<int:pk>/errors.csv', ImportJobErrorsView.as_view(), name='import_job_errors'),
+    path('reports/trial-balance/', TrialBalanceView.as_view(), name='trial_balance'),
+    path('reports/cost-centers/', CostCenterReportView.as_view(), name='cost_center_report'),
     path('help/', FibuHelpView.as_view(), name='help'),
     path('settings/', FibuSettingsView.as_view(), name='settings'),
     path('api/', include('apps.fibu.api.urls')),
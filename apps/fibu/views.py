@@ -1,11 +1,14 @@
 import csv
-from io import StringIO
+from datetime import date
 from django.views.generic import ListView, CreateView, DetailView, TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
-from django.shortcuts import redirect
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import redirect, get_object_or_404
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 from .models import Account, CostCenter, CostType, BusinessPartner, JournalEntry, JournalLine
 from .forms import (
     AccountForm,
@@ -17,7 +20,10 @@ from .forms import (
     FibuSettingsForm,
     AccountImportForm,
 )
-from .models import FibuSettings
+from .models import FibuSettings, FibuImportJob
+from .services.balances import post_entry, unpost_entry
+from .services.importer import create_import_job
+from .services.reports import trial_balance, account_statement, cost_center_report
 
 
 class FibuBaseView(LoginRequiredMixin):
@@ -46,6 +52,13 @@ class AccountCreateView(FibuBaseView, CreateView):
 
 class AccountImportView(FibuBaseView, TemplateView):
     template_name = 'fibu/account_import.html'
+    import_kind = 'accounts'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['import_kind'] = self.import_kind
+        context['jobs'] = FibuImportJob.objects.filter(kind=self.import_kind)[:10]
+        return context
 
     def get(self, request, *args, **kwargs):
         context = self.get_context_data(**kwargs)
@@ -56,47 +69,55 @@ class AccountImportView(FibuBaseView, TemplateView):
         form = AccountImportForm(request.POST, request.FILES)
         if not form.is_valid():
             messages.error(request, _("Bitte eine CSV-Datei auswählen."))
-            return redirect('/fibu/accounts/import/')
+            return redirect(request.path)
 
         upload = form.cleaned_data['file']
-        raw = upload.read().decode('utf-8', errors='ignore')
-        if not raw.strip():
+        if not upload.size:
             messages.error(request, _("Die Datei ist leer."))
-            return redirect('/fibu/accounts/import/')
-
-        first_line = raw.splitlines()[0] if raw.splitlines() else ''
-        delimiter = ';' if ';' in first_line else ','
-        reader = csv.DictReader(StringIO(raw), delimiter=delimiter)
-
-        created = 0
-        updated = 0
-        skipped = 0
-        allowed_types = {key for key, _ in Account.TYPES}
-
-        for row in reader:
-            code = (row.get('code') or row.get('konto') or '').strip()
-            name = (row.get('name') or row.get('bezeichnung') or '').strip()
-            if not code or not name:
-                skipped += 1
-                continue
-            account_type = (row.get('account_type') or row.get('typ') or 'expense').strip().lower()
-            if account_type not in allowed_types:
-                account_type = 'expense'
-
-            obj, created_flag = Account.objects.update_or_create(
-                code=code,
-                defaults={'name': name, 'account_type': account_type, 'is_active': True},
-            )
-            if created_flag:
-                created += 1
-            else:
-                updated += 1
-
-        messages.success(
-            request,
-            _("Import abgeschlossen: %(created)s neu, %(updated)s aktualisiert, %(skipped)s übersprungen.") % {"created": created, "updated": updated, "skipped": skipped},
-        )
-        return redirect('/fibu/accounts/')
+            return redirect(request.path)
+
+        job = create_import_job(upload, self.import_kind, request.user)
+        messages.success(request, _("Import wurde gestartet."))
+        return redirect('fibu:import_job', pk=job.pk)
+
+
+class JournalImportView(AccountImportView):
+    import_kind = 'journal'
+
+
+class ImportJobDetailView(FibuBaseView, DetailView):
+    model = FibuImportJob
+    template_name = 'fibu/import_job.html'
+    context_object_name = 'job'
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        if request.GET.get('format') == 'json':
+            job = self.object
+            return JsonResponse({
+                'status': job.status,
+                'progress': job.progress,
+                'rows_processed': job.rows_processed,
+                'created': job.created_count,
+                'updated': job.updated_count,
+                'skipped': job.skipped_count,
+                'errors': job.error_count,
+            })
+        return self.render_to_response(self.get_context_data(object=self.object))
+
+
+class ImportJobErrorsView(FibuBaseView, DetailView):
+    model = FibuImportJob
+
+    def get(self, request, *args, **kwargs):
+        job = self.get_object()
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="import-{job.pk}-fehler.csv"'
+        writer = csv.writer(response, delimiter=';')
+        writer.writerow(['zeile', 'fehler'])
+        for error in job.errors:
+            writer.writerow([error.get('line'), error.get('error')])
+        return response
 
 
 class CostCenterListView(FibuBaseView, ListView):
@@ -196,6 +217,73 @@ class JournalEntryDetailView(FibuBaseView, DetailView):
         context['line_form'] = JournalLineForm()
         return context
 
+    def post(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        try:
+            if 'post_entry' in request.POST:
+                post_entry(self.object)
+                messages.success(request, _("Buchung wurde gebucht."))
+            elif 'unpost_entry' in request.POST:
+                unpost_entry(self.object)
+                messages.success(request, _("Buchung wurde in den Entwurf zurückgesetzt."))
+        except ValidationError as exc:
+            messages.error(request, exc.messages[0])
+        return redirect('fibu:journal_detail', pk=self.object.pk)
+
+
+def _int_param(request, name, default, minimum, maximum):
+    try:
+        value = int(request.GET.get(name, default))
+    except (TypeError, ValueError):
+        return default
+    return min(max(value, minimum), maximum)
+
+
+def _date_param(request, name, default):
+    try:
+        return date.fromisoformat(request.GET.get(name) or '')
+    except ValueError:
+        return default
+
+
+class TrialBalanceView(FibuBaseView, TemplateView):
+    template_name = 'fibu/trial_balance.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        today = timezone.now().date()
+        year = _int_param(self.request, 'year', today.year, 1900, 2999)
+        month_from = _int_param(self.request, 'month_from', 1, 1, 12)
+        month_to = _int_param(self.request, 'month_to', 12, month_from, 12)
+        context['report'] = trial_balance(year, month_from, month_to)
+        return context
+
+
+class AccountStatementView(FibuBaseView, TemplateView):
+    template_name = 'fibu/account_statement.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        account = get_object_or_404(Account, pk=self.kwargs['pk'])
+        today = timezone.now().date()
+        date_from = _date_param(self.request, 'date_from', today.replace(month=1, day=1))
+        date_to = _date_param(self.request, 'date_to', today)
+        context['report'] = account_statement(account, date_from, date_to)
+        return context
+
+
+class CostCenterReportView(FibuBaseView, TemplateView):
+    template_name = 'fibu/costcenter_report.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        today = timezone.now().date()
+        year = _int_param(self.request, 'year', today.year, 1900, 2999)
+        month_from = _int_param(self.request, 'month_from', 1, 1, 12)
+        month_to = _int_param(self.request, 'month_to', 12, month_from, 12)
+        context['report'] = cost_center_report(year, month_from, month_to)
+        return context
+
 
 class FibuHelpView(FibuBaseView, TemplateView):
     template_name = 'fibu/help.html'
@@ -4,8 +4,9 @@ Bietet lokale KI-Funktionen ohne Cloud-API-Abhängigkeit
 """
 import logging
 import time
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from django.conf import settings
+from apps.core.services.ai_gateway import gateway
 
 logger = logging.getLogger(__name__)
 
@@ -44,8 +45,12 @@ class LLAMA3Service:
     def __init__(self):
         """Initialisiert den LLAMA3-Service"""
         self.model = getattr(settings, 'LLAMA3_MODEL', self.DEFAULT_MODEL)
+        # Eigener Client mit Timeout, damit ein hängender Ollama-Server nicht unbegrenzt blockiert
+        self.client = ollama.Client(
+            host=getattr(settings, 'LLAMA3_HOST', None),
+            timeout=getattr(settings, 'LLAMA3_TIMEOUT', 30),
+        ) if OLLAMA_AVAILABLE else None
         self.available = OLLAMA_AVAILABLE and self._check_ollama_service()
-        self.performance_metrics = []
 
         if self.available:
             logger.info(f"LLAMA3-Service initialisiert mit Modell: {self.model}")
@@ -59,7 +64,7 @@ class LLAMA3Service:
 
         try:
             # Teste mit einfacher Anfrage
-            ollama.list()
+            self.client.list()
             return True
         except Exception as e:
             logger.error(f"Ollama-Service nicht erreichbar: {e}")
@@ -69,13 +74,25 @@ class LLAMA3Service:
         """Prüft, ob LLAMA3-Service verfügbar ist"""
         return self.available
 
-    def _chat(self, messages: List[Dict[str, str]], temperature: float = None) -> Optional[str]:
+    def _models(self) -> List[str]:
+        """Konfiguriertes Modell, danach das Fallback-Modell"""
+        if self.model != self.FALLBACK_MODEL:
+            return [self.model, self.FALLBACK_MODEL]
+        return [self.model]
+
+    def _chat(self, messages: List[Dict[str, str]], temperature: float = None,
+              max_tokens: int = None) -> Optional[str]:
         """
         Interne Methode für Chat mit LLAMA3
 
+        Schlägt das konfigurierte Modell fehl, wird das Fallback-Modell
+        verwendet. Dauer, Tokens und Fehler landen in den Gateway-Metriken
+        (Provider 'llama3').
+
         Args:
             messages: Liste von Nachrichten mit 'role' und 'content'
             temperature: Temperatur für Antwort-Generierung
+            max_tokens: Maximale Antwortlänge (Standard: MAX_TOKENS)
 
         Returns:
             Antwort-Text oder None bei Fehler
@@ -85,50 +102,141 @@ class LLAMA3Service:
 
         temp = temperature if temperature is not None else self.DEFAULT_TEMPERATURE
 
-        try:
-            start_time = time.time()
-
-            response = ollama.chat(
-                model=self.model,
-                messages=messages,
-                options={
-                    'temperature': temp,
-                    'num_predict': self.MAX_TOKENS,
-                }
+        for model in self._models():
+            start_time = time.monotonic()
+            try:
+                response = self.client.chat(
+                    model=model,
+                    messages=messages,
+                    options={
+                        'temperature': temp,
+                        'num_predict': max_tokens or self.MAX_TOKENS,
+                    }
+                )
+            except Exception as e:
+                gateway.metrics.record('llama3', int((time.monotonic() - start_time) * 1000), error=True)
+                logger.error(f"LLAMA3-Chat-Fehler ({model}): {e}")
+                if model != self.FALLBACK_MODEL:
+                    logger.info(f"Fallback zu {self.FALLBACK_MODEL}")
+                continue
+
+            duration = time.monotonic() - start_time
+            gateway.metrics.record(
+                'llama3',
+                int(duration * 1000),
+                response.get('prompt_eval_count') or 0,
+                response.get('eval_count') or 0,
             )
+            logger.info(f"LLAMA3-Antwort in {duration:.2f}s generiert")
 
-            duration = time.time() - start_time
+            return response['message']['content'].strip()
 
-            # Performance-Metriken speichern
-            self.performance_metrics.append({
-                'timestamp': time.time(),
-                'duration': duration,
-                'model': self.model,
-                'tokens': len(response['message']['content'].split())
-            })
+        return None
 
-            # Nur letzte 100 Metriken behalten
-            if len(self.performance_metrics) > 100:
-                self.performance_metrics = self.performance_metrics[-100:]
+    def _chat_stream(self, messages: List[Dict[str, str]], temperature: float = None) -> Iterator[str]:
+        """
+        Streamt eine LLAMA3-Antwort als Text-Fragmente
 
-            logger.info(f"LLAMA3-Antwort in {duration:.2f}s generiert")
+        Schlägt das konfigurierte Modell fehl, bevor ein Fragment geliefert
+        wurde, wird das Fallback-Modell verwendet.
 
-            return response['message']['content'].strip()
+        Args:
+            messages: Liste von Nachrichten mit 'role' und 'content'
+            temperature: Temperatur für Antwort-Generierung
 
-        except Exception as e:
-            logger.error(f"LLAMA3-Chat-Fehler: {e}")
+        Yields:
+            Text-Fragmente in Generierungsreihenfolge
+        """
+        if not self.available:
+            return
 
-            # Fallback auf kleineres Modell
-            if self.model != self.FALLBACK_MODEL:
-                logger.info(f"Fallback zu {self.FALLBACK_MODEL}")
-                old_model = self.model
-                self.model = self.FALLBACK_MODEL
-                result = self._chat(messages, temperature)
-                self.model = old_model  # Zurücksetzen
-                return result
+        temp = temperature if temperature is not None else self.DEFAULT_TEMPERATURE
+
+        for model in self._models():
+            start_time = time.monotonic()
+            first_token_ms = None
+            usage = {}
+            try:
+                for part in self.client.chat(
+                    model=model,
+                    messages=messages,
+                    options={
+                        'temperature': temp,
+                        'num_predict': self.MAX_TOKENS,
+                    },
+                    stream=True,
+                ):
+                    if part.get('done'):
+                        usage = part
+                    text = part['message']['content']
+                    if not text:
+                        continue
+                    if first_token_ms is None:
+                        first_token_ms = int((time.monotonic() - start_time) * 1000)
+                    yield text
+            except Exception as e:
+                gateway.metrics.record('llama3', int((time.monotonic() - start_time) * 1000), error=True)
+                logger.error(f"LLAMA3-Stream-Fehler ({model}): {e}")
+                if first_token_ms is not None:
+                    raise
+                continue
+
+            duration = time.monotonic() - start_time
+            gateway.metrics.record(
+                'llama3',
+                int(duration * 1000),
+                usage.get('prompt_eval_count') or 0,
+                usage.get('eval_count') or 0,
+                first_token_ms=first_token_ms,
+            )
+            logger.info(f"LLAMA3-Stream in {duration:.2f}s (erstes Token nach {(first_token_ms or 0) / 1000:.2f}s)")
+            return
+
+    def complete(self, prompt: str, system: str = None, max_tokens: int = None) -> Optional[str]:
+        """
+        Deterministische Einzelanfrage (Temperatur 0), z. B. für strukturierte Antworten
+
+        Args:
+            prompt: Anfrage
+            system: Optionaler System-Prompt
+            max_tokens: Maximale Antwortlänge
+
+        Returns:
+            Antwort-Text oder None bei Fehler
+        """
+        messages = [{'role': 'system', 'content': system}] if system else []
+        messages.append({'role': 'user', 'content': prompt})
+        return self._chat(messages, temperature=0.0, max_tokens=max_tokens)
+
+    def embed(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """
+        Berechnet Embeddings lokal mit dem Ollama-Embedding-Modell
+
+        Args:
+            texts: Texte (ein Vektor je Text)
 
+        Returns:
+            Liste der Vektoren oder None bei Fehler
+        """
+        if not self.available or not texts:
             return None
 
+        model = getattr(settings, 'HELPDESK_EMBEDDING_MODEL', 'nomic-embed-text')
+        start_time = time.monotonic()
+        try:
+            response = self.client.embed(model=model, input=texts)
+        except Exception as e:
+            gateway.metrics.record('llama3', int((time.monotonic() - start_time) * 1000), error=True)
+            logger.error(f"LLAMA3-Embedding fehlgeschlagen ({model}): {e}")
+            return None
+
+        gateway.metrics.record(
+            'llama3',
+            int((time.monotonic() - start_time) * 1000),
+            input_tokens=response.get('prompt_eval_count') or 0,
+        )
+        return response['embeddings']
+
     def categorize_ticket(self, title: str, description: str) -> Tuple[Optional[str], Optional[float]]:
         """
         Kategorisiert ein Ticket automatisch mit LLAMA3
@@ -309,6 +417,28 @@ Beschreibung: {description}"""
         if not self.available:
             return None
 
+        response = self._chat(self._chat_messages(message, context), temperature=0.7)  # Höher für natürlichere Antworten
+
+        if response:
+            logger.info(f"Chat-Antwort generiert: {len(response)} Zeichen")
+
+        return response
+
+    def stream_chat_response(self, message: str, context: List[Dict[str, str]] = None) -> Iterator[str]:
+        """
+        Streamt Chat-Antwort mit LLAMA3 als Text-Fragmente
+
+        Args:
+            message: Benutzer-Nachricht
+            context: Optional vorherige Nachrichten für Kontext
+
+        Yields:
+            Text-Fragmente der KI-Antwort
+        """
+        return self._chat_stream(self._chat_messages(message, context), temperature=0.7)
+
+    def _chat_messages(self, message: str, context: List[Dict[str, str]] = None) -> List[Dict[str, str]]:
+        """Baut System-Prompt, Kontext und Benutzer-Nachricht für Chat-Antworten zusammen"""
         system_prompt = """Sie sind ein freundlicher Support-Agent.
 
 RICHTLINIEN:
@@ -326,13 +456,7 @@ Beginnen Sie mit einer freundlichen Begrüßung."""
             messages.extend(context[-5:])  # Letzte 5 Nachrichten
 
         messages.append({'role': 'user', 'content': message})
-
-        response = self._chat(messages, temperature=0.7)  # Höher für natürlichere Antworten
-
-        if response:
-            logger.info(f"Chat-Antwort generiert: {len(response)} Zeichen")
-
-        return response
+        return messages
 
     def analyze_ticket_sentiment(self, text: str) -> Tuple[Optional[str], Optional[float]]:
         """
@@ -380,26 +504,17 @@ Beispiel: negative 7"""
         Gibt Performance-Statistiken zurück
 
         Returns:
-            Dictionary mit Performance-Metriken
+            Dictionary mit Performance-Metriken aus den Gateway-Metriken
         """
-        if not self.performance_metrics:
-            return {
-                'available': self.available,
-                'total_requests': 0,
-                'avg_response_time': 0,
-                'model': self.model
-            }
-
-        avg_duration = sum(m['duration'] for m in self.performance_metrics) / len(self.performance_metrics)
-        avg_tokens = sum(m['tokens'] for m in self.performance_metrics) / len(self.performance_metrics)
+        metrics = gateway.metrics.snapshot().get('llama3', {})
+        avg_latency_ms = metrics.get('avg_latency_ms')
 
         return {
             'available': self.available,
             'model': self.model,
-            'total_requests': len(self.performance_metrics),
-            'avg_response_time': round(avg_duration, 2),
-            'avg_tokens': round(avg_tokens, 1),
-            'last_request': self.performance_metrics[-1]['timestamp'] if self.performance_metrics else None
+            'total_requests': metrics.get('calls', 0),
+            'avg_response_time': round(avg_latency_ms / 1000, 2) if avg_latency_ms else 0,
+            **metrics,
         }
 
 
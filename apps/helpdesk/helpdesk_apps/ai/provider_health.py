@@ -0,0 +1,147 @@
+"""
+Provider-Zustand für den Unified AI Service
+
+Je Provider werden Latenz (EWMA und p95 über ein gleitendes Fenster) und
+Fehlerquote erfasst. Ein Circuit Breaker nimmt Provider mit hoher Fehlerquote
+für AI_BREAKER_OPEN_SECONDS aus der Auswahl; danach darf genau ein Testaufruf
+entscheiden, ob der Provider wieder verwendet wird.
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ProviderHealth:
+    """Thread-sichere Latenz- und Fehlerstatistik mit Circuit Breaker je Provider"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providers = {}
+
+    def _entry(self, provider: str) -> Dict:
+        entry = self._providers.get(provider)
+        if entry is None:
+            window = getattr(settings, 'AI_HEALTH_WINDOW', 50)
+            entry = self._providers[provider] = {
+                'state': CLOSED,
+                'opened_at': 0.0,
+                'trial_running': False,
+                'ewma_ms': None,
+                'latencies': deque(maxlen=window),
+                'outcomes': deque(maxlen=window),
+                'calls': 0,
+                'errors': 0,
+            }
+        return entry
+
+    def _cooled_down(self, entry: Dict) -> bool:
+        return time.monotonic() - entry['opened_at'] >= getattr(settings, 'AI_BREAKER_OPEN_SECONDS', 30)
+
+    def _usable(self, entry: Dict) -> bool:
+        if entry['state'] == OPEN:
+            return self._cooled_down(entry)
+        if entry['state'] == HALF_OPEN:
+            return not entry['trial_running']
+        return True
+
+    def allow(self, provider: str) -> bool:
+        """
+        Prüft, ob ein Aufruf erlaubt ist; nach Ablauf der Sperrzeit wird der
+        Aufruf als einziger Testaufruf (half-open) registriert.
+        """
+        with self._lock:
+            entry = self._entry(provider)
+            if not self._usable(entry):
+                return False
+            if entry['state'] != CLOSED:
+                entry['state'] = HALF_OPEN
+                entry['trial_running'] = True
+            return True
+
+    def record(self, provider: str, latency_ms: int, ok: bool):
+        """Erfasst Dauer und Ergebnis eines Aufrufs und schaltet den Breaker"""
+        alpha = getattr(settings, 'AI_HEALTH_EWMA_ALPHA', 0.2)
+        with self._lock:
+            entry = self._entry(provider)
+            entry['calls'] += 1
+            if not ok:
+                entry['errors'] += 1
+            entry['ewma_ms'] = latency_ms if entry['ewma_ms'] is None else (
+                alpha * latency_ms + (1 - alpha) * entry['ewma_ms']
+            )
+            entry['latencies'].append(latency_ms)
+            entry['outcomes'].append(ok)
+
+            if entry['state'] == HALF_OPEN:
+                entry['trial_running'] = False
+                if ok:
+                    entry['state'] = CLOSED
+                    entry['outcomes'].clear()
+                else:
+                    entry['state'] = OPEN
+                    entry['opened_at'] = time.monotonic()
+            elif entry['state'] == CLOSED and not ok and self._error_rate_exceeded(entry):
+                entry['state'] = OPEN
+                entry['opened_at'] = time.monotonic()
+
+    def _error_rate_exceeded(self, entry: Dict) -> bool:
+        outcomes = entry['outcomes']
+        if len(outcomes) < getattr(settings, 'AI_BREAKER_MIN_CALLS', 5):
+            return False
+        failures = sum(1 for ok in outcomes if not ok)
+        return failures / len(outcomes) >= getattr(settings, 'AI_BREAKER_ERROR_RATE', 0.5)
+
+    @staticmethod
+    def _p95(entry: Dict) -> Optional[int]:
+        latencies = sorted(entry['latencies'])
+        return latencies[int(0.95 * (len(latencies) - 1))] if latencies else None
+
+    def order(self, providers: List[str]) -> List[str]:
+        """
+        Nutzbare Provider in Aufruf-Reihenfolge
+
+        Provider mit offenem Breaker entfallen. Bei AI_ROUTING_BY_LATENCY wird
+        nach beobachteter p95-Latenz sortiert; Provider mit weniger als
+        AI_BREAKER_MIN_CALLS Messungen kommen zuerst, damit sie gemessen
+        werden. Gleichstände behalten die übergebene Präferenz-Reihenfolge.
+        """
+        by_latency = getattr(settings, 'AI_ROUTING_BY_LATENCY', True)
+        min_samples = getattr(settings, 'AI_BREAKER_MIN_CALLS', 5)
+        with self._lock:
+            usable = []
+            for provider in providers:
+                entry = self._entry(provider)
+                if not self._usable(entry):
+                    continue
+                p95 = self._p95(entry) if len(entry['latencies']) >= min_samples else None
+                usable.append((provider, p95 or 0))
+        if by_latency:
+            usable.sort(key=lambda item: item[1])
+        return [provider for provider, _p95 in usable]
+
+    def snapshot(self) -> Dict:
+        """Zustand, Fehlerquote und Latenzen je Provider"""
+        with self._lock:
+            result = {}
+            for provider, entry in self._providers.items():
+                outcomes = entry['outcomes']
+                result[provider] = {
+                    'state': entry['state'],
+                    'calls': entry['calls'],
+                    'errors': entry['errors'],
+                    'error_rate': round(sum(1 for ok in outcomes if not ok) / len(outcomes), 3) if outcomes else 0.0,
+                    'ewma_latency_ms': round(entry['ewma_ms']) if entry['ewma_ms'] is not None else None,
+                    'p95_latency_ms': self._p95(entry),
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._providers.clear()
@@ -1,10 +1,19 @@
 """
 Vereinheitlichter KI-Service mit Fallback-Mechanismus
 Unterstützt: LLAMA3 (lokal), Claude (API), OpenAI (API)
+
+Die Provider-Reihenfolge folgt der beobachteten Latenz; Provider mit hoher
+Fehlerquote werden per Circuit Breaker übersprungen, und optional wird nach
+AI_HEDGE_AFTER_MS parallel der nächste Provider angefragt.
 """
 import logging
-from typing import Dict, List, Optional, Tuple
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from django.conf import settings
+from apps.core.services.ai_gateway import gateway
+from .provider_health import ProviderHealth
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +37,29 @@ try:
 except ImportError:
     OPENAI_AVAILABLE = False
 
+CHAT_SYSTEM_PROMPT = """Sie sind ein freundlicher Support-Agent. Antworten Sie auf Deutsch mit förmlicher Sie-Anrede,
+kurz und präzise. Bei komplexen Problemen empfehlen Sie einen menschlichen Agent."""
+
+_hedge_executor = None
+_hedge_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    """Gemeinsamer Thread-Pool für gehedgte Anfragen (nur Netzwerk, kein DB-Zugriff)"""
+    global _hedge_executor
+    with _hedge_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'AI_HEDGE_WORKERS', 8),
+                thread_name_prefix='ai-hedge',
+            )
+        return _hedge_executor
+
+
+def _if_first(result):
+    """Tupel-Ergebnis nur zurückgeben, wenn der erste Wert gesetzt ist"""
+    return result if result and result[0] else None
+
 
 class UnifiedAIService:
     """
@@ -50,18 +82,9 @@ class UnifiedAIService:
             'openai': OPENAI_AVAILABLE
         }
 
-        # Claude-Client
-        if CLAUDE_AVAILABLE:
-            self.claude_client = anthropic.Anthropic(api_key=settings.CLAUDE_API_KEY)
-        else:
-            self.claude_client = None
-
-        # OpenAI-Client
-        if OPENAI_AVAILABLE:
-            openai.api_key = settings.OPENAI_API_KEY
-            self.openai_client = openai
-        else:
-            self.openai_client = None
+        # Claude-/OpenAI-Clients werden prozessweit vom AI-Gateway geteilt
+        self.claude_client = gateway.anthropic_client() if CLAUDE_AVAILABLE else None
+        self.openai_client = gateway.openai_client() if OPENAI_AVAILABLE else None
 
         # Statistiken
         self.usage_stats = {
@@ -70,6 +93,7 @@ class UnifiedAIService:
             'openai': 0,
             'failures': 0
         }
+        self.health = ProviderHealth()
 
         logger.info(f"Unified AI Service initialisiert - Provider: {self.providers}")
 
@@ -97,6 +121,81 @@ class UnifiedAIService:
 
         return providers
 
+    def _provider_order(self) -> List[str]:
+        """Verfügbare Provider mit Client, nach Gesundheit und Latenz sortiert"""
+        providers = [
+            provider for provider in self._get_provider_priority()
+            if (provider != 'claude' or self.claude_client) and (provider != 'openai' or self.openai_client)
+        ]
+        return self.health.order(providers)
+
+    def _attempt(self, provider: str, call: Callable):
+        """Führt einen Provider-Aufruf aus und erfasst Dauer und Erfolg"""
+        started = time.monotonic()
+        result = None
+        try:
+            result = call()
+        except Exception as e:
+            logger.error(f"Fehler bei {provider}: {e}")
+        finally:
+            self.health.record(provider, int((time.monotonic() - started) * 1000), bool(result))
+        return result
+
+    def _hedged(self, provider: str, call: Callable, candidates: List[str], attempts: Dict[str, Callable],
+                hedge_after: float):
+        """
+        Startet den Aufruf und fragt nach ``hedge_after`` Sekunden zusätzlich
+        den nächsten erlaubten Provider an; das erste brauchbare Ergebnis gewinnt.
+        """
+        primary = _executor().submit(self._attempt, provider, call)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result(), provider
+
+        futures = {primary: provider}
+        while candidates:
+            backup = candidates.pop(0)
+            if self.health.allow(backup):
+                logger.info(f"{provider} antwortet nicht innerhalb von {hedge_after:.1f}s, frage zusätzlich {backup} an")
+                futures[_executor().submit(self._attempt, backup, attempts[backup])] = backup
+                break
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result():
+                    return future.result(), futures[future]
+        return None, provider
+
+    def _route(self, attempts: Dict[str, Callable]) -> Tuple[Optional[object], str]:
+        """
+        Ruft die Provider in Routing-Reihenfolge auf, bis einer ein Ergebnis liefert
+
+        Args:
+            attempts: Provider -> Aufruf, der ein Ergebnis oder None liefert
+
+        Returns:
+            Tuple (Ergebnis, Provider) oder (None, 'none')
+        """
+        candidates = [provider for provider in self._provider_order() if provider in attempts]
+        hedge_after = getattr(settings, 'AI_HEDGE_AFTER_MS', 0) / 1000
+
+        while candidates:
+            provider = candidates.pop(0)
+            if not self.health.allow(provider):
+                continue
+            if hedge_after > 0 and candidates:
+                result, provider = self._hedged(provider, attempts[provider], candidates, attempts, hedge_after)
+            else:
+                result = self._attempt(provider, attempts[provider])
+            if result:
+                self.usage_stats[provider] += 1
+                return result, provider
+
+        self.usage_stats['failures'] += 1
+        return None, 'none'
+
     def categorize_ticket(self, title: str, description: str) -> Tuple[Optional[str], Optional[float], str]:
         """
         Kategorisiert Ticket mit Fallback-Mechanismus
@@ -108,35 +207,16 @@ class UnifiedAIService:
         Returns:
             Tuple (Kategorie, Konfidenz, Provider)
         """
-        for provider in self._get_provider_priority():
-            try:
-                if provider == 'llama3':
-                    category, confidence = llama3_service.categorize_ticket(title, description)
-                    if category:
-                        self.usage_stats['llama3'] += 1
-                        logger.info(f"Ticket kategorisiert mit LLAMA3: {category}")
-                        return category, confidence, 'llama3'
-
-                elif provider == 'claude' and self.claude_client:
-                    category, confidence = self._categorize_with_claude(title, description)
-                    if category:
-                        self.usage_stats['claude'] += 1
-                        logger.info(f"Ticket kategorisiert mit Claude: {category}")
-                        return category, confidence, 'claude'
-
-                elif provider == 'openai' and self.openai_client:
-                    category, confidence = self._categorize_with_openai(title, description)
-                    if category:
-                        self.usage_stats['openai'] += 1
-                        logger.info(f"Ticket kategorisiert mit OpenAI: {category}")
-                        return category, confidence, 'openai'
-
-            except Exception as e:
-                logger.error(f"Fehler bei {provider} Kategorisierung: {e}")
-                continue
-
-        self.usage_stats['failures'] += 1
-        return None, None, 'none'
+        result, provider = self._route({
+            'llama3': lambda: _if_first(llama3_service.categorize_ticket(title, description)),
+            'claude': lambda: _if_first(self._categorize_with_claude(title, description)),
+            'openai': lambda: _if_first(self._categorize_with_openai(title, description)),
+        })
+        if result is None:
+            return None, None, 'none'
+        category, confidence = result
+        logger.info(f"Ticket kategorisiert mit {provider}: {category}")
+        return category, confidence, provider
 
     def _categorize_with_claude(self, title: str, description: str) -> Tuple[Optional[str], Optional[float]]:
         """Kategorisiert mit Claude API"""
@@ -149,12 +229,12 @@ Beschreibung: {description}
 Antworte NUR mit dem exakten Namen der Kategorie."""
 
         try:
-            message = self.claude_client.messages.create(
+            category = gateway.anthropic_message(
                 model="claude-3-haiku-20240307",
                 max_tokens=100,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            category = message.content[0].text.strip()
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.0,
+            ).strip()
             return category, 0.9
         except Exception as e:
             logger.error(f"Claude API Fehler: {e}")
@@ -171,13 +251,12 @@ Beschreibung: {description}
 Antworte NUR mit dem exakten Namen der Kategorie."""
 
         try:
-            response = self.openai_client.ChatCompletion.create(
+            category = gateway.openai_chat(
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=50,
                 temperature=0.1
-            )
-            category = response.choices[0].message.content.strip()
+            ).strip()
             return category, 0.9
         except Exception as e:
             logger.error(f"OpenAI API Fehler: {e}")
@@ -194,31 +273,15 @@ Antworte NUR mit dem exakten Namen der Kategorie."""
         Returns:
             Tuple (Priorität, Begründung, Provider)
         """
-        for provider in self._get_provider_priority():
-            try:
-                if provider == 'llama3':
-                    priority, reason = llama3_service.suggest_priority(title, description)
-                    if priority:
-                        self.usage_stats['llama3'] += 1
-                        return priority, reason, 'llama3'
-
-                elif provider == 'claude' and self.claude_client:
-                    priority, reason = self._suggest_priority_claude(title, description)
-                    if priority:
-                        self.usage_stats['claude'] += 1
-                        return priority, reason, 'claude'
-
-                elif provider == 'openai' and self.openai_client:
-                    priority, reason = self._suggest_priority_openai(title, description)
-                    if priority:
-                        self.usage_stats['openai'] += 1
-                        return priority, reason, 'openai'
-
-            except Exception as e:
-                logger.error(f"Fehler bei {provider} Prioritäts-Vorschlag: {e}")
-                continue
-
-        return None, None, 'none'
+        result, provider = self._route({
+            'llama3': lambda: _if_first(llama3_service.suggest_priority(title, description)),
+            'claude': lambda: _if_first(self._suggest_priority_claude(title, description)),
+            'openai': lambda: _if_first(self._suggest_priority_openai(title, description)),
+        })
+        if result is None:
+            return None, None, 'none'
+        priority, reason = result
+        return priority, reason, provider
 
     def _suggest_priority_claude(self, title: str, description: str) -> Tuple[Optional[str], Optional[str]]:
         """Priorität mit Claude"""
@@ -231,12 +294,12 @@ Format: Priorität: [wert]
 Begründung: [kurze Erklärung]"""
 
         try:
-            message = self.claude_client.messages.create(
+            response = gateway.anthropic_message(
                 model="claude-3-haiku-20240307",
                 max_tokens=200,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            response = message.content[0].text.strip()
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.0,
+            ).strip()
             # Parse response
             lines = response.split('\n')
             priority = None
@@ -262,13 +325,12 @@ Format: Priorität: [wert]
 Begründung: [kurze Erklärung]"""
 
         try:
-            response = self.openai_client.ChatCompletion.create(
+            text = gateway.openai_chat(
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=150,
                 temperature=0.2
-            )
-            text = response.choices[0].message.content.strip()
+            ).strip()
             # Parse response
             lines = text.split('\n')
             priority = None
@@ -294,37 +356,93 @@ Begründung: [kurze Erklärung]"""
         Returns:
             Tuple (Antwort, Provider)
         """
-        for provider in self._get_provider_priority():
-            try:
-                if provider == 'llama3':
-                    response = llama3_service.generate_chat_response(message, context)
-                    if response:
-                        self.usage_stats['llama3'] += 1
-                        return response, 'llama3'
-
-                elif provider == 'claude' and self.claude_client:
-                    response = self._chat_with_claude(message, context)
-                    if response:
-                        self.usage_stats['claude'] += 1
-                        return response, 'claude'
-
-                elif provider == 'openai' and self.openai_client:
-                    response = self._chat_with_openai(message, context)
-                    if response:
-                        self.usage_stats['openai'] += 1
-                        return response, 'openai'
+        return self._route({
+            'llama3': lambda: llama3_service.generate_chat_response(message, context),
+            'claude': lambda: self._chat_with_claude(message, context),
+            'openai': lambda: self._chat_with_openai(message, context),
+        })
 
-            except Exception as e:
-                logger.error(f"Fehler bei {provider} Chat-Response: {e}")
-                continue
+    def complete(self, prompt: str, system: str = None, max_tokens: int = 1024) -> Tuple[Optional[str], str]:
+        """
+        Deterministische Einzelanfrage (Temperatur 0) mit Fallback, z. B. für JSON-Antworten
 
-        return None, 'none'
+        Args:
+            prompt: Anfrage
+            system: Optionaler System-Prompt
+            max_tokens: Maximale Antwortlänge
 
-    def _chat_with_claude(self, message: str, context: List[Dict] = None) -> Optional[str]:
-        """Chat mit Claude API"""
-        system_prompt = """Sie sind ein freundlicher Support-Agent. Antworten Sie auf Deutsch mit förmlicher Sie-Anrede,
-kurz und präzise. Bei komplexen Problemen empfehlen Sie einen menschlichen Agent."""
+        Returns:
+            Tuple (Antwort, Provider)
+        """
+        messages = [{"role": "user", "content": prompt}]
+        openai_messages = ([{"role": "system", "content": system}] if system else []) + messages
+        return self._route({
+            'llama3': lambda: llama3_service.complete(prompt, system=system, max_tokens=max_tokens),
+            'claude': lambda: gateway.anthropic_message(
+                model="claude-3-haiku-20240307",
+                max_tokens=max_tokens,
+                system=system,
+                messages=messages,
+                temperature=0.0,
+            ),
+            'openai': lambda: gateway.openai_chat(
+                model="gpt-3.5-turbo",
+                messages=openai_messages,
+                max_tokens=max_tokens,
+                temperature=0.0,
+            ),
+        })
+
+    def stream_chat_response(self, message: str, context: List[Dict] = None) -> Iterator[Tuple[str, str]]:
+        """
+        Streamt Chat-Antwort mit Fallback
+
+        Fällt ein Provider aus, bevor er ein Fragment geliefert hat, wird der
+        nächste versucht; ein Abbruch mitten in der Antwort wird weitergereicht.
+        OpenAI liefert die Antwort als ein einzelnes Fragment.
+
+        Args:
+            message: Benutzer-Nachricht
+            context: Chat-Kontext
+
+        Yields:
+            Tupel (Provider, Text-Fragment)
+        """
+        for provider in self._provider_order():
+            if not self.health.allow(provider):
+                continue
+            if provider == 'llama3':
+                deltas = llama3_service.stream_chat_response(message, context)
+            elif provider == 'claude':
+                deltas = self._stream_with_claude(message, context)
+            else:
+                deltas = iter([self._chat_with_openai(message, context)])
+
+            started = time.monotonic()
+            emitted = failed = False
+            try:
+                for delta in deltas:
+                    if not delta:
+                        continue
+                    emitted = True
+                    yield provider, delta
+            except Exception as e:
+                failed = True
+                logger.error(f"Fehler bei {provider} Chat-Stream: {e}")
+                if emitted:
+                    raise
+            finally:
+                # Auch vom Aufrufer abgebrochene Streams beenden einen half-open Testaufruf
+                self.health.record(provider, int((time.monotonic() - started) * 1000), emitted and not failed)
+
+            if emitted:
+                self.usage_stats[provider] += 1
+                return
+
+        self.usage_stats['failures'] += 1
 
+    def _chat_messages(self, message: str, context: List[Dict] = None) -> List[Dict]:
+        """Kontext (letzte 5 Nachrichten) und Benutzer-Nachricht im Messages-Format"""
         messages = []
         if context:
             for msg in context[-5:]:
@@ -333,41 +451,43 @@ kurz und präzise. Bei komplexen Problemen empfehlen Sie einen menschlichen Agen
                     "content": msg.get('message', msg.get('content', ''))
                 })
         messages.append({"role": "user", "content": message})
+        return messages
 
+    def _chat_with_claude(self, message: str, context: List[Dict] = None) -> Optional[str]:
+        """Chat mit Claude API"""
         try:
-            response = self.claude_client.messages.create(
+            return gateway.anthropic_message(
                 model="claude-3-haiku-20240307",
                 max_tokens=256,
-                system=system_prompt,
-                messages=messages
-            )
-            return response.content[0].text.strip()
+                system=CHAT_SYSTEM_PROMPT,
+                messages=self._chat_messages(message, context),
+                cache=False,
+            ).strip()
         except Exception as e:
             logger.error(f"Claude Chat Error: {e}")
             return None
 
+    def _stream_with_claude(self, message: str, context: List[Dict] = None) -> Iterator[str]:
+        """Streamt Chat mit Claude API"""
+        return gateway.stream_anthropic(
+            model="claude-3-haiku-20240307",
+            max_tokens=256,
+            system=CHAT_SYSTEM_PROMPT,
+            messages=self._chat_messages(message, context),
+        )
+
     def _chat_with_openai(self, message: str, context: List[Dict] = None) -> Optional[str]:
         """Chat mit OpenAI API"""
-        system_prompt = """Sie sind ein freundlicher Support-Agent. Antworten Sie auf Deutsch mit förmlicher Sie-Anrede,
-kurz und präzise. Bei komplexen Problemen empfehlen Sie einen menschlichen Agent."""
-
-        messages = [{"role": "system", "content": system_prompt}]
-        if context:
-            for msg in context[-5:]:
-                messages.append({
-                    "role": "assistant" if not msg.get('is_from_visitor') else "user",
-                    "content": msg.get('message', msg.get('content', ''))
-                })
-        messages.append({"role": "user", "content": message})
+        messages = [{"role": "system", "content": CHAT_SYSTEM_PROMPT}] + self._chat_messages(message, context)
 
         try:
-            response = self.openai_client.ChatCompletion.create(
+            return gateway.openai_chat(
                 model="gpt-3.5-turbo",
                 messages=messages,
                 max_tokens=512,
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
+                temperature=0.7,
+                cache=False,
+            ).strip()
         except Exception as e:
             logger.error(f"OpenAI Chat Error: {e}")
             return None
@@ -390,6 +510,12 @@ kurz und präzise. Bei komplexen Problemen empfehlen Sie einen menschlichen Agen
                 if count > 0
             }
 
+        # Breaker-Zustand, Fehlerquote und Latenz je Provider
+        stats['health'] = self.health.snapshot()
+
+        # Latenz, Tokens und Cache-Treffer aller Provider (inkl. LLAMA3)
+        stats['gateway'] = gateway.stats()
+
         # LLAMA3-spezifische Stats
         if LLAMA3_AVAILABLE:
             stats['llama3_performance'] = llama3_service.get_performance_stats()
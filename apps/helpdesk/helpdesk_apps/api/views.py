@@ -21,6 +21,8 @@ from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from drf_spectacular.utils import extend_schema, OpenApiExample
 
+from apps.core.eager_loading import EagerLoadingMixin
+from apps.core.pagination import COUNT_PARAM, CURSOR_PARAM, EstimatedCountPaginator, KeysetPagination
 from apps.helpdesk.helpdesk_apps.tickets.models import Ticket, TicketComment, Category
 from apps.helpdesk.helpdesk_apps.knowledge.models import KnowledgeArticle
 from .serializers import (
@@ -191,7 +193,7 @@ class AuthViewSet(viewsets.ViewSet):
             )
 
 
-class TicketViewSet(viewsets.ModelViewSet, LicenseValidationMixin):
+class TicketViewSet(EagerLoadingMixin, viewsets.ModelViewSet, LicenseValidationMixin):
     """Ticket management API endpoints"""
 
     authentication_classes = [TokenAuthentication]
@@ -227,12 +229,14 @@ class TicketViewSet(viewsets.ModelViewSet, LicenseValidationMixin):
         List tickets
         GET /api/v1/tickets/
         Query params: ?status=open&priority=high&page=1
+        Keyset-Paginierung: ?cursor= (danach Link aus "next"), optional &count=exact|estimate
         """
         is_valid, error_response = self.validate_license(request)
         if not is_valid:
             return error_response
 
-        queryset = self.get_queryset()
+        # Lädt Ersteller, Bearbeiter, Kategorie und Kommentare seitenweise vor
+        queryset = self.filter_queryset(self.get_queryset())
 
         # Filter by status
         status_filter = request.query_params.get('status')
@@ -249,9 +253,23 @@ class TicketViewSet(viewsets.ModelViewSet, LicenseValidationMixin):
         if assigned_to and request.user.role == 'admin':
             queryset = queryset.filter(assigned_to_id=assigned_to)
 
+        # Keyset-Paginierung ohne OFFSET und ohne COUNT(*) (nur auf Anfrage)
+        if CURSOR_PARAM in request.query_params:
+            keyset = KeysetPagination()
+            keyset.page_size = 20
+            tickets = keyset.paginate_queryset(queryset, request, view=self)
+            data = {
+                'tickets': self.serializer_class(tickets, many=True).data,
+                'next': keyset.get_next_link(),
+            }
+            if keyset.count is not None:
+                data['total'] = keyset.count
+            return Response(data)
+
         # Pagination
         page = request.query_params.get('page', 1)
-        paginator = Paginator(queryset, 20)
+        paginator_class = EstimatedCountPaginator if request.query_params.get(COUNT_PARAM) == 'estimate' else Paginator
+        paginator = paginator_class(queryset, 20)
         page_obj = paginator.get_page(page)
 
         serializer = self.serializer_class(page_obj.object_list, many=True)
@@ -272,7 +290,7 @@ class TicketViewSet(viewsets.ModelViewSet, LicenseValidationMixin):
             return error_response
 
         try:
-            ticket = self.get_queryset().get(pk=pk)
+            ticket = self.filter_queryset(self.get_queryset()).get(pk=pk)
             serializer = self.serializer_class(ticket)
             return Response(serializer.data)
         except Ticket.DoesNotExist:
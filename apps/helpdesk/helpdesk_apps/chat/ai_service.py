@@ -3,8 +3,10 @@ import logging
 import requests
 from django.conf import settings
 from django.db.models import Q
+from django.utils.html import strip_tags
 from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
 from apps.helpdesk.helpdesk_apps.knowledge.models import KnowledgeArticle
+from apps.helpdesk.helpdesk_apps.knowledge.semantic import similar_articles
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +49,8 @@ class AIService:
         if not self.is_ai_enabled():
             return None
 
+        knowledge = self._knowledge_context(message)
+
         # PRIORITY 1: LLAMA3 lokale KI (wenn aktiviert und verfügbar)
         if self.use_llama3 and UNIFIED_AI_AVAILABLE:
             try:
@@ -62,7 +66,8 @@ class AIService:
                             'is_from_visitor': msg.is_from_visitor
                         })
 
-                response, provider = unified_ai_service.generate_chat_response(message, context)
+                prompt = f"{knowledge}\n\nKundenanfrage: {message}" if knowledge else message
+                response, provider = unified_ai_service.generate_chat_response(prompt, context)
                 if response:
                     logger.info(f"LLAMA3 response generated (provider: {provider})")
                     return response
@@ -74,21 +79,21 @@ class AIService:
         # PRIORITY 2: Cloud APIs (ChatGPT/Claude)
         try:
             if self.system_settings.ai_provider == 'chatgpt':
-                response = self._get_chatgpt_response(message, chat_history)
+                response = self._get_chatgpt_response(message, chat_history, knowledge)
                 if response:
                     return response
                 # Fallback to Claude if ChatGPT fails
                 logger.warning("ChatGPT failed, falling back to Claude")
-                response = self._get_claude_response(message, chat_history)
+                response = self._get_claude_response(message, chat_history, knowledge)
                 if response:
                     return response
             elif self.system_settings.ai_provider == 'claude':
-                response = self._get_claude_response(message, chat_history)
+                response = self._get_claude_response(message, chat_history, knowledge)
                 if response:
                     return response
                 # Fallback to ChatGPT if Claude fails
                 logger.warning("Claude failed, falling back to ChatGPT")
-                response = self._get_chatgpt_response(message, chat_history)
+                response = self._get_chatgpt_response(message, chat_history, knowledge)
                 if response:
                     return response
         except Exception as e:
@@ -119,7 +124,7 @@ Entschuldigung, unser KI-System ist momentan nicht verfügbar.
 
 Bitte beschreiben Sie Ihr Problem weiter - ein menschlicher Agent übernimmt sofort! 🚀"""
     
-    def _get_chatgpt_response(self, message, chat_history=None):
+    def _get_chatgpt_response(self, message, chat_history=None, knowledge=""):
         """Get response from OpenAI ChatGPT"""
         if not self.system_settings.openai_api_key:
             logger.warning("OpenAI API key not configured")
@@ -134,7 +139,7 @@ Bitte beschreiben Sie Ihr Problem weiter - ein menschlicher Agent übernimmt sof
         messages = [
             {
                 "role": "system",
-                "content": self._get_system_prompt()
+                "content": self._get_system_prompt(knowledge)
             }
         ]
         
@@ -180,16 +185,16 @@ Bitte beschreiben Sie Ihr Problem weiter - ein menschlicher Agent übernimmt sof
         
         return None
     
-    def _get_claude_response(self, message, chat_history=None):
+    def _get_claude_response(self, message, chat_history=None, knowledge=""):
         """Get response from Anthropic Claude"""
         # For Claude, we'll implement a fallback to free version if no API key
         if self.system_settings.anthropic_api_key:
-            return self._get_claude_api_response(message, chat_history)
+            return self._get_claude_api_response(message, chat_history, knowledge)
         else:
             # Use a simple rule-based response for free version
             return self._get_claude_free_response(message)
     
-    def _get_claude_api_response(self, message, chat_history=None):
+    def _get_claude_api_response(self, message, chat_history=None, knowledge=""):
         """Get response from Claude API (paid version)"""
         headers = {
             'x-api-key': self.system_settings.anthropic_api_key,
@@ -212,7 +217,7 @@ Bitte beschreiben Sie Ihr Problem weiter - ein menschlicher Agent übernimmt sof
             "messages": [
                 {
                     "role": "user",
-                    "content": f"{self._get_system_prompt()}\n\n{conversation}"
+                    "content": f"{self._get_system_prompt(knowledge)}\n\n{conversation}"
                 }
             ]
         }
@@ -669,9 +674,19 @@ Soll ich einen Support-Agent für Sie anfordern? 👨‍💻"""
         
         return context
     
-    def _get_system_prompt(self):
-        """Get the enhanced system prompt for AI responses"""
-        return """Du bist ein hochqualifizierter KI-Assistent für einen professionellen Helpdesk-Service. Du spezialisierst dich auf systematische Problemanalyse, intelligente Lösungsfindung und exzellenten Kundenservice.
+    def _knowledge_context(self, message):
+        """Semantisch passendste FAQ-Artikel als Prompt-Kontext (leer, wenn nicht verfügbar)"""
+        articles = similar_articles(message, limit=3)
+        if not articles:
+            return ""
+        context = "Relevante Wissensdatenbank-Artikel:\n"
+        for article in articles:
+            context += f"- {article.title}: {strip_tags(article.content)[:300]}...\n"
+        return context
+
+    def _get_system_prompt(self, knowledge=""):
+        """Get the enhanced system prompt for AI responses (plus knowledge base context)"""
+        prompt = """Du bist ein hochqualifizierter KI-Assistent für einen professionellen Helpdesk-Service. Du spezialisierst dich auf systematische Problemanalyse, intelligente Lösungsfindung und exzellenten Kundenservice.
 
 🔧 ERWEITERTE PROBLEMLÖSUNGSSTRATEGIE:
 
@@ -723,6 +738,9 @@ SPEZIALISIERUNGEN:
 📊 Windows/Mac/Linux Systeme | 🌐 Netzwerk-Diagnose | 📧 E-Mail-Konfiguration | 🔐 Security & Authentication | ⚡ Performance-Optimierung | 💻 Software-Troubleshooting
 
 WICHTIG: Du bist ein proaktiver Problem-Solver mit emotionaler Intelligenz. Dein Ziel ist nicht nur die Lösung, sondern auch die Bildung und Zufriedenheit des Benutzers!"""
+        if knowledge:
+            prompt += f"\n\n{knowledge}"
+        return prompt
 
 
 def get_ai_response_for_chat(message, chat_session):
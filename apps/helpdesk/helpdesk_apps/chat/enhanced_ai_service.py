@@ -16,6 +16,7 @@ from django.db.models import Q
 from django.utils import timezone
 from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
 from apps.helpdesk.helpdesk_apps.knowledge.models import KnowledgeArticle
+from apps.helpdesk.helpdesk_apps.knowledge.semantic import similar_articles
 from apps.helpdesk.helpdesk_apps.api.license_checker import LicenseFeatureChecker
 
 logger = logging.getLogger(__name__)
@@ -72,7 +73,12 @@ class EnhancedAIService:
             return self._get_fallback_response()
     
     def _search_relevant_faqs(self, message: str) -> List[KnowledgeArticle]:
-        """Suche relevante FAQ-Artikel basierend auf der Nachricht"""
+        """Suche relevante FAQ-Artikel basierend auf der Nachricht (semantisch, sonst per Keywords)"""
+        articles = similar_articles(message, limit=5)
+        if articles is not None:
+            logger.info(f"Found {len(articles)} semantically relevant FAQ articles")
+            return articles
+
         try:
             # Nur öffentliche und veröffentlichte Artikel
             base_query = KnowledgeArticle.objects.filter(
@@ -5,3 +5,7 @@ class KnowledgeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.helpdesk.helpdesk_apps.knowledge'
     verbose_name = 'Wissensdatenbank'
+
+    def ready(self):
+        """Register signal handlers when app is ready"""
+        import apps.helpdesk.helpdesk_apps.knowledge.signals  # noqa
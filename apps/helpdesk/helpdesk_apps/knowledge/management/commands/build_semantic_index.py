@@ -0,0 +1,61 @@
+"""
+Django Management Command: Build the semantic search index
+Computes embeddings for published articles and resolved tickets offline;
+unchanged texts are skipped via content hash
+
+Usage:
+    python manage.py build_semantic_index                   # articles and tickets
+    python manage.py build_semantic_index --source article
+    python manage.py build_semantic_index --force           # recompute everything
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.helpdesk.helpdesk_apps.knowledge.models import KnowledgeArticle
+from apps.helpdesk.helpdesk_apps.knowledge.semantic import (
+    ARTICLE, RESOLVED_STATUSES, TICKET, index_objects, is_enabled, remove_stale,
+)
+from apps.helpdesk.helpdesk_apps.tickets.models import Ticket
+
+CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Compute embeddings for knowledge articles and resolved tickets'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            choices=[ARTICLE, TICKET],
+            action='append',
+            default=None,
+            help='Only index this source (repeatable)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Recompute embeddings even if the text is unchanged',
+        )
+
+    def handle(self, *args, **options):
+        if not is_enabled():
+            raise CommandError('Semantic search is disabled or the local embedding model is not reachable')
+
+        querysets = {
+            ARTICLE: KnowledgeArticle.objects.filter(status='published', is_public=True),
+            TICKET: Ticket.objects.filter(status__in=RESOLVED_STATUSES),
+        }
+        for source in options['source'] or [ARTICLE, TICKET]:
+            queryset = querysets[source].order_by('pk')
+            totals = {'embedded': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+            last_pk = 0
+            while True:
+                chunk = list(queryset.filter(pk__gt=last_pk)[:CHUNK_SIZE])
+                if not chunk:
+                    break
+                last_pk = chunk[-1].pk
+                for key, value in index_objects(source, chunk, force=options['force']).items():
+                    totals[key] += value
+
+            totals['removed'] += remove_stale(source)
+            self.stdout.write(self.style.SUCCESS(f'{source}: {totals}'))
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knowledge', '0003_alter_knowledgearticle_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SemanticEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('article', 'Knowledge article'), ('ticket', 'Resolved ticket')], max_length=20, verbose_name='source')),
+                ('object_id', models.PositiveIntegerField(verbose_name='object ID')),
+                ('content_sha256', models.CharField(max_length=64, verbose_name='content hash')),
+                ('model', models.CharField(max_length=100, verbose_name='embedding model')),
+                ('dimensions', models.PositiveIntegerField(verbose_name='dimensions')),
+                ('vector', models.BinaryField(help_text='Normalized float32 array', verbose_name='vector')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='updated at')),
+            ],
+            options={
+                'verbose_name': 'semantic embedding',
+                'verbose_name_plural': 'semantic embeddings',
+                'unique_together': {('source', 'object_id')},
+            },
+        ),
+    ]
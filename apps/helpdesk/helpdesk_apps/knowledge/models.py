@@ -126,3 +126,28 @@ class KnowledgeArticle(models.Model):
             data['keywords'] = self.keywords
 
         return data
+
+
+class SemanticEmbedding(models.Model):
+    """Stored embedding vector of a knowledge article or resolved ticket"""
+
+    SOURCE_CHOICES = [
+        ('article', _('Knowledge article')),
+        ('ticket', _('Resolved ticket')),
+    ]
+
+    source = models.CharField(_('source'), max_length=20, choices=SOURCE_CHOICES)
+    object_id = models.PositiveIntegerField(_('object ID'))
+    content_sha256 = models.CharField(_('content hash'), max_length=64)
+    model = models.CharField(_('embedding model'), max_length=100)
+    dimensions = models.PositiveIntegerField(_('dimensions'))
+    vector = models.BinaryField(_('vector'), help_text='Normalized float32 array')
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True, db_index=True)
+
+    class Meta:
+        verbose_name = _('semantic embedding')
+        verbose_name_plural = _('semantic embeddings')
+        unique_together = [('source', 'object_id')]
+
+    def __str__(self):
+        return f'{self.source} #{self.object_id}'
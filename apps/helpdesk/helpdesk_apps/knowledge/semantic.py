@@ -0,0 +1,343 @@
+"""
+Semantische Suche über Wissensdatenbank-Artikel und gelöste Tickets
+
+Texte werden offline mit dem lokalen Ollama-Embedding-Modell
+(HELPDESK_EMBEDDING_MODEL) in Vektoren umgerechnet und normalisiert als
+float32-Bytes in SemanticEmbedding gespeichert. Jeder Prozess hält je Quelle
+eine NumPy-Matrix im Speicher; die Top-k-Suche ist ein einziges
+Matrix-Vektor-Produkt (Brute Force, bei einigen zehntausend Einträgen wenige
+Millisekunden). Änderungen erhöhen eine Versionsnummer im Cache, worauf
+andere Prozesse nur die seitdem geänderten Zeilen nachladen.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from apps.helpdesk.helpdesk_apps.ai.llama3_service import llama3_service
+from apps.helpdesk.helpdesk_apps.tickets.models import Ticket
+from .models import KnowledgeArticle, SemanticEmbedding
+
+logger = logging.getLogger(__name__)
+
+ARTICLE = 'article'
+TICKET = 'ticket'
+RESOLVED_STATUSES = ('resolved', 'closed')
+TEXT_CHARS = 4000
+VERSION_KEY = 'helpdesk-semantic:version'
+QUERY_CACHE_SIZE = 256
+
+
+def is_enabled() -> bool:
+    return getattr(settings, 'HELPDESK_SEMANTIC_SEARCH', True) and llama3_service.is_available()
+
+
+def _model_name() -> str:
+    return getattr(settings, 'HELPDESK_EMBEDDING_MODEL', 'nomic-embed-text')
+
+
+def article_text(article) -> str:
+    parts = [article.title, article.excerpt, article.keywords, strip_tags(article.content or '')]
+    return '\n'.join(part for part in parts if part)[:TEXT_CHARS]
+
+
+def ticket_text(ticket) -> str:
+    return f"{ticket.title}\n{strip_tags(ticket.description or '')}"[:TEXT_CHARS]
+
+
+SOURCES = {
+    ARTICLE: (KnowledgeArticle, article_text),
+    TICKET: (Ticket, ticket_text),
+}
+
+
+def _indexable(source: str, obj) -> bool:
+    """Nur veröffentlichte öffentliche Artikel und gelöste Tickets kommen in den Index"""
+    if source == ARTICLE:
+        return obj.status == 'published' and obj.is_public
+    return obj.status in RESOLVED_STATUSES
+
+
+def _normalize(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class SemanticIndex:
+    """Prozesslokale Vektor-Matrizen je Quelle mit inkrementellem Nachladen"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._model = None
+        self._loaded_at = None
+        # Quelle -> (object_ids, Matrix); wird nur als Ganzes ersetzt
+        self._data = {}
+        self._positions = {}
+        self._queries = OrderedDict()
+
+    def reset(self):
+        with self._lock:
+            self._version = self._model = self._loaded_at = None
+            self._data, self._positions = {}, {}
+            self._queries.clear()
+
+    def _merge(self, source: str, rows: List[Tuple[int, bytes]]):
+        """Übernimmt geänderte Zeilen (Copy-on-Write, damit laufende Suchen konsistent bleiben)"""
+        ids = np.array([object_id for object_id, _vector in rows], dtype=np.int64)
+        matrix = np.stack([np.frombuffer(bytes(vector), dtype=np.float32) for _object_id, vector in rows])
+        positions = self._positions.get(source)
+        if positions is None or self._data[source][1].shape[1] != matrix.shape[1]:
+            self._data[source] = (ids, matrix)
+            self._positions[source] = {int(object_id): row for row, object_id in enumerate(ids)}
+            return
+
+        current_ids, current = self._data[source]
+        current = current.copy()
+        new_rows = []
+        for row, object_id in enumerate(ids):
+            position = positions.get(int(object_id))
+            if position is None:
+                new_rows.append(row)
+            else:
+                current[position] = matrix[row]
+        if new_rows:
+            for offset, row in enumerate(new_rows):
+                positions[int(ids[row])] = len(current) + offset
+            current = np.vstack([current, matrix[new_rows]])
+            current_ids = np.concatenate([current_ids, ids[new_rows]])
+        self._data[source] = (current_ids, current)
+
+    def _load(self, queryset, reset: bool):
+        if reset:
+            self._data, self._positions = {}, {}
+        grouped = {}
+        for source, object_id, vector in queryset.values_list('source', 'object_id', 'vector'):
+            grouped.setdefault(source, []).append((object_id, vector))
+        for source, rows in grouped.items():
+            self._merge(source, rows)
+
+    def _sync(self):
+        version = cache.get(VERSION_KEY, 0)
+        model = _model_name()
+        if version == self._version and model == self._model:
+            return
+        with self._lock:
+            if version == self._version and model == self._model:
+                return
+            started = timezone.now()
+            rows = SemanticEmbedding.objects.filter(model=model)
+            if self._loaded_at is None or model != self._model:
+                self._load(rows, reset=True)
+            else:
+                self._load(rows.filter(updated_at__gte=self._loaded_at), reset=False)
+                # Gelöschte Einträge: bei abweichender Anzahl die Quelle neu laden
+                counts = dict(rows.values_list('source').annotate(count=Count('id')))
+                for source in set(counts) | set(self._data):
+                    if counts.get(source, 0) != len(self._data.get(source, ((),))[0]):
+                        self._data.pop(source, None)
+                        self._positions.pop(source, None)
+                        self._load(rows.filter(source=source), reset=False)
+            self._version, self._model, self._loaded_at = version, model, started
+
+    def query_vector(self, text: str) -> Optional[np.ndarray]:
+        """Embedding der Suchanfrage; wiederholte Anfragen kommen aus einem LRU-Cache"""
+        key = (_model_name(), text)
+        with self._lock:
+            vector = self._queries.get(key)
+            if vector is not None:
+                self._queries.move_to_end(key)
+                return vector
+        vectors = llama3_service.embed([text])
+        if not vectors:
+            return None
+        vector = _normalize(vectors)[0]
+        with self._lock:
+            self._queries[key] = vector
+            while len(self._queries) > QUERY_CACHE_SIZE:
+                self._queries.popitem(last=False)
+        return vector
+
+    def search(self, source: str, vector: np.ndarray, limit: int,
+               exclude: Iterable[int] = ()) -> Optional[List[Tuple[int, float]]]:
+        """
+        Top-k per Kosinus-Ähnlichkeit
+
+        Returns:
+            Liste (object_id, score) absteigend, oder None wenn die Quelle leer ist
+        """
+        self._sync()
+        ids, matrix = self._data.get(source, (None, None))
+        if ids is None or not len(ids) or matrix.shape[1] != vector.shape[0]:
+            return None
+
+        exclude = set(exclude)
+        scores = matrix @ vector
+        k = min(len(ids), limit + len(exclude))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        min_score = getattr(settings, 'HELPDESK_SEMANTIC_MIN_SCORE', 0.3)
+        hits = [(int(ids[row]), float(scores[row])) for row in top
+                if int(ids[row]) not in exclude and scores[row] >= min_score]
+        return hits[:limit]
+
+
+index = SemanticIndex()
+
+
+def _bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, timeout=None)
+
+
+def index_objects(source: str, objects: Iterable, force: bool = False) -> Dict[str, int]:
+    """
+    Berechnet Embeddings für Artikel bzw. Tickets
+
+    Unveränderte Texte (gleicher Hash, gleiches Modell) werden übersprungen;
+    nicht (mehr) indexierbare Objekte werden aus dem Index entfernt.
+
+    Args:
+        source: 'article' oder 'ticket'
+        objects: Artikel bzw. Tickets
+        force: Auch unveränderte Texte neu berechnen
+
+    Returns:
+        dict mit den Zählern embedded, unchanged, removed und failed
+    """
+    _model_cls, text_for = SOURCES[source]
+    model = _model_name()
+    batch_size = max(1, getattr(settings, 'HELPDESK_EMBEDDING_BATCH_SIZE', 32))
+    objects = list(objects)
+    stats = {'embedded': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+
+    existing = {
+        embedding.object_id: embedding
+        for embedding in SemanticEmbedding.objects.filter(
+            source=source, object_id__in=[obj.pk for obj in objects]
+        ).only('object_id', 'content_sha256', 'model')
+    }
+    removed, pending = [], []
+    for obj in objects:
+        if not _indexable(source, obj):
+            if obj.pk in existing:
+                removed.append(obj.pk)
+            continue
+        text = text_for(obj)
+        sha = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        current = existing.get(obj.pk)
+        if not force and current is not None and current.content_sha256 == sha and current.model == model:
+            stats['unchanged'] += 1
+            continue
+        pending.append((obj.pk, text, sha))
+
+    if removed:
+        SemanticEmbedding.objects.filter(source=source, object_id__in=removed).delete()
+        stats['removed'] = len(removed)
+
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        vectors = llama3_service.embed([text for _pk, text, _sha in batch])
+        if not vectors or len(vectors) != len(batch):
+            stats['failed'] += len(batch)
+            continue
+        for (pk, _text, sha), vector in zip(batch, _normalize(vectors)):
+            SemanticEmbedding.objects.update_or_create(
+                source=source,
+                object_id=pk,
+                defaults={
+                    'content_sha256': sha,
+                    'model': model,
+                    'dimensions': vector.shape[0],
+                    'vector': vector.tobytes(),
+                },
+            )
+        stats['embedded'] += len(batch)
+
+    if stats['embedded'] or stats['removed']:
+        transaction.on_commit(_bump_version)
+    return stats
+
+
+def index_object(source: str, object_id: int) -> Dict[str, int]:
+    """Aktualisiert den Index für ein einzelnes Objekt (auch nach dem Löschen)"""
+    model_cls, _text_for = SOURCES[source]
+    obj = model_cls.objects.filter(pk=object_id).first()
+    if obj is not None:
+        return index_objects(source, [obj])
+    deleted, _per_model = SemanticEmbedding.objects.filter(source=source, object_id=object_id).delete()
+    if deleted:
+        transaction.on_commit(_bump_version)
+    return {'embedded': 0, 'unchanged': 0, 'removed': deleted, 'failed': 0}
+
+
+def remove_stale(source: str) -> int:
+    """Entfernt Einträge, deren Artikel bzw. Ticket nicht mehr indexierbar ist"""
+    model_cls, _text_for = SOURCES[source]
+    if source == ARTICLE:
+        current = model_cls.objects.filter(status='published', is_public=True)
+    else:
+        current = model_cls.objects.filter(status__in=RESOLVED_STATUSES)
+    deleted, _per_model = SemanticEmbedding.objects.filter(source=source).exclude(
+        object_id__in=current.values('pk')
+    ).delete()
+    if deleted:
+        transaction.on_commit(_bump_version)
+    return deleted
+
+
+def search(source: str, text: str, limit: int = 3,
+           exclude: Iterable[int] = ()) -> Optional[List[Tuple[int, float]]]:
+    """
+    Semantische Suche
+
+    Returns:
+        Liste (object_id, score), oder None wenn die semantische Suche nicht
+        verfügbar ist bzw. der Index leer ist (Aufrufer nutzen dann die
+        Stichwortsuche)
+    """
+    if not text or not text.strip() or not is_enabled():
+        return None
+    try:
+        vector = index.query_vector(text[:TEXT_CHARS])
+        if vector is None:
+            return None
+        return index.search(source, vector, limit, exclude)
+    except Exception as e:
+        logger.error(f"Semantische Suche fehlgeschlagen: {e}")
+        return None
+
+
+def similar_articles(text: str, limit: int = 3) -> Optional[List[KnowledgeArticle]]:
+    """Passendste veröffentlichte, öffentliche Artikel; None, wenn nicht verfügbar"""
+    hits = search(ARTICLE, text, limit)
+    if hits is None:
+        return None
+    articles = KnowledgeArticle.objects.filter(
+        pk__in=[pk for pk, _score in hits], status='published', is_public=True
+    ).in_bulk()
+    return [articles[pk] for pk, _score in hits if pk in articles]
+
+
+def similar_tickets(text: str, limit: int = 3, exclude: Iterable[int] = ()) -> Optional[List[Ticket]]:
+    """Ähnlichste gelöste Tickets; None, wenn nicht verfügbar"""
+    hits = search(TICKET, text, limit, exclude)
+    if hits is None:
+        return None
+    tickets = Ticket.objects.filter(
+        pk__in=[pk for pk, _score in hits], status__in=RESOLVED_STATUSES
+    ).in_bulk()
+    return [tickets[pk] for pk, _score in hits if pk in tickets]
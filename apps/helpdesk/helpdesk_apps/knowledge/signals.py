@@ -0,0 +1,63 @@
+"""
+Signal handlers keeping the semantic index up to date
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.helpdesk.helpdesk_apps.tickets.models import Ticket
+from .models import KnowledgeArticle, SemanticEmbedding
+
+logger = logging.getLogger(__name__)
+
+# Saves touching only other fields (views, votes, SLA ...) do not change the indexed text
+ARTICLE_FIELDS = {'title', 'excerpt', 'keywords', 'content', 'status', 'is_public'}
+TICKET_FIELDS = {'title', 'description', 'status'}
+
+
+def _dispatch(source, object_id):
+    try:
+        from .tasks import update_semantic_embedding
+        update_semantic_embedding.delay(source, object_id)
+    except Exception as exc:
+        # Picked up again by the next build_semantic_index run
+        logger.warning("Semantic index update for %s #%s failed: %s", source, object_id, exc)
+
+
+def _queue(source, object_id):
+    if getattr(settings, 'HELPDESK_SEMANTIC_SEARCH', True):
+        transaction.on_commit(lambda: _dispatch(source, object_id))
+
+
+def _relevant(update_fields, fields):
+    return update_fields is None or bool(set(update_fields) & fields)
+
+
+@receiver(post_save, sender=KnowledgeArticle)
+def queue_article_embedding(sender, instance, update_fields=None, **kwargs):
+    if _relevant(update_fields, ARTICLE_FIELDS):
+        _queue('article', instance.pk)
+
+
+@receiver(post_save, sender=Ticket)
+def queue_ticket_embedding(sender, instance, created, update_fields=None, **kwargs):
+    """Resolved tickets are indexed; reopened ones are removed again"""
+    if created or not _relevant(update_fields, TICKET_FIELDS):
+        return
+    if instance.status in ('resolved', 'closed') or SemanticEmbedding.objects.filter(
+        source='ticket', object_id=instance.pk
+    ).exists():
+        _queue('ticket', instance.pk)
+
+
+@receiver(post_delete, sender=KnowledgeArticle)
+def remove_article_embedding(sender, instance, **kwargs):
+    _queue('article', instance.pk)
+
+
+@receiver(post_delete, sender=Ticket)
+def remove_ticket_embedding(sender, instance, **kwargs):
+    _queue('ticket', instance.pk)
@@ -0,0 +1,12 @@
+"""
+Celery tasks for the knowledge base
+"""
+
+from celery import shared_task
+
+
+@shared_task
+def update_semantic_embedding(source, object_id):
+    """Re-embed one knowledge article or ticket after it was saved or deleted"""
+    from .semantic import index_object
+    return index_object(source, object_id)
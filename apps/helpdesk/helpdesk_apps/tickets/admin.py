@@ -8,6 +8,7 @@ from .models import (
     SupportDepartment,
     SupportQueue,
     TicketRoutingRule,
+    TicketTriage,
 )
 
 
@@ -119,3 +120,12 @@ class TicketRoutingRuleAdmin(admin.ModelAdmin):
     list_display = ['name', 'is_active', 'category', 'department', 'queue', 'priority', 'support_level']
     list_filter = ['is_active', 'category', 'department', 'queue', 'priority', 'support_level']
     search_fields = ['name', 'contains_text']
+
+
+@admin.register(TicketTriage)
+class TicketTriageAdmin(admin.ModelAdmin):
+    list_display = ['ticket', 'category_name', 'priority', 'sentiment', 'sentiment_score', 'provider',
+                    'failed_attempts', 'triaged_at']
+    list_filter = ['priority', 'sentiment', 'provider']
+    search_fields = ['ticket__ticket_number', 'ticket__title', 'category_name']
+    readonly_fields = ['content_sha256', 'failed_attempts', 'retry_after', 'triaged_at']
@@ -1,11 +1,12 @@
 """
 AI Service für automatische Ticket-Responses mit LLAMA3-Integration
 """
-import anthropic
 import logging
 from django.conf import settings
+from apps.core.services.ai_gateway import gateway
 from .models import Ticket, TicketComment
 from apps.helpdesk.helpdesk_apps.knowledge.models import KnowledgeArticle
+from apps.helpdesk.helpdesk_apps.knowledge import semantic
 from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
 
 logger = logging.getLogger(__name__)
@@ -27,7 +28,8 @@ class ClaudeAIService:
         self.use_llama3 = getattr(settings, 'USE_LLAMA3', True) and UNIFIED_AI_AVAILABLE
 
         if hasattr(settings, 'CLAUDE_API_KEY') and settings.CLAUDE_API_KEY:
-            self.client = anthropic.Anthropic(api_key=settings.CLAUDE_API_KEY)
+            # Shared client from the process-wide AI gateway
+            self.client = gateway.anthropic_client()
 
         logger.info(f"Ticket AI Service - LLAMA3: {self.use_llama3}, Claude: {bool(self.client)}")
 
@@ -94,9 +96,13 @@ class ClaudeAIService:
         return None, None, None
 
     def get_relevant_knowledge(self, query, limit=3):
-        """Search knowledge base for relevant articles"""
+        """Search knowledge base for relevant articles (semantic, keyword search as fallback)"""
         from django.db.models import Q
 
+        articles = semantic.similar_articles(query, limit=limit)
+        if articles is not None:
+            return articles
+
         articles = KnowledgeArticle.objects.filter(
             status='published',
             is_public=True
@@ -240,48 +246,60 @@ class ClaudeAIService:
             return response_text
         return f"{response_text}\n\n{signature_text}"
 
-    def suggest_ticket_response(self, ticket, agent=None):
+    def _similar_tickets_context(self, ticket, limit=3):
         """
-        Generiert einen AI-Antwortvorschlag für ein Ticket
-        Der Agent kann den Vorschlag annehmen, bearbeiten oder ablehnen
+        Lösungen ähnlicher, bereits gelöster Tickets als Prompt-Kontext
 
-        Args:
-            ticket: Ticket-Instanz
+        Returns:
+            Kontext-Text (leer, wenn die semantische Suche nicht verfügbar ist)
+        """
+        similar = semantic.similar_tickets(
+            f"{ticket.title} {ticket.description}", limit=limit, exclude=[ticket.pk]
+        )
+        if not similar:
+            return ""
+
+        context = "\n\nÄhnliche gelöste Tickets:\n"
+        for other in similar:
+            resolution = other.comments.filter(is_internal=False).order_by('-created_at').first()
+            solution = resolution.content[:300] if resolution else other.description[:300]
+            context += f"- {other.title}: {solution}...\n"
+        return context
+
+    def _suggestion_prompt(self, ticket):
+        """
+        Baut den Prompt für einen Antwortvorschlag aus Ticket, bisherigen
+        Kommentaren, relevanten KB-Artikeln und ähnlichen gelösten Tickets.
 
         Returns:
-            dict: {
-                'text': 'Vorgeschlagene Antwort',
-                'provider': 'llama3/claude/openai',
-                'confidence': 0.0-1.0,
-                'kb_articles': [KnowledgeArticle, ...],
-                'success': True/False
-            }
+            Tuple (Prompt, Liste der KB-Artikel)
         """
-        try:
-            # Hole alle bisherigen Kommentare für Kontext
-            comments_context = []
-            for comment in ticket.comments.all().order_by('created_at'):
-                role = 'customer' if comment.author.role == 'customer' else 'agent'
-                comments_context.append({
-                    'role': role,
-                    'content': comment.content,
-                    'author': comment.author.full_name
-                })
-
-            # Hole relevante KB-Artikel
-            kb_articles = self.get_relevant_knowledge(
-                f"{ticket.title} {ticket.description}",
-                limit=3
-            )
+        # Hole alle bisherigen Kommentare für Kontext
+        comments_context = []
+        for comment in ticket.comments.all().order_by('created_at'):
+            role = 'customer' if comment.author.role == 'customer' else 'agent'
+            comments_context.append({
+                'role': role,
+                'content': comment.content,
+                'author': comment.author.full_name
+            })
+
+        # Hole relevante KB-Artikel
+        kb_articles = self.get_relevant_knowledge(
+            f"{ticket.title} {ticket.description}",
+            limit=3
+        )
 
-            kb_context = ""
-            if kb_articles:
-                kb_context = "\n\nRelevante Wissensdatenbank-Artikel:\n"
-                for article in kb_articles:
-                    kb_context += f"- {article.title}: {article.content[:300]}...\n"
+        kb_context = ""
+        if kb_articles:
+            kb_context = "\n\nRelevante Wissensdatenbank-Artikel:\n"
+            for article in kb_articles:
+                kb_context += f"- {article.title}: {article.content[:300]}...\n"
 
-            # Baue Prompt für AI
-            prompt = f"""Du bist ein professioneller Support-Agent für das ABoro-Soft Helpdesk-System.
+        similar_context = self._similar_tickets_context(ticket)
+
+        # Baue Prompt für AI
+        prompt = f"""Du bist ein professioneller Support-Agent für das ABoro-Soft Helpdesk-System.
 
 TICKET-INFORMATIONEN:
 Nummer: {ticket.ticket_number}
@@ -294,15 +312,16 @@ Erstellt von: {ticket.created_by.full_name}
 BISHERIGE KOMMUNIKATION:
 """
 
-            if comments_context:
-                for comment in comments_context:
-                    prompt += f"\n[{comment['role'].upper()}] {comment['author']}: {comment['content']}\n"
-            else:
-                prompt += "Noch keine Kommentare vorhanden.\n"
+        if comments_context:
+            for comment in comments_context:
+                prompt += f"\n[{comment['role'].upper()}] {comment['author']}: {comment['content']}\n"
+        else:
+            prompt += "Noch keine Kommentare vorhanden.\n"
 
-            prompt += kb_context
+        prompt += kb_context
+        prompt += similar_context
 
-            prompt += f"""
+        prompt += f"""
 
 AUFGABE:
 Schreibe eine hilfreiche, professionelle Antwort für den Support-Agent, die dieser an den Kunden senden kann.
@@ -326,6 +345,28 @@ RICHTLINIEN:
 
 Schreiben Sie NUR die Antwort, keine Metakommentare."""
 
+        return prompt, list(kb_articles)
+
+    def suggest_ticket_response(self, ticket, agent=None):
+        """
+        Generiert einen AI-Antwortvorschlag für ein Ticket
+        Der Agent kann den Vorschlag annehmen, bearbeiten oder ablehnen
+
+        Args:
+            ticket: Ticket-Instanz
+
+        Returns:
+            dict: {
+                'text': 'Vorgeschlagene Antwort',
+                'provider': 'llama3/claude/openai',
+                'confidence': 0.0-1.0,
+                'kb_articles': [KnowledgeArticle, ...],
+                'success': True/False
+            }
+        """
+        try:
+            prompt, kb_articles = self._suggestion_prompt(ticket)
+
             # Verwende Unified AI Service wenn verfügbar
             if self.use_llama3 and UNIFIED_AI_AVAILABLE:
                 logger.info(f"Generiere AI-Antwortvorschlag für Ticket {ticket.ticket_number} mit Unified AI Service")
@@ -346,13 +387,14 @@ Schreiben Sie NUR die Antwort, keine Metakommentare."""
             # Fallback zu Claude wenn verfügbar
             if self.client:
                 logger.info(f"Generiere AI-Antwortvorschlag für Ticket {ticket.ticket_number} mit Claude")
-                message = self.client.messages.create(
+                text = gateway.anthropic_message(
                     model="claude-3-5-sonnet-20241022",
                     max_tokens=1024,
-                    messages=[{"role": "user", "content": prompt}]
+                    messages=[{"role": "user", "content": prompt}],
+                    cache=True,
                 )
 
-                response_text = self._append_signature(message.content[0].text, agent=agent)
+                response_text = self._append_signature(text, agent=agent)
 
                 return {
                     'text': response_text,
@@ -382,6 +424,62 @@ Schreiben Sie NUR die Antwort, keine Metakommentare."""
                 'error': str(e)
             }
 
+    def stream_ticket_response(self, ticket, agent=None):
+        """
+        Streamt einen AI-Antwortvorschlag für ein Ticket
+
+        Prompt und KB-Artikel werden sofort ermittelt; die Textfragmente
+        folgen, sobald der Provider sie liefert. Liefert der Unified AI
+        Service nichts, wird Claude verwendet.
+
+        Args:
+            ticket: Ticket-Instanz
+
+        Returns:
+            Iterator von dicts: {'event': 'token', 'provider': ..., 'text': ...}
+            je Fragment, abschließend {'event': 'done', 'suggestion': {...}}
+            mit dem vollständigen Vorschlag inkl. Signatur oder
+            {'event': 'error', 'error': ...}
+        """
+        prompt, kb_articles = self._suggestion_prompt(ticket)
+        return self._suggestion_events(ticket, prompt, kb_articles, agent)
+
+    def _suggestion_events(self, ticket, prompt, kb_articles, agent):
+        sources = []
+        if self.use_llama3 and UNIFIED_AI_AVAILABLE:
+            sources.append((0.8, lambda: unified_ai_service.stream_chat_response(prompt, [])))
+        if self.client:
+            sources.append((0.85, lambda: (('claude', text) for text in gateway.stream_anthropic(
+                model="claude-3-5-sonnet-20241022",
+                max_tokens=1024,
+                messages=[{"role": "user", "content": prompt}],
+            ))))
+
+        parts = []
+        provider = confidence = None
+        try:
+            for confidence, source in sources:
+                for provider, text in source():
+                    parts.append(text)
+                    yield {'event': 'token', 'provider': provider, 'text': text}
+                if parts:
+                    break
+        except Exception as e:
+            logger.error(f"Fehler beim Streamen des AI-Antwortvorschlags für Ticket {ticket.ticket_number}: {e}")
+            yield {'event': 'error', 'error': str(e)}
+            return
+
+        if not parts:
+            yield {'event': 'error', 'error': 'Kein AI-Provider verfügbar'}
+            return
+
+        yield {'event': 'done', 'suggestion': serialize_suggestion({
+            'text': self._append_signature(''.join(parts).strip(), agent=agent),
+            'provider': provider,
+            'confidence': confidence,
+            'kb_articles': kb_articles,
+        })}
+
     def should_auto_respond(self, ticket):
         """Determine if ticket should get auto-response"""
         # Only auto-respond to new tickets
@@ -446,16 +544,15 @@ Antworte NICHT mit einer Lösung wenn:
 Beginne mit "Hallo {ticket.created_by.first_name}," und ende mit einer freundlichen Grußformel."""
 
         try:
-            message = self.client.messages.create(
+            response_text = gateway.anthropic_message(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=1024,
                 messages=[
                     {"role": "user", "content": prompt}
-                ]
+                ],
+                cache=True,
             )
 
-            response_text = message.content[0].text
-
             # Determine if this is a helpful answer or a "wait for agent" message
             is_solution = any(word in response_text.lower() for word in [
                 'lösung', 'können sie', 'versuchen sie', 'folgende schritte', 'hier ist'
@@ -499,3 +596,32 @@ Beginne mit "Hallo {ticket.created_by.first_name}," und ende mit einer freundlic
 
 # Create a global instance
 ai_service = ClaudeAIService()
+
+
+def serialize_suggestion(result):
+    """JSON form of a successful ``suggest_ticket_response`` result."""
+    return {
+        'text': result['text'],
+        'provider': result['provider'],
+        'confidence': result['confidence'],
+        'kb_articles': [
+            {
+                'id': article.id,
+                'title': article.title,
+                'excerpt': article.content[:200] + '...' if len(article.content) > 200 else article.content
+            }
+            for article in result['kb_articles']
+        ]
+    }
+
+
+def run_suggest_response_job(params):
+    """Handler for the ``helpdesk.suggest_response`` AI job."""
+    from django.contrib.auth import get_user_model
+
+    ticket = Ticket.objects.get(pk=params['ticket_id'])
+    agent = get_user_model().objects.filter(pk=params.get('agent_id')).first()
+    result = ai_service.suggest_ticket_response(ticket, agent=agent)
+    if not result.get('success'):
+        raise RuntimeError(result.get('error') or 'Fehler beim Generieren des Vorschlags')
+    return serialize_suggestion(result)
@@ -0,0 +1,92 @@
+"""
+Django Management Command: Batch AI triage of tickets
+Re-triages a historical backlog offline; unchanged tickets are skipped via content hash
+
+Usage:
+    python manage.py triage_tickets                  # new tickets without triage
+    python manage.py triage_tickets --all            # whole backlog
+    python manage.py triage_tickets --all --since 2025-01-01 --status open
+    python manage.py triage_tickets --all --force    # ignore cached results
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.helpdesk.helpdesk_apps.tickets.models import Ticket
+from apps.helpdesk.helpdesk_apps.tickets.triage import pending_tickets, triage_tickets
+
+CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Triage tickets (category, priority, sentiment) in batched AI calls'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Process all tickets instead of only new untriaged ones',
+        )
+        parser.add_argument(
+            '--since',
+            type=str,
+            default=None,
+            help='Only tickets created on or after this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--status',
+            action='append',
+            default=None,
+            help='Only tickets with this status (repeatable)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-triage even if content is unchanged or already known',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Maximum number of tickets to process',
+        )
+        parser.add_argument('--batch-size', type=int, default=None, help='Tickets per AI call')
+        parser.add_argument('--workers', type=int, default=None, help='Concurrent AI calls')
+
+    def handle(self, *args, **options):
+        if not options['all']:
+            stats = triage_tickets(pending_tickets(), force=options['force'],
+                                   batch_size=options['batch_size'], workers=options['workers'])
+            self.stdout.write(self.style.SUCCESS(f'Triage completed: {stats}'))
+            return
+
+        queryset = Ticket.objects.order_by('pk')
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError('--since must be YYYY-MM-DD')
+            queryset = queryset.filter(created_at__gte=timezone.make_aware(since))
+        if options['status']:
+            queryset = queryset.filter(status__in=options['status'])
+
+        totals = {'triaged': 0, 'cached': 0, 'unchanged': 0, 'failed': 0}
+        remaining = options['limit']
+        last_pk = 0
+        while remaining is None or remaining > 0:
+            size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+            chunk = list(queryset.filter(pk__gt=last_pk)[:size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            stats = triage_tickets(chunk, force=options['force'],
+                                   batch_size=options['batch_size'], workers=options['workers'])
+            for key, value in stats.items():
+                totals[key] += value
+            if remaining is not None:
+                remaining -= len(chunk)
+            self.stdout.write(f'Up to ticket #{last_pk}: {stats}')
+
+        self.stdout.write(self.style.SUCCESS(f'Triage completed: {totals}'))
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_support_departments_queues_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketTriage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_sha256', models.CharField(db_index=True, max_length=64, verbose_name='content hash')),
+                ('category_name', models.CharField(blank=True, max_length=100, verbose_name='category')),
+                ('priority', models.CharField(blank=True, choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('critical', 'Critical')], max_length=20, verbose_name='priority')),
+                ('sentiment', models.CharField(blank=True, choices=[('positive', 'Positive'), ('neutral', 'Neutral'), ('negative', 'Negative'), ('urgent', 'Urgent')], max_length=20, verbose_name='sentiment')),
+                ('sentiment_score', models.FloatField(blank=True, null=True, verbose_name='sentiment score')),
+                ('provider', models.CharField(blank=True, max_length=20, verbose_name='provider')),
+                ('triaged_at', models.DateTimeField(auto_now=True, verbose_name='triaged at')),
+                ('ticket', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='triage', to='tickets.ticket', verbose_name='ticket')),
+            ],
+            options={
+                'verbose_name': 'ticket triage',
+                'verbose_name_plural': 'ticket triages',
+            },
+        ),
+    ]
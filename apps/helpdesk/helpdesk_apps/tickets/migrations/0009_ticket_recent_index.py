@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0008_ticket_triage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['-created_at', '-id'], name='ticket_recent_idx'),
+        ),
+    ]
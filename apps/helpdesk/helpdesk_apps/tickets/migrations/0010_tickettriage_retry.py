@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0009_ticket_recent_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickettriage',
+            name='failed_attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='failed attempts'),
+        ),
+        migrations.AddField(
+            model_name='tickettriage',
+            name='retry_after',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='retry after'),
+        ),
+    ]
@@ -267,6 +267,9 @@ class Ticket(models.Model):
         verbose_name = _('ticket')
         verbose_name_plural = _('tickets')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='ticket_recent_idx'),
+        ]
 
     def __str__(self):
         return f'{self.ticket_number} - {self.title}'
@@ -526,3 +529,38 @@ class TicketAttachment(models.Model):
         }
 
         return data
+
+
+class TicketTriage(models.Model):
+    """
+    AI triage result (category, priority, sentiment) for a ticket's current content
+
+    Failed attempts are counted on the same row; a ticket that never got a
+    result has an empty content hash and is retried after ``retry_after``.
+    """
+
+    SENTIMENT_CHOICES = [
+        ('positive', _('Positive')),
+        ('neutral', _('Neutral')),
+        ('negative', _('Negative')),
+        ('urgent', _('Urgent')),
+    ]
+
+    ticket = models.OneToOneField(Ticket, on_delete=models.CASCADE, related_name='triage',
+                                  verbose_name=_('ticket'))
+    content_sha256 = models.CharField(_('content hash'), max_length=64, db_index=True)
+    category_name = models.CharField(_('category'), max_length=100, blank=True)
+    priority = models.CharField(_('priority'), max_length=20, choices=PRIORITY_CHOICES, blank=True)
+    sentiment = models.CharField(_('sentiment'), max_length=20, choices=SENTIMENT_CHOICES, blank=True)
+    sentiment_score = models.FloatField(_('sentiment score'), null=True, blank=True)
+    provider = models.CharField(_('provider'), max_length=20, blank=True)
+    failed_attempts = models.PositiveSmallIntegerField(_('failed attempts'), default=0)
+    retry_after = models.DateTimeField(_('retry after'), null=True, blank=True)
+    triaged_at = models.DateTimeField(_('triaged at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('ticket triage')
+        verbose_name_plural = _('ticket triages')
+
+    def __str__(self):
+        return f'Triage {self.ticket.ticket_number}: {self.category_name} / {self.priority} / {self.sentiment}'
@@ -43,6 +43,9 @@ def process_email_to_tickets(self):
 
         logger.info(f"Email processing completed: {result}")
 
+        # Triage the new tickets in batches instead of per ticket
+        triage_pending_tickets.delay()
+
         return {
             'status': 'success',
             'result': result
@@ -56,6 +59,20 @@ def process_email_to_tickets(self):
         raise self.retry(exc=exc, countdown=retry_in * 60)
 
 
+@shared_task
+def triage_pending_tickets():
+    """
+    Batch AI triage (category, priority, sentiment) of new tickets
+    Runs every 2 minutes (configured in celery beat) and after email imports
+    """
+    from .triage import triage_pending
+
+    stats = triage_pending()
+    if stats is None:
+        return {'status': 'skipped', 'reason': 'Triage already running'}
+    return {'status': 'success', 'result': stats}
+
+
 @shared_task
 def send_ticket_reply_via_email(ticket_id, comment_id):
     """
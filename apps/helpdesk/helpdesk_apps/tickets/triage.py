@@ -0,0 +1,246 @@
+"""
+Batch-Triage für Tickets
+
+Kategorie, Priorität und Stimmung mehrerer Tickets werden in einer einzigen
+strukturierten KI-Anfrage ermittelt statt mit drei Anfragen je Ticket. Das
+Ergebnis wird je Ticket zusammen mit dem Hash des Ticket-Inhalts gespeichert:
+unveränderte Tickets und Tickets mit identischem Inhalt werden nicht erneut
+angefragt. Batches laufen mit begrenzter Parallelität in Threads, die nur die
+KI-Anfrage ausführen; alle Datenbankzugriffe bleiben im aufrufenden Thread.
+Fehlgeschlagene Tickets werden mit wachsendem Abstand erneut versucht und nach
+HELPDESK_TRIAGE_MAX_ATTEMPTS Versuchen nicht mehr automatisch angefragt.
+"""
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.helpdesk.helpdesk_apps.ai.llama3_service import LLAMA3Service
+from apps.helpdesk.helpdesk_apps.ai.unified_ai_service import unified_ai_service
+from .models import Ticket, TicketTriage
+
+logger = logging.getLogger(__name__)
+
+# Erhöhen, wenn sich Prompt oder Auswertung ändern: alle Hashes werden ungültig
+PROMPT_VERSION = 1
+DESCRIPTION_CHARS = 1500
+LOCK_KEY = 'helpdesk-triage:lock'
+LOCK_SECONDS = 600
+
+CATEGORIES = LLAMA3Service.TICKET_CATEGORIES
+PRIORITIES = [value for value, _label in Ticket.PRIORITY_CHOICES]
+SENTIMENTS = [value for value, _label in TicketTriage.SENTIMENT_CHOICES]
+
+SYSTEM_PROMPT = f"""Du bist ein Triage-System für Helpdesk-Tickets. Bewerte JEDES Ticket:
+- category: genau eine von: {', '.join(CATEGORIES)}
+- priority: eine von: {', '.join(PRIORITIES)}
+- sentiment: eine von: {', '.join(SENTIMENTS)}
+- sentiment_score: Zahl 0-10 für die Stärke von Stimmung bzw. Dringlichkeit
+
+Antworte NUR mit einem JSON-Array, ein Objekt je Ticket mit dessen id:
+[{{"id": 1, "category": "...", "priority": "...", "sentiment": "...", "sentiment_score": 5}}]"""
+
+
+def content_hash(ticket) -> str:
+    raw = json.dumps([PROMPT_VERSION, ticket.title, ticket.description], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _batch_prompt(items: List[Tuple[int, str, str]]) -> str:
+    tickets = [
+        {'id': item_id, 'title': title, 'description': (description or '')[:DESCRIPTION_CHARS]}
+        for item_id, title, description in items
+    ]
+    return "Tickets:\n" + json.dumps(tickets, ensure_ascii=False, indent=1)
+
+
+def _choice(value, choices: List[str]) -> str:
+    text = str(value or '').strip().lower()
+    for choice in choices:
+        if choice.lower() == text:
+            return choice
+    return ''
+
+
+def _clean(entry: Dict) -> Optional[Dict]:
+    """Normalisiert ein Triage-Objekt der KI; None, wenn nichts Verwertbares enthalten ist"""
+    result = {
+        'category_name': _choice(entry.get('category'), CATEGORIES),
+        'priority': _choice(entry.get('priority'), PRIORITIES),
+        'sentiment': _choice(entry.get('sentiment'), SENTIMENTS),
+        'sentiment_score': None,
+    }
+    try:
+        result['sentiment_score'] = min(max(float(entry.get('sentiment_score')) / 10.0, 0.0), 1.0)
+    except (TypeError, ValueError):
+        pass
+    if not (result['category_name'] or result['priority'] or result['sentiment']):
+        return None
+    return result
+
+
+def parse_batch(text: str, ids: Iterable[int]) -> Dict[int, Dict]:
+    """Liest das JSON-Array der KI-Antwort; unbekannte oder unbrauchbare Einträge entfallen"""
+    ids = set(ids)
+    start, end = (text or '').find('['), (text or '').rfind(']')
+    if start < 0 or end <= start:
+        return {}
+    try:
+        entries = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+    results = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            item_id = int(entry.get('id'))
+        except (TypeError, ValueError):
+            continue
+        cleaned = _clean(entry) if item_id in ids else None
+        if cleaned:
+            results[item_id] = cleaned
+    return results
+
+
+def _run_batch(items: List[Tuple[int, str, str]]) -> Tuple[str, Dict[int, Dict]]:
+    """Eine KI-Anfrage für einen Batch (läuft im Thread-Pool, ohne DB-Zugriff)"""
+    try:
+        text, provider = unified_ai_service.complete(
+            _batch_prompt(items),
+            system=SYSTEM_PROMPT,
+            max_tokens=60 * len(items) + 100,
+        )
+    except Exception as e:
+        logger.error(f"Triage-Batch fehlgeschlagen: {e}")
+        return 'none', {}
+    return provider, parse_batch(text, [item_id for item_id, _title, _description in items])
+
+
+def _store(tickets: List[Ticket], sha: str, result: Dict, provider: str):
+    for ticket in tickets:
+        TicketTriage.objects.update_or_create(
+            ticket=ticket,
+            defaults={'content_sha256': sha, 'provider': provider, 'failed_attempts': 0,
+                      'retry_after': None, **result},
+        )
+
+
+def _record_failure(tickets: List[Ticket]):
+    """Zählt den Fehlversuch; der nächste Versuch wartet HELPDESK_TRIAGE_RETRY_MINUTES, je Versuch doppelt so lange"""
+    base = getattr(settings, 'HELPDESK_TRIAGE_RETRY_MINUTES', 10)
+    now = timezone.now()
+    for ticket in tickets:
+        triage, _created = TicketTriage.objects.get_or_create(ticket=ticket, defaults={'content_sha256': ''})
+        triage.failed_attempts += 1
+        triage.retry_after = now + timedelta(minutes=base * 2 ** (triage.failed_attempts - 1))
+        triage.save(update_fields=['failed_attempts', 'retry_after', 'triaged_at'])
+
+
+def triage_tickets(tickets: Iterable[Ticket], force: bool = False, batch_size: int = None,
+                   workers: int = None) -> Dict[str, int]:
+    """
+    Triagiert Tickets in Batches
+
+    Args:
+        tickets: Tickets (Queryset oder Liste)
+        force: Auch unveränderte Tickets und bekannte Inhalte neu anfragen
+        batch_size: Tickets je KI-Anfrage (Standard: HELPDESK_TRIAGE_BATCH_SIZE)
+        workers: Parallele KI-Anfragen (Standard: HELPDESK_TRIAGE_WORKERS)
+
+    Returns:
+        dict mit den Zählern triaged, cached, unchanged und failed
+    """
+    batch_size = max(1, batch_size or getattr(settings, 'HELPDESK_TRIAGE_BATCH_SIZE', 10))
+    workers = max(1, workers or getattr(settings, 'HELPDESK_TRIAGE_WORKERS', 2))
+    tickets = list(tickets)
+    stats = {'triaged': 0, 'cached': 0, 'unchanged': 0, 'failed': 0}
+
+    existing = {triage.ticket_id: triage for triage in TicketTriage.objects.filter(ticket__in=tickets)}
+    by_hash = {}
+    for ticket in tickets:
+        sha = content_hash(ticket)
+        current = existing.get(ticket.pk)
+        if not force and current is not None and current.content_sha256 == sha:
+            stats['unchanged'] += 1
+            continue
+        by_hash.setdefault(sha, []).append(ticket)
+
+    # Gleicher Inhalt wurde bereits bei einem anderen Ticket triagiert
+    if not force and by_hash:
+        known = TicketTriage.objects.filter(content_sha256__in=list(by_hash)).order_by('-triaged_at')
+        for triage in known:
+            group = by_hash.pop(triage.content_sha256, None)
+            if group is None:
+                continue
+            _store(group, triage.content_sha256, {
+                'category_name': triage.category_name,
+                'priority': triage.priority,
+                'sentiment': triage.sentiment,
+                'sentiment_score': triage.sentiment_score,
+            }, triage.provider)
+            stats['cached'] += len(group)
+
+    if not by_hash:
+        return stats
+    if not unified_ai_service.is_available():
+        logger.warning("Ticket-Triage übersprungen: kein KI-Provider verfügbar")
+        stats['failed'] += sum(len(group) for group in by_hash.values())
+        return stats
+
+    # Ein Vertreter je Inhalt; die Batch-ID ist der Index in dieser Liste
+    groups = list(by_hash.items())
+    items = [(index, group[0].title, group[0].description) for index, (_sha, group) in enumerate(groups)]
+    batches = [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+        outcomes = list(executor.map(_run_batch, batches))
+
+    for batch, (provider, results) in zip(batches, outcomes):
+        for index, _title, _description in batch:
+            sha, group = groups[index]
+            result = results.get(index)
+            if result is None:
+                _record_failure(group)
+                stats['failed'] += len(group)
+                continue
+            _store(group, sha, result, provider)
+            stats['triaged'] += len(group)
+
+    logger.info(f"Ticket-Triage: {stats}")
+    return stats
+
+
+def pending_tickets():
+    """
+    Neue Tickets ohne Triage (nur die letzten HELPDESK_TRIAGE_PENDING_DAYS Tage)
+
+    Fehlgeschlagene Tickets erst nach ihrer Wartezeit und höchstens
+    HELPDESK_TRIAGE_MAX_ATTEMPTS Mal, damit sie neue Tickets nicht verdrängen
+    """
+    now = timezone.now()
+    since = now - timedelta(days=getattr(settings, 'HELPDESK_TRIAGE_PENDING_DAYS', 7))
+    limit = getattr(settings, 'HELPDESK_TRIAGE_MAX_PER_RUN', 200)
+    retry = Q(
+        triage__content_sha256='',
+        triage__failed_attempts__lt=getattr(settings, 'HELPDESK_TRIAGE_MAX_ATTEMPTS', 5),
+        triage__retry_after__lte=now,
+    )
+    return Ticket.objects.filter(Q(triage__isnull=True) | retry, created_at__gte=since).order_by('created_at')[:limit]
+
+
+def triage_pending() -> Optional[Dict[str, int]]:
+    """Triagiert wartende Tickets; None, wenn bereits ein anderer Lauf aktiv ist"""
+    if not cache.add(LOCK_KEY, 1, LOCK_SECONDS):
+        return None
+    try:
+        return triage_tickets(pending_tickets())
+    finally:
+        cache.delete(LOCK_KEY)
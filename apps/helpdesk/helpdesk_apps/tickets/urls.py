@@ -13,4 +13,5 @@ urlpatterns = [
     path('<int:pk>/escalate/', views.ticket_escalate, name='escalate'),
     path('<int:pk>/close/', views.ticket_close, name='close'),
     path('<int:pk>/api/ai-suggest/', views.ai_suggest_response_api, name='ai_suggest_response'),
+    path('<int:pk>/api/ai-suggest/stream/', views.ai_suggest_response_stream, name='ai_suggest_response_stream'),
 ]
@@ -1,4 +1,5 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
 from django.contrib import messages
@@ -11,6 +12,8 @@ from django.db import models
 from .models import Ticket, TicketComment, Category, SupportDepartment, SupportQueue, TicketRoutingRule
 from .forms import TicketCreateForm, TicketCommentForm, AgentTicketCreateForm
 from .ai_service import ai_service
+from apps.core.services.ai_jobs import ProviderBusy, provider_slot, submit_job
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -930,7 +933,8 @@ def search_customers_api(request):
 def ai_suggest_response_api(request, pk):
     """
     API endpoint to generate AI response suggestion for a ticket.
-    Returns JSON with suggested response text.
+    Queues a background AI job and returns its status URL (HTTP 202); the
+    finished job's result holds the suggested response text.
     Only available for support agents and admins.
     """
     from django.http import JsonResponse
@@ -945,24 +949,57 @@ def ai_suggest_response_api(request, pk):
     if not request.user.can_access_ticket(ticket):
         return JsonResponse({'success': False, 'error': 'Keine Berechtigung für dieses Ticket'}, status=403)
 
-    # Generate AI suggestion
-    result = ai_service.suggest_ticket_response(ticket, agent=request.user)
-
-    if result['success']:
-        return JsonResponse({
-            'success': True,
-            'text': result['text'],
-            'provider': result['provider'],
-            'confidence': result['confidence'],
-            'kb_articles': [
-                {
-                    'id': article.id,
-                    'title': article.title,
-                    'excerpt': article.content[:200] + '...' if len(article.content) > 200 else article.content
-                }
-                for article in result['kb_articles']
-            ]
-        })
-    else:
-        error_msg = result.get('error', 'Fehler beim Generieren des Vorschlags')
-        return JsonResponse({'success': False, 'error': error_msg}, status=500)
\ No newline at end of file
+    # Queue the suggestion; the editor polls the job until the text is ready
+    job = submit_job('helpdesk.suggest_response', {'ticket_id': ticket.pk, 'agent_id': request.user.pk}, user=request.user)
+    return JsonResponse({
+        'success': True,
+        'job_id': job.pk,
+        'status': job.status,
+        'status_url': reverse('ai_job_status', args=[job.pk]),
+    }, status=202)
+
+
+def _sse(event, data):
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@login_required
+def ai_suggest_response_stream(request, pk):
+    """
+    Server-sent event stream of an AI response suggestion for a ticket.
+    Emits one 'token' event per text fragment as the provider produces it and
+    a final 'done' event with the complete suggestion (including signature),
+    or an 'error' event; 'busy' errors mean the editor should queue a job instead.
+    Only available for support agents and admins.
+    """
+    from django.http import JsonResponse, StreamingHttpResponse
+
+    if not getattr(settings, 'HELPDESK_AI_STREAMING', True):
+        return JsonResponse({'success': False, 'error': 'Streaming deaktiviert'}, status=404)
+
+    if request.user.role not in ['support_agent', 'admin']:
+        return JsonResponse({'success': False, 'error': 'Keine Berechtigung'}, status=403)
+
+    ticket = get_object_or_404(Ticket, pk=pk)
+
+    if not request.user.can_access_ticket(ticket):
+        return JsonResponse({'success': False, 'error': 'Keine Berechtigung für dieses Ticket'}, status=403)
+
+    # Prompt and KB lookup run here, inside the request; only generation is streamed
+    events = ai_service.stream_ticket_response(ticket, agent=request.user)
+
+    def stream():
+        # Comment line so proxies and the browser see the response start immediately
+        yield ": stream\n\n"
+        try:
+            with provider_slot('helpdesk'):
+                for event in events:
+                    yield _sse(event.pop('event'), event)
+        except ProviderBusy:
+            yield _sse('error', {'error': 'KI-Anbieter ist ausgelastet', 'busy': True})
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
\ No newline at end of file
@@ -6,6 +6,7 @@ from apps.marketing.models import (
     ContentApproval,
     ContentRevision,
     CampaignKpiSnapshot,
+    CampaignKpiRollup,
 )
 
 
@@ -117,3 +118,21 @@ class CampaignKpiSnapshotSerializer(serializers.ModelSerializer):
             'imported_at',
         ]
         read_only_fields = ['imported_at']
+
+
+class CampaignKpiRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CampaignKpiRollup
+        fields = [
+            'id',
+            'campaign',
+            'period',
+            'period_start',
+            'channel',
+            'impressions',
+            'clicks',
+            'conversions',
+            'spend',
+            'revenue',
+        ]
+        read_only_fields = fields
@@ -7,6 +7,7 @@ from .views import (
     ContentApprovalViewSet,
     ContentRevisionViewSet,
     CampaignKpiSnapshotViewSet,
+    CampaignKpiRollupViewSet,
 )
 
 app_name = 'marketing_api'
@@ -19,6 +20,7 @@ router.register(r'ideas', ContentIdeaViewSet, basename='ideas')
 router.register(r'approvals', ContentApprovalViewSet, basename='approvals')
 router.register(r'revisions', ContentRevisionViewSet, basename='revisions')
 router.register(r'kpi-snapshots', CampaignKpiSnapshotViewSet, basename='kpi-snapshots')
+router.register(r'kpi-rollups', CampaignKpiRollupViewSet, basename='kpi-rollups')
 
 urlpatterns = [
     path('', include(router.urls)),
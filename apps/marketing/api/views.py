@@ -7,6 +7,7 @@ from apps.marketing.models import (
     ContentApproval,
     ContentRevision,
     CampaignKpiSnapshot,
+    CampaignKpiRollup,
 )
 from .serializers import (
     CampaignSerializer,
@@ -15,6 +16,7 @@ from .serializers import (
     ContentApprovalSerializer,
     ContentRevisionSerializer,
     CampaignKpiSnapshotSerializer,
+    CampaignKpiRollupSerializer,
 )
 from .permissions import MarketingReadWritePermission
 
@@ -93,3 +95,24 @@ class CampaignKpiSnapshotViewSet(BaseMarketingViewSet):
         if campaign_id:
             qs = qs.filter(campaign_id=campaign_id)
         return qs
+
+
+class CampaignKpiRollupViewSet(viewsets.ReadOnlyModelViewSet):
+    """Precomputed day/week/month KPI totals; channel '' holds all channels."""
+    permission_classes = [IsAuthenticated, MarketingReadWritePermission]
+    filter_backends = [filters.OrderingFilter]
+    queryset = CampaignKpiRollup.objects.all()
+    serializer_class = CampaignKpiRollupSerializer
+    ordering_fields = ['period_start']
+    ordering = ['period_start']
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        params = self.request.query_params
+        if params.get('campaign'):
+            qs = qs.filter(campaign_id=params['campaign'])
+        if params.get('period'):
+            qs = qs.filter(period=params['period'])
+        if 'channel' in params:
+            qs = qs.filter(channel=params['channel'])
+        return qs
@@ -0,0 +1,53 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0006_campaignkpisnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignKpiDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('channel', models.CharField(default='other', max_length=100)),
+                ('impressions', models.PositiveBigIntegerField(default=0)),
+                ('clicks', models.PositiveBigIntegerField(default=0)),
+                ('conversions', models.PositiveBigIntegerField(default=0)),
+                ('spend', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('imported_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kpi_daily', to='marketing.campaign')),
+            ],
+            options={
+                'ordering': ['campaign', 'date', 'channel'],
+                'constraints': [models.UniqueConstraint(fields=('campaign', 'date', 'channel'), name='marketing_kpi_daily_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CampaignKpiRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Tag'), ('week', 'Woche'), ('month', 'Monat')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('channel', models.CharField(blank=True, default='', max_length=100)),
+                ('impressions', models.PositiveBigIntegerField(default=0)),
+                ('clicks', models.PositiveBigIntegerField(default=0)),
+                ('conversions', models.PositiveBigIntegerField(default=0)),
+                ('spend', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kpi_rollups', to='marketing.campaign')),
+            ],
+            options={
+                'ordering': ['campaign', 'period', 'period_start', 'channel'],
+                'constraints': [models.UniqueConstraint(fields=('campaign', 'period', 'period_start', 'channel'), name='marketing_kpi_rollup_unique')],
+            },
+        ),
+    ]
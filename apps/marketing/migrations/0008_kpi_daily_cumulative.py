@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketing', '0007_campaign_kpi_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaignkpidaily',
+            name='cumulative',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -72,6 +72,64 @@ class CampaignKpiSnapshot(models.Model):
         return f"{self.campaign.name} - {self.imported_at:%Y-%m-%d %H:%M}"
 
 
+class CampaignKpiDaily(models.Model):
+    """Imported KPIs of one campaign, day and channel (fact table)."""
+
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='kpi_daily')
+    date = models.DateField()
+    channel = models.CharField(max_length=100, default='other')
+    impressions = models.PositiveBigIntegerField(default=0)
+    clicks = models.PositiveBigIntegerField(default=0)
+    conversions = models.PositiveBigIntegerField(default=0)
+    spend = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    imported_at = models.DateTimeField(default=timezone.now)
+    # Cumulative totals from an upload without a date column, booked on the import day
+    cumulative = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['campaign', 'date', 'channel']
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'date', 'channel'], name='marketing_kpi_daily_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign.name} - {self.date} - {self.channel}"
+
+
+class CampaignKpiRollup(models.Model):
+    """Precomputed KPI totals per day, week or month; channel '' holds all channels."""
+
+    PERIOD_CHOICES = [
+        ('day', 'Tag'),
+        ('week', 'Woche'),
+        ('month', 'Monat'),
+    ]
+    ALL_CHANNELS = ''
+
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='kpi_rollups')
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    channel = models.CharField(max_length=100, blank=True, default='')
+    impressions = models.PositiveBigIntegerField(default=0)
+    clicks = models.PositiveBigIntegerField(default=0)
+    conversions = models.PositiveBigIntegerField(default=0)
+    spend = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['campaign', 'period', 'period_start', 'channel']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['campaign', 'period', 'period_start', 'channel'],
+                name='marketing_kpi_rollup_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign.name} - {self.period} {self.period_start} - {self.channel or 'alle'}"
+
+
 class ContentAsset(models.Model):
     TYPE_CHOICES = [
         ('blog', 'Blog'),
@@ -1,6 +1,6 @@
 ﻿import json
 from django.utils import timezone
-from apps.core.services.bedrock import BedrockService
+from apps.core.services.ai_gateway import gateway
 
 
 def _safe_json(text: str) -> dict:
@@ -12,7 +12,7 @@ def _safe_json(text: str) -> dict:
 
 class MarketingAIService:
     def __init__(self):
-        self.client = BedrockService()
+        self.client = gateway
 
     def generate_content(self, asset_type: str, channel: str, brief: str) -> dict:
         prompt = (
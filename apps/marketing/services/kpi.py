@@ -0,0 +1,301 @@
+"""
+Vectorized KPI import and rollups for marketing campaigns.
+
+Ad-platform exports are read with pandas in chunks (only the KPI columns are
+parsed), summed per day and channel and upserted into CampaignKpiDaily.
+Exports without a date column (e.g. our own snapshot export) are cumulative
+totals: they replace the campaign's facts instead of adding a day to them.
+Afterwards the day/week/month rollups of the campaign are rebuilt, so
+dashboards and trend charts only read a handful of CampaignKpiRollup rows.
+"""
+
+import csv
+import io
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.marketing.models import Campaign, CampaignKpiDaily, CampaignKpiRollup, CampaignKpiSnapshot
+
+CHUNK_ROWS = 100_000
+SNIFF_BYTES = 64 * 1024
+DEFAULT_CHANNEL = 'other'
+METRICS = ['impressions', 'clicks', 'conversions', 'spend', 'revenue']
+COUNT_METRICS = ['impressions', 'clicks', 'conversions']
+MONEY_METRICS = ['spend', 'revenue']
+TREND_POINTS = {'day': 7, 'week': 12, 'month': 12}
+
+# Header aliases: our template, German labels and common ad-platform exports.
+COLUMNS = {
+    'date': ('date', 'day', 'datum', 'tag', 'reporting starts', 'berichtsbeginn'),
+    'channel': ('channel', 'kanal', 'platform', 'plattform', 'source', 'quelle', 'network'),
+    'impressions': ('impressions', 'impr', 'impr.', 'impressionen'),
+    'clicks': ('clicks', 'klicks', 'link clicks'),
+    'conversions': ('conversions', 'conv', 'conv.', 'leads', 'results', 'ergebnisse'),
+    'spend': ('spend', 'cost', 'kosten', 'amount spent', 'amount spent (eur)', 'ausgegebener betrag (eur)'),
+    'revenue': ('revenue', 'value', 'umsatz', 'conv. value', 'conversion value', 'purchase conversion value'),
+}
+
+
+class KpiImportError(ValueError):
+    def __init__(self, message, missing=None):
+        super().__init__(message)
+        self.missing = missing or []
+
+
+def _sniff(fileobj):
+    """Detect delimiter and map our column names to the header of the upload."""
+    sample = fileobj.read(SNIFF_BYTES)
+    fileobj.seek(0)
+    if isinstance(sample, bytes):
+        sample = sample.decode('utf-8-sig', errors='replace')
+    first_line = sample.splitlines()[0] if sample else ''
+    # German exports use ';', some platforms tabs
+    delimiter = max(',;\t', key=first_line.count)
+    header = next(csv.reader(io.StringIO(first_line), delimiter=delimiter), [])
+    lookup = {str(name).strip().lower(): name for name in header}
+    mapping = {}
+    for column, aliases in COLUMNS.items():
+        for alias in aliases:
+            if alias in lookup:
+                mapping[column] = lookup[alias]
+                break
+    return delimiter, mapping
+
+
+def parse_numbers(values: pd.Series) -> np.ndarray:
+    """
+    Parse a column of numbers in German or English notation.
+
+    The separator that comes last is the decimal separator; a lone separator
+    followed by groups of exactly three digits ("1.234", "1,234") is read as a
+    thousands separator. Currency symbols, spaces and percent signs are dropped.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.fillna(0).to_numpy(dtype=float)
+    text = values.fillna('').astype(str).str.replace(r'[^\d,.\-]', '', regex=True)
+    last_comma = text.str.rfind(',')
+    last_dot = text.str.rfind('.')
+    comma_decimal = (last_comma > last_dot) & ~text.str.fullmatch(r'-?\d{1,3}(,\d{3})+')
+    dot_thousands = (last_comma < 0) & text.str.fullmatch(r'-?\d{1,3}(\.\d{3})+')
+    cleaned = np.select(
+        [comma_decimal.to_numpy(), dot_thousands.to_numpy()],
+        [
+            text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False).to_numpy(),
+            text.str.replace('.', '', regex=False).to_numpy(),
+        ],
+        text.str.replace(',', '', regex=False).to_numpy(),
+    )
+    return pd.to_numeric(pd.Series(cleaned), errors='coerce').fillna(0).to_numpy(dtype=float)
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Parse ISO, German (dd.mm.yyyy) and US (mm/dd/yyyy) dates; unknown values become NaT."""
+    text = values.fillna('').astype(str).str.strip().str.slice(0, 10)
+    parsed = pd.to_datetime(text, format='%Y-%m-%d', errors='coerce')
+    for date_format in ('%d.%m.%Y', '%m/%d/%Y'):
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed = parsed.where(~missing, pd.to_datetime(text, format=date_format, errors='coerce'))
+    return parsed
+
+
+def read_daily_kpis(fileobj, default_date=None):
+    """
+    Read an export and sum its KPIs per day and channel.
+
+    Rows without a readable date (e.g. totals lines) are skipped; files without
+    a date column are booked on ``default_date``.
+
+    Returns:
+        (DataFrame with date, channel and METRICS columns, rows read, rows skipped)
+    """
+    delimiter, mapping = _sniff(fileobj)
+    missing = sorted(column for column in METRICS if column not in mapping)
+    if missing:
+        raise KpiImportError(f"CSV fehlt Spalten: {', '.join(missing)}", missing)
+
+    default_date = default_date or timezone.localdate()
+    rename = {source: column for column, source in mapping.items()}
+    reader = pd.read_csv(
+        fileobj,
+        sep=delimiter,
+        usecols=list(rename),
+        # Numbers stay text: pandas would read German "1.200" as 1.2
+        dtype=str,
+        encoding='utf-8-sig',
+        encoding_errors='replace',
+        chunksize=CHUNK_ROWS,
+    )
+
+    parts, rows, skipped = [], 0, 0
+    for chunk in reader:
+        chunk = chunk.rename(columns=rename)
+        rows += len(chunk)
+        frame = pd.DataFrame({column: parse_numbers(chunk[column]) for column in METRICS})
+        if 'date' in chunk:
+            frame['date'] = parse_dates(chunk['date']).dt.date.to_numpy()
+        else:
+            frame['date'] = default_date
+        if 'channel' in chunk:
+            channel = chunk['channel'].fillna('').astype(str).str.strip().str.lower().str.slice(0, 100)
+            frame['channel'] = channel.where(channel != '', DEFAULT_CHANNEL).to_numpy()
+        else:
+            frame['channel'] = DEFAULT_CHANNEL
+        valid = frame['date'].notna()
+        skipped += int((~valid).sum())
+        parts.append(frame[valid].groupby(['date', 'channel'], as_index=False)[METRICS].sum())
+
+    if not parts:
+        return pd.DataFrame(columns=['date', 'channel', *METRICS]), rows, skipped
+    daily = pd.concat(parts).groupby(['date', 'channel'], as_index=False)[METRICS].sum()
+    return daily, rows, skipped
+
+
+def _money(value) -> Decimal:
+    return Decimal(f"{value:.2f}")
+
+
+def _kpi_values(row) -> dict:
+    values = {column: max(int(round(getattr(row, column))), 0) for column in COUNT_METRICS}
+    values.update({column: _money(getattr(row, column)) for column in MONEY_METRICS})
+    return values
+
+
+def rebuild_rollups(campaign: Campaign) -> int:
+    """Recompute the day (all channels), week and month rollups of a campaign from its daily facts."""
+    records = list(
+        CampaignKpiDaily.objects.filter(campaign=campaign).values_list('date', 'channel', *METRICS)
+    )
+    CampaignKpiRollup.objects.filter(campaign=campaign).delete()
+    if not records:
+        return 0
+
+    daily = pd.DataFrame.from_records(records, columns=['date', 'channel', *METRICS])
+    for column in MONEY_METRICS:
+        daily[column] = daily[column].astype(float)
+    dates = pd.to_datetime(daily['date'])
+    starts = {
+        'day': dates,
+        'week': dates - pd.to_timedelta(dates.dt.weekday, unit='D'),
+        'month': dates.dt.to_period('M').dt.start_time,
+    }
+
+    frames = []
+    for period, start in starts.items():
+        keyed = daily.assign(period=period, period_start=start.dt.date)
+        frames.append(
+            keyed.groupby(['period', 'period_start'], as_index=False)[METRICS].sum()
+            .assign(channel=CampaignKpiRollup.ALL_CHANNELS)
+        )
+        if period != 'day':
+            # Per-channel days are the daily facts themselves
+            frames.append(keyed.groupby(['period', 'period_start', 'channel'], as_index=False)[METRICS].sum())
+
+    rollups = [
+        CampaignKpiRollup(
+            campaign=campaign,
+            period=row.period,
+            period_start=row.period_start,
+            channel=row.channel,
+            **_kpi_values(row),
+        )
+        for row in pd.concat(frames).itertuples(index=False)
+    ]
+    CampaignKpiRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def import_kpi_csv(campaign: Campaign, fileobj) -> dict:
+    """
+    Import an ad-platform export into the campaign's KPI fact table.
+
+    Days and channels contained in the upload replace earlier imports of the
+    same day and channel. An upload without a date column holds cumulative
+    totals and replaces all daily facts of the campaign (booked on today);
+    a dated upload in turn replaces such cumulative facts.
+    Campaign totals are the sum over all daily facts; the previous totals move
+    to the ``last_kpi_*`` fields and a snapshot is stored as before.
+
+    Returns:
+        dict with rows, skipped, days, channels and the new totals
+    """
+    dated = 'date' in _sniff(fileobj)[1]
+    daily, rows, skipped = read_daily_kpis(fileobj)
+    imported_at = timezone.now()
+
+    with transaction.atomic():
+        if dated:
+            # Daily figures supersede totals booked by an earlier date-less import
+            CampaignKpiDaily.objects.filter(campaign=campaign, cumulative=True).delete()
+        else:
+            # Re-importing a totals export later must not count it twice
+            CampaignKpiDaily.objects.filter(campaign=campaign).delete()
+        CampaignKpiDaily.objects.bulk_create(
+            [
+                CampaignKpiDaily(
+                    campaign=campaign,
+                    date=row.date,
+                    channel=row.channel,
+                    imported_at=imported_at,
+                    cumulative=not dated,
+                    **_kpi_values(row),
+                )
+                for row in daily.itertuples(index=False)
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['campaign', 'date', 'channel'],
+            update_fields=[*METRICS, 'imported_at', 'cumulative'],
+        )
+        rebuild_rollups(campaign)
+
+        totals = CampaignKpiDaily.objects.filter(campaign=campaign).aggregate(
+            **{column: Sum(column) for column in METRICS}
+        )
+        update_fields = ['last_kpi_imported_at', 'updated_at']
+        for column in METRICS:
+            setattr(campaign, f'last_kpi_{column}', getattr(campaign, f'kpi_{column}'))
+            setattr(campaign, f'kpi_{column}', totals[column] or 0)
+            update_fields += [f'kpi_{column}', f'last_kpi_{column}']
+        campaign.last_kpi_imported_at = imported_at
+        campaign.save(update_fields=update_fields)
+        CampaignKpiSnapshot.objects.create(
+            campaign=campaign,
+            imported_at=imported_at,
+            **{column: getattr(campaign, f'kpi_{column}') for column in METRICS},
+        )
+
+    return {
+        'rows': rows,
+        'skipped': skipped,
+        'days': int(daily['date'].nunique()),
+        'channels': sorted(daily['channel'].unique().tolist()),
+        'totals': {column: totals[column] or 0 for column in METRICS},
+    }
+
+
+def kpi_trend(campaign: Campaign, metric: str, period: str = 'day') -> list:
+    """Latest rollup values of one metric (all channels), oldest first."""
+    rows = CampaignKpiRollup.objects.filter(
+        campaign=campaign,
+        period=period,
+        channel=CampaignKpiRollup.ALL_CHANNELS,
+    ).order_by('-period_start').values_list('period_start', metric)[:TREND_POINTS[period]]
+    return list(rows)[::-1]
+
+
+def channel_totals(campaign: Campaign) -> list:
+    """KPI totals per channel, read from the monthly rollups."""
+    return list(
+        CampaignKpiRollup.objects.filter(campaign=campaign, period='month')
+        .exclude(channel=CampaignKpiRollup.ALL_CHANNELS)
+        .values('channel')
+        .annotate(**{column: Sum(column) for column in METRICS})
+        .order_by('-impressions', 'channel')
+    )
@@ -2,11 +2,12 @@ from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
 from apps.marketing.models import ContentAsset
 from apps.workflows.services import run_workflows_for_trigger
+from apps.workflows.trigger_index import has_trigger
 
 
 @receiver(pre_save, sender=ContentAsset)
 def _marketing_store_status(sender, instance, **kwargs):
-    if not instance.pk:
+    if not instance.pk or not has_trigger('marketing_asset_status'):
         return
     old = ContentAsset.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
     instance._old_status = old
@@ -10,13 +10,17 @@ from django.utils import timezone
 
 from django.http import HttpResponse
 
+from django.utils.translation import gettext as _
+
 from collections import defaultdict
 
-from .models import Campaign, ContentAsset, ContentIdea, ContentApproval, ContentRevision, CampaignKpiSnapshot
+from .models import Campaign, ContentAsset, ContentIdea, ContentApproval, ContentRevision
 from .forms import CampaignForm, ContentAssetForm, ContentIdeaForm, ApprovalForm
 
 from .services.ai import MarketingAIService
 
+from .services.kpi import KpiImportError, TREND_POINTS, channel_totals, import_kpi_csv, kpi_trend
+
 from .permissions import (
 
     MarketingViewMixin,
@@ -29,10 +33,6 @@ from .permissions import (
 
 )
 
-import csv
-
-from io import TextIOWrapper
-
 
 
 
@@ -189,72 +189,6 @@ def _run_preflight_checks(asset: ContentAsset) -> list:
 
 
 
-def _parse_number(value, is_int=False):
-
-    if value is None:
-
-        return 0
-
-    text = str(value).strip().replace(".", "").replace(",", ".")
-
-    if not text:
-
-        return 0
-
-    try:
-
-        return int(float(text)) if is_int else float(text)
-
-    except Exception:
-
-        return 0
-
-
-
-
-
-def _parse_kpi_csv(upload):
-    totals = {
-        "impressions": 0,
-        "clicks": 0,
-        "conversions": 0,
-        "spend": 0.0,
-        "revenue": 0.0,
-    }
-    wrapped = TextIOWrapper(upload.file, encoding="utf-8", errors="ignore")
-
-    reader = csv.DictReader(wrapped)
-
-    for row in reader:
-
-        normalized = {str(k).strip().lower(): v for k, v in row.items()}
-
-        totals["impressions"] += _parse_number(normalized.get("impressions") or normalized.get("impr"), is_int=True)
-
-        totals["clicks"] += _parse_number(normalized.get("clicks"), is_int=True)
-
-        totals["conversions"] += _parse_number(
-
-            normalized.get("conversions") or normalized.get("conv") or normalized.get("leads"),
-
-            is_int=True,
-
-        )
-
-        totals["spend"] += _parse_number(normalized.get("spend") or normalized.get("cost"))
-        totals["revenue"] += _parse_number(normalized.get("revenue") or normalized.get("value"))
-    return totals
-
-
-def _validate_kpi_csv(upload):
-    wrapped = TextIOWrapper(upload.file, encoding="utf-8", errors="ignore")
-    reader = csv.DictReader(wrapped)
-    headers = [str(h).strip().lower() for h in (reader.fieldnames or [])]
-    required = {"impressions", "clicks", "conversions", "spend", "revenue"}
-    missing = [h for h in required if h not in headers]
-    return missing
-
-
 def _kpi_delta(current, previous):
     try:
         return current - previous
@@ -280,20 +214,18 @@ def _chart_data_for_campaign(campaign: Campaign):
     return chart
 
 
-def _trend_values_for_snapshots(snapshots, metric):
-    values = []
-    for snap in snapshots:
-        values.append(getattr(snap, metric, 0) or 0)
+def _trend_points(rows):
+    """Bar heights for (period_start, value) rollup rows, normalized to the maximum."""
+    values = [value or 0 for _start, value in rows]
     max_value = max(values or [1])
     min_value = min(values or [0])
     points = []
-    for snap in snapshots:
-        value = getattr(snap, metric, 0) or 0
+    for (start, _raw), value in zip(rows, values):
         percent = 0
         if max_value:
             percent = round((value / max_value) * 100, 2)
         points.append({
-            "date": snap.imported_at.date(),
+            "date": start,
             "value": value,
             "percent": percent,
         })
@@ -410,14 +342,18 @@ class CampaignDetailView(MarketingViewMixin, DetailView):
         metric = self.request.GET.get('trend', 'clicks').lower()
         if metric not in ['clicks', 'impressions', 'revenue']:
             metric = 'clicks'
-        snapshots = list(self.object.kpi_snapshots.order_by('-imported_at')[:7])[::-1]
+        period = self.request.GET.get('period', 'day').lower()
+        if period not in TREND_POINTS:
+            period = 'day'
         context['trend_metric'] = metric
-        points, min_value, max_value, delta = _trend_values_for_snapshots(snapshots, metric)
+        context['trend_period'] = period
+        points, min_value, max_value, delta = _trend_points(kpi_trend(self.object, metric, period))
         context['kpi_sparkline'] = points
         context['kpi_trend_min'] = min_value
         context['kpi_trend_max'] = max_value
         context['kpi_trend_delta'] = delta
-        context['kpi_snapshots'] = snapshots
+        context['kpi_channels'] = channel_totals(self.object)
+        context['kpi_snapshots'] = list(self.object.kpi_snapshots.order_by('-imported_at')[:7])[::-1]
         return context
 
 
@@ -439,47 +375,17 @@ class CampaignDetailView(MarketingViewMixin, DetailView):
                 messages.error(request, _("Bitte CSV-Datei auswählen."))
                 return redirect(reverse('marketing:campaign_detail', args=[self.object.pk]))
             try:
-                missing = _validate_kpi_csv(upload)
-                upload.seek(0)
-                if missing:
-                    messages.error(request, _("CSV fehlt Spalten: %(columns)s") % {"columns": ", ".join(sorted(missing))})
-                    return redirect(reverse('marketing:campaign_detail', args=[self.object.pk]))
-                self.object.last_kpi_impressions = self.object.kpi_impressions
-                self.object.last_kpi_clicks = self.object.kpi_clicks
-                self.object.last_kpi_conversions = self.object.kpi_conversions
-                self.object.last_kpi_spend = self.object.kpi_spend
-                self.object.last_kpi_revenue = self.object.kpi_revenue
-                totals = _parse_kpi_csv(upload)
-                self.object.kpi_impressions = totals["impressions"]
-                self.object.kpi_clicks = totals["clicks"]
-                self.object.kpi_conversions = totals["conversions"]
-                self.object.kpi_spend = totals["spend"]
-                self.object.kpi_revenue = totals["revenue"]
-                self.object.last_kpi_imported_at = timezone.now()
-                self.object.save(update_fields=[
-                    'kpi_impressions',
-                    'kpi_clicks',
-                    'kpi_conversions',
-                    'kpi_spend',
-                    'kpi_revenue',
-                    'last_kpi_impressions',
-                    'last_kpi_clicks',
-                    'last_kpi_conversions',
-                    'last_kpi_spend',
-                    'last_kpi_revenue',
-                    'last_kpi_imported_at',
-                    'updated_at',
-                ])
-                CampaignKpiSnapshot.objects.create(
-                    campaign=self.object,
-                    impressions=self.object.kpi_impressions,
-                    clicks=self.object.kpi_clicks,
-                    conversions=self.object.kpi_conversions,
-                    spend=self.object.kpi_spend,
-                    revenue=self.object.kpi_revenue,
-                    imported_at=self.object.last_kpi_imported_at,
-                )
-                messages.success(request, _("KPIs importiert."))
+                result = import_kpi_csv(self.object, upload.file)
+                messages.success(request, _("KPIs importiert: %(rows)s Zeilen, %(days)s Tage, Kanäle: %(channels)s") % {
+                    "rows": result["rows"],
+                    "days": result["days"],
+                    "channels": ", ".join(result["channels"]),
+                })
+            except KpiImportError as exc:
+                if exc.missing:
+                    messages.error(request, _("CSV fehlt Spalten: %(columns)s") % {"columns": ", ".join(sorted(exc.missing))})
+                else:
+                    messages.error(request, str(exc))
             except Exception as exc:
                 messages.error(request, _("KPI-Import fehlgeschlagen: %(error)s") % {"error": exc})
         return redirect(reverse('marketing:campaign_detail', args=[self.object.pk]))
@@ -487,7 +393,7 @@ class CampaignDetailView(MarketingViewMixin, DetailView):
 
 class MarketingKpiTemplateView(MarketingViewMixin, View):
     def get(self, request, *args, **kwargs):
-        content = "impressions,clicks,conversions,spend,revenue\n"
+        content = "date,channel,impressions,clicks,conversions,spend,revenue\n"
         response = HttpResponse(content, content_type="text/csv")
         response["Content-Disposition"] = 'attachment; filename="kpi_template.csv"'
         return response
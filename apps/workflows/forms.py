@@ -18,11 +18,13 @@ class WorkflowForm(forms.ModelForm):
 class WorkflowStepForm(forms.ModelForm):
     class Meta:
         model = WorkflowStep
-        fields = ['workflow', 'name', 'action_type', 'config', 'order']
+        fields = ['workflow', 'name', 'action_type', 'config', 'order', 'timeout_seconds', 'max_retries']
         widgets = {
             'workflow': forms.Select(attrs={'class': 'form-select'}),
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'action_type': forms.Select(attrs={'class': 'form-select'}),
             'config': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'order': forms.NumberInput(attrs={'class': 'form-control', 'min': '1'}),
+            'timeout_seconds': forms.NumberInput(attrs={'class': 'form-control', 'min': '1'}),
+            'max_retries': forms.NumberInput(attrs={'class': 'form-control', 'min': '0'}),
         }
@@ -0,0 +1,75 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0003_workflow_trigger_filters_alter_workflow_trigger_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkflowStepRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('action_type', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('success', 'Success'), ('skipped', 'Skipped'), ('failed', 'Failed')], max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=1)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('message', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['started_at', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='workflowexecution',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='workflowexecution',
+            name='context',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='workflowexecution',
+            name='duration_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workflowstep',
+            name='max_retries',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='workflowstep',
+            name='timeout_seconds',
+            field=models.PositiveIntegerField(default=15),
+        ),
+        migrations.AlterField(
+            model_name='workflowexecution',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('success', 'Success'), ('failed', 'Failed'), ('dead', 'Dead Letter')], default='queued', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='workflowexecution',
+            index=models.Index(fields=['status', 'started_at'], name='workflows_w_status_9f5713_idx'),
+        ),
+        migrations.AddField(
+            model_name='workflowsteprun',
+            name='execution',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='step_runs', to='workflows.workflowexecution'),
+        ),
+        migrations.AddField(
+            model_name='workflowsteprun',
+            name='step',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='runs', to='workflows.workflowstep'),
+        ),
+    ]
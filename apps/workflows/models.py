@@ -36,7 +36,10 @@ class WorkflowStep(models.Model):
     name = models.CharField(max_length=200)
     action_type = models.CharField(max_length=50, choices=ACTION_CHOICES, default='email')
     config = models.JSONField(default=dict, blank=True)
+    # Steps sharing the same order run concurrently as one stage.
     order = models.PositiveIntegerField(default=1)
+    timeout_seconds = models.PositiveIntegerField(default=15)
+    max_retries = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.workflow.name}: {self.name}"
@@ -48,13 +51,47 @@ class WorkflowExecution(models.Model):
         ('running', 'Running'),
         ('success', 'Success'),
         ('failed', 'Failed'),
+        ('dead', 'Dead Letter'),
     ]
 
     workflow = models.ForeignKey(Workflow, on_delete=models.CASCADE, related_name='executions')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
     message = models.TextField(blank=True)
+    context = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
     started_at = models.DateTimeField(auto_now_add=True)
     finished_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'started_at']),
+        ]
+
     def __str__(self):
         return f"{self.workflow.name} ({self.status})"
+
+
+class WorkflowStepRun(models.Model):
+    STATUS_CHOICES = [
+        ('success', 'Success'),
+        ('skipped', 'Skipped'),
+        ('failed', 'Failed'),
+    ]
+
+    execution = models.ForeignKey(WorkflowExecution, on_delete=models.CASCADE, related_name='step_runs')
+    step = models.ForeignKey(WorkflowStep, on_delete=models.SET_NULL, null=True, blank=True, related_name='runs')
+    name = models.CharField(max_length=200)
+    action_type = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    attempts = models.PositiveIntegerField(default=1)
+    duration_ms = models.PositiveIntegerField(default=0)
+    message = models.TextField(blank=True)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['started_at', 'id']
+
+    def __str__(self):
+        return f"{self.name} ({self.status}, {self.duration_ms} ms)"
@@ -1,115 +1,368 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import groupby
+
 from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
 from django.utils import timezone
 import requests
+from requests.adapters import HTTPAdapter
+
+from apps.workflows.trigger_index import get_index
+
+logger = logging.getLogger(__name__)
+
+RETRY_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 10.0
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide session so webhook steps reuse pooled keep-alive connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = int(getattr(settings, 'WORKFLOWS_HTTP_POOL_SIZE', 20))
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+class StepFailed(Exception):
+    """A step failed in a way that is worth retrying."""
+
+
+@dataclass
+class StepResult:
+    step: object
+    status: str
+    message: str
+    attempts: int
+    started_at: datetime
+    finished_at: datetime
+    duration_ms: int
+
+
+def _step_webhook(step, config: dict, context: dict) -> tuple[str, str]:
+    url = config.get('url')
+    if not url:
+        return 'skipped', f"{step.name}: webhook missing url"
+    payload = config.get('payload') or context
+    try:
+        response = get_http_session().post(url, json=payload, timeout=step.timeout_seconds or None)
+    except requests.RequestException as exc:
+        raise StepFailed(f"{step.name}: webhook error ({exc})") from exc
+    if response.status_code >= 400:
+        raise StepFailed(f"{step.name}: webhook HTTP {response.status_code}")
+    return 'success', f"{step.name}: webhook ok"
+
+
+def _step_erp_invoice_email(step, config: dict, context: dict) -> tuple[str, str]:
+    invoice_id = config.get('invoice_id') or context.get('invoice_id')
+    if not invoice_id:
+        return 'skipped', f"{step.name}: invoice_id missing"
+    Invoice = apps.get_model('erp', 'Invoice')
+    invoice = Invoice.objects.filter(id=invoice_id).first()
+    if not invoice:
+        return 'skipped', f"{step.name}: invoice not found"
+    from apps.erp.services.invoice_mail import send_invoice_email as _send_invoice_email
+    if _send_invoice_email(invoice):
+        return 'success', f"{step.name}: invoice email sent"
+    raise StepFailed(f"{step.name}: invoice email failed")
+
+
+def _step_erp_dunning_email(step, config: dict, context: dict) -> tuple[str, str]:
+    dunning_id = config.get('dunning_id') or context.get('dunning_id')
+    if not dunning_id:
+        return 'skipped', f"{step.name}: dunning_id missing"
+    Dunning = apps.get_model('erp', 'DunningNotice')
+    notice = Dunning.objects.filter(id=dunning_id).first()
+    if not notice:
+        return 'skipped', f"{step.name}: dunning not found"
+    from apps.erp.services.dunning import send_dunning_email as _send_dunning_email
+    if _send_dunning_email(notice):
+        return 'success', f"{step.name}: dunning email sent"
+    raise StepFailed(f"{step.name}: dunning email failed")
+
+
+STEP_HANDLERS = {
+    'webhook': _step_webhook,
+    'erp_invoice_email': _step_erp_invoice_email,
+    'erp_dunning_email': _step_erp_dunning_email,
+}
+
+
+def _call_step(step, context: dict) -> tuple[str, str]:
+    handler = STEP_HANDLERS.get(step.action_type)
+    if handler is None:
+        return 'skipped', f"{step.name}: skipped ({step.action_type})"
+    return handler(step, step.config or {}, context)
+
+
+def run_step(step, context: dict) -> StepResult:
+    """Run one step with its retry budget; never raises."""
+    started = timezone.now()
+    clock = time.monotonic()
+    attempts = 0
+    max_attempts = 1 + (step.max_retries or 0)
+    while True:
+        attempts += 1
+        try:
+            status, message = _call_step(step, context)
+            break
+        except StepFailed as exc:
+            status, message = 'failed', str(exc)
+        except Exception as exc:
+            status, message = 'failed', f"{step.name}: {exc}"
+        if attempts >= max_attempts:
+            break
+        time.sleep(min(RETRY_BACKOFF_SECONDS * (2 ** (attempts - 1)), MAX_BACKOFF_SECONDS))
+    return StepResult(
+        step=step,
+        status=status,
+        message=message,
+        attempts=attempts,
+        started_at=started,
+        finished_at=timezone.now(),
+        duration_ms=int((time.monotonic() - clock) * 1000),
+    )
+
+
+def _run_step_in_thread(step, context: dict) -> StepResult:
+    try:
+        return run_step(step, context)
+    finally:
+        connections.close_all()
+
+
+def _step_budget(step) -> float | None:
+    """Wall-clock limit for a step including all retries and backoff."""
+    if not step.timeout_seconds:
+        return None
+    retries = step.max_retries or 0
+    return step.timeout_seconds * (1 + retries) + MAX_BACKOFF_SECONDS * retries
 
 
-def execute_workflow(workflow, context: dict | None = None) -> tuple[str, str]:
+def _timed_out(step, started: datetime, clock: float) -> StepResult:
+    return StepResult(
+        step=step,
+        status='failed',
+        message=f"{step.name}: timed out after {step.timeout_seconds}s",
+        attempts=1 + (step.max_retries or 0),
+        started_at=started,
+        finished_at=timezone.now(),
+        duration_ms=int((time.monotonic() - clock) * 1000),
+    )
+
+
+def run_stage(steps: list, context: dict) -> list[StepResult]:
+    """Run the steps of one stage concurrently, bounded by each step's timeout."""
+    if len(steps) == 1:
+        return [run_step(steps[0], context)]
+    max_workers = min(len(steps), int(getattr(settings, 'WORKFLOWS_MAX_STEP_CONCURRENCY', 8)))
+    started = timezone.now()
+    clock = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='workflow-step')
+    try:
+        futures = [(step, pool.submit(_run_step_in_thread, step, context)) for step in steps]
+        results = []
+        for step, future in futures:
+            budget = _step_budget(step)
+            remaining = None if budget is None else max(budget - (time.monotonic() - clock), 0)
+            try:
+                results.append(future.result(timeout=remaining))
+            except FutureTimeout:
+                results.append(_timed_out(step, started, clock))
+        return results
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def execute_workflow(workflow, context: dict | None = None, execution=None) -> tuple[str, str]:
+    """
+    Execute the workflow steps stage by stage.
+
+    Steps with the same ``order`` form a stage and run concurrently. A step that
+    still fails after its retries stops later stages; the result is ``dead`` so
+    the execution can be re-queued. Step runs are recorded when ``execution`` is given.
+    """
     context = context or {}
     messages = []
+    step_runs = []
+    status = 'success'
     try:
-        for step in workflow.steps.order_by('order'):
-            action = step.action_type
-            config = step.config or {}
-            if action == 'webhook':
-                url = config.get('url')
-                if not url:
-                    messages.append(f"{step.name}: webhook missing url")
-                    continue
-                payload = config.get('payload') or context
-                requests.post(url, json=payload, timeout=15)
-                messages.append(f"{step.name}: webhook ok")
-                continue
-            if action == 'erp_invoice_email':
-                invoice_id = config.get('invoice_id') or context.get('invoice_id')
-                if not invoice_id:
-                    messages.append(f"{step.name}: invoice_id missing")
-                    continue
-                Invoice = apps.get_model('erp', 'Invoice')
-                invoice = Invoice.objects.filter(id=invoice_id).first()
-                if not invoice:
-                    messages.append(f"{step.name}: invoice not found")
-                    continue
-                from apps.erp.services.invoice_mail import send_invoice_email as _send_invoice_email
-                if _send_invoice_email(invoice):
-                    messages.append(f"{step.name}: invoice email sent")
-                else:
-                    messages.append(f"{step.name}: invoice email failed")
-                continue
-            if action == 'erp_dunning_email':
-                dunning_id = config.get('dunning_id') or context.get('dunning_id')
-                if not dunning_id:
-                    messages.append(f"{step.name}: dunning_id missing")
-                    continue
-                Dunning = apps.get_model('erp', 'DunningNotice')
-                notice = Dunning.objects.filter(id=dunning_id).first()
-                if not notice:
-                    messages.append(f"{step.name}: dunning not found")
-                    continue
-                from apps.erp.services.dunning import send_dunning_email as _send_dunning_email
-                if _send_dunning_email(notice):
-                    messages.append(f"{step.name}: dunning email sent")
-                else:
-                    messages.append(f"{step.name}: dunning email failed")
-                continue
-            messages.append(f"{step.name}: skipped ({action})")
-        return 'success', "\n".join(messages)
+        steps = list(workflow.steps.order_by('order', 'id'))
+        for _, stage in groupby(steps, key=lambda s: s.order):
+            results = run_stage(list(stage), context)
+            for result in results:
+                messages.append(result.message)
+                step_runs.append(result)
+            if any(result.status == 'failed' for result in results):
+                status = 'dead'
+                break
     except Exception as exc:
-        return 'failed', f"{exc}"
+        status = 'failed'
+        messages.append(f"{exc}")
+    if execution is not None and step_runs:
+        WorkflowStepRun = apps.get_model('workflows', 'WorkflowStepRun')
+        WorkflowStepRun.objects.bulk_create([
+            WorkflowStepRun(
+                execution=execution,
+                step=result.step,
+                name=result.step.name,
+                action_type=result.step.action_type,
+                status=result.status,
+                attempts=result.attempts,
+                duration_ms=result.duration_ms,
+                message=result.message,
+                started_at=result.started_at,
+                finished_at=result.finished_at,
+            )
+            for result in step_runs
+        ])
+    return status, "\n".join(messages)
 
 
+# ---------------------------------------------------------------------------
+# Queueing
+# ---------------------------------------------------------------------------
+
+def run_execution(execution_id: int) -> str | None:
+    """Run a queued execution. Returns the final status, or None if it was already taken."""
+    WorkflowExecution = apps.get_model('workflows', 'WorkflowExecution')
+    # started_at becomes the claim time, so stuck 'running' executions can be recovered
+    claimed = WorkflowExecution.objects.filter(pk=execution_id, status='queued').update(
+        status='running',
+        started_at=timezone.now(),
+    )
+    if not claimed:
+        return None
+    execution = WorkflowExecution.objects.select_related('workflow').get(pk=execution_id)
+    clock = time.monotonic()
+    status, message = execute_workflow(execution.workflow, context=execution.context, execution=execution)
+    execution.status = status
+    execution.message = message
+    execution.attempts += 1
+    execution.duration_ms = int((time.monotonic() - clock) * 1000)
+    execution.finished_at = timezone.now()
+    execution.save(update_fields=['status', 'message', 'attempts', 'duration_ms', 'finished_at'])
+    return status
+
+
+def _dispatch(execution_id: int):
+    mode = getattr(settings, 'WORKFLOWS_EXECUTION_MODE', 'celery')
+    if mode == 'inline':
+        run_execution(execution_id)
+        return
+    if mode != 'celery':
+        return
+    try:
+        from apps.workflows.tasks import run_workflow_execution
+        run_workflow_execution.delay(execution_id)
+    except Exception as exc:
+        # Stays queued; run_stale_executions picks it up.
+        logger.warning("Workflow execution %s dispatch failed: %s", execution_id, exc)
+
+
+def enqueue_workflow(workflow, context: dict | None = None):
+    """Create a queued execution (``workflow`` may be an instance or id) and hand it to a worker after commit."""
+    WorkflowExecution = apps.get_model('workflows', 'WorkflowExecution')
+    execution = WorkflowExecution.objects.create(
+        workflow_id=getattr(workflow, 'pk', workflow),
+        status='queued',
+        message='',
+        context=context or {},
+    )
+    transaction.on_commit(lambda: _dispatch(execution.pk))
+    return execution
+
+
+def requeue_execution(execution) -> bool:
+    """Put a failed or dead-lettered execution back on the queue."""
+    WorkflowExecution = apps.get_model('workflows', 'WorkflowExecution')
+    updated = WorkflowExecution.objects.filter(pk=execution.pk, status__in=['failed', 'dead']).update(
+        status='queued',
+        finished_at=None,
+    )
+    if updated:
+        execution.step_runs.all().delete()
+        transaction.on_commit(lambda: _dispatch(execution.pk))
+    return bool(updated)
+
+
+def recover_running_executions(timeout_seconds: int | None = None) -> tuple[int, int]:
+    """
+    Handle executions still 'running' after ``timeout_seconds`` (their worker
+    died). They are queued again until WORKFLOWS_MAX_EXECUTION_ATTEMPTS is
+    reached, then marked failed. Returns (requeued, failed).
+    """
+    WorkflowExecution = apps.get_model('workflows', 'WorkflowExecution')
+    if timeout_seconds is None:
+        timeout_seconds = int(getattr(settings, 'WORKFLOWS_RUNNING_TIMEOUT', 3600))
+    max_attempts = int(getattr(settings, 'WORKFLOWS_MAX_EXECUTION_ATTEMPTS', 2))
+    now = timezone.now()
+    stuck = WorkflowExecution.objects.filter(
+        status='running',
+        started_at__lt=now - timedelta(seconds=timeout_seconds),
+    )
+    failed = stuck.filter(attempts__gte=max_attempts - 1).update(
+        status='failed',
+        attempts=F('attempts') + 1,
+        message="Worker did not finish the execution in time",
+        finished_at=now,
+    )
+    requeue_ids = list(stuck.values_list('id', flat=True))
+    requeued = WorkflowExecution.objects.filter(pk__in=requeue_ids, status='running').update(
+        status='queued',
+        attempts=F('attempts') + 1,
+    )
+    if requeued:
+        apps.get_model('workflows', 'WorkflowStepRun').objects.filter(execution_id__in=requeue_ids).delete()
+    return requeued, failed
+
+
+def run_stale_executions(older_than_seconds: int = 60, limit: int = 100) -> int:
+    """Run executions whose dispatch was lost (e.g. broker unavailable) or whose worker died."""
+    WorkflowExecution = apps.get_model('workflows', 'WorkflowExecution')
+    recover_running_executions()
+    cutoff = timezone.now() - timedelta(seconds=older_than_seconds)
+    ids = list(
+        WorkflowExecution.objects.filter(status='queued', started_at__lt=cutoff)
+        .order_by('started_at')
+        .values_list('id', flat=True)[:limit]
+    )
+    for execution_id in ids:
+        run_execution(execution_id)
+    return len(ids)
+
+
+# ---------------------------------------------------------------------------
+# Trigger entry points (called from signals / outbox)
+# ---------------------------------------------------------------------------
+
 def run_workflows_for_action(action_type: str, context: dict | None = None, trigger: str | None = None) -> int:
     context = context or {}
-    Workflow = apps.get_model('workflows', 'Workflow')
-    WorkflowExecution = apps.get_model('workflows', 'WorkflowExecution')
-    workflows = Workflow.objects.filter(is_active=True, steps__action_type=action_type).distinct()
-    if trigger:
-        workflows = workflows.filter(trigger_type=trigger)
-    ran = 0
-    for wf in workflows:
-        exec_obj = WorkflowExecution.objects.create(
-            workflow=wf,
-            status='running',
-            message='',
-        )
-        status, message = execute_workflow(wf, context=context)
-        exec_obj.status = status
-        exec_obj.message = message
-        exec_obj.finished_at = timezone.now()
-        exec_obj.save(update_fields=['status', 'message', 'finished_at'])
-        ran += 1
-    return ran
+    workflow_ids = get_index().match_action(action_type, trigger=trigger)
+    for workflow_id in workflow_ids:
+        enqueue_workflow(workflow_id, context=context)
+    return len(workflow_ids)
 
 
 def run_workflows_for_trigger(trigger: str, context: dict | None = None) -> int:
     context = context or {}
-    Workflow = apps.get_model('workflows', 'Workflow')
-    WorkflowExecution = apps.get_model('workflows', 'WorkflowExecution')
-    workflows = Workflow.objects.filter(is_active=True, trigger_type=trigger).distinct()
-    ran = 0
-    def _matches(filters: dict, ctx: dict) -> bool:
-        if not filters:
-            return True
-        for key, expected in filters.items():
-            actual = ctx.get(key)
-            if isinstance(expected, list):
-                if actual not in expected:
-                    return False
-            else:
-                if actual != expected:
-                    return False
-        return True
-    for wf in workflows:
-        if not _matches(wf.trigger_filters or {}, context):
-            continue
-        exec_obj = WorkflowExecution.objects.create(
-            workflow=wf,
-            status='running',
-            message='',
-        )
-        status, message = execute_workflow(wf, context=context)
-        exec_obj.status = status
-        exec_obj.message = message
-        exec_obj.finished_at = timezone.now()
-        exec_obj.save(update_fields=['status', 'message', 'finished_at'])
-        ran += 1
-    return ran
+    workflow_ids = get_index().match_trigger(trigger, context)
+    for workflow_id in workflow_ids:
+        enqueue_workflow(workflow_id, context=context)
+    return len(workflow_ids)
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.workflows.models import Workflow, WorkflowStep
+from apps.workflows.trigger_index import invalidate_index
+
+
+@receiver(post_save, sender=Workflow)
+@receiver(post_save, sender=WorkflowStep)
+@receiver(post_delete, sender=Workflow)
+@receiver(post_delete, sender=WorkflowStep)
+def _workflows_changed(sender, instance, **kwargs):
+    invalidate_index()
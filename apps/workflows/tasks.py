@@ -0,0 +1,29 @@
+"""
+Celery tasks for the Workflows app
+Runs queued WorkflowExecutions outside the request/signal that triggered them
+"""
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from apps.workflows.services import run_execution, run_stale_executions
+
+logger = get_task_logger(__name__)
+
+
+@shared_task(ignore_result=True)
+def run_workflow_execution(execution_id):
+    """Run one queued execution (no-op if another worker already took it)."""
+    status = run_execution(execution_id)
+    if status:
+        logger.info(f"Workflow execution {execution_id} finished: {status}")
+    return status
+
+
+@shared_task(ignore_result=True)
+def run_stale_workflow_executions():
+    """Pick up executions whose dispatch was lost or whose worker died."""
+    count = run_stale_executions()
+    if count:
+        logger.info(f"Ran {count} stale workflow executions")
+    return count
@@ -0,0 +1,166 @@
+"""
+In-memory index of active workflows for event dispatch.
+
+The index is compiled once per process from the active workflows and their
+steps. A version counter in the Django cache is bumped (after commit) when a
+workflow or step changes, so every process rebuilds on its next lookup.
+Matching an event is a dict lookup; no query runs when nothing matches.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'workflows:trigger_index:version'
+# Safety net in case the version key is evicted from the cache.
+MAX_AGE_SECONDS = 300
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+_index_built_at = 0.0
+
+
+def _hashable(value) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _matches(filters: dict, ctx: dict) -> bool:
+    if not filters:
+        return True
+    for key, expected in filters.items():
+        actual = ctx.get(key)
+        if isinstance(expected, list):
+            if actual not in expected:
+                return False
+        else:
+            if actual != expected:
+                return False
+    return True
+
+
+class TriggerIndex:
+    """
+    Compiled lookup tables for one snapshot of the active workflows.
+
+    Filtered workflows are bucketed by ``(trigger, key, value)`` of their first
+    hashable filter; remaining filters are checked on the (small) bucket only.
+    """
+
+    def __init__(self, workflows, actions):
+        self.unfiltered = defaultdict(list)
+        self.buckets = defaultdict(list)
+        self.bucket_keys = defaultdict(set)
+        self.scan = defaultdict(list)
+        self.actions = defaultdict(list)
+        for wf_id, trigger, filters in workflows:
+            self._add(wf_id, trigger, filters or {})
+        for action_type, wf_id, trigger in actions:
+            self.actions[action_type].append((wf_id, trigger))
+
+    def _add(self, wf_id, trigger, filters):
+        if not filters:
+            self.unfiltered[trigger].append(wf_id)
+            return
+        for key, expected in filters.items():
+            values = expected if isinstance(expected, list) else [expected]
+            if not all(_hashable(v) for v in values):
+                continue
+            rest = {k: v for k, v in filters.items() if k != key}
+            for value in values:
+                self.buckets[(trigger, key, value)].append((wf_id, rest))
+            self.bucket_keys[trigger].add(key)
+            return
+        self.scan[trigger].append((wf_id, filters))
+
+    def has_trigger(self, trigger: str) -> bool:
+        return bool(self.unfiltered.get(trigger) or self.bucket_keys.get(trigger) or self.scan.get(trigger))
+
+    def match_trigger(self, trigger: str, context: dict) -> list[int]:
+        matched = set(self.unfiltered.get(trigger, ()))
+        for key in self.bucket_keys.get(trigger, ()):
+            value = context.get(key)
+            if not _hashable(value):
+                continue
+            for wf_id, rest in self.buckets.get((trigger, key, value), ()):
+                if _matches(rest, context):
+                    matched.add(wf_id)
+        for wf_id, filters in self.scan.get(trigger, ()):
+            if _matches(filters, context):
+                matched.add(wf_id)
+        return sorted(matched)
+
+    def match_action(self, action_type: str, trigger: str | None = None) -> list[int]:
+        return sorted({
+            wf_id for wf_id, wf_trigger in self.actions.get(action_type, ())
+            if trigger is None or wf_trigger == trigger
+        })
+
+
+def build_index() -> TriggerIndex:
+    Workflow = apps.get_model('workflows', 'Workflow')
+    WorkflowStep = apps.get_model('workflows', 'WorkflowStep')
+    workflows = Workflow.objects.filter(is_active=True).values_list('id', 'trigger_type', 'trigger_filters')
+    actions = (
+        WorkflowStep.objects.filter(workflow__is_active=True)
+        .values_list('action_type', 'workflow_id', 'workflow__trigger_type')
+        .distinct()
+    )
+    return TriggerIndex(list(workflows), list(actions))
+
+
+def _is_current(version) -> bool:
+    return (
+        _index is not None
+        and _index_version == version
+        and time.monotonic() - _index_built_at < MAX_AGE_SECONDS
+    )
+
+
+def get_index() -> TriggerIndex:
+    global _index, _index_version, _index_built_at
+    version = cache.get(VERSION_KEY, 0)
+    index = _index
+    if index is not None and _is_current(version):
+        return index
+    with _lock:
+        if not _is_current(version):
+            _index = build_index()
+            _index_version = version
+            _index_built_at = time.monotonic()
+        return _index
+
+
+def _bump_version():
+    global _index
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, timeout=None)
+    with _lock:
+        _index = None
+
+
+def reset_index():
+    """Forget the compiled index in this process (used by tests)."""
+    global _index
+    with _lock:
+        _index = None
+
+
+def invalidate_index():
+    """Drop the compiled index in all processes once the change is committed."""
+    transaction.on_commit(_bump_version)
+
+
+def has_trigger(trigger: str) -> bool:
+    """True if at least one active workflow listens to ``trigger``."""
+    return get_index().has_trigger(trigger)
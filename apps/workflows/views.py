@@ -1,3 +1,4 @@
+import json
 from django.views.generic import TemplateView, ListView, DetailView, CreateView
 from django.db import models
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -5,10 +6,9 @@ from django.urls import reverse_lazy
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
-from django.utils import timezone
 from .models import Workflow, WorkflowStep, WorkflowExecution
 from .forms import WorkflowForm, WorkflowStepForm
-from .services import execute_workflow
+from .services import enqueue_workflow, requeue_execution
 
 
 class WorkflowHomeView(LoginRequiredMixin, TemplateView):
@@ -47,7 +47,7 @@ class WorkflowDetailView(LoginRequiredMixin, DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['steps'] = self.object.steps.order_by('order')
-        context['executions'] = self.object.executions.order_by('-started_at')[:20]
+        context['executions'] = self.object.executions.prefetch_related('step_runs').order_by('-started_at')[:20]
         context['step_form'] = WorkflowStepForm(initial={'workflow': self.object})
         context['filter_builder_fields'] = [
             ('status', 'Status'),
@@ -106,11 +106,6 @@ class WorkflowDetailView(LoginRequiredMixin, DetailView):
                 messages.success(request, _("Trigger-Filter JSON ist gültig."))
             return redirect('workflows:workflow_detail', pk=self.object.pk)
         if 'run_workflow' in request.POST:
-            exec_obj = WorkflowExecution.objects.create(
-                workflow=self.object,
-                status='running',
-                message='',
-            )
             context = {}
             invoice_id = request.POST.get('invoice_id')
             dunning_id = request.POST.get('dunning_id')
@@ -118,10 +113,14 @@ class WorkflowDetailView(LoginRequiredMixin, DetailView):
                 context['invoice_id'] = int(invoice_id)
             if dunning_id:
                 context['dunning_id'] = int(dunning_id)
-            status, message = execute_workflow(self.object, context=context)
-            exec_obj.status = status
-            exec_obj.message = message
-            exec_obj.finished_at = timezone.now()
-            exec_obj.save(update_fields=['status', 'message', 'finished_at'])
+            enqueue_workflow(self.object, context=context)
+            messages.success(request, _("Workflow wurde zur Ausführung eingeplant."))
+            return redirect('workflows:workflow_detail', pk=self.object.pk)
+        if 'requeue_execution' in request.POST:
+            execution = self.object.executions.filter(pk=request.POST.get('execution_id')).first()
+            if execution and requeue_execution(execution):
+                messages.success(request, _("Ausführung erneut eingeplant."))
+            else:
+                messages.error(request, _("Ausführung kann nicht erneut eingeplant werden."))
             return redirect('workflows:workflow_detail', pk=self.object.pk)
         return redirect('workflows:workflow_detail', pk=self.object.pk)
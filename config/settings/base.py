@@ -331,6 +331,101 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.approvals.celery_tasks.check_server_health',
         'schedule': crontab(minute='*/15'),  # Every 15 minutes
     },
+    'recover-stale-approval-executions': {
+        'task': 'apps.approvals.celery_tasks.recover_stale_executions',
+        'schedule': crontab(minute='*/5'),
+    },
+    'process-erp-events': {
+        'task': 'apps.erp.tasks.process_erp_events',
+        'schedule': crontab(),  # Every minute (catch-up for missed dispatches)
+    },
+    'purge-erp-events': {
+        'task': 'apps.erp.tasks.purge_erp_events',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'refresh-erp-competitor-prices': {
+        'task': 'apps.erp.tasks.refresh_erp_competitor_prices',
+        'schedule': crontab(minute=20),  # Hourly, matches the provider's hourly budget
+    },
+    'run-stale-workflow-executions': {
+        'task': 'apps.workflows.tasks.run_stale_workflow_executions',
+        'schedule': crontab(minute='*/5'),
+    },
+    'sweep-fibu-imports': {
+        'task': 'apps.fibu.tasks.sweep_fibu_imports',
+        'schedule': crontab(minute='*/5'),
+    },
+    'sweep-ai-jobs': {
+        'task': 'apps.core.tasks.sweep_ai_jobs',
+        'schedule': crontab(minute='*/2'),
+    },
+    'triage-helpdesk-tickets': {
+        'task': 'apps.helpdesk.helpdesk_apps.tickets.tasks.triage_pending_tickets',
+        'schedule': crontab(minute='*/2'),
+    },
+}
+
+# ERP outbox dispatch after commit: 'celery' (queue worker), 'inline' (run in
+# the committing process, e.g. without a broker) or 'none' (periodic run only)
+ERP_OUTBOX_DISPATCH = os.getenv('ERP_OUTBOX_DISPATCH', 'celery')
+
+# Workflow runtime: 'celery' queues executions to workers, 'inline' runs them
+# after commit in the current process, 'none' leaves them for the periodic run
+WORKFLOWS_EXECUTION_MODE = os.getenv('WORKFLOWS_EXECUTION_MODE', 'celery')
+WORKFLOWS_MAX_STEP_CONCURRENCY = int(os.getenv('WORKFLOWS_MAX_STEP_CONCURRENCY', '8'))
+WORKFLOWS_HTTP_POOL_SIZE = int(os.getenv('WORKFLOWS_HTTP_POOL_SIZE', '20'))
+# Executions still 'running' after this many seconds lost their worker; they are
+# queued again until they have this many attempts, then marked failed
+WORKFLOWS_RUNNING_TIMEOUT = int(os.getenv('WORKFLOWS_RUNNING_TIMEOUT', '3600'))
+WORKFLOWS_MAX_EXECUTION_ATTEMPTS = int(os.getenv('WORKFLOWS_MAX_EXECUTION_ATTEMPTS', '2'))
+
+# FiBu CSV/DATEV imports: 'celery' runs them on a worker, 'inline' after
+# commit in the request process, 'none' leaves them queued
+FIBU_IMPORT_MODE = os.getenv('FIBU_IMPORT_MODE', 'celery')
+# Imports still queued after this many seconds lost their dispatch (broker down)
+# and are dispatched again by the periodic sweep
+FIBU_IMPORT_REDISPATCH_SECONDS = int(os.getenv('FIBU_IMPORT_REDISPATCH_SECONDS', '300'))
+
+# ERP competitor price refresh: products per batch, concurrent lookups,
+# per-host limit, pooled connections, request timeout, per-SKU cache
+# (found / not found) and when a checked price counts as stale
+ERP_COMPETITOR_BATCH_SIZE = int(os.getenv('ERP_COMPETITOR_BATCH_SIZE', '100'))
+ERP_COMPETITOR_WORKERS = int(os.getenv('ERP_COMPETITOR_WORKERS', '4'))
+ERP_COMPETITOR_PER_HOST = int(os.getenv('ERP_COMPETITOR_PER_HOST', '2'))
+ERP_COMPETITOR_POOL_SIZE = int(os.getenv('ERP_COMPETITOR_POOL_SIZE', '10'))
+ERP_COMPETITOR_TIMEOUT = float(os.getenv('ERP_COMPETITOR_TIMEOUT', '10'))
+ERP_COMPETITOR_CACHE_SECONDS = int(os.getenv('ERP_COMPETITOR_CACHE_SECONDS', str(24 * 3600)))
+ERP_COMPETITOR_MISS_SECONDS = int(os.getenv('ERP_COMPETITOR_MISS_SECONDS', '3600'))
+ERP_COMPETITOR_MAX_AGE_HOURS = int(os.getenv('ERP_COMPETITOR_MAX_AGE_HOURS', '24'))
+
+# CRM website enrichment: job dispatch mode, crawl pool size, per-host
+# politeness (concurrent requests / seconds between requests) and page cache
+CRM_ENRICHMENT_MODE = os.getenv('CRM_ENRICHMENT_MODE', 'celery')
+CRM_ENRICHMENT_WORKERS = int(os.getenv('CRM_ENRICHMENT_WORKERS', '8'))
+CRM_ENRICHMENT_POOL_SIZE = int(os.getenv('CRM_ENRICHMENT_POOL_SIZE', '20'))
+CRM_ENRICHMENT_PER_DOMAIN = int(os.getenv('CRM_ENRICHMENT_PER_DOMAIN', '2'))
+CRM_ENRICHMENT_DOMAIN_DELAY = float(os.getenv('CRM_ENRICHMENT_DOMAIN_DELAY', '0.5'))
+CRM_ENRICHMENT_TIMEOUT = float(os.getenv('CRM_ENRICHMENT_TIMEOUT', '10'))
+CRM_ENRICHMENT_CACHE_SECONDS = int(os.getenv('CRM_ENRICHMENT_CACHE_SECONDS', str(24 * 3600)))
+
+# Staging de-duplication: optional fuzzy company-name matching (similarity ratio)
+CRM_MATCH_FUZZY = os.getenv('CRM_MATCH_FUZZY', 'False') == 'True'
+CRM_MATCH_FUZZY_CUTOFF = float(os.getenv('CRM_MATCH_FUZZY_CUTOFF', '0.9'))
+
+# Lead scoring: leads per AI prompt, prompts in flight and how long AI scores
+# are cached by lead content hash
+CRM_AI_SCORE_BATCH_SIZE = int(os.getenv('CRM_AI_SCORE_BATCH_SIZE', '10'))
+CRM_AI_SCORE_CONCURRENCY = int(os.getenv('CRM_AI_SCORE_CONCURRENCY', '4'))
+CRM_AI_SCORE_CACHE_SECONDS = int(os.getenv('CRM_AI_SCORE_CACHE_SECONDS', str(7 * 24 * 3600)))
+
+# Lead source imports: concurrent source fetches and requests per hour per
+# source, enforced by token buckets kept in the shared cache
+CRM_IMPORT_WORKERS = int(os.getenv('CRM_IMPORT_WORKERS', '4'))
+CRM_SOURCE_RATE_LIMITS = {
+    'handelsregister': int(os.getenv('CRM_RATE_LIMIT_HANDELSREGISTER', '60')),
+    'serpapi': int(os.getenv('CRM_RATE_LIMIT_SERPAPI', '100')),
+    'dataforseo': int(os.getenv('CRM_RATE_LIMIT_DATAFORSEO', '100')),
+    'bing': int(os.getenv('CRM_RATE_LIMIT_BING', '300')),
 }
 
 # Email configuration (to be overridden in production)
@@ -351,6 +446,78 @@ BEDROCK_MODEL_ID = os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-5-sonnet-20
 BEDROCK_MAX_TOKENS = int(os.getenv('BEDROCK_MAX_TOKENS', '1024'))
 BEDROCK_TEMPERATURE = float(os.getenv('BEDROCK_TEMPERATURE', '0.7'))
 
+# Shared AI gateway: response cache (entries, TTL, max temperature cached by default),
+# config refresh interval and HTTP connection pool size
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', '1024'))
+AI_CACHE_SECONDS = int(os.getenv('AI_CACHE_SECONDS', '3600'))
+AI_CACHE_MAX_TEMPERATURE = float(os.getenv('AI_CACHE_MAX_TEMPERATURE', '0.3'))
+AI_CONFIG_SECONDS = int(os.getenv('AI_CONFIG_SECONDS', '60'))
+AI_HTTP_POOL_SIZE = int(os.getenv('AI_HTTP_POOL_SIZE', '10'))
+
+# Contract analysis: characters per chunk, overlap carried into the next chunk,
+# chunks analyzed concurrently and the most chunks analyzed per contract
+CONTRACTS_AI_CHUNK_CHARS = int(os.getenv('CONTRACTS_AI_CHUNK_CHARS', '8000'))
+CONTRACTS_AI_CHUNK_OVERLAP = int(os.getenv('CONTRACTS_AI_CHUNK_OVERLAP', '800'))
+CONTRACTS_AI_WORKERS = int(os.getenv('CONTRACTS_AI_WORKERS', '4'))
+CONTRACTS_AI_MAX_CHUNKS = int(os.getenv('CONTRACTS_AI_MAX_CHUNKS', '40'))
+
+# Background AI jobs: 'celery' (queue worker), 'inline' (run after commit in the
+# request process) or 'none' (left queued); concurrent jobs per provider, how long
+# a slot may be held, retry delay while a provider is saturated and how long
+# inline runs wait for a slot
+AI_JOBS_MODE = os.getenv('AI_JOBS_MODE', 'celery')
+AI_JOBS_PROVIDER_LIMITS = {
+    'bedrock': int(os.getenv('AI_JOBS_BEDROCK_LIMIT', '4')),
+    'helpdesk': int(os.getenv('AI_JOBS_HELPDESK_LIMIT', '2')),
+}
+AI_JOBS_DEFAULT_LIMIT = int(os.getenv('AI_JOBS_DEFAULT_LIMIT', '2'))
+AI_JOBS_SLOT_SECONDS = int(os.getenv('AI_JOBS_SLOT_SECONDS', '600'))
+AI_JOBS_RETRY_SECONDS = int(os.getenv('AI_JOBS_RETRY_SECONDS', '5'))
+AI_JOBS_INLINE_WAIT_SECONDS = float(os.getenv('AI_JOBS_INLINE_WAIT_SECONDS', '30'))
+# Stale jobs (see sweep_stale_jobs): queued jobs are dispatched again after
+# AI_JOBS_REDISPATCH_SECONDS and failed after AI_JOBS_QUEUED_TIMEOUT; running jobs
+# past AI_JOBS_RUNNING_TIMEOUT are re-queued until AI_JOBS_MAX_ATTEMPTS, then failed
+AI_JOBS_REDISPATCH_SECONDS = int(os.getenv('AI_JOBS_REDISPATCH_SECONDS', '120'))
+AI_JOBS_QUEUED_TIMEOUT = int(os.getenv('AI_JOBS_QUEUED_TIMEOUT', '900'))
+AI_JOBS_RUNNING_TIMEOUT = int(os.getenv('AI_JOBS_RUNNING_TIMEOUT', '900'))
+AI_JOBS_MAX_ATTEMPTS = int(os.getenv('AI_JOBS_MAX_ATTEMPTS', '2'))
+
+# Stream AI reply suggestions to the ticket editor as server-sent events; when off
+# (or the helpdesk slots are taken) the editor falls back to the background job
+HELPDESK_AI_STREAMING = os.getenv('HELPDESK_AI_STREAMING', 'True') == 'True'
+
+# Helpdesk AI provider routing: order providers by observed p95 latency, skip a
+# provider for AI_BREAKER_OPEN_SECONDS once at least AI_BREAKER_MIN_CALLS recent calls
+# fail at AI_BREAKER_ERROR_RATE, and (when > 0) also ask the next provider after
+# AI_HEDGE_AFTER_MS; LLAMA3_TIMEOUT bounds each Ollama request
+AI_ROUTING_BY_LATENCY = os.getenv('AI_ROUTING_BY_LATENCY', 'True') == 'True'
+AI_HEALTH_WINDOW = int(os.getenv('AI_HEALTH_WINDOW', '50'))
+AI_HEALTH_EWMA_ALPHA = float(os.getenv('AI_HEALTH_EWMA_ALPHA', '0.2'))
+AI_BREAKER_MIN_CALLS = int(os.getenv('AI_BREAKER_MIN_CALLS', '5'))
+AI_BREAKER_ERROR_RATE = float(os.getenv('AI_BREAKER_ERROR_RATE', '0.5'))
+AI_BREAKER_OPEN_SECONDS = int(os.getenv('AI_BREAKER_OPEN_SECONDS', '30'))
+AI_HEDGE_AFTER_MS = int(os.getenv('AI_HEDGE_AFTER_MS', '0'))
+AI_HEDGE_WORKERS = int(os.getenv('AI_HEDGE_WORKERS', '8'))
+LLAMA3_TIMEOUT = float(os.getenv('LLAMA3_TIMEOUT', '30'))
+
+# Helpdesk ticket triage: tickets per AI call, concurrent calls, how far back the
+# periodic run looks for untriaged tickets, how many it handles per run, and
+# how often and after how long (doubling per attempt) failed tickets are retried
+HELPDESK_TRIAGE_BATCH_SIZE = int(os.getenv('HELPDESK_TRIAGE_BATCH_SIZE', '10'))
+HELPDESK_TRIAGE_WORKERS = int(os.getenv('HELPDESK_TRIAGE_WORKERS', '2'))
+HELPDESK_TRIAGE_PENDING_DAYS = int(os.getenv('HELPDESK_TRIAGE_PENDING_DAYS', '7'))
+HELPDESK_TRIAGE_MAX_PER_RUN = int(os.getenv('HELPDESK_TRIAGE_MAX_PER_RUN', '200'))
+HELPDESK_TRIAGE_MAX_ATTEMPTS = int(os.getenv('HELPDESK_TRIAGE_MAX_ATTEMPTS', '5'))
+HELPDESK_TRIAGE_RETRY_MINUTES = int(os.getenv('HELPDESK_TRIAGE_RETRY_MINUTES', '10'))
+
+# Semantic retrieval of knowledge articles and resolved tickets: embeddings from the
+# local Ollama model, kept as float32 arrays; hits below the minimum cosine score are
+# dropped. Without the model, the keyword search is used
+HELPDESK_SEMANTIC_SEARCH = os.getenv('HELPDESK_SEMANTIC_SEARCH', 'True') == 'True'
+HELPDESK_EMBEDDING_MODEL = os.getenv('HELPDESK_EMBEDDING_MODEL', 'nomic-embed-text')
+HELPDESK_EMBEDDING_BATCH_SIZE = int(os.getenv('HELPDESK_EMBEDDING_BATCH_SIZE', '32'))
+HELPDESK_SEMANTIC_MIN_SCORE = float(os.getenv('HELPDESK_SEMANTIC_MIN_SCORE', '0.3'))
+
 # Branding defaults
 APP_NAME = os.getenv('APP_NAME', 'ABoroOffice')
 COMPANY_NAME = os.getenv('COMPANY_NAME', 'ABoroOffice')
@@ -369,8 +536,24 @@ APPROVALS_SSH = {
     'PASSWORD': os.getenv('APPROVALS_SSH_PASSWORD', ''),
     'KEY_PATH': os.getenv('APPROVALS_SSH_KEY_PATH', ''),
     'HEALTH_USERNAME': os.getenv('APPROVALS_SSH_HEALTH_USERNAME', ''),
+    'COMMAND': os.getenv('APPROVALS_SSH_COMMAND', ''),
     'HOSTS': {},
 }
+# SSH health checks: parallel probes, per-host timeout and idle pooled connections
+APPROVALS_HEALTH_WORKERS = int(os.getenv('APPROVALS_HEALTH_WORKERS', 16))
+APPROVALS_HEALTH_TIMEOUT = int(os.getenv('APPROVALS_HEALTH_TIMEOUT', 5))
+APPROVALS_SSH_POOL_IDLE_SECONDS = int(os.getenv('APPROVALS_SSH_POOL_IDLE_SECONDS', 1200))
+# SSH execution: connections per host, connect timeout, concurrent hosts and log chunk flush interval
+APPROVALS_SSH_MAX_PER_HOST = int(os.getenv('APPROVALS_SSH_MAX_PER_HOST', 2))
+APPROVALS_SSH_CONNECT_TIMEOUT = int(os.getenv('APPROVALS_SSH_CONNECT_TIMEOUT', 30))
+APPROVALS_SSH_WORKERS = int(os.getenv('APPROVALS_SSH_WORKERS', 8))
+APPROVALS_LOG_FLUSH_SECONDS = float(os.getenv('APPROVALS_LOG_FLUSH_SECONDS', 1.0))
+# One execution task also runs other approvals approved within this window, up to this many
+APPROVALS_EXECUTION_BATCH_WINDOW_SECONDS = int(os.getenv('APPROVALS_EXECUTION_BATCH_WINDOW_SECONDS', 900))
+APPROVALS_EXECUTION_BATCH_SIZE = int(os.getenv('APPROVALS_EXECUTION_BATCH_SIZE', 20))
+# Claimed executions not started after this many seconds (or still running this long
+# past the SSH timeout) lost their worker; see recover_stale_executions
+APPROVALS_EXECUTION_STALE_SECONDS = int(os.getenv('APPROVALS_EXECUTION_STALE_SECONDS', 1800))
 
 # Security headers (will be enabled in production)
 # SECURE_HSTS_SECONDS = 31536000
@@ -2,8 +2,24 @@
 Pytest configuration and fixtures for ABoroOffice tests.
 """
 
+import re
+from collections import Counter
+from contextlib import contextmanager
+
 import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
 from apps.core.models import ABoroUser
+from apps.workflows.trigger_index import reset_index
+
+
+@pytest.fixture(autouse=True)
+def reset_workflow_trigger_index():
+    """Workflows created in a rolled-back test must not leak into the next one."""
+    reset_index()
+    yield
+    reset_index()
 
 
 @pytest.fixture
@@ -46,3 +62,27 @@ def aboro_agent(db):
         is_agent=True,
         user_timezone='Europe/Berlin',
     )
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Fail when a block runs more SQL queries than its budget.
+
+        with query_budget(5):
+            client.get(url)
+
+    The failure lists the most repeated statements, which is usually the N+1.
+    """
+    @contextmanager
+    def check(budget, using='default'):
+        with CaptureQueriesContext(connections[using]) as captured:
+            yield captured
+        if len(captured) > budget:
+            # Same statement with different parameters counts as a repeat
+            repeated = Counter(
+                re.sub(r"'[^']*'|\b\d+\b", '?', query['sql']) for query in captured.captured_queries
+            ).most_common(3)
+            details = '\n'.join(f'  {count}x {sql[:200]}' for sql, count in repeated)
+            pytest.fail(f'{len(captured)} queries, budget {budget}. Most repeated:\n{details}')
+    return check
@@ -0,0 +1,126 @@
+"""
+Tests for the opt-in keyset pagination of the REST APIs.
+Covers unchanged default responses, cursor paging with ties, requested
+counts and the helpdesk ticket list.
+"""
+
+import datetime
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.core.pagination import EstimatedCountPaginator, estimated_count
+from apps.erp.models import Customer
+from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
+from apps.helpdesk.helpdesk_apps.api.views import TicketViewSet
+from apps.helpdesk.helpdesk_apps.tickets.models import Ticket
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def staff_client(client):
+    system_settings = SystemSettings.get_settings()
+    system_settings.app_toggles = {**(system_settings.app_toggles or {}), 'erp': True}
+    system_settings.save()
+    user = get_user_model().objects.create_user('erp', 'erp@example.com', 'pw', is_staff=True)
+    client.force_login(user)
+    return client
+
+
+@pytest.fixture
+def customers():
+    created = [Customer.objects.create(name=f'Kunde {number:02d}') for number in range(7)]
+    # Identical timestamps: the id tie-breaker has to keep pages disjoint
+    Customer.objects.update(created_at=timezone.now())
+    return created
+
+
+def _walk(client, url, params):
+    """Follow ``next`` links and return all ids and the pages seen."""
+    response = client.get(url, params)
+    ids, pages = [], []
+    while True:
+        assert response.status_code == 200
+        data = response.json()
+        pages.append(data)
+        ids += [row['id'] for row in data['results']]
+        if not data['next']:
+            return ids, pages
+        response = client.get(data['next'])
+
+
+class TestErpPagination:
+    """Tests for ERP lists, which are unpaginated unless the client opts in."""
+
+    url = staticmethod(lambda: reverse('erp:erp_api:customers-list'))
+
+    @pytest.mark.unit
+    def test_default_response_is_unchanged(self, staff_client, customers):
+        response = staff_client.get(self.url())
+        assert [row['id'] for row in response.json()] == sorted((c.pk for c in customers), reverse=True)
+        page = staff_client.get(self.url(), {'page_size': 3, 'page': 2}).json()
+        assert page['count'] == 7 and len(page['results']) == 3
+
+    @pytest.mark.unit
+    def test_cursor_walks_every_row_once(self, staff_client, customers):
+        ids, pages = _walk(staff_client, self.url(), {'cursor': '', 'page_size': 3})
+        assert ids == sorted((c.pk for c in customers), reverse=True)
+        assert [len(page['results']) for page in pages] == [3, 3, 1]
+        assert 'count' not in pages[0]
+
+    @pytest.mark.unit
+    def test_cursor_with_tied_ordering_and_search(self, staff_client, customers):
+        ids, _pages = _walk(staff_client, self.url(), {'cursor': '', 'page_size': 2, 'ordering': 'created_at'})
+        assert ids == [c.pk for c in customers]
+        ids, pages = _walk(staff_client, self.url(), {'cursor': '', 'page_size': 2, 'search': 'kunde 0', 'count': 'exact'})
+        assert len(ids) == 7 and pages[0]['count'] == 7
+
+    @pytest.mark.unit
+    def test_invalid_cursor_is_rejected(self, staff_client, customers):
+        assert staff_client.get(self.url(), {'cursor': 'kaputt'}).status_code == 404
+
+
+class TestCounts:
+    """Tests for estimated totals."""
+
+    @pytest.mark.unit
+    def test_estimate_is_exact_outside_postgres(self, customers):
+        assert estimated_count(Customer.objects.all()) == 7
+        assert EstimatedCountPaginator(Customer.objects.order_by('pk'), 3).num_pages == 3
+
+
+class TestTicketList:
+    """Tests for the helpdesk ticket list."""
+
+    @pytest.mark.unit
+    def test_cursor_mode_keeps_ticket_envelope(self, monkeypatch):
+        admin = get_user_model().objects.create_user('admin', 'admin@example.com', 'pw', role='admin')
+        start = timezone.now()
+        for number in range(25):
+            Ticket.objects.create(
+                ticket_number=f'T-{number:04d}', title=f'Ticket {number}', description='-',
+                created_by=admin, created_at=start - datetime.timedelta(minutes=number),
+            )
+        monkeypatch.setattr(TicketViewSet, 'validate_license', lambda self, request: (True, None))
+        view = TicketViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+
+        request = factory.get('/api/v1/tickets/', {'cursor': '', 'count': 'estimate'})
+        force_authenticate(request, user=admin)
+        first = view(request).data
+        assert first['total'] == 25 and len(first['tickets']) == 20
+        assert first['tickets'][0]['ticket_number'] == 'T-0000'
+
+        request = factory.get(first['next'])
+        force_authenticate(request, user=admin)
+        second = view(request).data
+        assert [ticket['ticket_number'] for ticket in second['tickets']] == [f'T-{n:04d}' for n in range(20, 25)]
+        assert second['next'] is None and 'total' not in second
+
+        request = factory.get('/api/v1/tickets/', {'page': 2})
+        force_authenticate(request, user=admin)
+        assert view(request).data['total'] == 25
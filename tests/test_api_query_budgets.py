@@ -0,0 +1,110 @@
+"""
+Tests for serializer-declared eager loading.
+Covers the derived lookups, annotated storage totals and the query budgets
+of the cloud storage and helpdesk list endpoints.
+"""
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.cloude.cloude_apps.api.serializers import UserSerializer
+from apps.cloude.cloude_apps.core.models import StorageFile, StorageFolder
+from apps.cloude.cloude_apps.sharing.models import UserShare
+from apps.core.eager_loading import eager_load
+from apps.helpdesk.helpdesk_apps.api.serializers import TicketSerializer
+from apps.helpdesk.helpdesk_apps.api.views import TicketViewSet
+from apps.helpdesk.helpdesk_apps.tickets.models import Category, Ticket, TicketComment
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+def _users(count, prefix='nutzer'):
+    return [User.objects.create_user(f'{prefix}{number}', f'{prefix}{number}@example.com', 'pw') for number in range(count)]
+
+
+def _files(owner, *sizes):
+    root = StorageFolder.objects.get(owner=owner, parent=None)
+    StorageFile.objects.bulk_create([
+        StorageFile(owner=owner, folder=root, name=f'datei{number}.txt', size=size, file_hash=f'{owner.pk}-{number}')
+        for number, size in enumerate(sizes)
+    ])
+
+
+class TestDeclarations:
+    """Tests for the lookups derived from serializers."""
+
+    @pytest.mark.unit
+    def test_ticket_serializer_joins_sources_and_prefetches_comments(self):
+        queryset = eager_load(Ticket.objects.all(), TicketSerializer)
+        assert set(queryset.query.select_related) == {'created_by', 'assigned_to', 'category'}
+        (comments,) = queryset._prefetch_related_lookups
+        assert comments.prefetch_to == 'comments'
+        assert set(comments.queryset.query.select_related) == {'author'}
+
+    @pytest.mark.unit
+    def test_profiles_are_prefetched_with_storage_totals(self, query_budget):
+        first, second, _empty = _users(3)
+        _files(first, 1024 * 1024, 1024 * 1024)
+        _files(second, 512)
+        with query_budget(2):
+            data = UserSerializer(eager_load(User.objects.order_by('pk'), UserSerializer), many=True).data
+        assert [user['profile']['storage_used'] for user in data] == [2.0, 512 / (1024 * 1024), 0.0]
+        assert first.profile.get_storage_used() == 2 * 1024 * 1024
+
+
+class TestQueryBudgets:
+    """Tests that list endpoints stay within a fixed number of queries."""
+
+    @pytest.mark.unit
+    def test_share_list_does_not_grow_with_rows(self, client, query_budget):
+        owner, *others = _users(9)
+        content_type = ContentType.objects.get_for_model(StorageFile)
+        _files(owner, 10)
+        shared_file = StorageFile.objects.get(owner=owner)
+        client.force_login(owner)
+
+        def share_with(users):
+            for user in users:
+                UserShare.objects.create(owner=owner, shared_with=user, content_type=content_type, object_id=shared_file.pk)
+
+        share_with(others[:2])
+        with query_budget(8) as few:
+            assert len(client.get('/cloudstorage/api/shares/').json()['results']) == 2
+        share_with(others[2:])
+        with query_budget(len(few)):
+            response = client.get('/cloudstorage/api/shares/', {'cursor': ''})
+        assert {share['shared_with_username'] for share in response.json()['results']} == {u.username for u in others}
+
+    @pytest.mark.unit
+    def test_ticket_list_budget(self, monkeypatch, query_budget):
+        admin = User.objects.create_user('admin', 'admin@example.com', 'pw', role='admin')
+        agent, customer = _users(2, prefix='person')
+        category = Category.objects.create(name='Netzwerk')
+        for number in range(10):
+            ticket = Ticket.objects.create(
+                ticket_number=f'T-{number:04d}', title=f'Ticket {number}', description='-',
+                created_by=customer, assigned_to=agent, category=category,
+            )
+            for author in (customer, agent):
+                TicketComment.objects.create(ticket=ticket, author=author, content='Antwort')
+        monkeypatch.setattr(TicketViewSet, 'validate_license', lambda self, request: (True, None))
+        request = APIRequestFactory().get('/api/v1/tickets/')
+        force_authenticate(request, user=admin)
+
+        with query_budget(3):
+            data = TicketViewSet.as_view({'get': 'list'})(request).data
+        assert data['total'] == 10
+        assert {comment['author_username'] for comment in data['tickets'][0]['comments']} == {'person0', 'person1'}
+        assert data['tickets'][0]['category_name'] == 'Netzwerk'
+
+    @pytest.mark.unit
+    def test_exceeded_budget_names_the_repeated_query(self, query_budget):
+        _users(3)
+        with pytest.raises(pytest.fail.Exception, match=r'(?s)7 queries, budget 1.*3x SELECT SUM'):
+            with query_budget(1):
+                for user in User.objects.order_by('pk'):
+                    user.profile.get_storage_used()
@@ -0,0 +1,128 @@
+"""
+Tests for classroom availability queries and bulk deployment planning.
+"""
+
+import pytest
+from datetime import date, timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from apps.classroom.models import MobileClassroom, ClassroomDeployment, ShippingAddress
+from apps.classroom.services import DeploymentRequest, DeploymentService
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def location(db):
+    return ShippingAddress.objects.create(
+        name='Training Center Munich',
+        location_type='training',
+        street='Main Street 123',
+        postal_code='80001',
+        city='Munich',
+    )
+
+
+@pytest.fixture
+def rooms(db):
+    return {
+        name: MobileClassroom.objects.create(name=name, room_type=name[:2], status='auf_lager')
+        for name in ('AC01', 'HP02', 'HP01')
+    }
+
+
+class TestAvailabilityQuery:
+    """Tests for the single-query availability lookup."""
+
+    @pytest.mark.unit
+    def test_available_classrooms_single_query(self, rooms, location):
+        """All free classrooms come back from one query."""
+        ClassroomDeployment.objects.create(
+            classroom=rooms['HP01'], location=location,
+            deployment_start=date(2026, 3, 1), deployment_end=date(2026, 3, 10),
+        )
+        with CaptureQueriesContext(connection) as queries:
+            names = [room.name for room in MobileClassroom.get_available_classrooms(date(2026, 3, 5), date(2026, 3, 12))]
+        assert names == ['AC01', 'HP02']
+        assert len(queries) == 1
+
+    @pytest.mark.unit
+    def test_pickup_buffer_and_locked_rooms(self, rooms, location):
+        """Shipping within the pickup buffer and locked rooms are excluded."""
+        ClassroomDeployment.objects.create(
+            classroom=rooms['HP01'], location=location,
+            deployment_start=date(2026, 3, 1), deployment_end=date(2026, 3, 10), pickup_date=date(2026, 3, 11),
+        )
+        rooms['HP02'].status = 'gesperrt'
+        rooms['HP02'].save()
+        available = MobileClassroom.get_available_classrooms(
+            date(2026, 3, 16), date(2026, 3, 20), shipping_date=date(2026, 3, 15),
+        )
+        assert list(available) == [rooms['AC01']]
+        later = MobileClassroom.get_available_classrooms(
+            date(2026, 3, 19), date(2026, 3, 25), shipping_date=date(2026, 3, 18),
+        )
+        assert rooms['HP01'] in later
+
+    @pytest.mark.unit
+    def test_exclude_current_deployment(self, rooms, location):
+        """The deployment being edited does not block its own classroom."""
+        deployment = ClassroomDeployment.objects.create(
+            classroom=rooms['HP01'], location=location,
+            deployment_start=date(2026, 3, 1), deployment_end=date(2026, 3, 10),
+        )
+        suggested = MobileClassroom.get_suggested_classroom(
+            date(2026, 3, 2), date(2026, 3, 9), exclude_deployment_id=deployment.id,
+        )
+        assert suggested == rooms['HP01']
+
+    @pytest.mark.unit
+    def test_suggestion_prefers_hp(self, rooms, location):
+        """HP rooms are suggested before AC rooms."""
+        ClassroomDeployment.objects.create(
+            classroom=rooms['HP01'], location=location,
+            deployment_start=date(2026, 3, 1), deployment_end=date(2026, 3, 10),
+        )
+        assert MobileClassroom.get_suggested_classroom(date(2026, 3, 5), date(2026, 3, 6)) == rooms['HP02']
+
+
+class TestPlanDeployments:
+    """Tests for DeploymentService.plan_deployments."""
+
+    @pytest.mark.unit
+    def test_plans_without_overlap(self, rooms, location):
+        """Overlapping requests are spread across classrooms; the rest stay unplaced."""
+        start = date(2026, 5, 4)
+        requests = [
+            DeploymentRequest(start, start + timedelta(days=4), location=location)
+            for _ in range(4)
+        ]
+        planned = DeploymentService.plan_deployments(requests, create=True)
+        assert [classroom.name if classroom else None for _request, classroom in planned] == [
+            'HP01', 'HP02', 'AC01', None,
+        ]
+        assert ClassroomDeployment.objects.count() == 3
+
+    @pytest.mark.unit
+    def test_respects_existing_and_planned_buffers(self, rooms, location):
+        """Existing deployments and pickups planned in the same run block a classroom."""
+        rooms['HP02'].delete()
+        rooms['AC01'].delete()
+        ClassroomDeployment.objects.create(
+            classroom=rooms['HP01'], location=location,
+            deployment_start=date(2026, 5, 1), deployment_end=date(2026, 5, 5),
+        )
+        requests = [
+            DeploymentRequest(date(2026, 5, 4), date(2026, 5, 8), location=location),
+            DeploymentRequest(date(2026, 5, 11), date(2026, 5, 15), pickup_date=date(2026, 5, 16), location=location),
+            DeploymentRequest(date(2026, 5, 20), date(2026, 5, 22), shipping_date=date(2026, 5, 19), location=location),
+            DeploymentRequest(date(2026, 5, 26), date(2026, 5, 29), shipping_date=date(2026, 5, 25), location=location),
+        ]
+        planned = DeploymentService.plan_deployments(requests)
+        assert [classroom for _request, classroom in planned] == [None, rooms['HP01'], None, rooms['HP01']]
+        for request, classroom in planned:
+            if classroom is not None:
+                available, _reason = classroom.is_available_for_deployment(
+                    request.deployment_start, request.deployment_end, request.shipping_date,
+                )
+                assert available
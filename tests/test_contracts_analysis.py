@@ -0,0 +1,169 @@
+"""
+Tests for chunked contract analysis.
+Covers content-defined chunking, per-file text extraction and chunk result caching.
+"""
+
+import json
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from apps.contracts.models import Contract, ContractChunkAnalysis, ContractVersion
+from apps.contracts.services import ai
+from apps.core.services.ai_gateway import gateway
+
+pytestmark = pytest.mark.django_db
+
+
+def _clauses(count, start=1):
+    return "\n".join(
+        f"§ {number} Regelung {number}: Der Auftragnehmer erbringt Leistung {number} gemäß Anlage {number}."
+        for number in range(start, start + count)
+    )
+
+
+class FakeProvider:
+    """Answers map calls per chunk and reduce calls with a fixed summary."""
+
+    def __init__(self):
+        self.map_calls = 0
+        self.reduce_calls = 0
+
+    def converse(self, prompt, system=None, **kwargs):
+        if system == ai.REDUCE_SYSTEM:
+            self.reduce_calls += 1
+            return json.dumps({'summary': 'Gesamt'})
+        self.map_calls += 1
+        first = prompt.split('§ ')[1].split(' ')[0] if '§ ' in prompt else '?'
+        return json.dumps({
+            'summary': f'Teil ab § {first}',
+            'risks': ['Haftung unbegrenzt'],
+            'checklist': [f'Kündigung § {first}'],
+            'key_dates': [],
+        })
+
+
+@pytest.fixture
+def provider(monkeypatch, settings):
+    settings.CONTRACTS_AI_CHUNK_CHARS = 1500
+    settings.CONTRACTS_AI_CHUNK_OVERLAP = 100
+    fake = FakeProvider()
+    monkeypatch.setattr(gateway, 'converse', fake.converse)
+    monkeypatch.setattr(gateway, 'bedrock', lambda: type('Service', (), {'model_id': 'test-model'})())
+    return fake
+
+
+class TestSplitChunks:
+    """Tests for overlapping, content-defined chunks."""
+
+    @pytest.mark.unit
+    def test_chunks_are_bounded_and_overlap(self):
+        text = _clauses(200)
+        chunks = ai.split_chunks(text, max_chars=1500, overlap=100)
+        assert len(chunks) > 5
+        assert all(len(chunk) <= 1600 for chunk in chunks)
+        assert chunks[0].startswith('§ 1 ')
+        assert '§ 200 ' in chunks[-1]
+        # Each chunk starts with the tail of the previous one
+        for previous, chunk in zip(chunks, chunks[1:]):
+            assert chunk[:50] in previous
+
+    @pytest.mark.unit
+    def test_edit_near_start_keeps_later_chunks(self):
+        """Inserting a clause only changes the chunks around the edit."""
+        original = ai.split_chunks(_clauses(200), max_chars=1500, overlap=100)
+        edited_text = _clauses(3) + "\n§ 3a Neue Klausel zur Vertraulichkeit.\n" + _clauses(197, start=4)
+        edited = ai.split_chunks(edited_text, max_chars=1500, overlap=100)
+        unchanged = set(original) & set(edited)
+        assert len(unchanged) >= len(original) - 3
+
+    @pytest.mark.unit
+    def test_overlong_lines_are_split(self):
+        chunks = ai.split_chunks('x' * 5000, max_chars=1500, overlap=0)
+        assert [len(chunk) for chunk in chunks] == [1500, 1500, 1500, 500]
+
+
+class TestDocumentText:
+    """Tests for text extraction cached by file hash."""
+
+    @pytest.mark.unit
+    def test_text_is_extracted_once_per_file_content(self, settings, tmp_path, monkeypatch):
+        settings.MEDIA_ROOT = str(tmp_path)
+        reads = []
+        monkeypatch.setattr(ai, '_read_file', lambda path: reads.append(path) or 'Vertragstext')
+        contract = Contract.objects.create(title='Rahmenvertrag')
+        first = ContractVersion.objects.create(
+            contract=contract, label='v1', file=SimpleUploadedFile('v1.pdf', b'%PDF same bytes')
+        )
+        assert ai.document_text(first) == 'Vertragstext'
+        assert ai.document_text(first) == 'Vertragstext'
+        # A second upload with identical bytes borrows the stored text
+        second = ContractVersion.objects.create(
+            contract=contract, label='v2', file=SimpleUploadedFile('v2.pdf', b'%PDF same bytes')
+        )
+        assert ai.document_text(second) == 'Vertragstext'
+        assert len(reads) == 1
+        second.refresh_from_db()
+        assert second.file_sha256 == first.file_sha256
+
+
+class TestAnalyzeContract:
+    """Tests for the map-reduce analysis."""
+
+    @pytest.mark.unit
+    def test_long_contract_is_analyzed_completely(self, provider):
+        contract = Contract.objects.create(title='Lang', notes=_clauses(200))
+        data, error = ai.analyze_contract(contract)
+        assert error == ''
+        chunk_count = len(ai.split_chunks(contract.notes))
+        assert provider.map_calls == chunk_count > 1
+        assert provider.reduce_calls == 1
+        contract.refresh_from_db()
+        assert contract.ai_status == 'done'
+        assert contract.ai_summary == 'Gesamt'
+        # Reduce gave no lists, so the de-duplicated merge is kept
+        assert contract.ai_risks == ['Haftung unbegrenzt']
+        assert len(contract.ai_checklist) == chunk_count
+        assert ContractChunkAnalysis.objects.count() == chunk_count
+
+    @pytest.mark.unit
+    def test_unchanged_chunks_reuse_cached_results(self, provider):
+        contract = Contract.objects.create(title='Lang', notes=_clauses(200))
+        ai.analyze_contract(contract)
+        first_calls = provider.map_calls
+        contract.notes = _clauses(199) + "\n§ 200 Geänderte Schlussbestimmung."
+        contract.save()
+        ai.analyze_contract(contract)
+        assert provider.map_calls - first_calls <= 2
+
+    @pytest.mark.unit
+    def test_latest_version_is_analyzed_and_summarized(self, provider, settings, tmp_path, monkeypatch):
+        settings.MEDIA_ROOT = str(tmp_path)
+        monkeypatch.setattr(ai, '_read_file', lambda path: '§ 1 Kurzer Vertrag.')
+        contract = Contract.objects.create(title='Kurz')
+        version = ContractVersion.objects.create(
+            contract=contract, label='v1', file=SimpleUploadedFile('v1.pdf', b'%PDF v1')
+        )
+        data, error = ai.analyze_contract(contract)
+        assert error == ''
+        # A single chunk needs no reduce call
+        assert (provider.map_calls, provider.reduce_calls) == (1, 0)
+        version.refresh_from_db()
+        assert version.summary == data['summary'] == 'Teil ab § 1'
+
+    @pytest.mark.unit
+    def test_failed_chunk_keeps_successful_results(self, provider, monkeypatch):
+        contract = Contract.objects.create(title='Lang', notes=_clauses(200))
+        chunks = ai.split_chunks(contract.notes)
+
+        def flaky(prompt, system=None, **kwargs):
+            if chunks[1] in prompt:
+                raise RuntimeError('Zeitüberschreitung')
+            return provider.converse(prompt, system=system)
+
+        monkeypatch.setattr(gateway, 'converse', flaky)
+        data, error = ai.analyze_contract(contract)
+        assert error == 'Zeitüberschreitung'
+        contract.refresh_from_db()
+        assert contract.ai_status == 'error'
+        assert ContractChunkAnalysis.objects.count() == len(chunks) - 1
@@ -0,0 +1,173 @@
+"""
+Tests for the shared AI gateway.
+Covers response caching, metrics and client pooling.
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from apps.core.services import ai_gateway, bedrock
+from apps.core.services.ai_gateway import AIGateway, ResponseCache
+
+
+class FakeBedrock:
+    model_id = 'test-model'
+    temperature = 0.0
+    max_tokens = 256
+
+    def __init__(self):
+        self.calls = []
+
+    def converse_with_usage(self, prompt, system=None, max_tokens=None, temperature=None):
+        self.calls.append((prompt, system, temperature))
+        return f'answer to {prompt}', {'inputTokens': 10, 'outputTokens': 5}
+
+
+class FakeAnthropic:
+    def __init__(self):
+        self.calls = 0
+        self.messages = self
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(
+            content=[SimpleNamespace(text='Netzwerk & Verbindung')],
+            usage=SimpleNamespace(input_tokens=20, output_tokens=3),
+        )
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    instance = AIGateway()
+    service = FakeBedrock()
+    monkeypatch.setattr(instance, 'bedrock', lambda: service)
+    instance.fake_bedrock = service
+    return instance
+
+
+class TestResponseCache:
+    """Tests for the TTL + LRU response cache."""
+
+    @pytest.mark.unit
+    def test_evicts_least_recently_used(self):
+        """The oldest untouched entry is dropped once the cache is full."""
+        cache = ResponseCache(max_entries=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1
+        cache.set('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+
+    @pytest.mark.unit
+    def test_entries_expire(self):
+        """Entries are gone after their TTL."""
+        cache = ResponseCache(max_entries=10, ttl=0.05)
+        cache.set('a', 1)
+        time.sleep(0.1)
+        assert cache.get('a') is None
+        assert len(cache) == 0
+
+
+class TestAIGateway:
+    """Tests for gateway calls, caching and metrics."""
+
+    @pytest.mark.unit
+    def test_deterministic_prompt_is_answered_from_cache(self, gateway):
+        """A repeated low-temperature prompt costs only one provider call."""
+        first = gateway.converse('Fasse zusammen', system='sys')
+        second = gateway.converse('Fasse zusammen', system='sys')
+        assert first == second == 'answer to Fasse zusammen'
+        assert len(gateway.fake_bedrock.calls) == 1
+        stats = gateway.stats()['providers']['bedrock']
+        assert stats['calls'] == 1
+        assert stats['cache_hits'] == 1
+        assert stats['input_tokens'] == 10
+        assert stats['output_tokens'] == 5
+        assert stats['avg_latency_ms'] is not None
+
+    @pytest.mark.unit
+    def test_cache_key_covers_system_and_temperature(self, gateway):
+        """Different system prompts or temperatures are separate cache entries."""
+        gateway.converse('Prompt', system='a', cache=True)
+        gateway.converse('Prompt', system='b', cache=True)
+        gateway.converse('Prompt', system='a', temperature=0.9, cache=True)
+        assert len(gateway.fake_bedrock.calls) == 3
+
+    @pytest.mark.unit
+    def test_high_temperature_and_opt_out_are_not_cached(self, gateway):
+        """Creative calls and cache=False always reach the provider."""
+        gateway.fake_bedrock.temperature = 0.7
+        gateway.converse('Entwurf')
+        gateway.converse('Entwurf')
+        gateway.fake_bedrock.temperature = 0.0
+        gateway.converse('Chat', cache=False)
+        gateway.converse('Chat', cache=False)
+        assert len(gateway.fake_bedrock.calls) == 4
+
+    @pytest.mark.unit
+    def test_errors_are_counted_and_not_cached(self, gateway):
+        """Failed calls raise, count as errors and leave the cache empty."""
+        def fail(*args, **kwargs):
+            raise RuntimeError('down')
+        gateway.fake_bedrock.converse_with_usage = fail
+        with pytest.raises(RuntimeError):
+            gateway.converse('Prompt')
+        assert gateway.stats()['providers']['bedrock']['errors'] == 1
+        assert gateway.stats()['cache_entries'] == 0
+
+    @pytest.mark.unit
+    def test_anthropic_client_is_shared(self, gateway, settings):
+        """One Anthropic client serves all calls; categorizations are cached."""
+        settings.CLAUDE_API_KEY = 'key'
+        fake = FakeAnthropic()
+        gateway._anthropic['key'] = fake
+        messages = [{'role': 'user', 'content': 'Kategorisiere'}]
+        for _ in range(3):
+            assert gateway.anthropic_message('haiku', messages, 100, temperature=0.0) == 'Netzwerk & Verbindung'
+        assert gateway.anthropic_client() is fake
+        assert fake.calls == 1
+        assert gateway.stats()['providers']['claude']['cache_hits'] == 2
+
+
+class TestClientPooling:
+    """Tests for process-wide Bedrock clients."""
+
+    @pytest.mark.unit
+    def test_runtime_client_and_session_are_reused(self):
+        """Bedrock clients and the HTTP session are created once per process."""
+        assert bedrock.runtime_client('eu-central-1') is bedrock.runtime_client('eu-central-1')
+        assert bedrock.http_session() is bedrock.http_session()
+
+    @pytest.mark.unit
+    def test_changed_api_key_gets_a_new_client(self, monkeypatch):
+        """botocore reads the bearer token at client creation, so a new key needs a new client."""
+        monkeypatch.setattr(bedrock, '_runtime_clients', {})
+        monkeypatch.delenv('AWS_BEARER_TOKEN_BEDROCK', raising=False)
+        old = bedrock.BedrockService({
+            'api_key': 'alt', 'region': 'eu-central-1', 'model_id': 'm', 'max_tokens': 10, 'temperature': 0.0,
+        }).client
+        new = bedrock.BedrockService({
+            'api_key': 'neu', 'region': 'eu-central-1', 'model_id': 'm', 'max_tokens': 10, 'temperature': 0.0,
+        }).client
+        assert new is not old
+        assert bedrock.runtime_client('eu-central-1', 'neu') is new
+
+    @pytest.mark.unit
+    def test_bedrock_config_is_reloaded_after_max_age(self, monkeypatch, settings):
+        """The gateway re-reads Bedrock settings only after AI_CONFIG_SECONDS."""
+        loads = []
+        monkeypatch.setattr(ai_gateway, 'load_config', lambda: loads.append(1) or {
+            'api_key': '', 'region': 'eu-central-1', 'model_id': 'm', 'max_tokens': 10, 'temperature': 0.0,
+        })
+        instance = AIGateway()
+        settings.AI_CONFIG_SECONDS = 60
+        assert instance.bedrock() is instance.bedrock()
+        assert len(loads) == 1
+        settings.AI_CONFIG_SECONDS = 0
+        time.sleep(0.01)
+        instance.bedrock()
+        assert len(loads) == 2
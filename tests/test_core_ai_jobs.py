@@ -0,0 +1,201 @@
+"""
+Tests for the background AI job queue.
+Covers de-duplication, per-provider slots, inline dispatch, stale job recovery
+and the job handlers.
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.contracts.models import Contract
+from apps.core.models import AIJob
+from apps.core.services import ai_jobs
+from apps.core.services.ai_gateway import gateway
+from apps.crm.models import Lead
+
+pytestmark = pytest.mark.django_db
+
+
+def echo_handler(params):
+    return {'echo': params['value']}
+
+
+def failing_handler(params):
+    raise RuntimeError('Anbieter nicht erreichbar')
+
+
+@pytest.fixture
+def job_kinds(monkeypatch, settings):
+    settings.AI_JOBS_MODE = 'none'
+    settings.AI_JOBS_PROVIDER_LIMITS = {'test': 1}
+    cache.clear()
+    monkeypatch.setitem(ai_jobs.JOB_KINDS, 'test.echo', (f'{__name__}.echo_handler', 'test'))
+    monkeypatch.setitem(ai_jobs.JOB_KINDS, 'test.fail', (f'{__name__}.failing_handler', 'test'))
+    yield
+    cache.clear()
+
+
+class TestSubmitJob:
+    """Tests for queueing and de-duplicating jobs."""
+
+    @pytest.mark.unit
+    def test_identical_active_jobs_are_shared(self, job_kinds):
+        """Submitting the same kind and params twice returns the queued job."""
+        first = ai_jobs.submit_job('test.echo', {'value': 1})
+        second = ai_jobs.submit_job('test.echo', {'value': 1})
+        other = ai_jobs.submit_job('test.echo', {'value': 2})
+        assert first.pk == second.pk
+        assert other.pk != first.pk
+        assert AIJob.objects.count() == 2
+        assert first.provider == 'test'
+
+    @pytest.mark.unit
+    def test_finished_jobs_are_not_reused(self, job_kinds):
+        """A new submission after completion queues a fresh job."""
+        first = ai_jobs.submit_job('test.echo', {'value': 1})
+        ai_jobs.run_job(first.pk)
+        second = ai_jobs.submit_job('test.echo', {'value': 1})
+        assert second.pk != first.pk
+        assert ai_jobs.active_jobs(('test.echo', {'value': 1})) == [second]
+
+    @pytest.mark.unit
+    def test_unknown_kind_is_rejected(self, job_kinds):
+        with pytest.raises(ValueError):
+            ai_jobs.submit_job('test.unknown', {})
+
+    @pytest.mark.unit
+    def test_inline_mode_runs_after_commit(self, job_kinds, settings, django_capture_on_commit_callbacks):
+        """Inline dispatch runs the job once the submitting transaction commits."""
+        settings.AI_JOBS_MODE = 'inline'
+        with django_capture_on_commit_callbacks(execute=True):
+            job = ai_jobs.submit_job('test.echo', {'value': 'x'})
+        job.refresh_from_db()
+        assert job.status == 'completed'
+        assert job.result == {'echo': 'x'}
+
+
+class TestRunJob:
+    """Tests for running jobs inside provider slots."""
+
+    @pytest.mark.unit
+    def test_result_and_failure_are_stored(self, job_kinds):
+        ok = ai_jobs.submit_job('test.echo', {'value': 3})
+        bad = ai_jobs.submit_job('test.fail', {})
+        assert ai_jobs.run_job(ok.pk).status == 'completed'
+        failed = ai_jobs.run_job(bad.pk)
+        assert failed.status == 'failed'
+        assert failed.error_message == 'Anbieter nicht erreichbar'
+        assert ai_jobs.job_payload(failed)['error'] == 'Anbieter nicht erreichbar'
+        # Already finished jobs are not run again
+        assert ai_jobs.run_job(ok.pk) is None
+
+    @pytest.mark.unit
+    def test_saturated_provider_leaves_job_queued(self, job_kinds):
+        """With every slot taken the job raises ProviderBusy and stays queued."""
+        job = ai_jobs.submit_job('test.echo', {'value': 4})
+        with ai_jobs.provider_slot('test'):
+            with pytest.raises(ai_jobs.ProviderBusy):
+                ai_jobs.run_job(job.pk)
+        job.refresh_from_db()
+        assert job.status == 'queued'
+        assert ai_jobs.run_job(job.pk).status == 'completed'
+
+    @pytest.mark.unit
+    def test_slots_are_per_provider_and_released(self, job_kinds, settings):
+        settings.AI_JOBS_PROVIDER_LIMITS = {'test': 2}
+        with ai_jobs.provider_slot('test'), ai_jobs.provider_slot('test'):
+            with pytest.raises(ai_jobs.ProviderBusy):
+                with ai_jobs.provider_slot('test'):
+                    pass
+            with ai_jobs.provider_slot('other'):
+                pass
+        with ai_jobs.provider_slot('test'):
+            pass
+
+
+class TestStaleJobs:
+    """Tests for jobs whose dispatch was lost or whose worker died."""
+
+    @pytest.mark.unit
+    def test_stale_jobs_are_not_shared(self, job_kinds):
+        stuck = ai_jobs.submit_job('test.echo', {'value': 5})
+        AIJob.objects.filter(pk=stuck.pk).update(status='running', started_at=timezone.now() - timedelta(hours=1))
+        fresh = ai_jobs.submit_job('test.echo', {'value': 5})
+        assert fresh.pk != stuck.pk
+        assert ai_jobs.active_jobs(('test.echo', {'value': 5})) == [fresh]
+
+    @pytest.mark.unit
+    def test_sweep_requeues_then_fails_dead_workers(self, job_kinds, settings):
+        settings.AI_JOBS_MODE = 'inline'
+        long_ago = timezone.now() - timedelta(hours=1)
+        retried = ai_jobs.submit_job('test.echo', {'value': 6})
+        exhausted = ai_jobs.submit_job('test.echo', {'value': 7})
+        AIJob.objects.filter(pk=retried.pk).update(status='running', started_at=long_ago, attempts=1)
+        AIJob.objects.filter(pk=exhausted.pk).update(status='running', started_at=long_ago, attempts=2)
+
+        assert ai_jobs.sweep_stale_jobs() == {'requeued': 1, 'redispatched': 0, 'failed': 1}
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        assert retried.status == 'completed' and retried.attempts == 2
+        assert exhausted.status == 'failed'
+
+    @pytest.mark.unit
+    def test_sweep_redispatches_lost_and_fails_expired_queued_jobs(self, job_kinds, settings):
+        settings.AI_JOBS_MODE = 'inline'
+        lost = ai_jobs.submit_job('test.echo', {'value': 8})
+        expired = ai_jobs.submit_job('test.echo', {'value': 9})
+        pending = ai_jobs.submit_job('test.echo', {'value': 10})
+        AIJob.objects.filter(pk=lost.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+        AIJob.objects.filter(pk=expired.pk).update(created_at=timezone.now() - timedelta(hours=1))
+
+        assert ai_jobs.sweep_stale_jobs() == {'requeued': 0, 'redispatched': 1, 'failed': 1}
+        statuses = dict(AIJob.objects.values_list('pk', 'status'))
+        assert statuses == {lost.pk: 'completed', expired.pk: 'failed', pending.pk: 'queued'}
+
+
+@pytest.fixture
+def bedrock_enabled():
+    from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
+    system_settings = SystemSettings.get_settings()
+    system_settings.bedrock_enabled = True
+    system_settings.save()
+
+
+class TestJobHandlers:
+    """Tests for the contract and lead job handlers."""
+
+    @pytest.mark.unit
+    def test_contract_analysis_job(self, job_kinds, monkeypatch):
+        monkeypatch.setattr(gateway, 'converse', lambda *args, **kwargs: (
+            '{"summary": "Kurz", "risks": ["Haftung"], "checklist": [], "key_dates": []}'
+        ))
+        contract = Contract.objects.create(title='Rahmenvertrag', notes='Laufzeit 2 Jahre')
+        job = ai_jobs.submit_job('contracts.analyze', {'contract_id': contract.pk})
+        assert ai_jobs.run_job(job.pk).result == {'contract_id': contract.pk, 'summary': 'Kurz'}
+        contract.refresh_from_db()
+        assert contract.ai_status == 'done'
+        assert contract.ai_risks == ['Haftung']
+
+    @pytest.mark.unit
+    def test_lead_summary_job_failure_marks_lead(self, job_kinds, bedrock_enabled, monkeypatch):
+        def down(*args, **kwargs):
+            raise RuntimeError('Bedrock down')
+        monkeypatch.setattr(gateway, 'converse', down)
+        lead = Lead.objects.create(name='Erika Muster', company='Muster GmbH')
+        job = ai_jobs.run_job(ai_jobs.submit_job('crm.lead_summary', {'lead_id': lead.pk}).pk)
+        assert job.status == 'failed'
+        lead.refresh_from_db()
+        assert lead.ai_status == 'error'
+        assert lead.ai_error == 'Bedrock down'
+
+    @pytest.mark.unit
+    def test_lead_followup_job(self, job_kinds, bedrock_enabled, monkeypatch):
+        monkeypatch.setattr(gateway, 'converse', lambda *args, **kwargs: '{"subject": "Hallo", "body": "Text"}')
+        lead = Lead.objects.create(name='Erika Muster')
+        job = ai_jobs.run_job(ai_jobs.submit_job('crm.lead_followup', {'lead_id': lead.pk}).pk)
+        assert job.result['ai_followup_subject'] == 'Hallo'
+        lead.refresh_from_db()
+        assert (lead.ai_followup_body, lead.ai_status) == ('Text', 'done')
@@ -0,0 +1,141 @@
+"""
+Tests for concurrent, cached website enrichment of CRM staging leads.
+Pages are served by a local HTTP server so the real session/limiter path runs.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from django.core.cache import cache
+from apps.crm.models import LeadEnrichmentJob, LeadSourceProfile, LeadStaging
+from apps.crm.services import enrichment, web_fetch
+
+pytestmark = pytest.mark.django_db
+
+PAGES = {
+    '/': '<html><a href="/kontakt">Kontakt</a></html>',
+    '/kontakt': '<p>Schreiben Sie an info@example.test</p>',
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits = []
+
+    def do_GET(self):
+        self.hits.append(self.path)
+        body = PAGES.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        payload = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site(settings):
+    settings.CRM_ENRICHMENT_DOMAIN_DELAY = 0
+    settings.CRM_ENRICHMENT_MODE = 'none'
+    cache.clear()
+    web_fetch.reset()
+    _Handler.hits = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+    web_fetch.reset()
+    cache.clear()
+
+
+@pytest.fixture
+def profile(db):
+    return LeadSourceProfile.objects.create(name='Test')
+
+
+def make_items(profile, website, count):
+    return [
+        LeadStaging.objects.create(profile=profile, company=f'Firma {i}', name='Max', phone='0301234567', raw_data={'website': website})
+        for i in range(count)
+    ]
+
+
+class TestFetchPage:
+    """Tests for the shared, cached page fetcher."""
+
+    @pytest.mark.unit
+    def test_pages_are_cached_by_url(self, site):
+        assert 'Kontakt' in web_fetch.fetch_page(site + '/')
+        web_fetch.fetch_page(site + '/')
+        assert _Handler.hits == ['/']
+
+    @pytest.mark.unit
+    def test_failures_are_cached(self, site):
+        for _ in range(2):
+            with pytest.raises(web_fetch.FetchError):
+                web_fetch.fetch_page(site + '/missing')
+        assert _Handler.hits == ['/missing']
+
+    @pytest.mark.unit
+    def test_domain_limiter_bounds_concurrency(self):
+        limiter = web_fetch.DomainLimiter(max_concurrent=2, min_interval=0)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def worker():
+            limiter.acquire('example.test')
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            threading.Event().wait(0.02)
+            with lock:
+                active.pop()
+            limiter.release('example.test')
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert max(peak) == 2
+
+
+class TestEnrichStaging:
+    """Tests for batch enrichment and background jobs."""
+
+    @pytest.mark.unit
+    def test_same_site_is_crawled_once_per_batch(self, site, profile):
+        items = make_items(profile, site, 5)
+        assert enrichment.enrich_staging_items(items) == 5
+        assert sorted(_Handler.hits) == ['/', '/kontakt']
+        for item in LeadStaging.objects.all():
+            assert item.email == 'info@example.test'
+            assert item.status == 'ready'
+            assert item.enrichment_status == 'enriched'
+
+    @pytest.mark.unit
+    def test_progress_callback_per_chunk(self, site, profile, monkeypatch):
+        monkeypatch.setattr(enrichment, 'CHUNK_SIZE', 2)
+        items = make_items(profile, site, 5)
+        calls = []
+        enrichment.enrich_staging_items(items, progress=lambda *args: calls.append(args))
+        assert calls == [(2, 2), (4, 4), (5, 5)]
+
+    @pytest.mark.unit
+    def test_job_runs_once_and_completes(self, site, profile):
+        items = make_items(profile, site, 3)
+        job = enrichment.create_enrichment_job([item.id for item in items])
+        job = enrichment.run_enrichment_job(job.pk)
+        assert job.status == 'completed'
+        assert (job.processed_count, job.enriched_count, job.progress) == (3, 3, 100)
+        assert enrichment.run_enrichment_job(job.pk) is None
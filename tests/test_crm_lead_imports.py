@@ -0,0 +1,117 @@
+"""
+Tests for the concurrent CRM lead import orchestrator and its shared rate limiter.
+"""
+
+import threading
+import time
+import pytest
+from django.core.cache import cache
+from apps.crm.models import LeadSourceProfile, LeadStaging, SourceRequestLog
+from apps.crm.services import fallbacks, lead_sources
+from apps.crm.services.fallbacks import FallbackResult
+from apps.crm.services.rate_limit import TokenBucket
+from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def profile(db):
+    return LeadSourceProfile.objects.create(name='IT Berlin', max_per_run=10)
+
+
+class TestTokenBucket:
+    """Tests for the cache-backed token bucket."""
+
+    @pytest.mark.unit
+    def test_capacity_is_shared_between_instances(self):
+        assert TokenBucket('demo', 2).try_acquire()
+        assert TokenBucket('demo', 2).try_acquire()
+        assert not TokenBucket('demo', 2).try_acquire()
+
+    @pytest.mark.unit
+    def test_refills_over_time(self):
+        bucket = TokenBucket('fast', 1, period=0.2)
+        assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+        time.sleep(0.25)
+        assert bucket.try_acquire()
+
+
+class TestStageItems:
+    """Tests for bulk staging with de-duplication."""
+
+    @pytest.mark.unit
+    def test_skips_known_and_repeated_companies(self, profile, django_assert_num_queries):
+        LeadStaging.objects.create(profile=profile, company='Alpha GmbH')
+        items = [{'name': 'ALPHA GmbH'}, {'name': 'Beta AG', 'url': 'https://beta.test'}, {'name': 'beta ag'}, {'name': ''}]
+        with django_assert_num_queries(2):
+            imported, skipped = lead_sources.stage_items(profile, items, 'serpapi', max_count=10)
+        assert (imported, skipped) == (1, 2)
+        beta = LeadStaging.objects.get(company='Beta AG')
+        assert beta.source == 'SearchFallback'
+        assert beta.raw_data == {'company_name': 'Beta AG', 'fallback_provider': 'serpapi', 'website': 'https://beta.test'}
+
+
+class TestRunImports:
+    """Tests for the orchestrator."""
+
+    @pytest.mark.unit
+    def test_fetches_run_concurrently_and_record_metrics(self, monkeypatch, settings):
+        settings.CRM_IMPORT_WORKERS = 3
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def fetch(profile, max_count):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.2)
+            with lock:
+                active[0] -= 1
+            return [{'name': f'{profile.name} {i}'} for i in range(3)]
+
+        monkeypatch.setitem(lead_sources.SOURCE_FETCHERS, 'handelsregister', fetch)
+        profiles = [LeadSourceProfile.objects.create(name=f'P{i}') for i in range(3)]
+        jobs = lead_sources.run_imports(profiles)
+
+        assert peak[0] == 3
+        assert {job.status for job in jobs} == {'completed'}
+        job = jobs[0]
+        assert job.source == 'handelsregister'
+        assert (job.fetched_count, job.imported_count, job.yield_rate) == (3, 3, 100)
+        assert job.metrics['handelsregister']['latency_ms'] >= 200
+        assert LeadStaging.objects.count() == 9
+        assert SourceRequestLog.objects.count() == 3
+
+    @pytest.mark.unit
+    def test_falls_back_when_primary_is_empty(self, profile, monkeypatch):
+        st = SystemSettings.get_settings()
+        st.crm_fallback_enabled = True
+        st.crm_fallback_provider_order = ['bing']
+        st.save()
+        monkeypatch.setitem(lead_sources.SOURCE_FETCHERS, 'handelsregister', lambda profile, max_count: [])
+        monkeypatch.setitem(
+            fallbacks.FALLBACK_PROVIDERS, 'bing',
+            lambda profile, max_count, settings_obj=None: FallbackResult(names=['Gamma KG'], items=[]),
+        )
+        job = lead_sources.run_import_for_profile(profile)
+        assert job.status == 'completed'
+        assert job.source == 'bing'
+        assert set(job.metrics) == {'handelsregister', 'bing'}
+        assert LeadStaging.objects.get().raw_data['fallback_provider'] == 'bing'
+
+    @pytest.mark.unit
+    def test_shared_bucket_rate_limits_runs(self, profile, monkeypatch, settings):
+        settings.CRM_SOURCE_RATE_LIMITS = {'handelsregister': 1}
+        monkeypatch.setitem(lead_sources.SOURCE_FETCHERS, 'handelsregister', lambda profile, max_count: [{'name': 'Delta'}])
+        assert lead_sources.run_import_for_profile(profile).status == 'completed'
+        second = lead_sources.run_import_for_profile(profile)
+        assert second.status == 'rate_limited'
+        assert SourceRequestLog.objects.count() == 1
@@ -0,0 +1,88 @@
+"""
+Tests for keyset-paginated CRM lists, search and the single-query pipeline board.
+"""
+
+from datetime import timedelta
+import pytest
+from django.utils import timezone
+from apps.crm.models import Account, Lead, Opportunity
+from apps.crm.services.listing import SEARCH_FIELDS, board_columns, keyset_page, search
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def leads(db):
+    created = [Lead.objects.create(name=f'Lead {i}', company=f'Firma {i}') for i in range(7)]
+    # Several rows share one timestamp so the id tiebreaker is exercised.
+    stamp = timezone.now() - timedelta(days=1)
+    Lead.objects.filter(pk__in=[lead.pk for lead in created[:4]]).update(updated_at=stamp)
+    return created
+
+
+class TestKeysetPage:
+    """Tests for keyset_page."""
+
+    @pytest.mark.unit
+    def test_walks_every_row_once(self, leads):
+        seen, cursor = [], ''
+        while True:
+            items, cursor = keyset_page(Lead.objects.all(), cursor, limit=3)
+            seen.extend(item.pk for item in items)
+            if not cursor:
+                break
+        expected = list(Lead.objects.order_by('-updated_at', '-id').values_list('pk', flat=True))
+        assert seen == expected
+
+    @pytest.mark.unit
+    def test_invalid_cursor_starts_over(self, leads):
+        items, _cursor = keyset_page(Lead.objects.all(), 'not-a-cursor', limit=2)
+        assert len(items) == 2
+
+
+class TestSearch:
+    """Tests for the free-text search helper."""
+
+    @pytest.mark.unit
+    def test_matches_company_and_email(self, db):
+        Lead.objects.create(name='Max', company='Nordwind AG')
+        Lead.objects.create(name='Erika', email='erika@sued.test')
+        Lead.objects.create(name='Other')
+        qs = Lead.objects.all()
+        assert list(search(qs, 'nordWIND', SEARCH_FIELDS['lead']).values_list('name', flat=True)) == ['Max']
+        assert list(search(qs, 'sued', SEARCH_FIELDS['lead']).values_list('name', flat=True)) == ['Erika']
+
+
+class TestBoardColumns:
+    """Tests for the grouped board query."""
+
+    @pytest.fixture
+    def opportunities(self, db):
+        account = Account.objects.create(name='Kunde GmbH')
+        for i in range(5):
+            Opportunity.objects.create(account=account, name=f'P{i}', stage='prospect')
+        Opportunity.objects.create(account=account, name='W', stage='won')
+        return account
+
+    @pytest.mark.unit
+    def test_counts_and_first_cards_in_one_query(self, opportunities, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            columns = board_columns(Opportunity.objects.select_related('account'), Opportunity.STAGE_CHOICES, 3)
+            names = [item.account.name for column in columns for item in column['items']]
+        by_stage = {column['key']: column for column in columns}
+        assert by_stage['prospect']['count'] == 5
+        assert len(by_stage['prospect']['items']) == 3
+        assert by_stage['prospect']['next_cursor']
+        assert by_stage['won']['count'] == 1
+        assert by_stage['won']['next_cursor'] is None
+        assert by_stage['lost'] == {'key': 'lost', 'label': 'Lost', 'count': 0, 'items': [], 'next_cursor': None}
+        assert set(names) == {'Kunde GmbH'}
+
+    @pytest.mark.unit
+    def test_next_cursor_continues_column(self, opportunities):
+        columns = board_columns(Opportunity.objects.all(), Opportunity.STAGE_CHOICES, 3)
+        prospect = columns[0]
+        rest, cursor = keyset_page(Opportunity.objects.filter(stage='prospect'), prospect['next_cursor'], 10)
+        assert cursor is None
+        assert len(prospect['items']) + len(rest) == 5
+        assert not {item.pk for item in rest} & {item.pk for item in prospect['items']}
@@ -0,0 +1,72 @@
+"""
+Tests for the in-memory CRM matching index used by staging enrichment and import.
+"""
+
+import pytest
+from apps.crm.models import Account, Contact, Lead, LeadSourceProfile, LeadStaging
+from apps.crm.services import enrichment
+from apps.crm.services.matching import MatchIndex, normalize_company, normalize_phone
+
+pytestmark = pytest.mark.django_db
+
+
+class TestNormalization:
+    """Tests for the key normalizers."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('value', ['Müller GmbH', 'MUELLER gmbh', 'Müller GmbH & Co. KG', ' müller '])
+    def test_company_variants_share_key(self, value):
+        assert normalize_company(value) == 'mueller'
+
+    @pytest.mark.unit
+    def test_phone_variants_share_key(self):
+        assert normalize_phone('+49 30 123456') == normalize_phone('030/123 456') == '030123456'
+
+
+class TestMatchIndex:
+    """Tests for lookups against the index."""
+
+    @pytest.fixture
+    def crm_data(self, db):
+        account = Account.objects.create(name='Beispiel Software GmbH', phone='0301111', email='info@beispiel.test')
+        Contact.objects.create(account=account, first_name='Erika', last_name='Muster', email='erika@beispiel.test')
+        Lead.objects.create(name='Max', company='Nordwind AG', email='MAX@nordwind.test', phone='040 2222')
+        return account
+
+    @pytest.mark.unit
+    def test_builds_with_fixed_queries(self, crm_data, django_assert_num_queries):
+        with django_assert_num_queries(3):
+            index = MatchIndex.build(fuzzy=False)
+        assert index.find_account('beispiel software') == crm_data
+        assert index.find_contact('Beispiel Software').first_name == 'Erika'
+        assert index.find_lead('NORDWIND').email == 'MAX@nordwind.test'
+
+    @pytest.mark.unit
+    def test_lead_exists_by_email_or_company_phone(self, crm_data):
+        index = MatchIndex.build(fuzzy=False)
+        assert index.lead_exists(email='max@nordwind.test')
+        assert index.lead_exists(company='Nordwind', phone='+49 40 2222')
+        assert not index.lead_exists(company='Nordwind', phone='040 3333')
+
+    @pytest.mark.unit
+    def test_fuzzy_matching_is_optional(self, crm_data):
+        assert MatchIndex.build(fuzzy=False).find_account('Beispiel Softwar') is None
+        assert MatchIndex.build(fuzzy=True).find_account('Beispiel Softwar') == crm_data
+
+
+class TestStagingBatch:
+    """Tests for batch enrichment using the index."""
+
+    @pytest.mark.unit
+    def test_enrichment_queries_do_not_grow_per_item(self, django_assert_max_num_queries):
+        Account.objects.create(name='Alpha GmbH', phone='0301', email='a@alpha.test')
+        profile = LeadSourceProfile.objects.create(name='Test')
+        items = [
+            LeadStaging.objects.create(profile=profile, company='Alpha GmbH' if i % 2 else f'Firma {i}', name='X')
+            for i in range(20)
+        ]
+        # 3 index queries + 1 bulk_update
+        with django_assert_max_num_queries(4):
+            enrichment.enrich_staging_items(items)
+        alpha = LeadStaging.objects.filter(company='Alpha GmbH').first()
+        assert (alpha.phone, alpha.email, alpha.status) == ('0301', 'a@alpha.test', 'ready')
@@ -0,0 +1,102 @@
+"""
+Tests for batched CRM lead scoring (rule scores, hash-gated AI scores, cache).
+"""
+
+import json
+import re
+import pytest
+from django.core.cache import cache
+from apps.crm.models import Lead
+from apps.crm.services import scoring
+
+pytestmark = pytest.mark.django_db
+
+
+class FakeConverse:
+    """Answers batch prompts with a fixed score per lead and records calls."""
+
+    def __init__(self, score=80):
+        self.score = score
+        self.prompts = []
+
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        items = json.loads(re.search(r"Leads:\n(.*)\n", prompt).group(1))
+        return json.dumps([{"id": item["id"], "score": self.score, "reason": "passt"} for item in items])
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def leads(db):
+    return [
+        Lead.objects.create(name=f'Lead {i}', company=f'Firma {i}', email=f'l{i}@example.test', status='new')
+        for i in range(5)
+    ]
+
+
+class TestScoreLeads:
+    """Tests for score_leads."""
+
+    @pytest.mark.unit
+    def test_rule_scores_in_one_update(self, leads, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            assert scoring.score_leads(leads, use_ai=False) == 5
+        lead = Lead.objects.get(pk=leads[0].pk)
+        assert lead.rule_score == 35
+        assert lead.score == round(35 * 0.7)
+        assert lead.score_hash == ''
+
+    @pytest.mark.unit
+    def test_ai_scores_batched(self, leads, settings):
+        settings.CRM_AI_SCORE_BATCH_SIZE = 2
+        converse = FakeConverse()
+        scoring.score_leads(leads, converse=converse)
+        assert len(converse.prompts) == 3
+        lead = Lead.objects.get(pk=leads[0].pk)
+        assert lead.ai_score == 80
+        assert lead.score == round(35 * 0.7 + 80 * 0.3)
+        assert lead.score_hash == scoring.lead_content_hash(lead)
+
+    @pytest.mark.unit
+    def test_unchanged_leads_skip_ai(self, leads):
+        scoring.score_leads(leads, converse=FakeConverse())
+        fresh = list(Lead.objects.order_by('id'))
+        fresh[0].phone = '030 1234'
+        converse = FakeConverse(score=50)
+        scoring.score_leads(fresh, converse=converse)
+        assert len(converse.prompts) == 1
+        assert '030 1234' in converse.prompts[0]
+        scores = dict(Lead.objects.values_list('pk', 'ai_score'))
+        assert scores[leads[0].pk] == 50
+        assert scores[leads[1].pk] == 80
+
+    @pytest.mark.unit
+    def test_cache_serves_same_content(self, leads):
+        scoring.score_leads(leads, converse=FakeConverse())
+        Lead.objects.update(score_hash='')
+        converse = FakeConverse(score=10)
+        scoring.score_leads(list(Lead.objects.all()), converse=converse)
+        assert converse.prompts == []
+        assert set(Lead.objects.values_list('ai_score', flat=True)) == {80}
+
+    @pytest.mark.unit
+    def test_failed_ai_keeps_lead_pending(self, leads):
+        def broken(prompt):
+            raise RuntimeError('timeout')
+
+        scoring.score_leads(leads[:1], converse=broken)
+        lead = Lead.objects.get(pk=leads[0].pk)
+        assert lead.ai_score == 0
+        assert lead.score_hash == ''
+        assert 'AI Fehler' in lead.score_reason
+
+    @pytest.mark.unit
+    def test_score_all_leads_walks_batches(self, leads):
+        assert scoring.score_all_leads(use_ai=False, batch_size=2) == 5
+        assert not Lead.objects.filter(score_updated_at__isnull=True).exists()
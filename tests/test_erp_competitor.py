@@ -0,0 +1,153 @@
+"""
+Tests for the cached, batched ERP competitor price refresh.
+Prices come from a local HTTP server configured as the API provider.
+"""
+
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from django.core.cache import cache
+from apps.erp.models import Product
+from apps.erp.services import competitor
+from apps.erp.services.competitor_refresh import competitor_price_report, refresh_competitor_prices
+from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
+
+pytestmark = pytest.mark.django_db
+
+PRICES = {'SKU-1': '100.00', 'SKU-2': '50.00', 'SKU-3': '20.00'}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits = []
+    delay = 0
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.hits.append(self.path)
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        time.sleep(cls.delay)
+        with cls.lock:
+            cls.active -= 1
+        sku = parse_qs(urlparse(self.path).query).get('sku', [''])[0]
+        price = PRICES.get(sku)
+        payload = (f'{{"price_net": "{price}"}}' if price else '{}').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def price_api(db):
+    cache.clear()
+    competitor.reset()
+    _Handler.hits, _Handler.delay, _Handler.peak = [], 0, 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    st = SystemSettings.get_settings()
+    st.erp_competitor_scrape_enabled = True
+    st.erp_competitor_accept_terms = True
+    st.erp_competitor_provider = 'api'
+    st.erp_competitor_api_url = f'http://127.0.0.1:{server.server_port}/price'
+    st.save()
+    yield _Handler
+    server.shutdown()
+    server.server_close()
+    competitor.reset()
+    cache.clear()
+
+
+@pytest.fixture
+def products(db):
+    return [
+        Product.objects.create(name=f'Produkt {sku}', sku=sku, cost_net=Decimal('10.00'))
+        for sku in ['SKU-1', 'SKU-2', 'SKU-3', 'SKU-404']
+    ]
+
+
+class TestExtraction:
+    """Tests for HTML price extraction."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('html, expected, source', [
+        ('<meta itemprop="price" content="12,50">', Decimal('12.50'), 'meta[itemprop=price]'),
+        ('<div class="gh_price">€ 1.299,00</div><span class="price">1.199,99 €</span>', Decimal('1199.99'), 'css/regex'),
+        ('<p>ab <b>49,90</b> €</p>', Decimal('49.90'), 'css/regex'),
+        ('<p>nichts</p>', None, 'not_found'),
+        ('', None, 'not_found'),
+    ])
+    def test_lxml_matches_bs4(self, html, expected, source):
+        assert competitor._extract_price_from_html(html) == (expected, source)
+        if html:
+            assert competitor._extract_price_bs4(html) == (expected, source)
+
+
+class TestRefresh:
+    """Tests for refresh_competitor_prices."""
+
+    @pytest.mark.unit
+    def test_updates_changed_prices_in_bulk(self, price_api, products):
+        result = refresh_competitor_prices()
+        assert result == {'checked': 4, 'changed': 3, 'missing': 1, 'cached': 0, 'rate_limited': 0}
+        product = Product.objects.get(sku='SKU-1')
+        assert product.competitor_price_net == Decimal('100.00')
+        assert product.suggested_price_net > 0
+        assert product.competitor_price_checked_at is not None
+        assert product.competitor_fetch_ms is not None
+        assert Product.objects.get(sku='SKU-404').competitor_price_net is None
+
+    @pytest.mark.unit
+    def test_fresh_products_are_skipped(self, price_api, products):
+        refresh_competitor_prices()
+        hits = len(price_api.hits)
+        assert refresh_competitor_prices()['checked'] == 0
+        assert len(price_api.hits) == hits
+
+    @pytest.mark.unit
+    def test_cache_serves_repeated_skus(self, price_api, products):
+        refresh_competitor_prices()
+        Product.objects.update(competitor_price_checked_at=None)
+        result = refresh_competitor_prices()
+        assert result['cached'] == 4
+        assert len(price_api.hits) == 4
+        refresh_competitor_prices(force=True)
+        assert len(price_api.hits) == 8
+
+    @pytest.mark.unit
+    def test_per_host_limit(self, price_api, products, settings):
+        settings.ERP_COMPETITOR_WORKERS = 4
+        settings.ERP_COMPETITOR_PER_HOST = 1
+        price_api.delay = 0.05
+        refresh_competitor_prices()
+        assert price_api.peak == 1
+
+    @pytest.mark.unit
+    def test_disabled_provider_is_noop(self, products):
+        assert refresh_competitor_prices()['checked'] == 0
+
+
+class TestReport:
+    """Tests for the stale-price report."""
+
+    @pytest.mark.unit
+    def test_coverage_and_staleness(self, price_api, products):
+        refresh_competitor_prices(queryset=Product.objects.filter(sku__in=['SKU-1', 'SKU-2']))
+        report = competitor_price_report()
+        assert (report['total'], report['covered'], report['coverage_pct']) == (4, 2, 50)
+        assert report['stale'] == report['never_checked'] == 2
+        assert report['p95_fetch_ms'] is not None
+        assert [p.sku for p in report['stale_products']] == ['SKU-3', 'SKU-404']
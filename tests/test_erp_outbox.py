@@ -0,0 +1,90 @@
+"""
+Tests for the ERP transactional outbox.
+Saves write one coalesced event; the worker runs audit/invoice side effects.
+"""
+
+import pytest
+from apps.erp.models import Customer, ErpEvent, Invoice, SalesOrder
+from apps.erp.services import outbox
+from apps.helpdesk.helpdesk_apps.admin_panel.models import AuditLog
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def no_dispatch(settings):
+    settings.ERP_OUTBOX_DISPATCH = 'none'
+
+
+@pytest.fixture
+def order(db):
+    customer = Customer.objects.create(name='ACME GmbH', email='billing@acme.test')
+    return SalesOrder.objects.create(customer=customer)
+
+
+class TestRecordEvent:
+    """Tests for the write side of the outbox."""
+
+    @pytest.mark.unit
+    def test_save_writes_event_without_side_effects(self, order):
+        event = ErpEvent.objects.get(model_name='SalesOrder', object_id=order.pk)
+        assert event.action == 'created'
+        assert event.status == 'pending'
+        assert not AuditLog.objects.filter(content_type='erp.SalesOrder').exists()
+
+    @pytest.mark.unit
+    def test_repeated_saves_coalesce(self, order):
+        order.status = 'confirmed'
+        order.save()
+        order.save()
+        events = ErpEvent.objects.filter(model_name='SalesOrder', object_id=order.pk)
+        assert events.count() == 1
+        assert events.get().old_status == 'draft'
+
+    @pytest.mark.unit
+    def test_status_change_does_not_select_old_row(self, order, django_assert_max_num_queries):
+        order = SalesOrder.objects.get(pk=order.pk)
+        order.status = 'paid'
+        # UPDATE order + UPDATE coalesced event
+        with django_assert_max_num_queries(2):
+            order.save(update_fields=['status'])
+
+
+class TestProcessEvents:
+    """Tests for the outbox worker."""
+
+    @pytest.mark.unit
+    def test_confirmed_order_creates_single_invoice(self, order):
+        order.status = 'confirmed'
+        order.save()
+        outbox.drain_events()
+        outbox.drain_events()
+
+        assert Invoice.objects.filter(order=order).count() == 1
+        assert not ErpEvent.objects.exclude(status='done').exists()
+        assert AuditLog.objects.filter(content_type='erp.SalesOrder', object_id=order.pk).count() == 1
+        assert AuditLog.objects.filter(content_type='erp.Invoice').count() == 1
+
+    @pytest.mark.unit
+    def test_failed_event_is_kept_for_retry(self, order, monkeypatch):
+        def boom(*args, **kwargs):
+            raise RuntimeError('smtp down')
+
+        monkeypatch.setitem(outbox.HANDLERS, 'SalesOrder', boom)
+        result = outbox.process_events()
+
+        event = ErpEvent.objects.get(model_name='SalesOrder', object_id=order.pk)
+        assert result == {'processed': 0, 'failed': 1}
+        assert event.status == 'failed'
+        assert event.attempts == 1
+        assert 'smtp down' in event.last_error
+
+    @pytest.mark.unit
+    def test_delete_keeps_snapshot(self, order):
+        pk = order.pk
+        order.delete()
+        outbox.drain_events()
+
+        log = AuditLog.objects.get(content_type='erp.SalesOrder', object_id=pk)
+        assert log.action == 'deleted'
+        assert log.new_values['order_number'] == order.order_number
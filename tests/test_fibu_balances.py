@@ -0,0 +1,198 @@
+"""
+Tests for FiBu period balances and the reports built on them.
+Posting an entry adds its lines to the balances; reports read the balances.
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
+from apps.fibu.models import Account, AccountPeriodBalance, CostCenter, CostCenterPeriodBalance, JournalEntry, JournalLine
+from apps.fibu.services.balances import post_entry, rebuild_balances, unpost_entry
+from apps.fibu.services.reports import account_statement, cost_center_report, trial_balance
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def accounts(db):
+    return {
+        'bank': Account.objects.create(code='T1200', name='Bank', account_type='asset'),
+        'revenue': Account.objects.create(code='T8400', name='Erlöse', account_type='income'),
+    }
+
+
+@pytest.fixture
+def center(db):
+    return CostCenter.objects.create(code='T100', name='Vertrieb')
+
+
+@pytest.fixture
+def api_client(client):
+    system_settings = SystemSettings.get_settings()
+    system_settings.app_toggles = {**(system_settings.app_toggles or {}), 'fibu': True}
+    system_settings.save()
+    client.force_login(get_user_model().objects.create_user('fibu', 'fibu@example.com', 'pw', is_staff=True))
+    return client
+
+
+def make_entry(accounts, amount, day, center=None):
+    entry = JournalEntry.objects.create(date=day, reference=f'R-{day}')
+    JournalLine.objects.create(entry=entry, account=accounts['bank'], debit=Decimal(amount))
+    JournalLine.objects.create(entry=entry, account=accounts['revenue'], cost_center=center, credit=Decimal(amount))
+    return entry
+
+
+class TestPosting:
+    """Tests for post_entry / unpost_entry."""
+
+    @pytest.mark.unit
+    def test_post_updates_totals_and_balances(self, accounts, center):
+        entry = make_entry(accounts, '100.00', date(2025, 3, 10), center)
+        assert entry.status == 'draft'
+        assert not AccountPeriodBalance.objects.exists()
+
+        post_entry(entry)
+        entry.refresh_from_db()
+        assert entry.is_posted
+        assert entry.total_debit == Decimal('100.00')
+        bank = AccountPeriodBalance.objects.get(account=accounts['bank'], year=2025, month=3)
+        assert bank.debit == Decimal('100.00')
+        assert CostCenterPeriodBalance.objects.get(cost_center=center).credit == Decimal('100.00')
+
+    @pytest.mark.unit
+    def test_post_is_idempotent(self, accounts):
+        entry = make_entry(accounts, '50.00', date(2025, 3, 1))
+        post_entry(entry)
+        post_entry(entry)
+        second = make_entry(accounts, '25.00', date(2025, 3, 2))
+        post_entry(second)
+        bank = AccountPeriodBalance.objects.get(account=accounts['bank'], year=2025, month=3)
+        assert bank.debit == Decimal('75.00')
+
+    @pytest.mark.unit
+    def test_unbalanced_entry_is_rejected(self, accounts):
+        entry = JournalEntry.objects.create(date=date(2025, 3, 1))
+        JournalLine.objects.create(entry=entry, account=accounts['bank'], debit=Decimal('10.00'))
+        with pytest.raises(ValidationError):
+            post_entry(entry)
+        assert not AccountPeriodBalance.objects.exists()
+
+    @pytest.mark.unit
+    def test_posted_lines_are_locked_and_unpost_reverses(self, accounts):
+        entry = make_entry(accounts, '40.00', date(2025, 4, 1))
+        post_entry(entry)
+        with pytest.raises(ValidationError):
+            JournalLine.objects.create(entry=entry, account=accounts['bank'], debit=Decimal('1.00'))
+
+        unpost_entry(entry)
+        bank = AccountPeriodBalance.objects.get(account=accounts['bank'], year=2025, month=4)
+        assert bank.debit == Decimal('0.00')
+        assert entry.status == 'draft'
+
+    @pytest.mark.unit
+    def test_api_rejects_line_changes_on_posted_entries(self, accounts, api_client):
+        client = api_client
+        entry = make_entry(accounts, '40.00', date(2025, 4, 1))
+        post_entry(entry)
+        line = entry.lines.first()
+        url = reverse('fibu:fibu_api:journal-lines-detail', args=[line.pk])
+
+        created = client.post(reverse('fibu:fibu_api:journal-lines-list'), {
+            'entry': entry.pk, 'account': accounts['bank'].pk, 'debit': '1.00',
+        })
+        assert created.status_code == 400
+        assert client.patch(url, {'debit': '5.00'}, content_type='application/json').status_code == 400
+        assert client.delete(url).status_code == 400
+        assert entry.lines.count() == 2
+
+    @pytest.mark.unit
+    def test_delete_posted_entry_reverses(self, accounts):
+        entry = make_entry(accounts, '40.00', date(2025, 4, 1))
+        post_entry(entry)
+        entry.delete()
+        assert AccountPeriodBalance.objects.get(account=accounts['bank'], year=2025, month=4).debit == 0
+
+    @pytest.mark.unit
+    def test_posted_entry_header_is_locked(self, accounts, api_client):
+        entry = make_entry(accounts, '40.00', date(2025, 4, 1))
+        post_entry(entry)
+        url = reverse('fibu:fibu_api:journal-detail', args=[entry.pk])
+        assert api_client.patch(url, {'reference': 'X-1'}, content_type='application/json').status_code == 400
+
+        entry.refresh_from_db()
+        entry.date = date(2025, 5, 1)
+        with pytest.raises(ValidationError):
+            entry.save()
+        entry.refresh_from_db()
+        assert (entry.date, entry.reference) == (date(2025, 4, 1), 'R-2025-04-01')
+
+        unpost_entry(entry)
+        entry.reference = 'X-1'
+        entry.save()
+        assert api_client.patch(url, {'reference': 'X-2'}, content_type='application/json').status_code == 200
+
+    @pytest.mark.unit
+    def test_line_changes_update_draft_totals(self, accounts, django_assert_max_num_queries):
+        entry = JournalEntry.objects.create(date=date(2025, 4, 1))
+        # INSERT line + audit row, aggregate + UPDATE of the entry totals + audit row
+        with django_assert_max_num_queries(5):
+            line = JournalLine.objects.create(entry=entry, account=accounts['bank'], debit=Decimal('1.00'))
+        JournalLine.objects.create(entry=entry, account=accounts['revenue'], credit=Decimal('1.00'))
+        entry.refresh_from_db()
+        assert (entry.total_debit, entry.total_credit) == (Decimal('1.00'), Decimal('1.00'))
+
+        line.delete()
+        entry.refresh_from_db()
+        assert entry.total_debit == Decimal('0.00')
+
+    @pytest.mark.unit
+    def test_rebuild_matches_incremental(self, accounts, center):
+        for day in (date(2024, 12, 5), date(2025, 1, 5), date(2025, 1, 20)):
+            post_entry(make_entry(accounts, '10.00', day, center))
+        before = sorted(AccountPeriodBalance.objects.values_list('account_id', 'year', 'month', 'debit', 'credit'))
+        rebuild_balances()
+        after = sorted(AccountPeriodBalance.objects.values_list('account_id', 'year', 'month', 'debit', 'credit'))
+        assert before == after
+
+
+class TestReports:
+    """Tests for reports read from period balances."""
+
+    @pytest.mark.unit
+    def test_trial_balance_carries_balance_sheet_accounts_only(self, accounts):
+        post_entry(make_entry(accounts, '100.00', date(2024, 11, 1)))
+        post_entry(make_entry(accounts, '30.00', date(2025, 2, 1)))
+        draft = make_entry(accounts, '999.00', date(2025, 2, 2))
+
+        report = trial_balance(2025)
+        rows = {row['account'].code: row for row in report['rows']}
+        assert rows['T1200']['opening'] == Decimal('100.00')
+        assert rows['T1200']['closing'] == Decimal('130.00')
+        assert rows['T8400']['opening'] == Decimal('0.00')
+        assert rows['T8400']['closing'] == Decimal('-30.00')
+        assert draft.status == 'draft'
+
+    @pytest.mark.unit
+    def test_account_statement_running_balance(self, accounts):
+        post_entry(make_entry(accounts, '100.00', date(2025, 1, 15)))
+        post_entry(make_entry(accounts, '20.00', date(2025, 3, 3)))
+        post_entry(make_entry(accounts, '5.00', date(2025, 3, 20)))
+
+        report = account_statement(accounts['bank'], date(2025, 3, 10), date(2025, 3, 31))
+        assert report['opening'] == Decimal('120.00')
+        assert [item['balance'] for item in report['lines']] == [Decimal('125.00')]
+        assert report['closing'] == Decimal('125.00')
+
+    @pytest.mark.unit
+    def test_cost_center_report(self, accounts, center):
+        post_entry(make_entry(accounts, '80.00', date(2025, 5, 1), center))
+        report = cost_center_report(2025)
+        assert report['rows'][0]['cost_center'] == center
+        assert report['rows'][0]['income'] == Decimal('80.00')
+        assert report['totals']['result'] == Decimal('80.00')
@@ -0,0 +1,150 @@
+"""
+Tests for the streaming FiBu CSV/DATEV importer.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from apps.fibu import tasks
+from apps.fibu.models import Account, AccountPeriodBalance, CostCenter, FibuImportJob, JournalEntry
+from apps.fibu.services import importer
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.FIBU_IMPORT_MODE = 'none'
+
+
+def run(kind, content, name='import.csv'):
+    job = importer.create_import_job(SimpleUploadedFile(name, content.encode('utf-8')), kind)
+    return importer.run_import(job.pk)
+
+
+class TestAccountImport:
+    """Tests for chart-of-accounts imports."""
+
+    @pytest.mark.unit
+    def test_upserts_accounts_in_bulk(self):
+        Account.objects.create(code='T4000', name='Alt', account_type='expense')
+        job = run('accounts', 'code;name;account_type\nT4000;Umsatzerlöse;income\nT1000;Kasse;asset\n;ohne Konto;asset\n')
+
+        assert job.status == 'completed'
+        assert (job.created_count, job.updated_count, job.skipped_count) == (1, 1, 1)
+        assert job.errors == [{'line': 4, 'error': 'Konto und Bezeichnung sind Pflichtfelder.'}]
+        updated = Account.objects.get(code='T4000')
+        assert (updated.name, updated.account_type) == ('Umsatzerlöse', 'income')
+
+    @pytest.mark.unit
+    def test_large_file_is_chunked(self, monkeypatch, django_assert_max_num_queries):
+        monkeypatch.setattr(importer, 'CHUNK_SIZE', 100)
+        rows = ''.join(f'X{i};Konto {i}\n' for i in range(1000))
+        job = importer.create_import_job(SimpleUploadedFile('big.csv', f'konto;bezeichnung\n{rows}'.encode()), 'accounts')
+        # claim + 10 chunks x (select, upsert, progress) + finish
+        with django_assert_max_num_queries(40):
+            job = importer.run_import(job.pk)
+        assert job.created_count == 1000
+        assert Account.objects.filter(code__startswith='X').count() == 1000
+
+    @pytest.mark.unit
+    def test_job_runs_only_once(self):
+        job = importer.create_import_job(SimpleUploadedFile('a.csv', b'code;name\nT1;A\n'), 'accounts')
+        assert importer.run_import(job.pk) is not None
+        assert importer.run_import(job.pk) is None
+
+
+class TestJournalImport:
+    """Tests for journal entry imports."""
+
+    @pytest.fixture
+    def accounts(self, db):
+        Account.objects.create(code='T1200', name='Bank', account_type='asset')
+        Account.objects.create(code='T8400', name='Erlöse', account_type='income')
+        CostCenter.objects.create(code='K1', name='Vertrieb')
+
+    @pytest.mark.unit
+    def test_groups_rows_into_posted_entries(self, accounts):
+        content = (
+            'date;reference;description;account;debit;credit;cost_center\n'
+            '2025-01-02;EB-1;Eröffnung;T1200;1.000,00;;\n'
+            '2025-01-02;EB-1;Eröffnung;T8400;;1.000,00;K1\n'
+            '2025-01-03;EB-2;kaputt;T1200;5,00;;\n'
+            '2025-01-04;EB-3;unbekannt;T9999;5,00;;\n'
+        )
+        job = run('journal', content)
+
+        assert job.status == 'completed'
+        assert job.created_count == 1
+        assert job.error_count == 2
+        entry = JournalEntry.objects.get(reference='EB-1')
+        assert entry.is_posted
+        assert entry.lines.count() == 2
+        assert AccountPeriodBalance.objects.get(account__code='T1200').debit == Decimal('1000.00')
+
+    @pytest.mark.unit
+    def test_datev_buchungsstapel(self, accounts):
+        header = '"EXTF";700;21;"Buchungsstapel";13;;;;;;"1";"2";20250101;4\n'
+        content = (
+            header
+            + 'Umsatz (ohne Soll/Haben-Kz);Soll/Haben-Kennzeichen;Konto;Gegenkonto (ohne BU-Schlüssel);Belegdatum;Belegfeld 1;Buchungstext\n'
+            + '119,00;S;T1200;T8400;1503;R1;Rechnung 1\n'
+            + '19,00;H;T1200;T8400;1603;R2;Gutschrift\n'
+        )
+        job = run('journal', content)
+
+        assert job.created_count == 2
+        credit_note = JournalEntry.objects.get(reference='R2')
+        assert credit_note.date == date(2025, 3, 16)
+        debit_line = credit_note.lines.get(debit__gt=0)
+        assert debit_line.account.code == 'T8400'
+
+    @pytest.mark.unit
+    def test_reimported_documents_are_skipped(self, accounts):
+        """Entries with a booked document key are not posted twice."""
+        content = (
+            'Umsatz (ohne Soll/Haben-Kz);Soll/Haben-Kennzeichen;Konto;Gegenkonto (ohne BU-Schlüssel);Belegdatum;Belegfeld 1;Buchungstext\n'
+            '119,00;S;T1200;T8400;15.03.2025;R1;Rechnung 1\n'
+            '50,00;S;T1200;T8400;15.03.2025;;Barverkauf\n'
+        )
+        assert run('journal', content).created_count == 2
+        again = run('journal', content + '60,00;S;T1200;T8400;15.03.2025;R1;Rechnung 1\n')
+
+        assert (again.created_count, again.skipped_count) == (1, 2)
+        assert JournalEntry.objects.filter(reference='R1').count() == 2
+        assert AccountPeriodBalance.objects.get(account__code='T1200').debit == Decimal('229.00')
+
+    @pytest.mark.unit
+    def test_amounts_in_german_and_english_notation(self):
+        """The separator that comes last is the decimal separator."""
+        assert importer._decimal('1.234,56') == Decimal('1234.56')
+        assert importer._decimal('1,234.56') == Decimal('1234.56')
+        assert importer._decimal('119,00') == Decimal('119.00')
+        assert importer._decimal('1.234') == Decimal('1234.00')
+        assert importer._decimal('0,500') == Decimal('0.50')
+
+
+class TestDispatch:
+    """Tests for dispatching import jobs to workers."""
+
+    @pytest.mark.unit
+    def test_failed_dispatch_leaves_job_queued_for_sweep(self, settings, monkeypatch):
+        def broker_down(job_id):
+            raise ConnectionError('broker down')
+        monkeypatch.setattr(tasks.run_fibu_import, 'delay', broker_down)
+        settings.FIBU_IMPORT_MODE = 'celery'
+        job = importer.create_import_job(SimpleUploadedFile('a.csv', b'code;name\nT1;A\n'), 'accounts')
+        importer.dispatch_import(job.pk)
+        job.refresh_from_db()
+        assert job.status == 'queued'
+
+        settings.FIBU_IMPORT_MODE = 'inline'
+        assert importer.sweep_queued_imports() == 0
+        FibuImportJob.objects.filter(pk=job.pk).update(created_at=timezone.now() - timedelta(minutes=10))
+        assert importer.sweep_queued_imports() == 1
+        job.refresh_from_db()
+        assert job.status == 'completed'
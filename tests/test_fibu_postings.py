@@ -0,0 +1,106 @@
+"""
+Tests for bulk journal posting of ERP invoices and stock receipts.
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from apps.erp.models import Customer, Invoice, SalesOrder, StockReceipt, StockReceiptItem
+from apps.fibu.models import Account, AccountPeriodBalance, FibuSettings, JournalEntry, JournalLine
+from apps.fibu.services import postings
+from apps.helpdesk.helpdesk_apps.admin_panel.models import AuditLog
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def no_dispatch(settings):
+    settings.ERP_OUTBOX_DISPATCH = 'none'
+
+
+@pytest.fixture
+def fibu_settings(db):
+    settings_obj = FibuSettings.get_settings()
+    settings_obj.auto_posting_enabled = True
+    settings_obj.receivable_account = Account.objects.create(code='T1400', name='Forderungen', account_type='asset')
+    settings_obj.revenue_account = Account.objects.create(code='T8400', name='Erlöse', account_type='income')
+    settings_obj.vat_output_account = Account.objects.create(code='T1776', name='USt', account_type='liability')
+    settings_obj.inventory_account = Account.objects.create(code='T3200', name='Lager', account_type='asset')
+    settings_obj.payable_account = Account.objects.create(code='T1600', name='Verbindlichkeiten', account_type='liability')
+    settings_obj.save()
+    return settings_obj
+
+
+@pytest.fixture
+def invoices(db):
+    customer = Customer.objects.create(name='ACME GmbH', email='billing@acme.test')
+    order = SalesOrder.objects.create(customer=customer)
+    return [
+        Invoice.objects.create(
+            order=order,
+            status='issued',
+            issue_date=date(2025, 6, day),
+            net_amount=Decimal('100.00'),
+            tax_amount=Decimal('19.00'),
+            total_amount=Decimal('119.00'),
+        )
+        for day in range(1, 6)
+    ]
+
+
+class TestBulkPosting:
+    """Tests for post_invoices / post_*_period."""
+
+    @pytest.mark.unit
+    def test_period_posts_entries_lines_balances_and_audit(self, fibu_settings, invoices):
+        result = postings.post_invoice_period(date(2025, 6, 1), date(2025, 6, 30))
+        assert result == {'posted': 5, 'skipped': 0, 'unbalanced': []}
+        assert JournalEntry.objects.filter(status='posted', erp_invoice__isnull=False).count() == 5
+        assert JournalLine.objects.count() == 15
+        receivable = AccountPeriodBalance.objects.get(account=fibu_settings.receivable_account, year=2025, month=6)
+        assert receivable.debit == Decimal('595.00')
+        audits = AuditLog.objects.filter(content_type='fibu.JournalEntry')
+        assert audits.count() == 5
+        assert not AuditLog.objects.filter(content_type='fibu.JournalLine').exists()
+        assert len(audits.first().new_values['lines']) == 3
+
+    @pytest.mark.unit
+    def test_posting_is_idempotent(self, fibu_settings, invoices):
+        postings.post_invoices(invoices)
+        result = postings.post_invoices(invoices)
+        assert result['posted'] == 0
+        assert result['skipped'] == 5
+        assert JournalEntry.objects.count() == 5
+        receivable = AccountPeriodBalance.objects.get(account=fibu_settings.receivable_account)
+        assert receivable.debit == Decimal('595.00')
+
+    @pytest.mark.unit
+    def test_query_count_does_not_grow_with_batch(self, fibu_settings, invoices, django_assert_max_num_queries):
+        with django_assert_max_num_queries(12):
+            postings.post_invoices(invoices, fibu_settings)
+
+    @pytest.mark.unit
+    def test_unbalanced_invoices_are_reported(self, fibu_settings, invoices):
+        Invoice.objects.filter(pk=invoices[1].pk).update(total_amount=Decimal('119.01'))
+        result = postings.post_invoice_period(date(2025, 6, 1), date(2025, 6, 30))
+        assert (result['posted'], result['skipped']) == (4, 1)
+        assert result['unbalanced'] == [invoices[1].number]
+        assert not JournalEntry.objects.filter(erp_invoice=invoices[1]).exists()
+
+    @pytest.mark.unit
+    def test_single_invoice_wrapper(self, fibu_settings, invoices):
+        entry = postings.post_invoice(invoices[0])
+        assert entry.total_debit == entry.total_credit == Decimal('119.00')
+        assert postings.post_invoice(invoices[0]) is None
+
+    @pytest.mark.unit
+    def test_stock_receipts(self, fibu_settings):
+        receipt = StockReceipt.objects.create(receipt_date=date(2025, 6, 3))
+        StockReceiptItem.objects.create(receipt=receipt, quantity=3, unit_cost_net=Decimal('10.00'))
+        StockReceipt.objects.create(receipt_date=date(2025, 6, 4))
+
+        result = postings.post_stock_receipt_period(date(2025, 6, 1), date(2025, 6, 30))
+        assert result == {'posted': 1, 'skipped': 1}
+        entry = JournalEntry.objects.get(erp_stockreceipt=receipt)
+        assert entry.total_debit == Decimal('30.00')
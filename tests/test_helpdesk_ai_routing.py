@@ -0,0 +1,169 @@
+"""
+Tests for helpdesk AI provider routing.
+Covers circuit breakers, latency-ordered routing, hedged requests and the
+LLAMA3 model fallback.
+"""
+
+import time
+
+import pytest
+
+from apps.core.services.ai_gateway import gateway
+from apps.helpdesk.helpdesk_apps.ai import unified_ai_service as unified_module
+from apps.helpdesk.helpdesk_apps.ai.llama3_service import LLAMA3Service
+from apps.helpdesk.helpdesk_apps.ai.provider_health import ProviderHealth
+
+
+@pytest.fixture
+def breaker_settings(settings):
+    settings.AI_BREAKER_MIN_CALLS = 4
+    settings.AI_BREAKER_ERROR_RATE = 0.5
+    settings.AI_BREAKER_OPEN_SECONDS = 30
+    settings.AI_ROUTING_BY_LATENCY = True
+    settings.AI_HEDGE_AFTER_MS = 0
+    return settings
+
+
+class TestProviderHealth:
+    """Tests for the per-provider circuit breaker and latency ordering."""
+
+    @pytest.mark.unit
+    def test_breaker_opens_on_error_rate(self, breaker_settings):
+        health = ProviderHealth()
+        for ok in (True, False, True, False):
+            health.record('llama3', 100, ok)
+        assert health.snapshot()['llama3']['state'] == 'open'
+        assert not health.allow('llama3')
+        assert health.order(['llama3', 'claude']) == ['claude']
+
+    @pytest.mark.unit
+    def test_half_open_allows_single_trial(self, breaker_settings):
+        health = ProviderHealth()
+        for _ in range(4):
+            health.record('llama3', 100, False)
+        breaker_settings.AI_BREAKER_OPEN_SECONDS = 0
+        assert health.allow('llama3')
+        assert not health.allow('llama3')
+        health.record('llama3', 100, True)
+        assert health.snapshot()['llama3']['state'] == 'closed'
+        assert health.allow('llama3')
+
+    @pytest.mark.unit
+    def test_failed_trial_reopens(self, breaker_settings):
+        health = ProviderHealth()
+        for _ in range(4):
+            health.record('claude', 100, False)
+        breaker_settings.AI_BREAKER_OPEN_SECONDS = 0
+        assert health.allow('claude')
+        health.record('claude', 100, False)
+        assert health.snapshot()['claude']['state'] == 'open'
+
+    @pytest.mark.unit
+    def test_order_follows_p95_and_measures_new_providers_first(self, breaker_settings):
+        health = ProviderHealth()
+        for latency in (900, 1000, 1100, 5000):
+            health.record('llama3', latency, True)
+        for latency in (300, 350, 400, 450):
+            health.record('claude', latency, True)
+        assert health.order(['llama3', 'claude', 'openai']) == ['openai', 'claude', 'llama3']
+        breaker_settings.AI_ROUTING_BY_LATENCY = False
+        assert health.order(['llama3', 'claude', 'openai']) == ['llama3', 'claude', 'openai']
+
+    @pytest.mark.unit
+    def test_ewma_tracks_latency(self, breaker_settings):
+        breaker_settings.AI_HEALTH_EWMA_ALPHA = 0.5
+        health = ProviderHealth()
+        health.record('openai', 100, True)
+        health.record('openai', 300, True)
+        assert health.snapshot()['openai']['ewma_latency_ms'] == 200
+
+
+@pytest.fixture
+def service(breaker_settings, monkeypatch):
+    service = unified_module.UnifiedAIService()
+    service.claude_client = service.openai_client = object()
+    monkeypatch.setattr(service, '_get_provider_priority', lambda: ['llama3', 'claude', 'openai'])
+    return service
+
+
+class TestRouting:
+    """Tests for provider routing in UnifiedAIService."""
+
+    @pytest.mark.unit
+    def test_failing_provider_is_skipped_once_breaker_opens(self, service):
+        calls = []
+
+        def down():
+            calls.append('llama3')
+            return None
+
+        attempts = {'llama3': down, 'claude': lambda: 'Antwort'}
+        for _ in range(6):
+            assert service._route(attempts) == ('Antwort', 'claude')
+        # The down provider is measured first, then skipped once its breaker opens
+        assert len(calls) < 6
+        assert service.health.snapshot()['llama3']['state'] == 'open'
+        assert service.usage_stats['claude'] == 6
+
+    @pytest.mark.unit
+    def test_exceptions_fall_through(self, service):
+        def broken():
+            raise RuntimeError('timeout')
+        assert service._route({'llama3': broken, 'claude': broken, 'openai': lambda: 'ok'}) == ('ok', 'openai')
+        assert service._route({'llama3': broken}) == (None, 'none')
+        assert service.usage_stats['failures'] == 1
+
+    @pytest.mark.unit
+    def test_slow_provider_is_hedged(self, service, breaker_settings):
+        breaker_settings.AI_HEDGE_AFTER_MS = 50
+
+        def slow():
+            time.sleep(0.5)
+            return 'langsam'
+
+        started = time.monotonic()
+        assert service._route({'llama3': slow, 'claude': lambda: 'schnell'}) == ('schnell', 'claude')
+        assert time.monotonic() - started < 0.4
+
+    @pytest.mark.unit
+    def test_fast_provider_is_not_hedged(self, service, breaker_settings):
+        breaker_settings.AI_HEDGE_AFTER_MS = 200
+        backup = []
+        assert service._route({'llama3': lambda: 'sofort', 'claude': lambda: backup.append(1) or 'x'}) == ('sofort', 'llama3')
+        assert backup == []
+
+    @pytest.mark.unit
+    def test_categorize_uses_route(self, service, monkeypatch):
+        monkeypatch.setattr(service, '_categorize_with_claude', lambda title, description: ('Sonstiges', 0.9))
+        monkeypatch.setattr(service, '_get_provider_priority', lambda: ['claude'])
+        assert service.categorize_ticket('Titel', 'Text') == ('Sonstiges', 0.9, 'claude')
+        assert service.get_stats()['health']['claude']['calls'] == 1
+
+
+class FakeOllama:
+    def __init__(self, failing_model):
+        self.failing_model = failing_model
+        self.models = []
+
+    def chat(self, model, messages, options):
+        self.models.append(model)
+        if model == self.failing_model:
+            raise ConnectionError('model not loaded')
+        return {'message': {'content': ' Hallo '}, 'prompt_eval_count': 8, 'eval_count': 2}
+
+
+class TestLlama3Fallback:
+    """Tests for the LLAMA3 fallback model and metrics."""
+
+    @pytest.mark.unit
+    def test_fallback_model_does_not_change_shared_model(self):
+        service = LLAMA3Service()
+        service.available = True
+        service.model = 'llama3-70b'
+        service.client = FakeOllama(failing_model='llama3-70b')
+        gateway.metrics.reset()
+        assert service._chat([{'role': 'user', 'content': 'Hi'}]) == 'Hallo'
+        assert service.client.models == ['llama3-70b', LLAMA3Service.FALLBACK_MODEL]
+        assert service.model == 'llama3-70b'
+        stats = service.get_performance_stats()
+        assert (stats['calls'], stats['errors'], stats['output_tokens']) == (2, 1, 2)
@@ -0,0 +1,187 @@
+"""
+Tests for streamed AI replies.
+Covers gateway and Bedrock token streams, provider fallback before the first
+token and the ticket suggestion event stream.
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from apps.core.services import bedrock
+from apps.core.services.ai_gateway import AIGateway
+from apps.helpdesk.helpdesk_apps.ai import unified_ai_service as unified_module
+from apps.helpdesk.helpdesk_apps.tickets import ai_service as ticket_ai
+from apps.helpdesk.helpdesk_apps.tickets.models import Ticket
+
+
+class FakeStream:
+    def __init__(self, texts):
+        self.text_stream = iter(texts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def get_final_message(self):
+        return SimpleNamespace(usage=SimpleNamespace(input_tokens=12, output_tokens=3))
+
+
+class FakeAnthropic:
+    def __init__(self, texts):
+        self.texts = texts
+        self.messages = self
+
+    def stream(self, **kwargs):
+        return FakeStream(self.texts)
+
+
+class TestGatewayStreams:
+    """Tests for streamed gateway calls."""
+
+    @pytest.mark.unit
+    def test_anthropic_stream_records_first_token_latency(self, settings):
+        settings.CLAUDE_API_KEY = 'key'
+        gateway = AIGateway()
+        gateway._anthropic['key'] = FakeAnthropic(['Guten ', '', 'Tag'])
+        deltas = gateway.stream_anthropic('haiku', [{'role': 'user', 'content': 'Hallo'}], 100)
+        assert list(deltas) == ['Guten ', 'Tag']
+        stats = gateway.stats()['providers']['claude']
+        assert (stats['calls'], stats['input_tokens'], stats['output_tokens']) == (1, 12, 3)
+        assert stats['p95_first_token_ms'] is not None
+
+    @pytest.mark.unit
+    def test_bedrock_converse_stream_yields_deltas_and_usage(self, monkeypatch):
+        events = [
+            {'messageStart': {'role': 'assistant'}},
+            {'contentBlockDelta': {'delta': {'text': 'Sehr '}}},
+            {'contentBlockDelta': {'delta': {'text': 'geehrte'}}},
+            {'messageStop': {'stopReason': 'end_turn'}},
+            {'metadata': {'usage': {'inputTokens': 7, 'outputTokens': 2}}},
+        ]
+        fake_client = SimpleNamespace(converse_stream=lambda **request: {'stream': iter(events)})
+        monkeypatch.setattr(bedrock, 'runtime_client', lambda region, api_key=None: fake_client)
+        service = bedrock.BedrockService({
+            'api_key': '', 'region': 'eu-central-1', 'model_id': 'm', 'max_tokens': 10, 'temperature': 0.0,
+        })
+        gateway = AIGateway()
+        monkeypatch.setattr(gateway, 'bedrock', lambda: service)
+        assert ''.join(gateway.stream_converse('Prompt')) == 'Sehr geehrte'
+        stats = gateway.stats()['providers']['bedrock']
+        assert (stats['input_tokens'], stats['output_tokens']) == (7, 2)
+
+    @pytest.mark.unit
+    def test_failed_stream_counts_as_error(self, settings):
+        settings.CLAUDE_API_KEY = 'key'
+        gateway = AIGateway()
+
+        def broken(**kwargs):
+            raise RuntimeError('overloaded')
+        gateway._anthropic['key'] = SimpleNamespace(messages=SimpleNamespace(stream=broken))
+        with pytest.raises(RuntimeError):
+            list(gateway.stream_anthropic('haiku', [], 100))
+        assert gateway.stats()['providers']['claude']['errors'] == 1
+
+
+class TestUnifiedStream:
+    """Tests for provider fallback while streaming."""
+
+    @pytest.fixture
+    def service(self, monkeypatch):
+        service = unified_module.UnifiedAIService()
+        service.claude_client = object()
+        monkeypatch.setattr(service, '_get_provider_priority', lambda: ['llama3', 'claude'])
+        return service
+
+    @pytest.mark.unit
+    def test_falls_back_before_first_token(self, service, monkeypatch):
+        def down(message, context=None):
+            raise RuntimeError('ollama down')
+            yield
+        monkeypatch.setattr(unified_module, 'llama3_service', SimpleNamespace(stream_chat_response=down), raising=False)
+        monkeypatch.setattr(service, '_stream_with_claude', lambda message, context=None: iter(['Hallo', ' Welt']))
+        assert list(service.stream_chat_response('Hi')) == [('claude', 'Hallo'), ('claude', ' Welt')]
+        assert service.usage_stats['claude'] == 1
+
+    @pytest.mark.unit
+    def test_failure_after_first_token_is_raised(self, service, monkeypatch):
+        def cut_off(message, context=None):
+            yield 'Hallo'
+            raise RuntimeError('connection reset')
+        monkeypatch.setattr(unified_module, 'llama3_service', SimpleNamespace(stream_chat_response=cut_off), raising=False)
+        stream = service.stream_chat_response('Hi')
+        assert next(stream) == ('llama3', 'Hallo')
+        with pytest.raises(RuntimeError):
+            next(stream)
+
+
+@pytest.fixture
+def ticket(db, monkeypatch):
+    # The helpdesk prompt expects the helpdesk user model's full_name
+    monkeypatch.setattr(get_user_model(), 'full_name', property(lambda user: user.get_full_name()), raising=False)
+    customer = get_user_model().objects.create_user(
+        'kunde', 'kunde@example.com', 'pw', first_name='Erika', last_name='Muster', role='customer'
+    )
+    return Ticket.objects.create(
+        ticket_number='T-1001', title='VPN trennt', description='Die VPN-Verbindung bricht ab.', created_by=customer
+    )
+
+
+@pytest.fixture
+def streaming(monkeypatch):
+    """Ticket AI service streaming two fragments through the unified service."""
+    service = ticket_ai.ClaudeAIService()
+    service.use_llama3 = True
+    service.client = None
+    monkeypatch.setattr(ticket_ai, 'UNIFIED_AI_AVAILABLE', True)
+    monkeypatch.setattr(
+        ticket_ai, 'unified_ai_service',
+        SimpleNamespace(stream_chat_response=lambda prompt, context: iter([('llama3', 'Guten Tag, '), ('llama3', 'bitte neu starten.')])),
+        raising=False,
+    )
+    monkeypatch.setattr(service, 'get_relevant_knowledge', lambda query, limit=3: [])
+    monkeypatch.setattr(ticket_ai, 'ai_service', service)
+    return service
+
+
+@pytest.mark.django_db
+class TestTicketSuggestionStream:
+    """Tests for the streamed ticket reply suggestion."""
+
+    @pytest.mark.unit
+    def test_events_end_with_signed_suggestion(self, ticket, streaming):
+        events = list(streaming.stream_ticket_response(ticket))
+        assert [event['event'] for event in events] == ['token', 'token', 'done']
+        suggestion = events[-1]['suggestion']
+        assert suggestion['text'].startswith('Guten Tag, bitte neu starten.')
+        assert 'Mit freundlichen Grüßen' in suggestion['text']
+        assert (suggestion['provider'], suggestion['confidence']) == ('llama3', 0.8)
+
+    @pytest.mark.unit
+    def test_no_provider_yields_error(self, ticket, streaming):
+        streaming.use_llama3 = False
+        assert list(streaming.stream_ticket_response(ticket)) == [
+            {'event': 'error', 'error': 'Kein AI-Provider verfügbar'}
+        ]
+
+    @pytest.mark.unit
+    def test_view_streams_server_sent_events(self, ticket, streaming, client, monkeypatch):
+        from apps.helpdesk.helpdesk_apps.tickets import views
+        monkeypatch.setattr(views, 'ai_service', streaming)
+        User = get_user_model()
+        monkeypatch.setattr(User, 'can_access_ticket', lambda self, ticket: True, raising=False)
+        agent = User.objects.create_user('agent', 'agent@example.com', 'pw', role='support_agent')
+        client.force_login(agent)
+        cache.clear()
+
+        response = client.get(f'/helpdesk/tickets/{ticket.pk}/api/ai-suggest/stream/')
+        assert response['Content-Type'] == 'text/event-stream'
+        body = b''.join(response.streaming_content).decode('utf-8')
+        events = [block.split('\n') for block in body.split('\n\n') if block.startswith('event:')]
+        assert [lines[0] for lines in events] == ['event: token', 'event: token', 'event: done']
+        assert json.loads(events[0][1][len('data: '):]) == {'provider': 'llama3', 'text': 'Guten Tag, '}
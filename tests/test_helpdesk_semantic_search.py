@@ -0,0 +1,195 @@
+"""
+Tests for semantic retrieval over knowledge articles and resolved tickets.
+Covers embedding storage, top-k search, incremental index updates and the
+keyword fallback.
+"""
+
+import re
+import zlib
+
+import numpy as np
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from apps.helpdesk.helpdesk_apps.knowledge import semantic, signals
+from apps.helpdesk.helpdesk_apps.knowledge.models import KnowledgeArticle, SemanticEmbedding
+from apps.helpdesk.helpdesk_apps.tickets.ai_service import ClaudeAIService
+from apps.helpdesk.helpdesk_apps.tickets.models import Ticket
+
+pytestmark = pytest.mark.django_db
+
+DIMENSIONS = 64
+
+
+class FakeEmbedder:
+    """Bag-of-words vectors: texts sharing words are similar."""
+
+    def __init__(self):
+        self.calls = []
+
+    def is_available(self):
+        return True
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        vectors = []
+        for text in texts:
+            vector = [0.0] * DIMENSIONS
+            for word in re.findall(r'\w+', text.lower()):
+                vector[zlib.crc32(word.encode()) % DIMENSIONS] += 1.0
+            vectors.append(vector)
+        return vectors
+
+
+@pytest.fixture
+def embedder(monkeypatch, settings):
+    settings.HELPDESK_SEMANTIC_SEARCH = True
+    settings.HELPDESK_SEMANTIC_MIN_SCORE = 0.2
+    fake = FakeEmbedder()
+    monkeypatch.setattr(semantic, 'llama3_service', fake)
+    cache.delete(semantic.VERSION_KEY)
+    semantic.index.reset()
+    yield fake
+    semantic.index.reset()
+
+
+@pytest.fixture
+def author():
+    return get_user_model().objects.create_user('autor', 'autor@example.com', 'pw')
+
+
+def _article(author, title, content, **kwargs):
+    kwargs.setdefault('status', 'published')
+    return KnowledgeArticle.objects.create(title=title, content=content, author=author, **kwargs)
+
+
+def _ticket(author, title, description, status='resolved'):
+    return Ticket.objects.create(
+        ticket_number=f'T-{Ticket.objects.count() + 1:04d}',
+        title=title,
+        description=description,
+        status=status,
+        created_by=author,
+    )
+
+
+@pytest.fixture
+def articles(author):
+    return [
+        _article(author, 'VPN Verbindung einrichten', '<p>VPN Client installieren und Verbindung testen</p>'),
+        _article(author, 'Passwort zurücksetzen', 'Passwort vergessen: Link anfordern und neues Passwort setzen'),
+        _article(author, 'Drucker einrichten', 'Drucker im Netzwerk hinzufügen'),
+        _article(author, 'Entwurf VPN', 'VPN intern', status='draft'),
+    ]
+
+
+class TestIndexing:
+    """Tests for computing and storing embeddings."""
+
+    @pytest.mark.unit
+    def test_only_published_articles_are_stored_as_float32(self, embedder, articles):
+        stats = semantic.index_objects(semantic.ARTICLE, articles)
+        assert stats == {'embedded': 3, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        assert len(embedder.calls) == 1
+        embedding = SemanticEmbedding.objects.get(source='article', object_id=articles[0].pk)
+        vector = np.frombuffer(bytes(embedding.vector), dtype=np.float32)
+        assert embedding.dimensions == DIMENSIONS and vector.shape == (DIMENSIONS,)
+        assert np.isclose(np.linalg.norm(vector), 1.0)
+        assert not SemanticEmbedding.objects.filter(object_id=articles[3].pk, source='article').exists()
+
+    @pytest.mark.unit
+    def test_unchanged_text_is_not_embedded_again(self, embedder, articles):
+        semantic.index_objects(semantic.ARTICLE, articles)
+        articles[0].views = 10
+        articles[1].status = 'archived'
+        stats = semantic.index_objects(semantic.ARTICLE, articles)
+        assert stats == {'embedded': 0, 'unchanged': 2, 'removed': 1, 'failed': 0}
+        assert len(embedder.calls) == 1
+
+
+class TestSearch:
+    """Tests for top-k retrieval and its callers."""
+
+    @pytest.mark.unit
+    def test_best_article_ranks_first(self, embedder, articles):
+        semantic.index_objects(semantic.ARTICLE, articles)
+        result = semantic.similar_articles('Meine VPN Verbindung bricht ab', limit=2)
+        assert result[0] == articles[0]
+        assert articles[3] not in result
+
+    @pytest.mark.unit
+    def test_query_vectors_are_cached(self, embedder, articles):
+        semantic.index_objects(semantic.ARTICLE, articles)
+        semantic.similar_articles('Passwort vergessen')
+        semantic.similar_articles('Passwort vergessen')
+        assert embedder.calls[1:] == [['Passwort vergessen']]
+
+    @pytest.mark.unit
+    def test_similar_tickets_skip_open_and_own_ticket(self, embedder, author):
+        resolved = _ticket(author, 'Outlook startet nicht', 'Outlook hängt beim Start')
+        current = _ticket(author, 'Outlook startet nicht mehr', 'Outlook hängt', status='resolved')
+        _ticket(author, 'Outlook startet nicht', 'Outlook hängt beim Start', status='open')
+        semantic.index_objects(semantic.TICKET, Ticket.objects.all())
+        assert semantic.similar_tickets('Outlook hängt beim Start', exclude=[current.pk]) == [resolved]
+
+    @pytest.mark.unit
+    def test_keyword_search_is_used_without_embeddings(self, settings, articles):
+        settings.HELPDESK_SEMANTIC_SEARCH = False
+        assert semantic.similar_articles('VPN') is None
+        service = ClaudeAIService.__new__(ClaudeAIService)
+        assert list(service.get_relevant_knowledge('Drucker')) == [articles[2]]
+
+    @pytest.mark.unit
+    def test_empty_index_falls_back(self, embedder):
+        assert semantic.similar_articles('VPN') is None
+
+
+class TestIncrementalUpdates:
+    """Tests for keeping the in-memory index current."""
+
+    @pytest.mark.unit
+    def test_changed_rows_are_merged_into_loaded_index(self, embedder, articles, author,
+                                                       django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            semantic.index_objects(semantic.ARTICLE, articles)
+        assert semantic.similar_articles('Drucker Netzwerk', limit=1) == [articles[2]]
+
+        scanner = _article(author, 'Scanner Netzwerk', 'Scanner im Netzwerk hinzufügen und Drucker koppeln')
+        articles[2].content = 'Toner wechseln'
+        articles[2].title = 'Toner'
+        with django_capture_on_commit_callbacks(execute=True):
+            semantic.index_objects(semantic.ARTICLE, [scanner, articles[2]])
+        assert semantic.similar_articles('Scanner Netzwerk hinzufügen', limit=1) == [scanner]
+        assert semantic.similar_articles('Toner wechseln', limit=1) == [articles[2]]
+
+    @pytest.mark.unit
+    def test_deleted_rows_leave_the_index(self, embedder, articles, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            semantic.index_objects(semantic.ARTICLE, articles)
+        assert semantic.similar_articles('VPN Verbindung', limit=1) == [articles[0]]
+        deleted_pk = articles[0].pk
+        articles[0].delete()
+        with django_capture_on_commit_callbacks(execute=True):
+            semantic.index_object(semantic.ARTICLE, deleted_pk)
+        assert deleted_pk not in [article.pk for article in semantic.similar_articles('VPN Verbindung')]
+
+    @pytest.mark.unit
+    def test_stale_rows_are_pruned(self, embedder, articles):
+        semantic.index_objects(semantic.ARTICLE, articles)
+        KnowledgeArticle.objects.filter(pk=articles[0].pk).update(is_public=False)
+        assert semantic.remove_stale(semantic.ARTICLE) == 1
+        assert SemanticEmbedding.objects.filter(source='article').count() == 2
+
+    @pytest.mark.unit
+    def test_saves_queue_index_updates(self, embedder, author, monkeypatch, django_capture_on_commit_callbacks):
+        queued = []
+        monkeypatch.setattr(signals, '_dispatch', lambda source, object_id: queued.append((source, object_id)))
+        with django_capture_on_commit_callbacks(execute=True):
+            article = _article(author, 'VPN', 'Text')
+            article.increment_views()
+            ticket = _ticket(author, 'Outlook', 'Hängt', status='open')
+            ticket.status = 'resolved'
+            ticket.save()
+            ticket.save(update_fields=['updated_at'])
+        assert queued == [('article', article.pk), ('ticket', ticket.pk)]
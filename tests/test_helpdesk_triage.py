@@ -0,0 +1,176 @@
+"""
+Tests for batched ticket triage.
+Covers response parsing, batching, content-hash caching, retries of failed
+tickets and the backlog command.
+"""
+
+import json
+import threading
+from io import StringIO
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+
+from apps.helpdesk.helpdesk_apps.tickets import triage
+from apps.helpdesk.helpdesk_apps.tickets.models import Ticket, TicketTriage
+
+pytestmark = pytest.mark.django_db
+
+
+class FakeProvider:
+    """Answers each batch prompt with one triage object per ticket."""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def is_available(self):
+        return True
+
+    def complete(self, prompt, system=None, max_tokens=None):
+        tickets = json.loads(prompt.split('\n', 1)[1])
+        with self._lock:
+            self.calls.append(len(tickets))
+        return json.dumps([
+            {
+                'id': ticket['id'],
+                'category': 'netzwerk & verbindung' if 'VPN' in ticket['title'] else 'Sonstiges',
+                'priority': 'High',
+                'sentiment': 'negative',
+                'sentiment_score': 7,
+            }
+            for ticket in tickets
+        ]), 'claude'
+
+
+@pytest.fixture
+def provider(monkeypatch, settings):
+    settings.HELPDESK_TRIAGE_BATCH_SIZE = 10
+    settings.HELPDESK_TRIAGE_WORKERS = 2
+    fake = FakeProvider()
+    monkeypatch.setattr(triage, 'unified_ai_service', fake)
+    return fake
+
+
+@pytest.fixture
+def customer():
+    return get_user_model().objects.create_user('kunde', 'kunde@example.com', 'pw')
+
+
+def _tickets(customer, count, title='VPN trennt'):
+    return [
+        Ticket.objects.create(
+            ticket_number=f'T-{Ticket.objects.count() + 1:04d}',
+            title=f'{title} {number}',
+            description=f'Beschreibung {number}',
+            created_by=customer,
+        )
+        for number in range(count)
+    ]
+
+
+class TestParseBatch:
+    """Tests for reading the structured AI answer."""
+
+    @pytest.mark.unit
+    def test_values_are_normalized_and_junk_dropped(self):
+        text = 'Ergebnis:\n[{"id": 0, "category": "sonstiges", "priority": "LOW", "sentiment": "urgent", ' \
+               '"sentiment_score": 12}, {"id": 5, "category": "Sonstiges"}, {"id": 1, "category": "Wetter"}, "x"]'
+        assert triage.parse_batch(text, [0, 1]) == {
+            0: {'category_name': 'Sonstiges', 'priority': 'low', 'sentiment': 'urgent', 'sentiment_score': 1.0},
+        }
+
+    @pytest.mark.unit
+    def test_invalid_json_yields_nothing(self):
+        assert triage.parse_batch('Keine Ahnung', [0]) == {}
+        assert triage.parse_batch('[{"id": 0,', [0]) == {}
+
+
+class TestTriageTickets:
+    """Tests for the batched triage pipeline."""
+
+    @pytest.mark.unit
+    def test_tickets_are_triaged_in_batches(self, provider, customer):
+        tickets = _tickets(customer, 25)
+        stats = triage.triage_tickets(Ticket.objects.all())
+        assert stats == {'triaged': 25, 'cached': 0, 'unchanged': 0, 'failed': 0}
+        assert sorted(provider.calls) == [5, 10, 10]
+        result = TicketTriage.objects.get(ticket=tickets[0])
+        assert (result.category_name, result.priority, result.sentiment) == ('Netzwerk & Verbindung', 'high', 'negative')
+        assert result.sentiment_score == 0.7
+        assert result.provider == 'claude'
+
+    @pytest.mark.unit
+    def test_unchanged_and_duplicate_content_is_not_sent_again(self, provider, customer):
+        first, second = _tickets(customer, 2)
+        triage.triage_tickets([first, second])
+        duplicate = Ticket.objects.create(
+            ticket_number='T-DUP', title=first.title, description=first.description, created_by=customer
+        )
+        stats = triage.triage_tickets(Ticket.objects.all())
+        assert stats == {'triaged': 0, 'cached': 1, 'unchanged': 2, 'failed': 0}
+        assert provider.calls == [2]
+        assert TicketTriage.objects.get(ticket=duplicate).category_name == 'Netzwerk & Verbindung'
+
+        second.title = 'Drucker defekt'
+        second.save()
+        assert triage.triage_tickets(Ticket.objects.all())['triaged'] == 1
+        assert TicketTriage.objects.get(ticket=second).category_name == 'Sonstiges'
+
+    @pytest.mark.unit
+    def test_identical_new_tickets_share_one_slot(self, provider, customer):
+        for number in range(3):
+            Ticket.objects.create(ticket_number=f'T-S{number}', title='Spam', description='Gleich', created_by=customer)
+        assert triage.triage_tickets(Ticket.objects.all())['triaged'] == 3
+        assert provider.calls == [1]
+
+    @pytest.mark.unit
+    def test_missing_answers_count_as_failed(self, provider, customer, monkeypatch):
+        _tickets(customer, 2)
+        monkeypatch.setattr(provider, 'complete', lambda prompt, **kwargs: ('[]', 'llama3'))
+        assert triage.triage_tickets(Ticket.objects.all())['failed'] == 2
+        assert set(TicketTriage.objects.values_list('content_sha256', 'category_name', 'failed_attempts')) == {('', '', 1)}
+
+    @pytest.mark.unit
+    def test_without_provider_nothing_is_called(self, customer, monkeypatch):
+        _tickets(customer, 1)
+        monkeypatch.setattr(triage, 'unified_ai_service', SimpleNamespace(is_available=lambda: False))
+        assert triage.triage_tickets(Ticket.objects.all())['failed'] == 1
+
+
+class TestTriageCommand:
+    """Tests for pending runs and offline backlog re-triage."""
+
+    @pytest.mark.unit
+    def test_pending_run_and_backlog_command(self, provider, customer):
+        tickets = _tickets(customer, 3)
+        assert triage.triage_pending()['triaged'] == 3
+        assert triage.triage_pending()['triaged'] == 0
+        call_command('triage_tickets', '--all', '--force', '--batch-size', '2', stdout=StringIO())
+        assert sorted(provider.calls[-2:]) == [1, 2]
+        assert TicketTriage.objects.filter(ticket__in=tickets).count() == 3
+
+    @pytest.mark.unit
+    def test_failed_tickets_back_off_and_give_up(self, provider, customer, monkeypatch, settings):
+        settings.HELPDESK_TRIAGE_MAX_ATTEMPTS = 2
+        (broken,) = _tickets(customer, 1)
+        answer = provider.complete
+        monkeypatch.setattr(provider, 'complete', lambda prompt, **kwargs: ('kein JSON', 'llama3'))
+        assert triage.triage_pending()['failed'] == 1
+        assert list(triage.pending_tickets()) == []
+
+        TicketTriage.objects.update(retry_after=timezone.now())
+        assert triage.triage_pending()['failed'] == 1
+        TicketTriage.objects.update(retry_after=timezone.now())
+        assert list(triage.pending_tickets()) == []
+
+        # Neue Tickets werden weiter triagiert, ein Erfolg setzt den Zähler zurück
+        monkeypatch.setattr(provider, 'complete', answer)
+        (fresh,) = _tickets(customer, 1, title='Drucker')
+        assert triage.triage_pending()['triaged'] == 1
+        assert triage.triage_tickets([broken])['triaged'] == 1
+        assert TicketTriage.objects.get(ticket=broken).failed_attempts == 0
+        assert TicketTriage.objects.get(ticket=fresh).category_name == 'Sonstiges'
@@ -0,0 +1,183 @@
+"""
+Tests for the marketing KPI fact table.
+Covers number/date parsing, the chunked CSV import, day/week/month rollups
+and the campaign detail and API consumers.
+"""
+
+import datetime
+import io
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from apps.helpdesk.helpdesk_apps.admin_panel.models import SystemSettings
+from apps.marketing.models import Campaign, CampaignKpiDaily, CampaignKpiRollup
+from apps.marketing.services import kpi
+
+pytestmark = pytest.mark.django_db
+
+
+def _csv(text):
+    return io.BytesIO(text.encode('utf-8'))
+
+
+@pytest.fixture
+def campaign():
+    return Campaign.objects.create(name='Herbst')
+
+
+@pytest.fixture
+def staff_client(client):
+    system_settings = SystemSettings.get_settings()
+    system_settings.app_toggles = {**(system_settings.app_toggles or {}), 'marketing': True}
+    system_settings.save()
+    user = get_user_model().objects.create_user('marketing', 'marketing@example.com', 'pw', is_staff=True)
+    client.force_login(user)
+    return client
+
+
+GERMAN_EXPORT = (
+    'Datum;Kanal;Impressionen;Klicks;Conversions;Kosten;Umsatz\n'
+    '30.09.2024;Meta;1.200;30;2;12,50 €;100,00\n'
+    '30.09.2024;Meta;800;10;1;7,50 €;50,00\n'
+    '01.10.2024;Google;2.000;40;4;1.020,00 €;400,00\n'
+    'Gesamt;;4.000;80;7;1.040,00;550,00\n'
+)
+
+
+class TestParsing:
+    """Tests for the vectorized number and date parsing."""
+
+    @pytest.mark.unit
+    def test_german_and_english_numbers(self):
+        values = pd.Series(['1.234,56', '1,234.56', '12.50', '1.234', '1,5', '€ 3', '', None, 'n/a', '-2,5'])
+        assert kpi.parse_numbers(values).tolist() == [1234.56, 1234.56, 12.5, 1234.0, 1.5, 3.0, 0, 0, 0, -2.5]
+
+    @pytest.mark.unit
+    def test_iso_german_and_us_dates(self):
+        parsed = kpi.parse_dates(pd.Series(['2024-10-01', '02.10.2024', '10/03/2024', 'Gesamt']))
+        assert parsed.dt.date.tolist()[:3] == [datetime.date(2024, 10, d) for d in (1, 2, 3)]
+        assert pd.isna(parsed.iloc[3])
+
+
+class TestImport:
+    """Tests for importing exports into daily facts."""
+
+    @pytest.mark.unit
+    def test_german_export_is_summed_per_day_and_channel(self, campaign):
+        result = kpi.import_kpi_csv(campaign, _csv(GERMAN_EXPORT))
+        assert (result['rows'], result['skipped'], result['days']) == (4, 1, 2)
+        assert result['channels'] == ['google', 'meta']
+        meta = CampaignKpiDaily.objects.get(campaign=campaign, channel='meta')
+        assert (meta.date, meta.impressions, meta.clicks, meta.spend) == (
+            datetime.date(2024, 9, 30), 2000, 40, Decimal('20.00'),
+        )
+        campaign.refresh_from_db()
+        assert (campaign.kpi_impressions, campaign.kpi_spend) == (4000, Decimal('1040.00'))
+        assert campaign.kpi_snapshots.count() == 1
+
+    @pytest.mark.unit
+    def test_reimport_replaces_same_day_and_channel(self, campaign):
+        kpi.import_kpi_csv(campaign, _csv(GERMAN_EXPORT))
+        kpi.import_kpi_csv(campaign, _csv(
+            'date,channel,impressions,clicks,conversions,spend,revenue\n'
+            '2024-10-01,google,500,5,1,10.00,20.00\n'
+        ))
+        assert CampaignKpiDaily.objects.filter(campaign=campaign).count() == 2
+        campaign.refresh_from_db()
+        assert (campaign.kpi_impressions, campaign.last_kpi_impressions) == (2500, 4000)
+
+    @pytest.mark.unit
+    def test_file_without_date_is_booked_today(self, campaign):
+        kpi.import_kpi_csv(campaign, _csv('impressions,clicks,conversions,spend,revenue\n10,1,0,1.5,0\n'))
+        daily = CampaignKpiDaily.objects.get(campaign=campaign)
+        assert daily.channel == kpi.DEFAULT_CHANNEL
+        assert daily.date == datetime.date.today()
+
+    @pytest.mark.unit
+    def test_reimported_snapshot_export_replaces_totals(self, staff_client, campaign):
+        kpi.import_kpi_csv(campaign, _csv(GERMAN_EXPORT))
+        export = staff_client.get(reverse('marketing:campaign_kpi_export', args=[campaign.pk])).content
+        kpi.import_kpi_csv(campaign, io.BytesIO(export))
+        CampaignKpiDaily.objects.filter(campaign=campaign).update(date=datetime.date(2024, 10, 2))
+        kpi.import_kpi_csv(campaign, io.BytesIO(export))
+
+        campaign.refresh_from_db()
+        assert (campaign.kpi_impressions, campaign.kpi_spend) == (4000, Decimal('1040.00'))
+        assert CampaignKpiDaily.objects.filter(campaign=campaign).count() == 1
+
+    @pytest.mark.unit
+    def test_dated_import_replaces_totals_of_dateless_import(self, staff_client, campaign):
+        """Daily figures after a totals upload are not added on top of the totals."""
+        kpi.import_kpi_csv(campaign, _csv(GERMAN_EXPORT))
+        export = staff_client.get(reverse('marketing:campaign_kpi_export', args=[campaign.pk])).content
+        kpi.import_kpi_csv(campaign, io.BytesIO(export))
+        assert CampaignKpiDaily.objects.get(campaign=campaign).cumulative
+
+        kpi.import_kpi_csv(campaign, _csv(GERMAN_EXPORT))
+        campaign.refresh_from_db()
+        assert (campaign.kpi_impressions, campaign.kpi_spend) == (4000, Decimal('1040.00'))
+        assert not CampaignKpiDaily.objects.filter(campaign=campaign, cumulative=True).exists()
+
+    @pytest.mark.unit
+    def test_missing_columns_are_reported(self, campaign):
+        with pytest.raises(kpi.KpiImportError) as excinfo:
+            kpi.import_kpi_csv(campaign, _csv('date,impressions,clicks\n2024-10-01,1,1\n'))
+        assert excinfo.value.missing == ['conversions', 'revenue', 'spend']
+        assert not CampaignKpiDaily.objects.exists()
+
+
+class TestRollups:
+    """Tests for the precomputed week and month rollups."""
+
+    @pytest.mark.unit
+    def test_weeks_start_monday_and_months_on_the_first(self, campaign):
+        kpi.import_kpi_csv(campaign, _csv(GERMAN_EXPORT))
+        weeks = CampaignKpiRollup.objects.filter(campaign=campaign, period='week', channel='')
+        assert [(row.period_start, row.impressions) for row in weeks] == [(datetime.date(2024, 9, 30), 4000)]
+        months = dict(
+            CampaignKpiRollup.objects.filter(campaign=campaign, period='month', channel='')
+            .values_list('period_start', 'impressions')
+        )
+        assert months == {datetime.date(2024, 9, 1): 2000, datetime.date(2024, 10, 1): 2000}
+        assert not CampaignKpiRollup.objects.filter(period='day').exclude(channel='').exists()
+
+    @pytest.mark.unit
+    def test_trend_and_channel_totals_read_rollups(self, campaign):
+        kpi.import_kpi_csv(campaign, _csv(GERMAN_EXPORT))
+        assert kpi.kpi_trend(campaign, 'clicks', 'day') == [
+            (datetime.date(2024, 9, 30), 40), (datetime.date(2024, 10, 1), 40),
+        ]
+        totals = kpi.channel_totals(campaign)
+        assert [(row['channel'], row['spend']) for row in totals] == [
+            ('google', Decimal('1020.00')), ('meta', Decimal('20.00')),
+        ]
+
+
+class TestConsumers:
+    """Tests for the detail view and the rollup API."""
+
+    @pytest.mark.unit
+    def test_upload_and_detail_view(self, staff_client, campaign):
+        url = reverse('marketing:campaign_detail', args=[campaign.pk])
+        upload = SimpleUploadedFile('kpi.csv', GERMAN_EXPORT.encode('utf-8'), content_type='text/csv')
+        staff_client.post(url, {'action': 'import_kpi', 'kpi_file': upload})
+        response = staff_client.get(url, {'trend': 'revenue', 'period': 'month'})
+        assert response.status_code == 200
+        assert response.context['trend_period'] == 'month'
+        assert [point['value'] for point in response.context['kpi_sparkline']] == [150.0, 400.0]
+        assert [row['channel'] for row in response.context['kpi_channels']] == ['google', 'meta']
+
+    @pytest.mark.unit
+    def test_rollup_api_filters(self, staff_client, campaign):
+        kpi.import_kpi_csv(campaign, _csv(GERMAN_EXPORT))
+        response = staff_client.get(
+            reverse('marketing:marketing_api:kpi-rollups-list'),
+            {'campaign': campaign.pk, 'period': 'month', 'channel': ''},
+        )
+        assert response.status_code == 200
+        assert [row['period_start'] for row in response.json()] == ['2024-09-01', '2024-10-01']
@@ -0,0 +1,174 @@
+"""
+Tests for the workflow runtime.
+Executions are queued, stages run concurrently, failing steps retry and dead-letter.
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from apps.workflows import services, trigger_index
+from apps.workflows.models import Workflow, WorkflowExecution, WorkflowStep
+
+pytestmark = pytest.mark.django_db
+
+
+class FakeResponse:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+
+
+class FakeSession:
+    """Records webhook calls; ``delay`` simulates a slow endpoint."""
+
+    def __init__(self, delay=0.0, status_codes=None):
+        self.delay = delay
+        self.status_codes = list(status_codes or [])
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def post(self, url, json=None, timeout=None):
+        with self.lock:
+            self.calls.append((url, timeout))
+            status = self.status_codes.pop(0) if self.status_codes else 200
+        time.sleep(self.delay)
+        return FakeResponse(status)
+
+
+@pytest.fixture(autouse=True)
+def fast_runtime(monkeypatch, settings):
+    settings.WORKFLOWS_EXECUTION_MODE = 'inline'
+    monkeypatch.setattr(services, 'RETRY_BACKOFF_SECONDS', 0)
+
+
+@pytest.fixture
+def workflow(db):
+    return Workflow.objects.create(name='Order hooks', trigger_type='erp_order_status')
+
+
+class TestWorkflowRuntime:
+    """Tests for queueing and executing workflows."""
+
+    @pytest.mark.unit
+    def test_trigger_queues_execution(self, workflow, settings):
+        settings.WORKFLOWS_EXECUTION_MODE = 'none'
+        queued = services.run_workflows_for_trigger('erp_order_status', context={'order_id': 1})
+        execution = WorkflowExecution.objects.get(workflow=workflow)
+        assert queued == 1
+        assert execution.status == 'queued'
+        assert execution.context == {'order_id': 1}
+
+    @pytest.mark.unit
+    def test_same_order_steps_run_concurrently(self, workflow, monkeypatch):
+        session = FakeSession(delay=0.3)
+        monkeypatch.setattr(services, 'get_http_session', lambda: session)
+        for idx in range(3):
+            WorkflowStep.objects.create(
+                workflow=workflow, name=f'hook {idx}', action_type='webhook',
+                config={'url': f'https://hooks.test/{idx}'}, order=1,
+            )
+        execution = WorkflowExecution.objects.create(workflow=workflow)
+
+        started = time.monotonic()
+        status = services.run_execution(execution.pk)
+        elapsed = time.monotonic() - started
+
+        execution.refresh_from_db()
+        assert status == 'success'
+        assert len(session.calls) == 3
+        assert elapsed < 0.8
+        assert execution.step_runs.count() == 3
+        assert all(run.duration_ms >= 250 for run in execution.step_runs.all())
+
+    @pytest.mark.unit
+    def test_failing_step_retries_then_dead_letters(self, workflow, monkeypatch):
+        session = FakeSession(status_codes=[500, 500, 500])
+        monkeypatch.setattr(services, 'get_http_session', lambda: session)
+        WorkflowStep.objects.create(
+            workflow=workflow, name='hook', action_type='webhook',
+            config={'url': 'https://hooks.test/x'}, order=1, max_retries=2,
+        )
+        WorkflowStep.objects.create(
+            workflow=workflow, name='later', action_type='webhook',
+            config={'url': 'https://hooks.test/y'}, order=2,
+        )
+        execution = WorkflowExecution.objects.create(workflow=workflow)
+
+        assert services.run_execution(execution.pk) == 'dead'
+        run = execution.step_runs.get()
+        assert run.attempts == 3
+        assert run.status == 'failed'
+        assert len(session.calls) == 3
+
+    @pytest.mark.unit
+    def test_run_execution_is_idempotent(self, workflow):
+        execution = WorkflowExecution.objects.create(workflow=workflow)
+        assert services.run_execution(execution.pk) == 'success'
+        assert services.run_execution(execution.pk) is None
+
+    @pytest.mark.unit
+    def test_requeue_dead_execution(self, workflow, monkeypatch):
+        monkeypatch.setattr(services, 'get_http_session', lambda: FakeSession(status_codes=[503]))
+        WorkflowStep.objects.create(
+            workflow=workflow, name='hook', action_type='webhook',
+            config={'url': 'https://hooks.test/x'}, order=1,
+        )
+        execution = WorkflowExecution.objects.create(workflow=workflow)
+        services.run_execution(execution.pk)
+
+        assert services.requeue_execution(execution)
+        execution.refresh_from_db()
+        assert execution.status == 'queued'
+        assert not execution.step_runs.exists()
+
+    @pytest.mark.unit
+    def test_stuck_running_execution_is_rerun_then_failed(self, workflow):
+        long_ago = timezone.now() - timedelta(hours=2)
+        execution = WorkflowExecution.objects.create(workflow=workflow)
+        WorkflowExecution.objects.filter(pk=execution.pk).update(status='running', started_at=long_ago)
+
+        assert services.run_stale_executions() == 1
+        execution.refresh_from_db()
+        assert execution.status == 'success'
+        assert execution.attempts == 2
+
+        WorkflowExecution.objects.filter(pk=execution.pk).update(status='running', started_at=long_ago)
+        assert services.recover_running_executions() == (0, 1)
+        execution.refresh_from_db()
+        assert execution.status == 'failed'
+        assert execution.finished_at is not None
+
+
+class TestTriggerIndex:
+    """Tests for the compiled trigger index used by dispatch."""
+
+    @pytest.fixture(autouse=True)
+    def queue_only(self, settings):
+        settings.WORKFLOWS_EXECUTION_MODE = 'none'
+
+    @pytest.mark.unit
+    def test_no_match_needs_no_query(self, workflow, django_assert_num_queries):
+        trigger_index.get_index()
+        with django_assert_num_queries(0):
+            assert services.run_workflows_for_trigger('crm_lead_status', context={'status': 'won'}) == 0
+
+    @pytest.mark.unit
+    def test_filters_are_matched_by_value(self, workflow):
+        won = Workflow.objects.create(
+            name='Won', trigger_type='erp_order_status', trigger_filters={'status': ['paid', 'invoiced']},
+        )
+        trigger_index.reset_index()
+
+        index = trigger_index.get_index()
+        assert index.match_trigger('erp_order_status', {'status': 'paid'}) == [workflow.pk, won.pk]
+        assert index.match_trigger('erp_order_status', {'status': 'draft'}) == [workflow.pk]
+
+    @pytest.mark.unit
+    def test_step_change_invalidates_action_lookup(self, workflow, django_capture_on_commit_callbacks):
+        assert trigger_index.get_index().match_action('webhook') == []
+        with django_capture_on_commit_callbacks(execute=True):
+            WorkflowStep.objects.create(workflow=workflow, name='hook', action_type='webhook', order=1)
+        assert trigger_index.get_index().match_action('webhook') == [workflow.pk]
+        assert trigger_index.get_index().match_action('webhook', trigger='invoice_issued') == []